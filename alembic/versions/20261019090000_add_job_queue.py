@@ -0,0 +1,47 @@
+"""Add job_queue table
+
+Revision ID: add_job_queue
+Revises: add_notification_log
+Create Date: 2026-10-19 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_job_queue'
+down_revision = 'add_notification_log'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create job_queue table (worker processes claim jobs by lease)
+    op.create_table(
+        'job_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('dedupe_key', sa.String(150), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dedupe_key')
+    )
+    
+    op.create_index(
+        'idx_job_status_run_after',
+        'job_queue',
+        ['status', 'run_after']
+    )
+
+
+def downgrade():
+    op.drop_index('idx_job_status_run_after')
+    op.drop_table('job_queue')
@@ -0,0 +1,30 @@
+"""Add scheduler_lease table
+
+Revision ID: add_scheduler_lease
+Revises: add_job_queue
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_scheduler_lease'
+down_revision = 'add_job_queue'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create scheduler_lease table (leader election between replicas)
+    op.create_table(
+        'scheduler_lease',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('holder', sa.String(100), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_lease')
@@ -0,0 +1,165 @@
+"""Compact lo_2_so_history / lo_3_so_history storage
+
+Revision ID: compact_lo_history
+Revises: add_scheduler_lease
+Create Date: 2026-10-19 11:00:00
+
+- number, province, region, prize stored as smallint (ids in app/constants/codes.py)
+- drop per-row position / created_at
+- replace 4 composite + 5 single-column indexes with 2 covering indexes
+
+Rows are copied with INSERT ... SELECT (backfill), old tables dropped and
+the new ones renamed in place. Rows with unknown province/region/prize
+codes cannot be encoded and are skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.constants.codes import PROVINCE_IDS, REGION_IDS, PRIZE_TIERS
+
+revision = 'compact_lo_history'
+down_revision = 'add_scheduler_lease'
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    # table: (number width, index prefix, lottery_result_id has FK)
+    'lo_2_so_history': (2, 'idx_lo2so', False),
+    'lo_3_so_history': (3, 'idx_lo3so', True),
+}
+
+
+def _case(column, mapping):
+    whens = " ".join(f"WHEN '{code}' THEN {value}" for code, value in mapping.items())
+    return f"CASE {column} {whens} END"
+
+
+def _reverse_case(column, mapping):
+    whens = " ".join(f"WHEN {value} THEN '{code}'" for code, value in mapping.items())
+    return f"CASE {column} {whens} END"
+
+
+def _in(mapping):
+    return ", ".join(f"'{code}'" for code in mapping)
+
+
+def _lottery_result_fk(has_fk):
+    if has_fk:
+        return [sa.ForeignKeyConstraint(['lottery_result_id'], ['lottery_results.id'])]
+    return []
+
+
+def upgrade():
+    for table, (width, prefix, has_fk) in TABLES.items():
+        compact = f'{table}_compact'
+
+        op.create_table(
+            compact,
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('lottery_result_id', sa.Integer(), nullable=False),
+            sa.Column('province_id', sa.SmallInteger(), nullable=False),
+            sa.Column('region_id', sa.SmallInteger(), nullable=False),
+            sa.Column('draw_date', sa.Date(), nullable=False),
+            sa.Column('number', sa.SmallInteger(), nullable=False),
+            sa.Column('prize_tier', sa.SmallInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            *_lottery_result_fk(has_fk)
+        )
+
+        # Backfill
+        op.execute(f"""
+            INSERT INTO {compact}
+                (id, lottery_result_id, province_id, region_id, draw_date, number, prize_tier)
+            SELECT
+                id,
+                lottery_result_id,
+                {_case('province_code', PROVINCE_IDS)},
+                {_case('region', REGION_IDS)},
+                draw_date,
+                CAST(number AS SMALLINT),
+                {_case('prize_type', PRIZE_TIERS)}
+            FROM {table}
+            WHERE province_code IN ({_in(PROVINCE_IDS)})
+              AND region IN ({_in(REGION_IDS)})
+              AND prize_type IN ({_in(PRIZE_TIERS)})
+        """)
+
+        op.drop_table(table)
+        op.rename_table(compact, table)
+
+        op.create_index(f'{prefix}_province_date_number', table, ['province_id', 'draw_date', 'number'])
+        op.create_index(f'{prefix}_province_number_date', table, ['province_id', 'number', 'draw_date'])
+
+    # Postgres: sequence của id giữ tên bảng tạm → đồng bộ lại giá trị
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for table in TABLES:
+            op.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for table, (width, prefix, has_fk) in TABLES.items():
+        legacy = f'{table}_legacy'
+
+        op.create_table(
+            legacy,
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('lottery_result_id', sa.Integer(), nullable=False),
+            sa.Column('province_code', sa.String(length=20), nullable=False),
+            sa.Column('region', sa.String(length=10), nullable=False),
+            sa.Column('draw_date', sa.Date(), nullable=False),
+            sa.Column('number', sa.String(length=width), nullable=False),
+            sa.Column('prize_type', sa.String(length=10), nullable=False),
+            sa.Column('position', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            *_lottery_result_fk(has_fk)
+        )
+
+        if bind.dialect.name == 'postgresql':
+            padded = f"LPAD(CAST(number AS TEXT), {width}, '0')"
+        else:
+            padded = f"substr('{'0' * width}' || number, -{width})"
+
+        prize_type = _reverse_case('prize_tier', PRIZE_TIERS)
+        position = "'last_2'" if width == 2 else prize_type
+
+        op.execute(f"""
+            INSERT INTO {legacy}
+                (id, lottery_result_id, province_code, region, draw_date, number, prize_type, position, created_at)
+            SELECT
+                id,
+                lottery_result_id,
+                {_reverse_case('province_id', PROVINCE_IDS)},
+                {_reverse_case('region_id', REGION_IDS)},
+                draw_date,
+                {padded},
+                {prize_type},
+                {position},
+                CURRENT_TIMESTAMP
+            FROM {table}
+        """)
+
+        op.drop_table(table)
+        op.rename_table(legacy, table)
+
+        op.create_index(f'ix_{table}_lottery_result_id', table, ['lottery_result_id'])
+        op.create_index(f'ix_{table}_province_code', table, ['province_code'])
+        op.create_index(f'ix_{table}_region', table, ['region'])
+        op.create_index(f'ix_{table}_draw_date', table, ['draw_date'])
+        op.create_index(f'ix_{table}_number', table, ['number'])
+
+    op.create_index('idx_number_date', 'lo_2_so_history', ['number', 'draw_date'])
+    op.create_index('idx_province_number_date', 'lo_2_so_history', ['province_code', 'number', 'draw_date'])
+    op.create_index('idx_region_number_date', 'lo_2_so_history', ['region', 'number', 'draw_date'])
+    op.create_index('idx_draw_date_number', 'lo_2_so_history', ['draw_date', 'number'])
+
+    op.create_index('idx_lo3so_number_date', 'lo_3_so_history', ['number', 'draw_date'])
+    op.create_index('idx_lo3so_province_number_date', 'lo_3_so_history', ['province_code', 'number', 'draw_date'])
+    op.create_index('idx_lo3so_region_number_date', 'lo_3_so_history', ['region', 'number', 'draw_date'])
+    op.create_index('idx_lo3so_draw_date_number', 'lo_3_so_history', ['draw_date', 'number'])
@@ -0,0 +1,127 @@
+"""Partition lo_2_so_history / lo_3_so_history by draw year (Postgres)
+
+Revision ID: partition_lo_history
+Revises: compact_lo_history
+Create Date: 2026-10-19 12:00:00
+
+Postgres only (SQLite: no-op):
+- tables become PARTITION BY RANGE (draw_date), PK (id, draw_date)
+- 1 partition per year (first data year → next year) + DEFAULT partition
+- BRIN index on draw_date; the 2 covering B-tree indexes are recreated on the parent
+
+Rows are copied from the old heap (renamed *_unpartitioned) then the old
+table is dropped. New year partitions are created by the scheduler
+(app/database/partitioning.ensure_partitions).
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import HISTORY_PARTITION_START_YEAR
+from app.models.partitioning import partition_statements
+
+revision = 'partition_lo_history'
+down_revision = 'compact_lo_history'
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    # table: (index prefix, lottery_result_id has FK)
+    'lo_2_so_history': ('idx_lo2so', False),
+    'lo_3_so_history': ('idx_lo3so', True),
+}
+
+COLUMNS = "id, lottery_result_id, province_id, region_id, draw_date, number, prize_tier"
+
+
+def _columns():
+    return [
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('lottery_result_id', sa.Integer(), nullable=False),
+        sa.Column('province_id', sa.SmallInteger(), nullable=False),
+        sa.Column('region_id', sa.SmallInteger(), nullable=False),
+        sa.Column('draw_date', sa.Date(), nullable=False),
+        sa.Column('number', sa.SmallInteger(), nullable=False),
+        sa.Column('prize_tier', sa.SmallInteger(), nullable=False),
+    ]
+
+
+def _lottery_result_fk(has_fk):
+    if has_fk:
+        return [sa.ForeignKeyConstraint(['lottery_result_id'], ['lottery_results.id'])]
+    return []
+
+
+def _create_indexes(table, prefix):
+    op.create_index(f'{prefix}_province_date_number', table, ['province_id', 'draw_date', 'number'])
+    op.create_index(f'{prefix}_province_number_date', table, ['province_id', 'number', 'draw_date'])
+
+
+def _detach(table, prefix, suffix):
+    """Đổi tên bảng cũ + sequence, bỏ PK/indexes để tên được dùng lại cho bảng mới"""
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_{suffix}")
+    op.execute(f"ALTER SEQUENCE IF EXISTS {table}_id_seq RENAME TO {table}_{suffix}_id_seq")
+    op.execute(f"ALTER TABLE {table}_{suffix} DROP CONSTRAINT IF EXISTS {table}_pkey")
+    op.execute(f"DROP INDEX IF EXISTS {prefix}_province_date_number")
+    op.execute(f"DROP INDEX IF EXISTS {prefix}_province_number_date")
+
+
+def _setval(table):
+    op.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table, (prefix, has_fk) in TABLES.items():
+        old = f'{table}_unpartitioned'
+        _detach(table, prefix, 'unpartitioned')
+
+        op.create_table(
+            table,
+            *_columns(),
+            sa.PrimaryKeyConstraint('id', 'draw_date'),
+            *_lottery_result_fk(has_fk),
+            postgresql_partition_by='RANGE (draw_date)'
+        )
+
+        first, last = bind.execute(sa.text(f"SELECT MIN(draw_date), MAX(draw_date) FROM {old}")).first()
+        first_year = min(first.year, HISTORY_PARTITION_START_YEAR) if first else HISTORY_PARTITION_START_YEAR
+        last_year = max(last.year if last else 0, date.today().year) + 1
+
+        for statement in partition_statements(table, range(first_year, last_year + 1)):
+            op.execute(statement)
+        _create_indexes(table, prefix)
+
+        op.execute(f"INSERT INTO {table} ({COLUMNS}) SELECT {COLUMNS} FROM {old}")
+        op.drop_table(old)
+        _setval(table)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table, (prefix, has_fk) in TABLES.items():
+        old = f'{table}_partitioned'
+        _detach(table, prefix, 'partitioned')
+
+        op.create_table(
+            table,
+            *_columns(),
+            sa.PrimaryKeyConstraint('id'),
+            *_lottery_result_fk(has_fk)
+        )
+        _create_indexes(table, prefix)
+
+        op.execute(f"INSERT INTO {table} ({COLUMNS}) SELECT {COLUMNS} FROM {old}")
+        # Drop bảng cha → drop luôn mọi partition và BRIN index
+        op.drop_table(old)
+        _setval(table)
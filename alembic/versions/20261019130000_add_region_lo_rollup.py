@@ -0,0 +1,67 @@
+"""Add region_lo_rollup table
+
+Revision ID: add_region_lo_rollup
+Revises: partition_lo_history
+Create Date: 2026-10-19 13:00:00
+
+1 row per (region, draw date): 100-byte count vector of 2-digit lô numbers
+over every province of the region drawing that day. Backfilled from
+lo_2_so_history; kept up to date by LotteryDBService.save_result.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_region_lo_rollup'
+down_revision = 'partition_lo_history'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table(
+        'region_lo_rollup',
+        sa.Column('region_id', sa.SmallInteger(), nullable=False),
+        sa.Column('draw_date', sa.Date(), nullable=False),
+        sa.Column('province_count', sa.SmallInteger(), nullable=False),
+        sa.Column('counts', sa.LargeBinary(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('region_id', 'draw_date')
+    )
+
+    # Backfill: đếm theo (miền, ngày, số) rồi dựng vector 100 bytes
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("""
+        SELECT region_id, draw_date, number, COUNT(*)
+        FROM lo_2_so_history
+        GROUP BY region_id, draw_date, number
+    """)).all()
+    provinces = dict(
+        ((region_id, str(draw_date)), count)
+        for region_id, draw_date, count in bind.execute(sa.text("""
+            SELECT region_id, draw_date, COUNT(DISTINCT province_id)
+            FROM lo_2_so_history
+            GROUP BY region_id, draw_date
+        """)).all()
+    )
+
+    vectors = {}
+    for region_id, draw_date, number, count in rows:
+        if isinstance(draw_date, str):  # SQLite trả về chuỗi với text()
+            draw_date = date.fromisoformat(draw_date)
+        vectors.setdefault((region_id, draw_date), bytearray(100))[number] = min(count, 255)
+
+    if vectors:
+        op.bulk_insert(rollup, [
+            {
+                'region_id': region_id,
+                'draw_date': draw_date,
+                'province_count': provinces[(region_id, str(draw_date))],
+                'counts': bytes(vector),
+            }
+            for (region_id, draw_date), vector in vectors.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('region_lo_rollup')
@@ -0,0 +1,28 @@
+"""Add partial index for đề (special prize) series
+
+Revision ID: add_de_index
+Revises: add_region_lo_rollup
+Create Date: 2026-10-19 14:00:00
+
+idx_lo2so_de covers only prize_tier = 0 (DB) rows of lo_2_so_history:
+1 entry per draw instead of 18/27, used to load the đề series per province.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_de_index'
+down_revision = 'add_region_lo_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_lo2so_de', 'lo_2_so_history', ['province_id', 'draw_date', 'number'],
+        sqlite_where=sa.text('prize_tier = 0'),
+        postgresql_where=sa.text('prize_tier = 0'),
+    )
+
+
+def downgrade():
+    op.drop_index('idx_lo2so_de', table_name='lo_2_so_history')
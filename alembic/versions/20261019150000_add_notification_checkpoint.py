@@ -0,0 +1,33 @@
+"""Add notification_checkpoint table
+
+Revision ID: add_notification_checkpoint
+Revises: add_de_index
+Create Date: 2026-10-19 15:00:00
+
+Position of a notification fan-out interrupted by a graceful shutdown, so the
+next run resumes after the last processed subscriber instead of starting over.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_notification_checkpoint'
+down_revision = 'add_de_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification_checkpoint',
+        sa.Column('key', sa.String(100), nullable=False),
+        sa.Column('last_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('success_count', sa.Integer(), nullable=False),
+        sa.Column('failed_count', sa.Integer(), nullable=False),
+        sa.Column('state', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('notification_checkpoint')
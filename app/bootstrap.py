@@ -0,0 +1,151 @@
+"""Bootstrap - Khởi động bot theo pha, warm-up trước khi nhận updates
+
+    imports   - import handlers / services (module nặng chỉ import ở đây)
+    services  - tạo services dùng chung (callbacks.init_services)
+    warmup    - kết quả hôm nay, ma trận analytics, menu (trong post_init,
+                trước khi polling bắt đầu)
+
+Mỗi pha được đo thời gian và log 1 dòng tổng kết. Mỗi stage warm-up có
+timeout riêng (WARMUP_TIMEOUT_SECONDS): lỗi / quá hạn chỉ log, bot vẫn chạy.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from app.config import SCHEDULE, WARMUP_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Số tỉnh lấy kết quả song song khi warm-up
+WARMUP_CONCURRENCY = 4
+
+
+class StartupTimer:
+    """Đo thời gian từng pha khởi động"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases.append((name, elapsed))
+            logger.info("⏱️ Startup %s: %.0fms", name, elapsed * 1000)
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        """"imports 850ms · services 40ms · ... · total 2100ms" """
+        parts = [f"{name} {elapsed * 1000:.0f}ms" for name, elapsed in self.phases]
+        parts.append(f"total {self.total * 1000:.0f}ms")
+        return " · ".join(parts)
+
+
+def today_provinces() -> List[str]:
+    """Các tỉnh quay hôm nay (MB, MT, MN)"""
+    from app.utils.cache import get_cached_schedule_day
+
+    schedule_day = get_cached_schedule_day()
+    return [code for region in ("MB", "MT", "MN") for code in SCHEDULE[region].get(schedule_day, [])]
+
+
+async def warm_results(lottery_service, province_codes: List[str]) -> int:
+    """Kết quả mới nhất của các tỉnh (đi qua Redis → DB → API như request thật)"""
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+    async def load(province_code: str) -> bool:
+        async with semaphore:
+            return bool(await lottery_service.get_latest_result(province_code))
+
+    loaded = await asyncio.gather(*(load(code) for code in province_codes), return_exceptions=True)
+    return sum(1 for item in loaded if item is True)
+
+
+async def warm_analytics(statistics_service, province_codes: List[str]) -> int:
+    """Nạp ma trận analytics (lô gan / xiên, đề, bạc nhớ, presence) vào bộ nhớ"""
+    if not statistics_service.use_database:
+        return 0
+
+    for province_code in province_codes:
+        await statistics_service.gap_score_service.get_profile(province_code)
+        await statistics_service.de_service.get_matrix(province_code)
+        await statistics_service.transition_service.get_matrix(province_code)
+    await statistics_service.presence_service.get_tensor()
+    return len(province_codes)
+
+
+def warm_menus() -> int:
+    """Render các menu / message lịch quay (nạp ScheduleCache + module UI)"""
+    from app.ui import keyboards, messages
+
+    renders = [
+        keyboards.get_main_menu_keyboard,
+        keyboards.get_results_menu_keyboard,
+        keyboards.get_stats_menu_keyboard,
+        keyboards.get_schedule_menu,
+        keyboards.get_schedule_today_keyboard,
+        keyboards.get_today_schedule_actions,
+        messages.get_today_schedule_message,
+        messages.get_tomorrow_schedule_message,
+        messages.get_full_week_schedule_message,
+    ]
+    for render in renders:
+        render()
+    for region in ("MB", "MT", "MN"):
+        messages.get_region_message(region)
+    return len(renders) + 3
+
+
+async def _run_stage(timer: StartupTimer, name: str, awaitable, timeout: float) -> Any:
+    with timer.phase(f"warmup.{name}"):
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Warm-up %s timed out after %.0fs, skipping", name, timeout)
+            return "timeout"
+        except Exception as e:
+            logger.warning("⚠️ Warm-up %s failed: %s", name, e)
+            return "error"
+
+
+async def warm_up(
+    lottery_service,
+    statistics_service,
+    timer: StartupTimer,
+    timeout: float = WARMUP_TIMEOUT_SECONDS
+) -> Dict[str, Any]:
+    """
+    Warm-up trước khi nhận updates
+
+    Returns:
+        {"menus" | "results" | "analytics": số mục đã nạp hoặc "timeout" / "error"}
+    """
+    summary: Dict[str, Any] = {}
+
+    with timer.phase("warmup.menus"):
+        try:
+            summary["menus"] = warm_menus()
+        except Exception as e:
+            logger.warning("⚠️ Warm-up menus failed: %s", e)
+            summary["menus"] = "error"
+
+    province_codes = today_provinces()
+    summary["results"] = await _run_stage(
+        timer, "results", warm_results(lottery_service, province_codes), timeout
+    )
+    summary["analytics"] = await _run_stage(
+        timer, "analytics", warm_analytics(statistics_service, province_codes), timeout
+    )
+
+    logger.info("🔥 Warm-up done (%s): %s", ", ".join(province_codes), summary)
+    return summary
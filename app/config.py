@@ -17,6 +17,15 @@ CACHE_TTL = 600  # 10 phút
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "text" | "json" (1 object JSON / dòng, kèm trace_id)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Lấy mẫu log INFO/DEBUG khối lượng lớn: "logger=N" giữ 1/N mỗi mẫu message
+# ví dụ: app.services.notification_service=20,app.handlers.callbacks=5
+LOG_SAMPLING = {
+    name.strip(): int(every)
+    for name, _, every in (item.partition("=") for item in os.getenv("LOG_SAMPLING", "").split(","))
+    if name.strip() and every.strip().isdigit() and int(every) > 0
+}
 
 # Database Configuration
 DATABASE_URL = os.getenv(
@@ -25,6 +34,86 @@ DATABASE_URL = os.getenv(
 )
 USE_DATABASE = os.getenv("USE_DATABASE", "false").lower() == "true"
 
+# Notification Delivery
+# "province": mỗi tỉnh 1 tin nhắn | "digest": gộp các tỉnh cùng miền thành 1 tin nhắn/user
+NOTIFICATION_DELIVERY_MODE = os.getenv("NOTIFICATION_DELIVERY_MODE", "province").lower()
+# Thời gian tối đa (giây) chờ các tỉnh cùng miền có đủ kết quả trước khi gửi digest
+# (lần check cuối của khung giờ luôn gửi phần đã đủ giải)
+DIGEST_WAIT_SECONDS = int(os.getenv("DIGEST_WAIT_SECONDS", "600"))
+
+# Channel fan-out: đăng kết quả 1 lần lên channel rồi copy/forward cho subscribers
+# BROADCAST_CHANNEL_ID: "@ten_channel" hoặc "-100xxxxxxxxxx"
+BROADCAST_CHANNEL_ID = os.getenv("BROADCAST_CHANNEL_ID", "")
+# Chế độ gửi theo tỉnh, ví dụ: "MB:copy,TPHCM:forward,*:direct"
+#   direct  - send_message cho từng subscriber (mặc định)
+#   copy    - đăng lên channel, copy_message cho từng subscriber
+#   forward - đăng lên channel, forward_message cho từng subscriber
+#   follow  - chỉ đăng lên channel (subscribers theo dõi channel)
+CHANNEL_PUBLISH_MODES = {
+    code.strip().upper(): mode.strip().lower()
+    for code, _, mode in (
+        item.partition(":") for item in os.getenv("CHANNEL_PUBLISH_MODES", "").split(",")
+    )
+    if code.strip() and mode.strip()
+}
+
+# Deployment mode
+# "all": 1 process làm tất cả | "handler": chỉ phục vụ updates (jobs do app.worker xử lý)
+RUN_MODE = os.getenv("RUN_MODE", "all").lower()
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "2.0"))
+
+# Leader election: nhiều replica chạy song song, chỉ leader chạy scheduler jobs
+SCHEDULER_LEADER_ELECTION = os.getenv("SCHEDULER_LEADER_ELECTION", "false").lower() == "true"
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "30"))
+
+# Analytics executor: tính toán thống kê nặng (lô gan, chuỗi) chạy ngoài event loop
+# "thread" (mặc định) | "process" (nhiều CPU: tách hẳn khỏi GIL của bot)
+ANALYTICS_EXECUTOR = os.getenv("ANALYTICS_EXECUTOR", "thread").lower()
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", "2"))
+# Số task tối đa đang chạy + chờ; vượt quá → từ chối ngay (AnalyticsBusy)
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "16"))
+# Số update xử lý đồng thời (1 = tuần tự như mặc định của python-telegram-bot)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+
+# Loop monitor: đo độ trễ event loop + bắt stack khi loop bị chặn
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.5"))
+# Loop bị chặn lâu hơn ngưỡng này (ms) → lấy mẫu stack, ghi nhận chỗ gây chặn
+LOOP_SLOW_CALLBACK_MS = int(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+# Cửa sổ histogram (giây) và chu kỳ ghi metrics ra log (0 = tắt)
+LOOP_MONITOR_WINDOW_SECONDS = int(os.getenv("LOOP_MONITOR_WINDOW_SECONDS", "900"))
+LOOP_METRICS_LOG_SECONDS = int(os.getenv("LOOP_METRICS_LOG_SECONDS", "300"))
+
+# Tracing: tỉ lệ update được ghi trace (0 = tắt, 1 = tất cả), giữ N trace gần nhất
+# trong bộ nhớ (lệnh admin /trace); TRACE_FILE → ghi thêm mỗi trace 1 dòng JSON
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+# Warm-up trước khi nhận updates: kết quả hôm nay, ma trận analytics, menu
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Mỗi stage warm-up tối đa N giây (quá hạn → bỏ qua, bot vẫn khởi động)
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "20"))
+
+# Snapshot ma trận analytics: ghi khi tắt bot, mmap + kiểm tra với database khi khởi động
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "data/analytics.snapshot")
+
+# Graceful drain khi nhận SIGTERM: chờ update / fan-out đang chạy tối đa N giây
+# (đặt nhỏ hơn thời gian chờ của orchestrator, vd. stop_grace_period)
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "25"))
+# Fan-out thông báo lưu vị trí đã gửi sau mỗi N user (và khi bị drain)
+FANOUT_CHECKPOINT_EVERY = int(os.getenv("FANOUT_CHECKPOINT_EVERY", "50"))
+
+# Batch loader: gom các lần đọc cùng loại (kết quả mới nhất, lịch sử, subscriptions)
+# trong N ms thành 1 query (0 = chỉ gom trong cùng 1 vòng event loop)
+DB_BATCH_WINDOW_MS = float(os.getenv("DB_BATCH_WINDOW_MS", "2"))
+DB_BATCH_MAX_KEYS = int(os.getenv("DB_BATCH_MAX_KEYS", "100"))
+
+# Postgres: lịch sử lô partition theo năm, bắt đầu từ năm này (cũ hơn → partition DEFAULT)
+HISTORY_PARTITION_START_YEAR = int(os.getenv("HISTORY_PARTITION_START_YEAR", "2020"))
+
 # Giờ quay thưởng (HH:MM format)
 DRAW_TIMES = {
     "MB": {"start": "18:15", "end": "18:30"},
@@ -118,3 +207,9 @@ def get_province_by_code(code: str) -> Optional[Dict]:
 def get_provinces_by_region(region: str) -> List[Dict]:
     """Lấy danh sách tỉnh theo miền"""
     return [v for v in PROVINCES.values() if v["region"] == region]
+
+
+def get_publish_mode(province_code: str, modes: Optional[Dict[str, str]] = None) -> str:
+    """Lấy chế độ gửi thông báo của tỉnh (direct/copy/forward/follow)"""
+    modes = CHANNEL_PUBLISH_MODES if modes is None else modes
+    return modes.get(province_code.upper(), modes.get("*", "direct"))
@@ -0,0 +1,75 @@
+"""
+Integer codes for compact lô history storage
+
+lo_2_so_history / lo_3_so_history lưu tỉnh, miền, giải dưới dạng smallint.
+Các ID dưới đây đã được ghi vào database → CHỈ THÊM MỚI, không đổi/xóa ID cũ.
+"""
+
+# Province code -> smallint id
+PROVINCE_IDS = {
+    # Miền Bắc
+    'MB': 1,
+
+    # Miền Nam
+    'TPHCM': 10,
+    'BALI': 11,
+    'BETR': 12,
+    'ANGI': 13,
+    'BIDU': 14,
+    'BIPH': 15,
+    'BITH': 16,
+    'CAMA': 17,
+    'CATH': 18,
+    'DALAT': 19,
+    'DONA': 20,
+    'DOTH': 21,
+    'HAGI': 22,
+    'KIGI': 23,
+    'LOAN': 24,
+    'SOTR': 25,
+    'TANI': 26,
+    'TIGI': 27,
+    'TRVI': 28,
+    'VILO': 29,
+    'VUTA': 30,
+
+    # Miền Trung
+    'DANA': 50,
+    'BIDI': 51,
+    'DALAK': 52,
+    'DANO': 53,
+    'GILA': 54,
+    'KHHO': 55,
+    'KOTU': 56,
+    'NITH': 57,
+    'PHYE': 58,
+    'QUBI': 59,
+    'QUNA': 60,
+    'QUNG': 61,
+    'QUTR': 62,
+    'THTH': 63,
+}
+
+# Region code -> smallint id
+REGION_IDS = {
+    'MB': 1,
+    'MT': 2,
+    'MN': 3,
+}
+
+# Prize key -> tier (0 = giải đặc biệt)
+PRIZE_TIERS = {
+    'DB': 0,
+    'G1': 1,
+    'G2': 2,
+    'G3': 3,
+    'G4': 4,
+    'G5': 5,
+    'G6': 6,
+    'G7': 7,
+    'G8': 8,
+}
+
+PROVINCE_CODES_BY_ID = {v: k for k, v in PROVINCE_IDS.items()}
+REGION_CODES_BY_ID = {v: k for k, v in REGION_IDS.items()}
+PRIZE_KEYS_BY_TIER = {v: k for k, v in PRIZE_TIERS.items()}
@@ -0,0 +1,94 @@
+"""Synthetic lottery results - Dữ liệu giả lập có seed cho benchmarks/tests
+
+Sinh kết quả theo đúng lịch quay (SCHEDULE) và cơ cấu giải từng miền:
+MB 27 giải, MT/MN 18 giải. Cùng seed → cùng dữ liệu.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from app.config import PROVINCES, SCHEDULE
+
+# Cơ cấu giải: prize_key -> (số chữ số, số lượng)
+MB_PRIZE_STRUCTURE = {
+    "DB": (5, 1), "G1": (5, 1), "G2": (5, 2), "G3": (5, 6),
+    "G4": (4, 4), "G5": (4, 6), "G6": (3, 3), "G7": (2, 4),
+}
+MN_MT_PRIZE_STRUCTURE = {
+    "DB": (6, 1), "G1": (5, 1), "G2": (5, 1), "G3": (5, 2), "G4": (5, 7),
+    "G5": (4, 1), "G6": (4, 3), "G7": (3, 1), "G8": (2, 1),
+}
+
+
+def generate_prizes(region: str, rng: random.Random) -> Dict[str, List[str]]:
+    """Sinh 1 bộ giải ngẫu nhiên theo cơ cấu của miền"""
+    structure = MB_PRIZE_STRUCTURE if region == "MB" else MN_MT_PRIZE_STRUCTURE
+    return {
+        key: [str(rng.randrange(10 ** digits)).zfill(digits) for _ in range(count)]
+        for key, (digits, count) in structure.items()
+    }
+
+
+def provinces_on(draw_date: date, regions: Optional[List[str]] = None) -> List[str]:
+    """Các tỉnh quay thưởng trong ngày (schedule_day: 0=CN)"""
+    schedule_day = (draw_date.weekday() + 1) % 7
+    provinces = []
+    for region in regions or ["MB", "MT", "MN"]:
+        provinces.extend(SCHEDULE[region].get(schedule_day, []))
+    return provinces
+
+
+def generate_results(
+    days: int,
+    end_date: Optional[date] = None,
+    regions: Optional[List[str]] = None,
+    seed: int = 42
+) -> Iterator[Dict]:
+    """
+    Sinh kết quả `days` ngày gần nhất (cũ → mới)
+
+    Args:
+        days: Số ngày
+        end_date: Ngày cuối (mặc định hôm nay)
+        regions: Giới hạn miền (mặc định cả 3 miền)
+        seed: Seed cho random
+
+    Yields:
+        Dict cùng format với LotteryDBService.save_result
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+
+    for offset in range(days - 1, -1, -1):
+        draw_date = end_date - timedelta(days=offset)
+        for province_code in provinces_on(draw_date, regions):
+            province = PROVINCES[province_code]
+            yield {
+                "province_code": province_code,
+                "province_name": province["name"],
+                "region": province["region"],
+                "date": draw_date.isoformat(),
+                "prizes": generate_prizes(province["region"], rng),
+            }
+
+
+def generate_subscriptions(count: int, seed: int = 42) -> Iterator[Dict]:
+    """
+    Sinh `count` subscriptions (~4 tỉnh / user, 90% active)
+
+    Yields:
+        Dict cột của UserSubscription
+    """
+    rng = random.Random(seed)
+    province_codes = sorted(PROVINCES)
+
+    for index in range(count):
+        user_id = 100000 + index // 4
+        yield {
+            "user_id": user_id,
+            "username": f"user{user_id}",
+            "province_code": rng.choice(province_codes),
+            "notification_time": None,
+            "is_active": rng.random() < 0.9,
+        }
@@ -2,5 +2,9 @@
 
 from .config import get_engine, get_session, init_db, close_db
 from .connection import DatabaseSession
+from .routing import get_read_router
+from .unit_of_work import unit_of_work, current_unit_of_work, get_unit_of_work_stats
+from .write_queue import run_write, get_write_queue
 
-__all__ = ["get_engine", "get_session", "init_db", "close_db", "DatabaseSession"]
+__all__ = ["get_engine", "get_session", "init_db", "close_db", "DatabaseSession", "run_write", "get_write_queue",
+           "unit_of_work", "current_unit_of_work", "get_unit_of_work_stats", "get_read_router"]
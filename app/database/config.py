@@ -4,6 +4,8 @@ import os
 import logging
 from typing import AsyncGenerator
 
+from sqlalchemy import Connection, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
@@ -19,6 +21,25 @@ logger = logging.getLogger(__name__)
 _engine: AsyncEngine | None = None
 _session_factory: async_sessionmaker[AsyncSession] | None = None
 
+# Read-only engine (SQLite production profile: pool riêng cho readers)
+_read_engine: AsyncEngine | None = None
+_read_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+# SQLite production profile: WAL cho phép readers chạy song song với 1 writer
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",   # WAL + NORMAL: an toàn khi crash, fsync ít hơn FULL
+    "cache_size": -64000,      # ~64MB page cache / connection
+    "mmap_size": 268435456,    # 256MB memory-mapped I/O
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,      # ms chờ lock thay vì lỗi "database is locked" ngay
+    "foreign_keys": "ON",
+}
+
+
+# ANALYZE chỉ lấy mẫu ~N dòng mỗi index → chạy nhanh cả trên database lớn
+SQLITE_ANALYSIS_LIMIT = 1000
+
 
 def get_database_url() -> str:
     """Get database URL from environment"""
@@ -28,6 +49,56 @@ def get_database_url() -> str:
     )
 
 
+def get_read_database_url() -> str:
+    """READ_DATABASE_URL: replica (hoặc chính primary để tách pool) cho read-only sessions"""
+    return os.getenv("READ_DATABASE_URL", "")
+
+
+def use_read_replica(database_url: str | None = None) -> bool:
+    """Read engine riêng theo READ_DATABASE_URL (không áp dụng cho SQLite)"""
+    database_url = database_url or get_database_url()
+    read_url = get_read_database_url()
+    return bool(read_url) and not read_url.startswith("sqlite") and not database_url.startswith("sqlite")
+
+
+def get_sqlite_profile() -> str:
+    """SQLite profile: production (WAL + pragmas + reader pool + writer queue) hoặc default"""
+    return os.getenv("SQLITE_PROFILE", "production").lower()
+
+
+def use_sqlite_profile(database_url: str | None = None) -> bool:
+    """Profile production chỉ áp dụng cho SQLite file (không phải :memory:)"""
+    database_url = database_url or get_database_url()
+    return (
+        database_url.startswith("sqlite")
+        and ":memory:" not in database_url
+        and get_sqlite_profile() == "production"
+    )
+
+
+def _install_sqlite_profile(engine: AsyncEngine, read_only: bool = False) -> None:
+    """Áp dụng pragmas khi mở connection và tự quản lý BEGIN
+
+    pysqlite/aiosqlite tự mở transaction theo cách riêng làm PRAGMA
+    journal_mode và SAVEPOINT không hoạt động đúng; tắt chế độ đó và
+    để SQLAlchemy phát BEGIN (recipe trong tài liệu SQLAlchemy).
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 def get_engine() -> AsyncEngine:
     """Get or create database engine"""
     global _engine
@@ -48,12 +119,68 @@ def get_engine() -> AsyncEngine:
                 "max_overflow": 20,
                 "pool_pre_ping": True,
             })
+        elif use_sqlite_profile(database_url):
+            # aiosqlite mặc định NullPool: mỗi session mở lại file + chạy lại pragmas.
+            # Giữ connection; writes đi qua 1 writer (write_queue), pool nhỏ đủ cho job_queue/lease
+            engine_kwargs.update({
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": 2,
+                "max_overflow": 2,
+            })
 
         _engine = create_async_engine(database_url, **engine_kwargs)
 
+        if use_sqlite_profile(database_url):
+            _install_sqlite_profile(_engine)
+            logger.info("⚡ SQLite production profile: WAL, tuned pragmas, writer queue")
+
     return _engine
 
 
+def get_read_engine() -> AsyncEngine:
+    """Engine cho read-only sessions
+
+    READ_DATABASE_URL (PostgreSQL): pool riêng trên replica / primary, đợt
+    đọc analytics không chiếm connection của ingest / notification.
+    SQLite production profile: pool nhỏ các connection query_only, đọc
+    song song với writer nhờ WAL. Các trường hợp khác dùng chung engine chính.
+    """
+    global _read_engine
+
+    database_url = get_database_url()
+    if use_read_replica(database_url):
+        if _read_engine is None:
+            read_url = get_read_database_url()
+            logger.info(f"Creating read engine: {read_url.split('@')[1] if '@' in read_url else 'local'}")
+            _read_engine = create_async_engine(
+                read_url,
+                echo=os.getenv("DB_ECHO", "false").lower() == "true",
+                pool_size=int(os.getenv("READ_POOL_SIZE", "10")),
+                max_overflow=int(os.getenv("READ_MAX_OVERFLOW", "10")),
+                pool_pre_ping=True,
+            )
+        return _read_engine
+
+    if not use_sqlite_profile(database_url):
+        return get_engine()
+
+    if _read_engine is None:
+        # Engine chính tạo trước để đảm bảo file đã ở WAL mode
+        get_engine()
+
+        pool_size = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))
+        _read_engine = create_async_engine(
+            database_url,
+            echo=os.getenv("DB_ECHO", "false").lower() == "true",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+        )
+        _install_sqlite_profile(_read_engine, read_only=True)
+
+    return _read_engine
+
+
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
     """Get or create session factory"""
     global _session_factory
@@ -69,6 +196,23 @@ def get_session_factory() -> async_sessionmaker[AsyncSession]:
     return _session_factory
 
 
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get or create read-only session factory"""
+    global _read_session_factory
+
+    if not use_sqlite_profile() and not use_read_replica():
+        return get_session_factory()
+
+    if _read_session_factory is None:
+        _read_session_factory = async_sessionmaker(
+            get_read_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+
+    return _read_session_factory
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session (for dependency injection)"""
     session_factory = get_session_factory()
@@ -83,6 +227,17 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def analyze_tables(conn: Connection) -> None:
+    """Cập nhật thống kê cho query planner (sqlite_stat1 / pg_statistic)
+
+    SQLite không tự ANALYZE: thiếu thống kê planner có thể chọn index kém
+    (vd is_active thay vì province_code) - xem tests/test_query_plans.py.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"PRAGMA analysis_limit={SQLITE_ANALYSIS_LIMIT}")
+    conn.exec_driver_sql("ANALYZE")
+
+
 async def init_db() -> None:
     """Initialize database - create all tables"""
     engine = get_engine()
@@ -90,13 +245,24 @@ async def init_db() -> None:
     logger.info("Creating database tables...")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        if use_sqlite_profile():
+            await conn.run_sync(analyze_tables)
 
     logger.info("✅ Database tables created successfully")
 
 
 async def close_db() -> None:
     """Close database connections"""
-    global _engine, _session_factory
+    global _engine, _session_factory, _read_engine, _read_session_factory
+
+    # Writer queue giữ connection của engine chính → đóng trước
+    from .write_queue import close_write_queue
+    await close_write_queue()
+
+    if _read_engine:
+        await _read_engine.dispose()
+        _read_engine = None
+        _read_session_factory = None
 
     if _engine:
         logger.info("Closing database connections...")
@@ -4,25 +4,60 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .config import get_session_factory
+from .routing import get_read_router, mark_write
+from .unit_of_work import UnitOfWork, begin_read_only, current_unit_of_work
 
 
 class DatabaseSession:
-    """Context manager for database sessions"""
+    """Context manager for database sessions
 
-    def __init__(self):
+    read_only=True: dùng read engine (SQLite: pool query_only), transaction
+    read-only và không commit khi thoát (close() trả connection, objects đã
+    load vẫn dùng được).
+
+    Có READ_DATABASE_URL: read-only đọc replica, fresh=True (dữ liệu vừa ghi,
+    sai là gửi trùng) đọc primary, xem routing.py.
+
+    Trong unit_of_work() (mỗi update / job): dùng lại session của scope, xem
+    unit_of_work.py. scoped=False: luôn mở session riêng (write phải commit ngay).
+    """
+
+    def __init__(self, read_only: bool = False, scoped: bool = True, fresh: bool = False):
+        self.read_only = read_only
+        self.scoped = scoped
+        self.fresh = fresh
         self.session: Optional[AsyncSession] = None
+        self.unit_of_work: Optional[UnitOfWork] = None
 
     async def __aenter__(self) -> AsyncSession:
         """Enter async context"""
-        session_factory = get_session_factory()
+        scope = current_unit_of_work()
+        if self.scoped and scope is not None and scope.accepts(self.read_only, self.fresh):
+            self.unit_of_work = scope
+            self.session = await scope.enter(self.fresh)
+            return self.session
+
+        if self.read_only:
+            session_factory = await get_read_router().session_factory(self.fresh)
+        else:
+            session_factory = get_session_factory()
         self.session = session_factory()
+        if scope is not None:
+            scope.checkouts += 1
+        if self.read_only:
+            await begin_read_only(self.session)
         return self.session
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Exit async context"""
+        if self.unit_of_work is not None:
+            await self.unit_of_work.exit(failed=exc_type is not None)
+            return
+
         if self.session:
             if exc_type is not None:
                 await self.session.rollback()
-            else:
+            elif not self.read_only:
                 await self.session.commit()
+                mark_write()
             await self.session.close()
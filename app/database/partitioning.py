@@ -0,0 +1,53 @@
+"""Tạo trước partition năm mới cho bảng lịch sử lô (Postgres)
+
+Partition DEFAULT nhận mọi ngày chưa có partition năm, nhưng khi DEFAULT
+đã chứa dòng của năm X thì không tạo được partition năm X nữa. Vì vậy
+scheduler gọi ensure_partitions() hằng ngày để luôn có sẵn partition cho
+năm hiện tại và năm sau. SQLite: no-op.
+"""
+
+import logging
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.models.base import Base
+from app.models.partitioning import is_partitioned, partition_name, year_partition_ddl
+from .config import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def partitioned_tables() -> List[str]:
+    """Tên các bảng partition theo năm trong metadata"""
+    return [table.name for table in Base.metadata.sorted_tables if is_partitioned(table)]
+
+
+async def ensure_partitions(years_ahead: int = 1, today: Optional[date] = None) -> List[str]:
+    """
+    Tạo partition cho năm hiện tại → năm hiện tại + years_ahead (nếu chưa có)
+
+    Returns:
+        Danh sách partitions đã đảm bảo tồn tại (rỗng nếu không phải Postgres)
+    """
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return []
+
+    today = today or date.today()
+    ensured = []
+
+    for table_name in partitioned_tables():
+        for year in range(today.year, today.year + years_ahead + 1):
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(text(year_partition_ddl(table_name, year)))
+                ensured.append(partition_name(table_name, year))
+            except Exception as e:
+                # Thường do partition DEFAULT đã có dòng thuộc năm này
+                logger.error(f"❌ Không tạo được partition {partition_name(table_name, year)}: {e}")
+
+    if ensured:
+        logger.info(f"✅ Partitions sẵn sàng: {', '.join(ensured)}")
+    return ensured
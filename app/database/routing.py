@@ -0,0 +1,135 @@
+"""Routing - Chọn engine cho read-only sessions (replica / primary)
+
+Khi có READ_DATABASE_URL (PostgreSQL), DatabaseSession(read_only=True) đọc
+từ read engine (pool riêng), trừ khi dữ liệu có thể chưa kịp sang replica:
+
+- fresh=True: đọc dữ liệu vừa ghi ở nơi khác, sai là gửi trùng / hiển thị
+  sai (notification log, checkpoint, subscriptions của user) → primary
+- context hiện tại (update / job, gồm các task con) vừa commit ghi trong
+  REPLICA_MAX_LAG_SECONDS → primary (read-your-writes)
+- replica trễ hơn REPLICA_MAX_LAG_SECONDS (đo tối đa mỗi
+  REPLICA_LAG_CHECK_SECONDS, lỗi khi đo cũng tính là trễ) → primary
+
+READ_DATABASE_URL trỏ về chính primary thì chỉ tách pool, độ trễ luôn 0.
+SQLite không dùng routing (read pool query_only cùng file, xem config.py).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .config import get_read_engine, get_read_session_factory, get_session_factory, use_read_replica
+
+logger = logging.getLogger(__name__)
+
+# Replica trễ hơn mức này → đọc từ primary; cũng là thời gian read-your-writes
+MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+
+# Khoảng cách tối thiểu giữa 2 lần đo độ trễ replica
+LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "10"))
+
+# Độ trễ replay (giây); 0 nếu là primary hoặc đã replay hết WAL nhận được
+# (replica rảnh: pg_last_xact_replay_timestamp đứng yên nhưng không trễ)
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_last_write: ContextVar[Optional[float]] = ContextVar("db_last_write", default=None)
+
+
+def mark_write() -> None:
+    """Context hiện tại vừa commit ghi: các lần đọc sau đọc primary trong MAX_LAG_SECONDS"""
+    _last_write.set(time.monotonic())
+
+
+def recently_wrote() -> bool:
+    last_write = _last_write.get()
+    return last_write is not None and time.monotonic() - last_write < MAX_LAG_SECONDS
+
+
+class ReadRouter:
+    """Đo độ trễ replica (có cache) và đếm số lần đọc theo đích"""
+
+    def __init__(self, max_lag: float = MAX_LAG_SECONDS, check_seconds: float = LAG_CHECK_SECONDS):
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.lag: Optional[float] = None
+        self.lagging = False
+        self.routes: Counter = Counter()
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _measure_lag(self) -> float:
+        async with get_read_engine().connect() as conn:
+            return float((await conn.execute(LAG_QUERY)).scalar() or 0)
+
+    async def replica_lagging(self) -> bool:
+        """Replica trễ quá max_lag (đo lại nếu kết quả cũ hơn check_seconds)"""
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return self.lagging
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_seconds:
+                return self.lagging
+
+            try:
+                self.lag = await self._measure_lag()
+                lagging = self.lag > self.max_lag
+            except Exception as e:
+                logger.warning("⚠️ Replica lag check failed, reading from primary: %s", e)
+                self.lag = None
+                lagging = True
+
+            if lagging != self.lagging:
+                if lagging:
+                    logger.warning("⚠️ Replica lagging (%ss > %ss), reads → primary", self.lag, self.max_lag)
+                else:
+                    logger.info("✅ Replica caught up (%.1fs), reads → replica", self.lag)
+            self.lagging = lagging
+            self._checked_at = time.monotonic()
+            return self.lagging
+
+    async def session_factory(self, fresh: bool = False) -> async_sessionmaker[AsyncSession]:
+        """Session factory cho 1 read-only session"""
+        if not use_read_replica():
+            return get_read_session_factory()
+
+        if fresh:
+            route = "primary_fresh"
+        elif recently_wrote():
+            route = "primary_after_write"
+        elif await self.replica_lagging():
+            route = "primary_lag"
+        else:
+            route = "replica"
+
+        self.routes[route] += 1
+        return get_read_session_factory() if route == "replica" else get_session_factory()
+
+    def snapshot(self) -> Dict:
+        return {
+            "enabled": use_read_replica(),
+            "lag": self.lag,
+            "lagging": self.lagging,
+            "routes": dict(self.routes),
+        }
+
+
+_router: Optional[ReadRouter] = None
+
+
+def get_read_router() -> ReadRouter:
+    """Router dùng chung của process"""
+    global _router
+    if _router is None:
+        _router = ReadRouter()
+    return _router
@@ -0,0 +1,195 @@
+"""Unit of work - 1 scope database cho mỗi Telegram update / job
+
+Mỗi service method tự mở DatabaseSession; gọi lồng nhau (vd.
+get_statistics_summary → get_lo2so_frequency) thì session trong giữ thêm
+1 connection trong khi session ngoài vẫn mở. Với 32 update song song và read
+pool 4 connection (SQLite), vài update là hết pool.
+
+    async with unit_of_work(read_only=True):   # update processor / worker
+        await service.get_statistics_summary("MB", 30)
+
+Trong scope, DatabaseSession của cùng task dùng lại session của scope:
+- read_only=True (mặc định): session đọc, transaction read-only, không
+  commit. Connection được trả khi DatabaseSession ngoài cùng thoát, nên scope
+  không giữ connection trong lúc handler chờ Telegram API. Gọi lồng nhau chỉ
+  dùng 1 connection.
+- read_only=False: 1 transaction cho cả scope, commit khi scope thoát
+  (rollback nếu lỗi). Mỗi DatabaseSession lồng trong chạy trong SAVEPOINT
+  riêng nên lỗi đã bắt trong service không làm hỏng cả scope.
+
+DatabaseSession ghi trong scope read-only, DatabaseSession(scoped=False)
+(run_write, job_queue, leader_election: phải commit ngay) và task con
+(asyncio.gather, create_task) vẫn mở session riêng như trước. Session riêng
+mở trong scope vẫn được đếm vào checkouts của scope.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+
+from .config import get_session_factory
+from .routing import get_read_router, mark_write
+
+logger = logging.getLogger(__name__)
+
+# Scope lấy quá số connection này → log cảnh báo
+CHECKOUT_WARN = int(os.getenv("DB_CHECKOUT_WARN", "3"))
+
+
+async def begin_read_only(session: AsyncSession) -> None:
+    """
+    Mở transaction read-only (PostgreSQL: SET TRANSACTION READ ONLY qua asyncpg)
+
+    SQLite production profile đã dùng connection query_only của read engine.
+    """
+    if session.bind is not None and session.bind.dialect.name == "postgresql":
+        await session.connection(execution_options={"postgresql_readonly": True})
+
+
+class UnitOfWork:
+    """Session dùng chung của 1 scope (gắn với task tạo scope)"""
+
+    def __init__(self, read_only: bool = True, kind: str = "update"):
+        self.read_only = read_only
+        self.kind = kind
+        self.task = asyncio.current_task()
+        self.session: Optional[AsyncSession] = None
+        self.depth = 0
+        self.checkouts = 0
+        self.closed = False
+        self._savepoints: List[Optional[AsyncSessionTransaction]] = []
+
+    def accepts(self, read_only: bool, fresh: bool = False) -> bool:
+        """DatabaseSession(read_only, fresh) của task hiện tại có dùng session của scope được không"""
+        return (
+            not self.closed
+            and self.task is asyncio.current_task()
+            and (read_only or not self.read_only)
+            # fresh trong lúc đang mở session (có thể trên replica) → session riêng
+            and not (fresh and self.read_only and self.depth > 0)
+        )
+
+    async def enter(self, fresh: bool = False) -> AsyncSession:
+        """DatabaseSession lồng trong scope bắt đầu"""
+        if self.read_only and self.depth == 0:
+            # Mỗi lần lấy connection chọn lại replica / primary (routing.py)
+            self.session = (await get_read_router().session_factory(fresh))()
+            self.checkouts += 1
+            await begin_read_only(self.session)
+        elif self.session is None:
+            self.session = get_session_factory()()
+            self.checkouts += 1
+
+        self.depth += 1
+        savepoint = None
+        if not self.read_only or self.depth > 1:
+            savepoint = await self.session.begin_nested()
+        self._savepoints.append(savepoint)
+        return self.session
+
+    async def exit(self, failed: bool) -> None:
+        """DatabaseSession lồng trong scope kết thúc"""
+        savepoint = self._savepoints.pop()
+        self.depth -= 1
+        if savepoint is not None and savepoint.is_active:
+            if failed:
+                await savepoint.rollback()
+            else:
+                await savepoint.commit()
+
+        if self.read_only and self.depth == 0:
+            # Trả connection; objects đã load vẫn dùng được (như DatabaseSession read_only)
+            await self.session.close()
+
+    async def close(self, commit: bool) -> None:
+        """Kết thúc scope: read-write → commit / rollback"""
+        self.closed = True
+        if self.session is None:
+            return
+        try:
+            if commit:
+                await self.session.commit()
+                mark_write()
+            elif self.session.in_transaction():
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+
+
+class UnitOfWorkStats:
+    """Số connection lấy ra mỗi scope (đo áp lực lên pool)"""
+
+    def __init__(self):
+        self.scopes: Counter = Counter()
+        self.checkouts: Counter = Counter()
+        self.max_checkouts: Dict[str, int] = {}
+        self.histogram: Counter = Counter()
+
+    def record(self, scope: UnitOfWork) -> None:
+        self.scopes[scope.kind] += 1
+        self.checkouts[scope.kind] += scope.checkouts
+        self.max_checkouts[scope.kind] = max(self.max_checkouts.get(scope.kind, 0), scope.checkouts)
+        self.histogram[min(scope.checkouts, CHECKOUT_WARN + 1)] += 1
+        if scope.checkouts > CHECKOUT_WARN:
+            logger.warning("⚠️ DB scope %s checked out %s connections", scope.kind, scope.checkouts)
+
+    def snapshot(self) -> Dict:
+        """{"kinds": {kind: {"scopes", "avg", "max"}}, "histogram": [(nhãn, số scope)]}"""
+        kinds = {
+            kind: {
+                "scopes": count,
+                "avg": self.checkouts[kind] / count,
+                "max": self.max_checkouts[kind],
+            }
+            for kind, count in self.scopes.items()
+        }
+        histogram = [
+            (f"{checkouts}+" if checkouts > CHECKOUT_WARN else str(checkouts), self.histogram[checkouts])
+            for checkouts in range(CHECKOUT_WARN + 2)
+        ]
+        return {"kinds": kinds, "histogram": histogram}
+
+
+_current: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+_stats = UnitOfWorkStats()
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    """Scope đang mở của context hiện tại (có thể thuộc task cha)"""
+    return _current.get()
+
+
+def get_unit_of_work_stats() -> UnitOfWorkStats:
+    return _stats
+
+
+@asynccontextmanager
+async def unit_of_work(read_only: bool = True, kind: str = "update") -> AsyncIterator[UnitOfWork]:
+    """
+    Mở scope database cho 1 update / job
+
+    Đã có scope dùng được (cùng task, đủ quyền) → dùng lại scope đó.
+    """
+    outer = _current.get()
+    if outer is not None and outer.accepts(read_only):
+        yield outer
+        return
+
+    scope = UnitOfWork(read_only, kind)
+    token = _current.set(scope)
+    try:
+        yield scope
+    except BaseException:
+        await scope.close(commit=False)
+        raise
+    else:
+        await scope.close(commit=not read_only)
+    finally:
+        _current.reset(token)
+        _stats.record(scope)
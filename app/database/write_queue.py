@@ -0,0 +1,174 @@
+"""Write queue - 1 writer duy nhất cho SQLite, gom nhiều writes vào 1 transaction
+
+SQLite chỉ cho 1 writer tại 1 thời điểm; nhiều coroutine cùng ghi sẽ tranh
+lock và chờ busy_timeout. WriteQueue đưa mọi write op vào 1 hàng đợi, 1 task
+duy nhất lấy ra theo batch và chạy trong 1 transaction:
+
+- Mỗi op chạy trong SAVEPOINT riêng → op lỗi không làm hỏng cả batch
+- Kết quả chỉ trả về sau khi batch commit thành công (durable)
+
+Ngoài SQLite production profile, run_write() chạy op trực tiếp trong
+DatabaseSession như trước.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .config import get_session_factory, use_sqlite_profile
+from .connection import DatabaseSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Hàng đợi write ops với 1 writer task"""
+
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        max_batch: int = 64,
+        max_delay: float = 0.002
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.ops = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(), name="sqlite-write-queue")
+
+    async def submit(self, op: WriteOp) -> Any:
+        """
+        Đưa 1 write op vào hàng đợi và chờ kết quả
+
+        Args:
+            op: async callable nhận AsyncSession (không tự commit)
+
+        Returns:
+            Giá trị op trả về, sau khi batch đã commit
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[WriteOp, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch: List[Tuple[WriteOp, asyncio.Future]]):
+        session_factory = self.session_factory or get_session_factory()
+        outcomes = []
+
+        try:
+            async with session_factory() as session:
+                for op, future in batch:
+                    if future.cancelled():
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            outcomes.append((future, await op(session), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+
+                await session.commit()
+
+        except Exception as e:
+            logger.error("❌ Write batch of %s failed: %s", len(batch), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.ops += len(batch)
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Xử lý nốt các op đang chờ rồi dừng writer task"""
+        if self._task is None:
+            return
+
+        while self._queue and not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+            await self._run_batch(batch)
+
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, RuntimeError):
+            pass
+        self._task = None
+
+
+_write_queue: Optional[WriteQueue] = None
+
+
+def get_write_queue() -> WriteQueue:
+    """Get or create the global write queue"""
+    global _write_queue
+
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+
+    return _write_queue
+
+
+async def close_write_queue() -> None:
+    """Flush và dừng write queue (gọi từ close_db)"""
+    global _write_queue
+
+    if _write_queue is not None:
+        await _write_queue.close()
+        _write_queue = None
+
+
+async def run_write(op: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Chạy 1 write op
+
+    SQLite production profile: qua WriteQueue (1 writer, gom batch).
+    Khác: trong DatabaseSession riêng, commit khi xong.
+    """
+    if use_sqlite_profile():
+        return await get_write_queue().submit(op)
+
+    async with DatabaseSession(scoped=False) as session:
+        return await op(session)
@@ -1,6 +1,7 @@
 """Callback handlers - Xử lý tất cả các callback từ inline buttons"""
 
 import logging
+from typing import Optional
 
 from telegram import Update
 from telegram.constants import ParseMode
@@ -8,7 +9,7 @@ from telegram.ext import ContextTypes
 from app.ui.keyboards import get_subscription_management_keyboard
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime, timedelta
-from app.ui.messages import WELCOME_MESSAGE
+from app.ui.messages import WELCOME_MESSAGE, BUSY_MESSAGE
 from app.ui.keyboards import (
     get_main_menu_keyboard,
     get_results_menu_keyboard,
@@ -21,7 +22,13 @@ from app.services.subscription_service import SubscriptionService
 from app.services.beautiful_numbers_service import BeautifulNumbersService
 from app.services.statistics_service import StatisticsService
 from app.services.mock_data import get_mock_lo_gan
+from app.services.analytics.executor import AnalyticsBusy, task_key as analytics_task_key
+from app.services.tracing import traced_update
+from app.utils.lottery_helpers import is_daily_draw_province
 from app.ui.formatters import (
+    format_bac_nho,
+    format_de_distribution,
+    format_de_gan,
     format_dau_lo,
     format_duoi_lo,
     format_lo_2_so_mb,
@@ -31,16 +38,26 @@ from app.ui.formatters import (
     format_lo_3_so_mn_mt,
     format_lo_3_so_stats,
     format_lo_gan,
+    format_lo_gan_scored,
     format_lottery_result,
+    format_lo_xien,
+    format_lo_xien_partners,
+    format_national_gan,
+    format_region_head_tail,
     format_result_mb_full,
     format_result_mn_mt_full,
 )
 from app.ui.keyboards import (
+    get_bac_nho_keyboard,
     get_back_to_menu_keyboard,
+    get_de_keyboard,
+    get_lo_gan_keyboard,
+    get_lo_xien_keyboard,
     get_main_menu_keyboard,
     get_province_detail_keyboard,
     get_province_detail_menu,
     get_region_menu_keyboard,
+    get_region_stats_keyboard,
     get_schedule_back_button,
     get_schedule_menu,
     get_schedule_today_keyboard,
@@ -58,11 +75,20 @@ from app.ui.messages import (
 
 logger = logging.getLogger(__name__)
 
-# Initialize services
-lottery_service = LotteryService(use_database=True)
-statistics_service = StatisticsService(use_database=True)
+# Services - tạo trong init_services() (pha khởi tạo của app.bootstrap), không phải lúc import
+lottery_service: Optional[LotteryService] = None
+statistics_service: Optional[StatisticsService] = None
+subscription_service: Optional[SubscriptionService] = None
+
+
+def init_services() -> None:
+    """Tạo các service dùng chung của handlers (gọi 1 lần trước khi nhận updates)"""
+    global lottery_service, statistics_service, subscription_service
+    if lottery_service is None:
+        lottery_service = LotteryService(use_database=True)
+        statistics_service = StatisticsService(use_database=True)
+        subscription_service = SubscriptionService()
 
-subscription_service = SubscriptionService()
 
 async def safe_edit_message(query, message, reply_markup, parse_mode="HTML"):
     """
@@ -84,18 +110,25 @@ async def safe_edit_message(query, message, reply_markup, parse_mode="HTML"):
         error_msg = str(e).lower()
         if "message is not modified" in error_msg:
             # Message content is same, just answer callback silently
-            logger.info(f"Message content unchanged, skipping edit")
+            logger.info("Message content unchanged, skipping edit")
         else:
             # Other errors, re-raise
             raise
 
+@traced_update
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Xử lý tất cả callback queries từ inline buttons"""
     query = update.callback_query
     await query.answer()
 
+    if lottery_service is None:
+        init_services()
+
     callback_data = query.data
-    logger.info(f"User {update.effective_user.id} clicked: {callback_data}")
+    logger.info("User %s clicked: %s", update.effective_user.id, callback_data)
+
+    # Bấm nút mới = rời màn hình cũ: tính toán analytics còn dở của user bị hủy
+    analytics_task_key.set(update.effective_user.id)
 
     try:
         # Main menu
@@ -227,7 +260,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 province = PROVINCES.get(province_key, {})
                 region = province.get("region", "MN")
 
-            logger.info(f"🔍 province_key={province_key}, region={region}")
+            logger.info("🔍 province_key=%s, region=%s", province_key, region)
 
             # Format result
             formatted_result = format_lottery_result(result_data, region)
@@ -251,43 +284,63 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             region_names = {"MB": "Miền Bắc", "MT": "Miền Trung", "MN": "Miền Nam"}
 
             try:
-                # Query frequency từ database (50 ngày)
-                frequency = await statistics_service.get_frequency_stats(region, days=200)
+                # Gộp mọi tỉnh trong miền từ region rollup (200 ngày)
+                frequency = await statistics_service.get_region_frequency(region, days=200)
                 
                 # Format message
                 if frequency:
                     sorted_freq = sorted(frequency.items(), key=lambda x: x[1], reverse=True)[:30]
+                    head_tail = await statistics_service.get_region_head_tail(region, days=200)
                     
                     message = f"📊 <b>THỐNG KÊ LÔ 2 SỐ - {region_names.get(region, region)}</b>\n"
-                    message += f"📅 Dữ liệu: 50 ngày gần nhất từ database\n\n"
+                    message += f"📅 Dữ liệu: 200 ngày gần nhất, tất cả đài trong miền\n\n"
                     
                     message += "🔥 <b>Top 30 số hay về:</b>\n"
                     for idx, (num, count) in enumerate(sorted_freq, 1):
                         message += f"  {idx:2d}. <code>{num}</code> - {count:2d} lần\n"
                     
+                    message += "\n" + format_region_head_tail(head_tail)
                     message += f"\n💾 Tổng: {len(frequency)} số đã xuất hiện"
                 else:
                     message = "⚠️ Chưa có dữ liệu trong database"
                 await query.edit_message_text(
                     message,
-                    reply_markup=get_back_to_menu_keyboard(),
+                    reply_markup=get_region_stats_keyboard(region),
                     parse_mode="HTML",
                 )
             except Exception as e:
-                logger.exception(f"Error in stats by region: {e}")
+                logger.exception("Error in stats by region: %s", e)
                 await query.edit_message_text(
                     f"❌ Lỗi khi lấy thống kê: {str(e)}",
                     reply_markup=get_back_to_menu_keyboard(),
                     parse_mode="HTML",
                 )
 
+        # Lô gan theo miền (region rollup)
+        elif callback_data.startswith("stats_") and callback_data.endswith("_regiongan"):
+            region = callback_data.split("_")[1]
+            region_names = {"MB": "Miền Bắc", "MT": "Miền Trung", "MN": "Miền Nam"}
+
+            try:
+                gan_data = await statistics_service.get_region_lo_gan(region, draws=200, limit=15)
+                message = format_lo_gan(gan_data, region_names.get(region, region))
+                
+                await safe_edit_message(query, message, get_region_stats_keyboard(region))
+            except Exception as e:
+                logger.exception("Error in region gan for %s: %s", region, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê lô gan: {str(e)}",
+                    reply_markup=get_region_stats_keyboard(region),
+                    parse_mode="HTML",
+                )
+
         # Thống kê lô 2 số - STREAK ANALYSIS
         elif callback_data.startswith("stats2_"):
             province_key = callback_data.split("_")[1]
             province = PROVINCES.get(province_key, {})
 
             try:
-                logger.info(f"Getting lo2so streak analysis for {province_key}")
+                logger.info("Getting lo2so streak analysis for %s", province_key)
                 
                 # Gọi streak analysis
                 streaks_data = await statistics_service.get_lo2so_streaks(
@@ -301,8 +354,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 message = format_lo_2_so_streaks(streaks_data, province.get("name", ""))
                 
                 await safe_edit_message(query, message, get_province_detail_keyboard(province_key))
+            except AnalyticsBusy:
+                await safe_edit_message(query, BUSY_MESSAGE, get_province_detail_keyboard(province_key))
             except Exception as e:
-                logger.exception(f"Error in stats2 for {province_key}: {e}")
+                logger.exception("Error in stats2 for %s: %s", province_key, e)
                 await query.edit_message_text(
                     f"❌ Lỗi: {str(e)}",
                     reply_markup=get_province_detail_keyboard(province_key),
@@ -315,7 +370,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             province = PROVINCES.get(province_key, {})
 
             try:
-                logger.info(f"Getting lo3so streak analysis for {province_key}")
+                logger.info("Getting lo3so streak analysis for %s", province_key)
                 
                 # Gọi streak analysis
                 streaks_data = await statistics_service.get_lo3so_streaks(
@@ -329,8 +384,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 message = format_lo_3_so_streaks(streaks_data, province.get("name", ""))
                 
                 await safe_edit_message(query, message, get_province_detail_keyboard(province_key))
+            except AnalyticsBusy:
+                await safe_edit_message(query, BUSY_MESSAGE, get_province_detail_keyboard(province_key))
             except Exception as e:
-                logger.exception(f"Error in stats3 for {province_key}: {e}")
+                logger.exception("Error in stats3 for %s: %s", province_key, e)
                 await query.edit_message_text(
                     f"❌ Lỗi: {str(e)}",
                     reply_markup=get_province_detail_keyboard(province_key),
@@ -357,7 +414,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     parse_mode="HTML",
                 )
             except Exception as e:
-                logger.exception(f"Error in stats_headtail: {e}")
+                logger.exception("Error in stats_headtail: %s", e)
                 await query.edit_message_text(
                     f"❌ Lỗi khi lấy thống kê: {str(e)}",
                     reply_markup=get_back_to_menu_keyboard(),
@@ -370,26 +427,165 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             try:
                 # Query lô gan từ database (200 draws)
-                logger.info(f"Getting lô gan from DB for {province_key} (200 draws)")
+                logger.info("Getting lô gan from DB for %s (200 draws)", province_key)
                 gan_data = await statistics_service.get_lo_gan(province_key, draws=200, limit=15)
                 
                 # Format message
                 message = format_lo_gan(gan_data, province.get("name", province_key))
                 
-                await safe_edit_message(query, message, get_province_detail_keyboard(province_key))
+                await safe_edit_message(query, message, get_lo_gan_keyboard(province_key))
+            except AnalyticsBusy:
+                await safe_edit_message(query, BUSY_MESSAGE, get_province_detail_keyboard(province_key))
+            except Exception as e:
+                logger.exception("Error in stats_gan for %s: %s", province_key, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê lô gan: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Lô gan xếp theo xác suất (phân phối gap thực nghiệm)
+        elif callback_data.startswith("stats_ganp_"):
+            province_key = callback_data.split("_")[2]
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                scores = await statistics_service.get_lo_gan_scored(province_key, limit=15)
+                message = format_lo_gan_scored(
+                    scores, province.get("name", province_key), is_daily=is_daily_draw_province(province_key)
+                )
+
+                await safe_edit_message(query, message, get_lo_gan_keyboard(province_key, scored=True))
             except Exception as e:
-                logger.exception(f"Error in stats_gan for {province_key}: {e}")
+                logger.exception("Error in stats_ganp for %s: %s", province_key, e)
                 await query.edit_message_text(
                     f"❌ Lỗi khi lấy thống kê lô gan: {str(e)}",
                     reply_markup=get_province_detail_keyboard(province_key),
                     parse_mode="HTML",
                 )
         
+        # Lô xiên theo tỉnh (co-occurrence matrix)
+        elif callback_data.startswith("stats_xien_"):
+            province_key = callback_data.split("_")[2]
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                recent_pairs = await statistics_service.get_lo_xien(province_key, draws=200, limit=10)
+                all_pairs = await statistics_service.get_lo_xien(province_key, draws=None, limit=5)
+                message = format_lo_xien(recent_pairs, all_pairs, province.get("name", province_key), draws=200)
+
+                # Nút xem số đi cùng cho các số trong top cặp
+                numbers = sorted({number for item in recent_pairs for number in item["pair"]})
+                await safe_edit_message(query, message, get_lo_xien_keyboard(province_key, numbers))
+            except Exception as e:
+                logger.exception("Error in stats_xien for %s: %s", province_key, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê lô xiên: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Các số hay về cùng 1 số
+        elif callback_data.startswith("stats_xienp_"):
+            province_key, number = callback_data[len("stats_xienp_"):].rsplit("_", 1)
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                partners = await statistics_service.get_lo_xien_partners(province_key, number, draws=200, limit=10)
+                message = format_lo_xien_partners(number, partners, province.get("name", province_key), draws=200)
+
+                await safe_edit_message(
+                    query, message, get_lo_xien_keyboard(province_key, [item["number"] for item in partners])
+                )
+            except Exception as e:
+                logger.exception("Error in stats_xienp for %s/%s: %s", province_key, number, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê lô xiên: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Bạc nhớ theo kỳ mới nhất (transition matrix)
+        elif callback_data.startswith("stats_bacnho_"):
+            province_key = callback_data.split("_")[2]
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                bac_nho = await statistics_service.get_bac_nho(province_key, draws=200, limit=10)
+                message = format_bac_nho(bac_nho, province.get("name", province_key), draws=200)
+
+                await safe_edit_message(query, message, get_bac_nho_keyboard(province_key, bac_nho.get("numbers", [])))
+            except Exception as e:
+                logger.exception("Error in stats_bacnho for %s: %s", province_key, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy bạc nhớ: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Bạc nhớ theo 1 số
+        elif callback_data.startswith("stats_bacnhop_"):
+            province_key, number = callback_data[len("stats_bacnhop_"):].rsplit("_", 1)
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                bac_nho = await statistics_service.get_bac_nho_number(province_key, number, draws=200, limit=10)
+                message = format_bac_nho(bac_nho, province.get("name", province_key), draws=200, number=number)
+
+                await safe_edit_message(
+                    query, message, get_bac_nho_keyboard(province_key, [item["number"] for item in bac_nho["next"]])
+                )
+            except Exception as e:
+                logger.exception("Error in stats_bacnhop for %s/%s: %s", province_key, number, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy bạc nhớ: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Đề: gan + chuỗi bệt (chuỗi đề trong bộ nhớ)
+        elif callback_data.startswith("stats_de_"):
+            province_key = callback_data.split("_")[2]
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                gan_data = await statistics_service.get_de_gan(province_key, limit=15)
+                streaks = await statistics_service.get_de_streaks(province_key)
+                latest = await statistics_service.get_de_latest(province_key, count=7)
+                message = format_de_gan(gan_data, streaks, latest, province.get("name", province_key))
+
+                await safe_edit_message(query, message, get_de_keyboard(province_key))
+            except Exception as e:
+                logger.exception("Error in stats_de for %s: %s", province_key, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê đề: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
+        # Đề: đầu / đuôi / tổng / chạm
+        elif callback_data.startswith("stats_dedt_"):
+            province_key = callback_data.split("_")[2]
+            province = PROVINCES.get(province_key, {})
+
+            try:
+                distributions = await statistics_service.get_de_distributions(province_key, draws=100)
+                message = format_de_distribution(distributions, province.get("name", province_key), draws=100)
+
+                await safe_edit_message(query, message, get_de_keyboard(province_key))
+            except Exception as e:
+                logger.exception("Error in stats_dedt for %s: %s", province_key, e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy thống kê đề: {str(e)}",
+                    reply_markup=get_province_detail_keyboard(province_key),
+                    parse_mode="HTML",
+                )
+
         # Lô gan
         elif callback_data == "stats_gan":
             try:
                 # Use REAL DATABASE query (200 draws)
-                logger.info(f"Getting lô gan from DB for MB (200 draws)")
+                logger.info("Getting lô gan from DB for MB (200 draws)")
                 gan_data = await statistics_service.get_lo_gan("MB", draws=200, limit=15)
                 
                 # Format message
@@ -400,14 +596,32 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     reply_markup=get_back_to_menu_keyboard(),
                     parse_mode="HTML",
                 )
+            except AnalyticsBusy:
+                await safe_edit_message(query, BUSY_MESSAGE, get_back_to_menu_keyboard())
             except Exception as e:
-                logger.exception(f"Error in stats_gan: {e}")
+                logger.exception("Error in stats_gan: %s", e)
                 await query.edit_message_text(
                     f"❌ Lỗi khi lấy thống kê lô gan: {str(e)}",
                     reply_markup=get_back_to_menu_keyboard(),
                     parse_mode="HTML",
                 )
 
+        # Gan toàn quốc (presence tensor MN + MT)
+        elif callback_data == "stats_national_gan":
+            try:
+                gan_data = await statistics_service.get_national_gan(min_gan=6, min_provinces=3, limit=15)
+                hot_data = await statistics_service.get_national_hot(draws=30, limit=10)
+                message = format_national_gan(gan_data, hot_data, min_gan=6, draws=30)
+
+                await safe_edit_message(query, message, get_stats_menu_keyboard())
+            except Exception as e:
+                logger.exception("Error in stats_national_gan: %s", e)
+                await query.edit_message_text(
+                    f"❌ Lỗi khi lấy gan toàn quốc: {str(e)}",
+                    reply_markup=get_back_to_menu_keyboard(),
+                    parse_mode="HTML",
+                )
+
         # ✅ KẾT QUẢ ĐẦY ĐỦ - DÙNG API
         elif callback_data.startswith("result_full_"):
             province_code = callback_data.replace("result_full_", "")
@@ -415,8 +629,8 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # ✅ GỌI API THẬT
             result_data = await lottery_service.get_latest_result(province_code)
 
-            logger.info(f"🔍 result_full_{province_code}")
-            logger.info(f"🔍 result_data keys: {result_data.keys()}")
+            logger.info("🔍 result_full_%s", province_code)
+            logger.info("🔍 result_data keys: %s", result_data.keys())
 
             # Format theo miền
             if province_code == "MB":
@@ -558,7 +772,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 
                 await safe_edit_message(query, text, get_province_detail_keyboard(province_code))
             except Exception as e:
-                logger.exception(f"Error in stats_lo2: {e}")
+                logger.exception("Error in stats_lo2: %s", e)
                 await safe_edit_message(
                     query,
                     "❌ Có lỗi xảy ra",
@@ -589,7 +803,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 
                 await safe_edit_message(query, text, get_province_detail_keyboard(province_code))
             except Exception as e:
-                logger.exception(f"Error in stats_lo3: {e}")
+                logger.exception("Error in stats_lo3: %s", e)
                 await safe_edit_message(
                     query,
                     "❌ Có lỗi xảy ra",
@@ -614,7 +828,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 text = format_dau_lo(result)
                 await safe_edit_message(query, text, get_province_detail_keyboard(province_code))
             except Exception as e:
-                logger.exception(f"Error in stats_dau: {e}")
+                logger.exception("Error in stats_dau: %s", e)
                 await safe_edit_message(
                     query,
                     "❌ Có lỗi xảy ra",
@@ -639,7 +853,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 text = format_duoi_lo(result)
                 await safe_edit_message(query, text, get_province_detail_keyboard(province_code))
             except Exception as e:
-                logger.exception(f"Error in stats_duoi: {e}")
+                logger.exception("Error in stats_duoi: %s", e)
                 await safe_edit_message(
                     query,
                     "❌ Có lỗi xảy ra",
@@ -695,7 +909,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 
             except Exception as e:
-                logger.exception(f"Error confirming subscription: {e}")
+                logger.exception("Error confirming subscription: %s", e)
                 await safe_edit_message(
                     query,
                     "❌ Có lỗi xảy ra. Vui lòng thử lại!",
@@ -721,7 +935,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
 
     except Exception as e:
-        logger.exception(f"Error in button_callback: {e}")
+        logger.exception("Error in button_callback: %s", e)
         try:
             await query.edit_message_text(
                 "❌ Có lỗi xảy ra. Vui lòng thử lại.",
@@ -754,7 +968,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             }
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 
                 end_date = date.today()
                 start_date = end_date - timedelta(days=days)
@@ -832,11 +1046,11 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 # Sort by days_since_last (descending)
                 lo_gan.sort(key=lambda x: x["days_since_last"], reverse=True)
                 
-                logger.info(f"✅ Got {len(lo_gan)} lo gan numbers for {province_code}")
+                logger.info("✅ Got %s lo gan numbers for %s", len(lo_gan), province_code)
                 return lo_gan[:limit]
                 
         except Exception as e:
-            logger.error(f"❌ Error getting lo gan: {e}")
+            logger.error("❌ Error getting lo gan: %s", e)
             return []
 
 
@@ -877,10 +1091,10 @@ async def handle_beautiful_numbers_callback(update: Update, context: ContextType
         # Gửi kết quả
         await loading_msg.edit_text(message, parse_mode="HTML")
         
-        logger.info(f"✨ Beautiful numbers sent for {province_code}")
+        logger.info("✨ Beautiful numbers sent for %s", province_code)
         
     except Exception as e:
-        logger.exception(f"Error in beautiful numbers callback: {e}")
+        logger.exception("Error in beautiful numbers callback: %s", e)
         try:
             await query.message.reply_text(
                 "❌ Có lỗi xảy ra khi tìm số đẹp. Vui lòng thử lại!",
@@ -900,7 +1114,7 @@ async def handle_unsubscribe_callback(update: Update, context: ContextTypes.DEFA
         user = update.effective_user
         subscription_service = SubscriptionService()
         
-        logger.info(f"User {user.id} requesting unsubscribe from {province_code}")
+        logger.info("User %s requesting unsubscribe from %s", user.id, province_code)
         
         # Hủy đăng ký
         success = await subscription_service.unsubscribe(
@@ -912,9 +1126,9 @@ async def handle_unsubscribe_callback(update: Update, context: ContextTypes.DEFA
         province_name = province.get('name', province_code)
         
         if success:
-            logger.info(f"✅ User {user.id} unsubscribed from {province_code}")
+            logger.info("✅ User %s unsubscribed from %s", user.id, province_code)
         else:
-            logger.warning(f"⚠️ User {user.id} unsubscribe failed for {province_code}")
+            logger.warning("⚠️ User %s unsubscribe failed for %s", user.id, province_code)
         
         # Refresh subscription list
         subscriptions = await subscription_service.get_user_subscriptions(user.id)
@@ -942,7 +1156,7 @@ async def handle_unsubscribe_callback(update: Update, context: ContextTypes.DEFA
         )
         
     except Exception as e:
-        logger.exception(f"Error in unsubscribe callback: {e}", exc_info=True)
+        logger.exception("Error in unsubscribe callback: %s", e, exc_info=True)
         try:
             await query.message.reply_text(
                 "❌ Có lỗi xảy ra. Vui lòng thử lại!",
@@ -959,7 +1173,7 @@ async def handle_stats_callbacks(update: Update, context: ContextTypes.DEFAULT_T
         province = PROVINCES.get(province_key, {})
         
         try:
-            logger.info(f"Getting lo2so streak analysis for {province_key}")
+            logger.info("Getting lo2so streak analysis for %s", province_key)
             streaks_data = await statistics_service.get_lo2so_streaks(
                 province_key, draws=200, min_streak=2
             )
@@ -968,8 +1182,10 @@ async def handle_stats_callbacks(update: Update, context: ContextTypes.DEFAULT_T
             message = format_lo_2_so_streaks(streaks_data, province.get("name", ""))
             
             await safe_edit_message(query, message, get_province_detail_keyboard(province_key))
+        except AnalyticsBusy:
+            await safe_edit_message(query, BUSY_MESSAGE, get_province_detail_keyboard(province_key))
         except Exception as e:
-            logger.exception(f"Error in stats2 for {province_key}: {e}")
+            logger.exception("Error in stats2 for %s: %s", province_key, e)
             await query.edit_message_text(
                 f"❌ Lỗi: {str(e)}",
                 reply_markup=get_province_detail_keyboard(province_key),
@@ -981,7 +1197,7 @@ async def handle_stats_callbacks(update: Update, context: ContextTypes.DEFAULT_T
         province = PROVINCES.get(province_key, {})
         
         try:
-            logger.info(f"Getting lo3so streak analysis for {province_key}")
+            logger.info("Getting lo3so streak analysis for %s", province_key)
             streaks_data = await statistics_service.get_lo3so_streaks(
                 province_key, draws=200, min_streak=2
             )
@@ -990,8 +1206,10 @@ async def handle_stats_callbacks(update: Update, context: ContextTypes.DEFAULT_T
             message = format_lo_3_so_streaks(streaks_data, province.get("name", ""))
             
             await safe_edit_message(query, message, get_province_detail_keyboard(province_key))
+        except AnalyticsBusy:
+            await safe_edit_message(query, BUSY_MESSAGE, get_province_detail_keyboard(province_key))
         except Exception as e:
-            logger.exception(f"Error in stats3 for {province_key}: {e}")
+            logger.exception("Error in stats3 for %s: %s", province_key, e)
             await query.edit_message_text(
                 f"❌ Lỗi: {str(e)}",
                 reply_markup=get_province_detail_keyboard(province_key),
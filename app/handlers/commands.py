@@ -13,12 +13,14 @@ from app.ui.keyboards import (
 from app.services.subscription_service import SubscriptionService
 from app.services.notification_service import NotificationService
 from app.services.admin_service import AdminService
+from app.services.tracing import traced_update
 from app.config import PROVINCES
 
 logger = logging.getLogger(__name__)
 
 
 # app/handlers/commands.py
+@traced_update
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle /start command with dynamic welcome message
@@ -107,6 +109,7 @@ Xin chào <b>{user_name}</b>! 👋
     )
 
 
+@traced_update
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Command: /help - Hiển thị trợ giúp"""
     message = (
@@ -135,6 +138,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@traced_update
 async def mb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Command: /mb - Xổ số Miền Bắc"""
     
@@ -150,6 +154,7 @@ async def mb_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@traced_update
 async def mt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Command: /mt - Xổ số Miền Trung"""
     
@@ -165,6 +170,7 @@ async def mt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@traced_update
 async def mn_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Command: /mn - Xổ số Miền Nam"""
     
@@ -180,6 +186,7 @@ async def mn_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@traced_update
 async def subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Command: /subscriptions - Quản lý đăng ký"""
     
@@ -400,3 +407,150 @@ async def admin_broadcast_command(update: Update, context: ContextTypes.DEFAULT_
     except Exception as e:
         logger.exception(f"Error in broadcast: {e}")
         await update.message.reply_text(f"❌ Lỗi: {str(e)}")
+
+
+# Giữ cache kết quả backtest giữa các lần gọi
+_backtest_service = None
+
+
+def _parse_backtest_args(args: list) -> tuple:
+    """
+    /backtest [chiến lược|all] [tỉnh|MN|MT|all] [số năm] [số con]
+
+    Returns:
+        (strategies, province_codes, years, picks)
+    """
+    from app.services.analytics import STRATEGIES
+
+    name = args[0].lower() if len(args) > 0 else "all"
+    target = args[1].upper() if len(args) > 1 else "MB"
+    years = int(args[2]) if len(args) > 2 else 5
+    picks = int(args[3]) if len(args) > 3 else 3
+
+    if name == "all":
+        strategies = sorted(STRATEGIES)
+    elif name in STRATEGIES:
+        strategies = [name]
+    else:
+        raise ValueError(f"Chiến lược không hợp lệ: {name} ({', '.join(sorted(STRATEGIES))}, all)")
+
+    if target == "ALL":
+        province_codes = list(PROVINCES)
+    elif target in ("MN", "MT"):
+        province_codes = [code for code, info in PROVINCES.items() if info.get("region") == target]
+    elif target in PROVINCES:
+        province_codes = [target]
+    else:
+        raise ValueError(f"Tỉnh không hợp lệ: {target}")
+
+    if not 1 <= years <= 20 or not 1 <= picks <= 10:
+        raise ValueError("Số năm 1-20, số con 1-10")
+
+    return strategies, province_codes, years, picks
+
+
+async def admin_backtest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Command: /backtest [chiến lược] [tỉnh] [năm] [số con] - Backtest chiến lược chọn số (admin)"""
+    global _backtest_service
+    from datetime import timedelta
+
+    from app.services.analytics import BacktestService
+    from app.ui.formatters import format_backtest
+    from app.utils.timezone import get_vietnam_today
+
+    user = update.effective_user
+
+    if not is_admin(user.id):
+        await update.message.reply_text("❌ Bạn không có quyền truy cập")
+        return
+
+    try:
+        strategies, province_codes, years, picks = _parse_backtest_args(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"⚠️ {e}\n\n"
+            "<code>/backtest [hot|cold|gan|streak|all] [MB|TPHCM|MN|MT|all] [năm] [số con]</code>\n"
+            "Ví dụ: <code>/backtest gan MB 5 3</code>",
+            parse_mode='HTML'
+        )
+        return
+
+    try:
+        if _backtest_service is None:
+            _backtest_service = BacktestService()
+
+        await update.message.reply_text(
+            f"⏳ Đang backtest {len(strategies)} chiến lược × {len(province_codes)} tỉnh ({years} năm)..."
+        )
+
+        since = get_vietnam_today() - timedelta(days=365 * years)
+        results = await _backtest_service.run(strategies, province_codes, since, picks)
+
+        await update.message.reply_text(format_backtest(results, years, picks), parse_mode='HTML')
+
+    except Exception as e:
+        logger.exception(f"Error in backtest: {e}")
+        await update.message.reply_text(f"❌ Lỗi: {str(e)}")
+
+
+async def admin_loop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Command: /loop - Độ trễ event loop, các chỗ gây chặn loop, connection DB mỗi update, batch đọc DB (admin)"""
+    from app.database import get_read_router, get_unit_of_work_stats
+    from app.services.db.batch_loader import loader_stats
+    from app.services.loop_monitor import get_loop_monitor
+    from app.ui.formatters import format_batch_loaders, format_db_scopes, format_loop_health
+
+    user = update.effective_user
+
+    if not is_admin(user.id):
+        await update.message.reply_text("❌ Bạn không có quyền truy cập")
+        return
+
+    try:
+        snapshot = get_loop_monitor().snapshot()
+        message = format_loop_health(snapshot) + "\n\n" + format_db_scopes(
+            get_unit_of_work_stats().snapshot(), get_read_router().snapshot()
+        ) + "\n\n" + format_batch_loaders(loader_stats())
+        await update.message.reply_text(message, parse_mode='HTML')
+    except Exception as e:
+        logger.exception(f"Error in loop health: {e}")
+        await update.message.reply_text(f"❌ Lỗi: {str(e)}")
+
+
+async def admin_trace_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Command: /trace [id | rate 0.1] - Trace các update gần nhất (admin)"""
+    from app.services.tracing import get_tracer
+    from app.ui.formatters import format_trace_list, format_trace_waterfall
+
+    user = update.effective_user
+
+    if not is_admin(user.id):
+        await update.message.reply_text("❌ Bạn không có quyền truy cập")
+        return
+
+    try:
+        tracer = get_tracer()
+        args = context.args or []
+
+        if len(args) == 2 and args[0].lower() == "rate":
+            rate = float(args[1])
+            if not 0 <= rate <= 1:
+                raise ValueError("Tỉ lệ lấy mẫu 0-1")
+            tracer.sample_rate = rate
+            await update.message.reply_text(f"✅ Lấy mẫu {rate:.0%} update")
+            return
+
+        if args:
+            record = tracer.find(args[0])
+            if record is None:
+                await update.message.reply_text(f"⚠️ Không tìm thấy trace {args[0]}")
+                return
+            await update.message.reply_text(format_trace_waterfall(record), parse_mode='HTML')
+            return
+
+        stats = {"sample_rate": tracer.sample_rate, "started": tracer.started, "sampled": tracer.sampled}
+        await update.message.reply_text(format_trace_list(tracer.recent(15), stats), parse_mode='HTML')
+
+    except Exception as e:
+        logger.exception(f"Error in trace: {e}")
+        await update.message.reply_text(f"❌ Lỗi: {str(e)}")
@@ -1,62 +1,14 @@
-"""Comprehensive logging configuration"""
+"""Comprehensive logging configuration
 
-import logging
-import logging.handlers
-from pathlib import Path
-
-
-def setup_logging():
-    """Setup comprehensive logging configuration"""
-
-    # Create logs directory
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-
-    # Formatter
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+Pipeline queue + listener thread nằm ở app.utils.logging_helper; module này
+giữ lại đường import cũ.
+"""
 
-    # Console handler (INFO level)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-
-    # File handler - All logs (DEBUG level)
-    file_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "app.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"  # 10MB
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-
-    # File handler - Errors only (ERROR level)
-    error_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "error.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"  # 10MB
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-
-    # File handler - Cache logs (DEBUG level)
-    cache_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "cache.log", maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"  # 5MB
-    )
-    cache_handler.setLevel(logging.DEBUG)
-    cache_handler.setFormatter(formatter)
-
-    # Add handlers to root logger
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(error_handler)
+import logging
 
-    # Cache-specific logger
-    cache_logger = logging.getLogger("app.utils.cache")
-    cache_logger.addHandler(cache_handler)
+from app.utils.logging_helper import setup_logging, shutdown_logging
 
-    logging.info("✅ Logging system initialized")
+__all__ = ["setup_logging", "shutdown_logging"]
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 """Main bot application - XS Ba Miền Bot"""
 
+import asyncio
 import logging
 import signal
 import sys
@@ -11,38 +12,23 @@ from telegram.ext import (
     ContextTypes,
 )
 
-from app.config import TELEGRAM_TOKEN, LOG_LEVEL
-from app.services.scheduler_jobs import SchedulerJobs
-
-# Import command handlers
-from app.handlers.commands import (
-    start_command,
-    help_command,
-    mb_command,
-    mt_command,
-    mn_command,
-    subscriptions_command,
-    test_notify_command,
-    admin_command,
+from app.bootstrap import StartupTimer
+from app.config import (
+    TELEGRAM_TOKEN,
+    LOG_LEVEL,
+    RUN_MODE,
+    SCHEDULER_LEADER_ELECTION,
+    SCHEDULER_LEASE_SECONDS,
+    UPDATE_CONCURRENCY,
+    LOOP_MONITOR_ENABLED,
+    WARMUP_ENABLED,
+    SNAPSHOT_ENABLED,
 )
+from app.services.drain import TrackingUpdateProcessor, get_drain
+from app.utils.logging_helper import setup_logging, shutdown_logging
 
-# Import callback handlers
-from app.handlers.callbacks import button_callback
-
-# Import admin handlers
-from app.handlers.admin_handlers import (
-    admin_menu,
-    admin_backfill_menu,
-    admin_backfill,
-    admin_stats,
-    admin_clear_cache,
-)
-
-# Setup logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=getattr(logging, LOG_LEVEL),
-)
+# Setup logging (queue + listener thread: ghi log không chặn event loop)
+setup_logging(LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
@@ -51,6 +37,91 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.error("Exception while handling an update:", exc_info=context.error)
 
 
+async def post_init(application: Application) -> None:
+    """Chạy trong event loop của bot, trước khi nhận updates"""
+    timer = application.bot_data["startup_timer"]
+
+    if LOOP_MONITOR_ENABLED:
+        from app.services.loop_monitor import get_loop_monitor
+        get_loop_monitor().start()
+
+    from app.handlers import callbacks
+
+    if SNAPSHOT_ENABLED:
+        # Ma trận analytics của lần chạy trước: mmap thay vì dựng lại từ database
+        from app.services.analytics.snapshot import load_snapshot
+        with timer.phase("snapshot"):
+            await load_snapshot(callbacks.statistics_service)
+
+    if WARMUP_ENABLED:
+        from app.bootstrap import warm_up
+        await warm_up(callbacks.lottery_service, callbacks.statistics_service, timer)
+
+    # SIGINT / SIGTERM → drain (run_polling(stop_signals=None): PTB không tự dừng ngay)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(drain_and_stop(application)))
+
+    logger.info("🏁 Startup: %s", timer.report())
+
+
+async def drain_and_stop(application: Application) -> None:
+    """
+    Graceful drain: dừng nhận update / chạy job mới, chờ việc đang chạy tới
+    DRAIN_TIMEOUT_SECONDS, rồi để run_polling tắt tiếp (post_stop, post_shutdown)
+
+    Tín hiệu thứ 2 trong lúc drain → dừng ngay.
+    """
+    drain = get_drain()
+    if not drain.begin():
+        logger.warning("⚠️ Second stop signal, stopping without waiting")
+        application.stop_running()
+        return
+
+    # 1. Không chạy job mới (fan-out đang chạy thấy `draining` → lưu checkpoint, dừng)
+    scheduler = application.bot_data.get("scheduler")
+    if scheduler:
+        scheduler.pause()
+
+    # 2. Không nhận update mới; update đã nhận (còn trong update_queue) vẫn được xử lý
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+
+    # 3. Chờ update / fan-out đang chạy (quá deadline → hủy)
+    await drain.drain(pending=application.update_queue.qsize)
+    application.stop_running()
+
+
+async def post_stop(application: Application) -> None:
+    """Đã xử lý xong updates: dừng scheduler (nhả leader lease), analytics workers, loop monitor"""
+    scheduler = application.bot_data.get("scheduler")
+    if scheduler:
+        scheduler.shutdown()
+        if scheduler.leader:
+            # Replica khác lên leader ngay, không chờ lease hết hạn
+            await scheduler.leader.release()
+
+    from app.services.analytics.executor import shutdown_analytics_executor
+    shutdown_analytics_executor(wait=False)
+    logger.info("✅ Analytics executor stopped")
+
+    if LOOP_MONITOR_ENABLED:
+        from app.services.loop_monitor import get_loop_monitor
+        await get_loop_monitor().stop()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Sau khi Bot đóng HTTP pool: ghi snapshot analytics, flush write queue + đóng DB pool"""
+    if SNAPSHOT_ENABLED:
+        from app.handlers import callbacks
+        from app.services.analytics.snapshot import save_snapshot
+        await asyncio.to_thread(save_snapshot, callbacks.statistics_service)
+
+    from app.database import close_db
+    await close_db()
+    logger.info("✅ Bot shutdown complete")
+
+
 def main():
     """Khởi động bot"""
     if not TELEGRAM_TOKEN:
@@ -58,19 +129,78 @@ def main():
         return
 
     logger.info("🚀 Đang khởi động XS Ba Miền Bot...")
+    timer = StartupTimer()
+
+    # ====================================
+    # IMPORT HANDLERS (module nặng: telegram handlers, services, SQLAlchemy models)
+    # ====================================
+    with timer.phase("imports"):
+        from app.handlers.commands import (
+            start_command,
+            help_command,
+            mb_command,
+            mt_command,
+            mn_command,
+            subscriptions_command,
+            test_notify_command,
+            admin_command,
+            admin_backtest_command,
+            admin_loop_command,
+            admin_trace_command,
+        )
+        from app.handlers.callbacks import button_callback, init_services
+        from app.handlers.admin_handlers import (
+            admin_menu,
+            admin_backfill_menu,
+            admin_backfill,
+            admin_stats,
+            admin_clear_cache,
+        )
+
+    # ====================================
+    # KHỞI TẠO SERVICES
+    # ====================================
+    with timer.phase("services"):
+        init_services()
 
     # ====================================
     # TẠO APPLICATION
     # ====================================
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    # Update xử lý đồng thời: thống kê nặng của 1 user (chạy trong AnalyticsExecutor)
+    # không chặn các user khác; bấm nút mới hủy tính toán cũ của cùng user
+    with timer.phase("application"):
+        app = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .concurrent_updates(TrackingUpdateProcessor(UPDATE_CONCURRENCY))
+            .post_init(post_init)
+            .post_stop(post_stop)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
+        app.bot_data["startup_timer"] = timer
 
     # ====================================
     # SETUP SCHEDULER
     # ====================================
-    scheduler = SchedulerJobs(bot=app.bot)
-    scheduler.setup_jobs()
-    scheduler.start()
-    logger.info("✅ Scheduler started with notification jobs")
+    # RUN_MODE=handler: scheduler + jobs chạy ở worker riêng (python -m app.worker)
+    scheduler = None
+    if RUN_MODE == "handler":
+        logger.info("ℹ️ RUN_MODE=handler: scheduler chạy ở worker process")
+    else:
+        leader = None
+        if SCHEDULER_LEADER_ELECTION:
+            # Nhiều replica: mọi replica phục vụ updates, chỉ leader chạy jobs
+            from app.services.leader_election import LeaderElection
+            leader = LeaderElection(lease_seconds=SCHEDULER_LEASE_SECONDS)
+        
+        with timer.phase("scheduler"):
+            from app.services.scheduler_jobs import SchedulerJobs
+            scheduler = SchedulerJobs(bot=app.bot, leader=leader)
+            scheduler.setup_jobs()
+            scheduler.start()
+        app.bot_data["scheduler"] = scheduler
+        logger.info("✅ Scheduler started with notification jobs")
 
     # ====================================
     # COMMAND HANDLERS
@@ -87,6 +217,9 @@ def main():
     # ADMIN COMMANDS
     # ====================================
     app.add_handler(CommandHandler("admin", admin_command))
+    app.add_handler(CommandHandler("backtest", admin_backtest_command))
+    app.add_handler(CommandHandler("loop", admin_loop_command))
+    app.add_handler(CommandHandler("trace", admin_trace_command))
     # Legacy admin commands (if still needed)
     try:
         from app.handlers.admin import (
@@ -120,31 +253,6 @@ def main():
     # ====================================
     app.add_error_handler(error_handler)
 
-    # ====================================
-    # GRACEFUL SHUTDOWN HANDLER
-    # ====================================
-    def signal_handler(sig, frame):
-        """Handle shutdown signals (SIGINT, SIGTERM)"""
-        logger.info(f"🛑 Received signal {sig}, initiating graceful shutdown...")
-        try:
-            # 1. Stop Telegram Application
-            app.stop()
-            logger.info("✅ Telegram application stopped")
-            
-            # 2. Stop Scheduler
-            scheduler.shutdown()
-            logger.info("✅ Scheduler stopped")
-            
-            logger.info("✅ Bot shutdown complete")
-        except Exception as e:
-            logger.exception(f"❌ Error during shutdown: {e}")
-        finally:
-            sys.exit(0)
-    
-    # Register signal handlers
-    signal.signal(signal.SIGINT, signal_handler)   # Ctrl+C
-    signal.signal(signal.SIGTERM, signal_handler)  # Kill signal
-    
     # ====================================
     # START BOT
     # ====================================
@@ -152,12 +260,15 @@ def main():
     logger.info("🎯 Đang lắng nghe updates từ Telegram...")
     logger.info("💡 Press Ctrl+C to stop")
     
-    # Start polling
+    # Start polling (tín hiệu dừng do drain_and_stop xử lý, xem post_init)
     try:
-        app.run_polling(allowed_updates=Update.ALL_TYPES)
+        app.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
     except Exception as e:
         logger.exception(f"❌ Fatal error in main loop: {e}")
         sys.exit(1)
+    finally:
+        # Ghi nốt log còn trong queue
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -3,9 +3,12 @@
 from .base import Base
 from app.models.lottery_result import LotteryResult, Lo2SoHistory, Lo3SoHistory, UserSubscription
 from .user import User
+from .job import Job
+from .scheduler_lease import SchedulerLease
+from .region_rollup import RegionLoRollup
 
 __all__ = ["Base", "User", "LotteryResult", "Lo2SoHistory", "Lo3SoHistory"]
 
 from app.models.lottery_result import UserSubscription
 
-__all__ = ["Base", "LotteryResult", "Lo2SoHistory", "Lo3SoHistory", "UserSubscription", "User"]
+__all__ = ["Base", "LotteryResult", "Lo2SoHistory", "Lo3SoHistory", "UserSubscription", "User", "Job", "SchedulerLease", "RegionLoRollup"]
@@ -0,0 +1,44 @@
+"""Job queue model - Hàng đợi công việc cho worker processes"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index
+
+from app.models.base import Base
+
+
+class Job(Base):
+    """
+    1 công việc (notification, ingest...) chờ worker xử lý
+    
+    Vòng đời: pending → running → done
+                         └→ pending (retry, có backoff) → ... → failed
+                         └→ lease hết hạn (worker chết) → claim lại / failed khi hết lượt
+    """
+    
+    __tablename__ = "job_queue"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    # Khóa chống enqueue trùng khi job còn pending/running (vd: notify_province:MB:2025-10-18);
+    # done/failed → NULL để lần check sau enqueue lại được
+    dedupe_key = Column(String(150), nullable=True, unique=True)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Lease: worker đang giữ job và thời điểm hết hạn
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Worker tìm job sẵn sàng theo status + run_after
+        Index("idx_job_status_run_after", "status", "run_after"),
+    )
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status}, attempts={self.attempts})>"
@@ -20,9 +20,11 @@ from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 from app.models.base import Base
+from app.models.types import LoNumber, ProvinceId, RegionId, PrizeTier
+from app.models.partitioning import partition_by_year
 
 
 
@@ -80,36 +82,37 @@ class Lo2SoHistory(Base):
     
     This table denormalizes the 2-digit numbers from lottery results
     for efficient statistics queries (frequency, Lô Gan, etc.)
+    
+    Compact layout: number/province/region/prize are stored as smallint
+    (see app/models/types.py), but read and compared as strings.
     """
     __tablename__ = "lo_2_so_history"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    lottery_result_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
-    province_code: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
-    region: Mapped[str] = mapped_column(String(10), nullable=False, index=True)
-    draw_date: Mapped[datetime] = mapped_column(Date, nullable=False, index=True)
-
-    # The 2-digit number (00-99)
-    number: Mapped[str] = mapped_column(String(2), nullable=False, index=True)
+    lottery_result_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    province_code: Mapped[str] = mapped_column("province_id", ProvinceId, nullable=False)
+    region: Mapped[str] = mapped_column("region_id", RegionId, nullable=False)
+    draw_date: Mapped[datetime] = mapped_column(Date, nullable=False)
 
-    # Which prize this number came from (DB, G1, G2, etc.)
-    prize_type: Mapped[str] = mapped_column(String(10), nullable=False)
+    # The 2-digit number ("00"-"99", stored as 0-99)
+    number: Mapped[str] = mapped_column(LoNumber(2), nullable=False)
 
-    # Position in the original number (last 2 digits)
-    # This helps track if it's from special prizes
-    position: Mapped[str] = mapped_column(String(20), default="last_2", nullable=False)
-
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Which prize this number came from (DB, G1, G2, etc. - stored as tier 0-8)
+    prize_type: Mapped[str] = mapped_column("prize_tier", PrizeTier, nullable=False)
 
     __table_args__ = (
-        # Fast lookup for specific number history
-        Index('idx_number_date', 'number', 'draw_date', postgresql_ops={'draw_date': 'DESC'}),
-        # Fast lookup for province statistics
-        Index('idx_province_number_date', 'province_code', 'number', 'draw_date'),
-        # Fast lookup for region statistics
-        Index('idx_region_number_date', 'region', 'number', 'draw_date'),
-        # Fast date range queries
-        Index('idx_draw_date_number', 'draw_date', 'number', postgresql_ops={'draw_date': 'DESC'}),
+        # Frequency / streaks / delete-on-resave: province + date range (covering)
+        Index('idx_lo2so_province_date_number', 'province_id', 'draw_date', 'number'),
+        # Lô gan / number history: last appearance of a number in a province (covering)
+        Index('idx_lo2so_province_number_date', 'province_id', 'number', 'draw_date'),
+        # Đề (giải ĐB, tier 0): 1 dòng / kỳ → index riêng nhỏ ~27 lần (MB)
+        Index(
+            'idx_lo2so_de', 'province_id', 'draw_date', 'number',
+            sqlite_where=text('prize_tier = 0'),
+            postgresql_where=text('prize_tier = 0'),
+        ),
+        # Postgres: partition theo năm (app/models/partitioning.py)
+        {'postgresql_partition_by': 'RANGE (draw_date)'},
     )
 
     def __repr__(self) -> str:
@@ -125,38 +128,37 @@ class Lo2SoHistory(Base):
             "date": self.draw_date.strftime("%Y-%m-%d"),
             "number": self.number,
             "prize_type": self.prize_type,
-            "position": self.position,
         }
 
 
 
 class Lo3SoHistory(Base):
-    """Lịch sử xuất hiện của lô 3 số (ba càng)"""
+    """Lịch sử xuất hiện của lô 3 số (ba càng) - cùng layout gọn như Lo2SoHistory"""
     
     __tablename__ = "lo_3_so_history"
     
-    id = Column(Integer, primary_key=True, index=True)
-    lottery_result_id = Column(Integer, ForeignKey("lottery_results.id"), nullable=False, index=True)
-    province_code = Column(String(20), nullable=False, index=True)
-    region = Column(String(10), nullable=False, index=True)
-    draw_date = Column(Date, nullable=False, index=True)
-    number = Column(String(3), nullable=False, index=True)  # 3 chữ số
-    prize_type = Column(String(10), nullable=False)  # Loại giải (DB, G1, G2, etc.)
-    position = Column(String(20), nullable=False)  # Vị trí trong giải
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    id = Column(Integer, primary_key=True)
+    lottery_result_id = Column(Integer, ForeignKey("lottery_results.id"), nullable=False)
+    province_code = Column("province_id", ProvinceId, nullable=False)
+    region = Column("region_id", RegionId, nullable=False)
+    draw_date = Column(Date, nullable=False)
+    number = Column(LoNumber(3), nullable=False)  # 3 chữ số, lưu 0-999
+    prize_type = Column("prize_tier", PrizeTier, nullable=False)  # Loại giải (DB, G1, G2, etc.)
     
     # Indexes for efficient queries
     __table_args__ = (
-        Index("idx_lo3so_number_date", "number", "draw_date"),
-        Index("idx_lo3so_province_number_date", "province_code", "number", "draw_date"),
-        Index("idx_lo3so_region_number_date", "region", "number", "draw_date"),
-        Index("idx_lo3so_draw_date_number", "draw_date", "number"),
+        Index("idx_lo3so_province_date_number", "province_id", "draw_date", "number"),
+        Index("idx_lo3so_province_number_date", "province_id", "number", "draw_date"),
+        {"postgresql_partition_by": "RANGE (draw_date)"},
     )
     
     def __repr__(self):
         return f"<Lo3SoHistory(number={self.number}, province={self.province_code}, date={self.draw_date})>"
 
 
+partition_by_year(Lo2SoHistory.__table__)
+partition_by_year(Lo3SoHistory.__table__)
+
 
 class UserSubscription(Base):
     """User subscription for lottery result notifications"""
@@ -191,3 +193,27 @@ class NotificationLog(Base):
     
     def __repr__(self):
         return f"<NotificationLog(province={self.province_code}, date={self.result_date}, sent={self.total_sent})>"
+
+
+class NotificationCheckpoint(Base):
+    """
+    Vị trí fan-out đang gửi dở (tắt bot giữa chừng → lần sau gửi tiếp, không gửi lại)
+
+    Subscribers được gửi theo user_id tăng dần; last_user_id là user cuối
+    cùng đã xử lý. Xóa khi fan-out hoàn tất (đã ghi NotificationLog).
+    """
+
+    __tablename__ = "notification_checkpoint"
+
+    # "MB:2026-10-19" (1 tỉnh) hoặc "digest:MN:2026-10-19" (gửi gộp)
+    key = Column(String(100), primary_key=True)
+    last_user_id = Column(BigInteger, nullable=False)
+    success_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    # Trạng thái cần để gửi tiếp đúng như cũ: message_id trên channel (copy /
+    # forward), bộ tỉnh + thống kê từng tỉnh của tin gộp
+    state = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<NotificationCheckpoint(key={self.key}, last_user_id={self.last_user_id})>"
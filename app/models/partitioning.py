@@ -0,0 +1,107 @@
+"""Partition theo năm cho bảng lịch sử lô (chỉ Postgres)
+
+Trên Postgres, lo_2_so_history / lo_3_so_history là bảng partitioned
+RANGE (draw_date), mỗi năm 1 partition `{table}_y{year}` + 1 partition
+DEFAULT, kèm BRIN index trên draw_date. Truy vấn có điều kiện draw_date
+(tần suất, lô gan, chuỗi) chỉ quét partition của các năm liên quan.
+
+SQLite bỏ qua `postgresql_partition_by` và các DDL ở đây → schema giữ nguyên.
+"""
+
+from datetime import date
+from typing import Iterable, List, Optional
+
+from sqlalchemy import DDL, PrimaryKeyConstraint, Table, event
+from sqlalchemy.ext.compiler import compiles
+
+from app.config import HISTORY_PARTITION_START_YEAR
+
+PARTITION_KEY = "draw_date"
+
+# BRIN: ~1.5 trang dữ liệu / ngày → 1 range ≈ 3 tuần
+BRIN_PAGES_PER_RANGE = 32
+
+
+def partition_name(table_name: str, year: int) -> str:
+    """Tên partition của 1 năm, vd lo_2_so_history_y2026"""
+    return f"{table_name}_y{year}"
+
+
+def _qualified(table_name: str, schema: Optional[str]) -> str:
+    return f"{schema}.{table_name}" if schema else table_name
+
+
+def year_partition_ddl(table_name: str, year: int, schema: Optional[str] = None) -> str:
+    """CREATE TABLE ... PARTITION OF cho năm `year` ([1/1/year, 1/1/year+1))"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_qualified(partition_name(table_name, year), schema)} "
+        f"PARTITION OF {_qualified(table_name, schema)} "
+        f"FOR VALUES FROM ('{date(year, 1, 1)}') TO ('{date(year + 1, 1, 1)}')"
+    )
+
+
+def default_partition_ddl(table_name: str, schema: Optional[str] = None) -> str:
+    """Partition DEFAULT: nhận các ngày chưa có partition năm"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_qualified(table_name + '_default', schema)} "
+        f"PARTITION OF {_qualified(table_name, schema)} DEFAULT"
+    )
+
+
+def brin_index_name(table_name: str) -> str:
+    return f"idx_{table_name}_draw_date_brin"
+
+
+def brin_index_ddl(table_name: str, schema: Optional[str] = None) -> str:
+    """BRIN index trên draw_date (tạo trên bảng cha → tự áp cho mọi partition)"""
+    return (
+        f"CREATE INDEX IF NOT EXISTS {brin_index_name(table_name)} "
+        f"ON {_qualified(table_name, schema)} USING brin ({PARTITION_KEY}) "
+        f"WITH (pages_per_range = {BRIN_PAGES_PER_RANGE})"
+    )
+
+
+def partition_years(first_year: int, today: Optional[date] = None, years_ahead: int = 1) -> List[int]:
+    """Các năm cần có partition: first_year → năm hiện tại + years_ahead"""
+    today = today or date.today()
+    return list(range(first_year, today.year + years_ahead + 1))
+
+
+def partition_statements(
+    table_name: str,
+    years: Iterable[int],
+    schema: Optional[str] = None
+) -> List[str]:
+    """Toàn bộ DDL dựng partitions + BRIN cho 1 bảng partitioned"""
+    statements = [year_partition_ddl(table_name, year, schema) for year in years]
+    statements.append(default_partition_ddl(table_name, schema))
+    statements.append(brin_index_ddl(table_name, schema))
+    return statements
+
+
+def is_partitioned(table: Table) -> bool:
+    return table.info.get("partition_by_year", False)
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _compile_partitioned_pk(constraint, compiler, **kw):
+    """Postgres yêu cầu PK của bảng partitioned chứa partition key → (id, draw_date)"""
+    table = constraint.table
+    if table is None or not is_partitioned(table) or PARTITION_KEY in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    columns = [column.name for column in constraint.columns] + [PARTITION_KEY]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+
+
+def partition_by_year(table: Table) -> None:
+    """
+    Đánh dấu bảng là partitioned theo năm của draw_date
+
+    Bảng cần khai báo `postgresql_partition_by` trong __table_args__;
+    hàm này gắn listener tạo partitions + BRIN ngay sau CREATE TABLE (Postgres).
+    """
+    table.info["partition_by_year"] = True
+
+    for statement in partition_statements(table.name, partition_years(HISTORY_PARTITION_START_YEAR)):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,27 @@
+"""Region rollup model - Tần suất lô 2 số gộp theo (miền, ngày quay)"""
+
+from sqlalchemy import Column, Date, LargeBinary, SmallInteger
+
+from app.models.base import Base
+from app.models.types import RegionId
+
+
+class RegionLoRollup(Base):
+    """
+    Vector đếm lô 2 số của cả miền trong 1 ngày
+    
+    counts: 100 bytes, byte i = số lần số i (00-99) về trong mọi tỉnh của
+    miền quay hôm đó (tối đa 4 đài × 18 giải < 256). Cập nhật khi ingest
+    (LotteryDBService.save_result) → thống kê theo miền đọc vài trăm dòng
+    thay vì quét lịch sử từng tỉnh.
+    """
+    
+    __tablename__ = "region_lo_rollup"
+    
+    region = Column("region_id", RegionId, primary_key=True)
+    draw_date = Column(Date, primary_key=True)
+    province_count = Column(SmallInteger, nullable=False)
+    counts = Column(LargeBinary(100), nullable=False)
+    
+    def __repr__(self):
+        return f"<RegionLoRollup(region={self.region}, date={self.draw_date}, provinces={self.province_count})>"
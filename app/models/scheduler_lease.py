@@ -0,0 +1,24 @@
+"""Scheduler lease model - Leader election giữa các bot replicas"""
+
+from sqlalchemy import Column, String, DateTime
+
+from app.models.base import Base
+
+
+class SchedulerLease(Base):
+    """
+    Lease của 1 vai trò (vd: "scheduler")
+    
+    Replica nào giữ lease còn hạn là leader; leader gia hạn định kỳ,
+    replica khác chiếm lease khi expires_at đã qua.
+    """
+    
+    __tablename__ = "scheduler_lease"
+    
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<SchedulerLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
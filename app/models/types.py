@@ -0,0 +1,85 @@
+"""Column types mã hóa số nguyên cho bảng lô (lo_2_so_history, lo_3_so_history)
+
+ORM và các query vẫn dùng giá trị chuỗi ("05", "MB", "G7"...); database lưu
+smallint. So sánh, IN, GROUP BY, ORDER BY theo number giữ nguyên ngữ nghĩa
+vì số có zero-padding sắp xếp giống số nguyên.
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+from app.constants.codes import (
+    PROVINCE_IDS,
+    PROVINCE_CODES_BY_ID,
+    REGION_IDS,
+    REGION_CODES_BY_ID,
+    PRIZE_TIERS,
+    PRIZE_KEYS_BY_TIER,
+)
+
+
+class LoNumber(TypeDecorator):
+    """Số lô dạng chuỗi zero-padded ↔ smallint"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, width: int = 2):
+        super().__init__()
+        self.width = width
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return int(value)
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return str(value).zfill(self.width)
+
+
+class _CodeId(TypeDecorator):
+    """Mã chuỗi ↔ smallint id theo bảng cố định (mã lạ → NULL)"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    ids: Dict[str, int] = {}
+    codes: Dict[int, str] = {}
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return self.ids.get(value)
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return self.codes.get(value)
+
+
+class ProvinceId(_CodeId):
+    """Mã tỉnh (MB, TPHCM...) ↔ province id"""
+
+    cache_ok = True
+    ids = PROVINCE_IDS
+    codes = PROVINCE_CODES_BY_ID
+
+
+class RegionId(_CodeId):
+    """Mã miền (MB, MT, MN) ↔ region id"""
+
+    cache_ok = True
+    ids = REGION_IDS
+    codes = REGION_CODES_BY_ID
+
+
+class PrizeTier(_CodeId):
+    """Giải (DB, G1..G8) ↔ tier 0..8"""
+
+    cache_ok = True
+    ids = PRIZE_TIERS
+    codes = PRIZE_KEYS_BY_TIER
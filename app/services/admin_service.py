@@ -30,7 +30,7 @@ class AdminService:
             Dict với các thống kê
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 # 1. Tổng subscribers (unique users)
                 query_users = select(func.count(func.distinct(UserSubscription.user_id))).where(
                     UserSubscription.is_active == True
@@ -123,7 +123,7 @@ class AdminService:
             List of dicts với thông tin subscriber
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 query = select(
                     UserSubscription.user_id,
                     UserSubscription.username,
@@ -170,7 +170,7 @@ class AdminService:
             Dict với thống kê gửi
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 # Lấy danh sách user_id
                 query = select(func.distinct(UserSubscription.user_id)).where(
                     UserSubscription.is_active == True
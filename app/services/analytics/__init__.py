@@ -0,0 +1,42 @@
+"""Analytics - Cấu trúc dữ liệu trong bộ nhớ cho thống kê nhiều tỉnh
+
+Các submodule được import khi dùng tới (PEP 562): import executor không kéo
+theo backtest / multiprocessing lúc khởi động.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "STRATEGIES": "backtest",
+    "BacktestService": "backtest",
+    "BacktestSpec": "backtest",
+    "run_backtests": "backtest",
+    "strategy": "backtest",
+    "CooccurrenceMatrix": "cooccurrence",
+    "CooccurrenceService": "cooccurrence",
+    "DeSeries": "de_series",
+    "DeService": "de_series",
+    "GapProfile": "gap_scores",
+    "GapScoreService": "gap_scores",
+    "PresenceService": "presence",
+    "PresenceTensor": "presence",
+    "load_snapshot": "snapshot",
+    "save_snapshot": "snapshot",
+    "TransitionMatrix": "transition",
+    "TransitionService": "transition",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
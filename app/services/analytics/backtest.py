@@ -0,0 +1,371 @@
+"""Backtest - Chạy lại lịch sử từng kỳ để đánh giá chiến lược chọn số lô
+
+"Chọn 3 số gan nhất mỗi kỳ thì 5 năm qua trúng bao nhiêu?" - thay vì gọi
+get_lo_gan cho từng ngày trong quá khứ (hàng nghìn truy vấn / tỉnh), lịch sử
+mỗi tỉnh được nạp 1 lần thành ma trận byte (kỳ × 100 ô, ô = số lần số đó về
+trong kỳ) rồi replay tuần tự: trước mỗi kỳ chiến lược chọn số từ trạng thái
+đã biết (ReplayState), sau đó kỳ đó được cộng vào trạng thái.
+
+Chiến lược đăng ký bằng @strategy("tên") (hot, cold, gan, streak có sẵn).
+Nhiều tỉnh chạy song song bằng ProcessPoolExecutor: ma trận của mọi tỉnh nằm
+trong 1 khối SharedMemory, mỗi worker nhận (tên khối, offset) thay vì pickle
+dữ liệu. Kết quả cache theo (chiến lược, tỉnh, cửa sổ, tham số) + phiên bản
+dữ liệu của tỉnh.
+"""
+
+import asyncio
+import heapq
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import PROVINCES
+from app.database import DatabaseSession
+from app.models.lottery_result import LotteryResult
+from app.services.analytics.draw_matrix import HISTORY_START, to_version, version_query
+from app.services.db.hot_queries import lo_gan_window_query
+from app.utils.timezone import get_vietnam_today
+
+logger = logging.getLogger(__name__)
+
+# Giá 1 điểm lô (nghìn đồng) theo miền và tiền thưởng mỗi lần về - giá phổ
+# biến, chỉ dùng để tính lãi/lỗ tương đối giữa các chiến lược
+LO_STAKE = {"MB": 23, "MN": 18, "MT": 18}
+LO_PAYOUT = 80
+
+# Số kỳ gần nhất dùng để tính hot / cold
+DEFAULT_LOOKBACK = 30
+
+# Chỉ dùng process pool khi có từ 2 tỉnh trở lên
+MIN_PARALLEL_PROVINCES = 2
+
+_CELLS = 100
+
+
+class ReplayState:
+    """Trạng thái sau các kỳ đã replay (chỉ dùng dữ liệu quá khứ)"""
+
+    def __init__(self, lookback: int = DEFAULT_LOOKBACK):
+        self.lookback = lookback
+        self.index = 0
+        # Số lần về của từng số trong `lookback` kỳ gần nhất
+        self.window_counts = [0] * _CELLS
+        self.last_seen = [-1] * _CELLS
+        # Số kỳ liên tiếp gần nhất có về
+        self.streak = [0] * _CELLS
+        self._recent: deque = deque()
+
+    def gan(self, number: int) -> int:
+        """Số kỳ chưa về (chưa về lần nào = số kỳ đã replay)"""
+        return self.index - 1 - self.last_seen[number]
+
+    def update(self, counts: Sequence[int]) -> None:
+        """Cộng 1 kỳ (counts[n] = số lần n về)"""
+        present = [number for number in range(_CELLS) if counts[number]]
+        for number in present:
+            self.window_counts[number] += counts[number]
+        self._recent.append([(number, counts[number]) for number in present])
+        if len(self._recent) > self.lookback:
+            for number, count in self._recent.popleft():
+                self.window_counts[number] -= count
+
+        present_set = set(present)
+        for number in range(_CELLS):
+            self.streak[number] = self.streak[number] + 1 if number in present_set else 0
+        for number in present:
+            self.last_seen[number] = self.index
+        self.index += 1
+
+
+STRATEGIES: Dict[str, Callable[[ReplayState, int], List[int]]] = {}
+
+
+def strategy(name: str):
+    """Đăng ký chiến lược: hàm (state, picks) → danh sách số 0..99"""
+    def decorator(func):
+        STRATEGIES[name] = func
+        return func
+    return decorator
+
+
+@strategy("hot")
+def pick_hot(state: ReplayState, picks: int) -> List[int]:
+    """Về nhiều nhất trong `lookback` kỳ gần nhất"""
+    return heapq.nlargest(picks, range(_CELLS), key=lambda n: (state.window_counts[n], -n))
+
+
+@strategy("cold")
+def pick_cold(state: ReplayState, picks: int) -> List[int]:
+    """Về ít nhất trong `lookback` kỳ gần nhất"""
+    return heapq.nsmallest(picks, range(_CELLS), key=lambda n: (state.window_counts[n], n))
+
+
+@strategy("gan")
+def pick_gan(state: ReplayState, picks: int) -> List[int]:
+    """Lâu chưa về nhất"""
+    return heapq.nlargest(picks, range(_CELLS), key=lambda n: (state.gan(n), -n))
+
+
+@strategy("streak")
+def pick_streak(state: ReplayState, picks: int) -> List[int]:
+    """Đang về liên tiếp nhiều kỳ nhất (bằng nhau: về nhiều hơn trong cửa sổ)"""
+    return heapq.nlargest(picks, range(_CELLS), key=lambda n: (state.streak[n], state.window_counts[n], -n))
+
+
+@dataclass(frozen=True)
+class BacktestSpec:
+    """Tham số 1 lần backtest (khóa cache cùng với tỉnh)"""
+
+    strategy: str
+    since: date
+    picks: int = 3
+    lookback: int = DEFAULT_LOOKBACK
+
+
+def replay(history: memoryview, start_index: int, spec: BacktestSpec, region: str) -> Dict:
+    """
+    Replay 1 chiến lược trên lịch sử 1 tỉnh
+
+    Args:
+        history: len = số kỳ × 100, ô [k*100 + n] = số lần n về ở kỳ k (cũ → mới)
+        start_index: Kỳ đầu tiên được tính kết quả (các kỳ trước chỉ để làm nóng trạng thái)
+        spec: Chiến lược + tham số
+        region: MB / MN / MT (giá 1 điểm)
+
+    Returns:
+        {"draws", "hit_draws", "hit_rate", "hits", "avg_hits", "max_miss_streak",
+         "stake", "payout", "roi"}
+    """
+    pick = STRATEGIES[spec.strategy]
+    state = ReplayState(spec.lookback)
+    total = len(history) // _CELLS
+
+    draws = hit_draws = hits = 0
+    miss_streak = max_miss_streak = 0
+    for index in range(total):
+        counts = history[index * _CELLS:(index + 1) * _CELLS]
+        if index >= start_index:
+            draw_hits = sum(counts[number] for number in pick(state, spec.picks))
+            draws += 1
+            hits += draw_hits
+            if draw_hits:
+                hit_draws += 1
+                miss_streak = 0
+            else:
+                miss_streak += 1
+                max_miss_streak = max(max_miss_streak, miss_streak)
+        state.update(counts)
+
+    stake = draws * spec.picks * LO_STAKE.get(region, LO_STAKE["MN"])
+    payout = hits * LO_PAYOUT
+    return {
+        "draws": draws,
+        "hit_draws": hit_draws,
+        "hit_rate": hit_draws / draws if draws else 0.0,
+        "hits": hits,
+        "avg_hits": hits / draws if draws else 0.0,
+        "max_miss_streak": max_miss_streak,
+        "stake": stake,
+        "payout": payout,
+        "roi": (payout - stake) / stake if stake else 0.0,
+    }
+
+
+def _run_shard(
+    shm_name: str,
+    offset: int,
+    length: int,
+    start_indexes: Dict[BacktestSpec, int],
+    region: str
+) -> Dict[BacktestSpec, Dict]:
+    """Worker: mọi spec của 1 tỉnh, đọc lịch sử từ SharedMemory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        with shm.buf[offset:offset + length] as history:
+            return {spec: replay(history, start, spec, region) for spec, start in start_indexes.items()}
+    finally:
+        shm.close()
+
+
+@dataclass
+class ProvinceHistory:
+    """Lịch sử 1 tỉnh dạng ma trận byte"""
+
+    province_code: str
+    dates: List[date]
+    matrix: bytearray
+
+    @classmethod
+    def from_rows(cls, province_code: str, rows) -> "ProvinceHistory":
+        """rows (number, draw_date) sắp theo ngày, mỗi lần về 1 dòng"""
+        dates: List[date] = []
+        matrix = bytearray()
+        for number, draw_date in rows:
+            if not dates or draw_date != dates[-1]:
+                dates.append(draw_date)
+                matrix.extend(bytes(_CELLS))
+            matrix[(len(dates) - 1) * _CELLS + int(number)] += 1
+        return cls(province_code, dates, matrix)
+
+    def start_index(self, since: date) -> int:
+        """Chỉ số kỳ đầu tiên có ngày ≥ since"""
+        for index, draw_date in enumerate(self.dates):
+            if draw_date >= since:
+                return index
+        return len(self.dates)
+
+
+def run_backtests(
+    histories: Sequence[ProvinceHistory],
+    specs: Sequence[BacktestSpec],
+    workers: Optional[int] = None
+) -> Dict[Tuple[BacktestSpec, str], Dict]:
+    """
+    Chạy mọi spec trên mọi tỉnh (đồng bộ, CPU-bound)
+
+    ≥ MIN_PARALLEL_PROVINCES tỉnh và workers != 1 → mỗi tỉnh 1 task trong
+    ProcessPoolExecutor (spawn: an toàn với thread / event loop của bot),
+    dữ liệu đặt trong 1 khối SharedMemory.
+
+    Returns:
+        {(spec, province_code): kết quả replay}
+    """
+    results: Dict[Tuple[BacktestSpec, str], Dict] = {}
+    histories = [history for history in histories if history.dates]
+
+    if workers == 1 or len(histories) < MIN_PARALLEL_PROVINCES:
+        for history in histories:
+            region = PROVINCES.get(history.province_code, {}).get("region", "MN")
+            view = memoryview(history.matrix)
+            for spec in specs:
+                results[(spec, history.province_code)] = replay(view, history.start_index(spec.since), spec, region)
+        return results
+
+    size = sum(len(history.matrix) for history in histories)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        shards = []
+        offset = 0
+        for history in histories:
+            length = len(history.matrix)
+            shm.buf[offset:offset + length] = history.matrix
+            shards.append((history, offset, length))
+            offset += length
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(
+                    _run_shard,
+                    shm.name,
+                    offset,
+                    length,
+                    {spec: history.start_index(spec.since) for spec in specs},
+                    PROVINCES.get(history.province_code, {}).get("region", "MN"),
+                ): history.province_code
+                for history, offset, length in shards
+            }
+            for future, province_code in futures.items():
+                for spec, result in future.result().items():
+                    results[(spec, province_code)] = result
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return results
+
+
+class BacktestService:
+    """Nạp lịch sử từ database, chạy backtest ngoài event loop, cache kết quả"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers
+        # (spec, province) → (phiên bản dữ liệu tỉnh, kết quả)
+        self._cache: Dict[Tuple[BacktestSpec, str], Tuple[Tuple, Dict]] = {}
+
+    async def run(
+        self,
+        strategies: Sequence[str],
+        province_codes: Sequence[str],
+        since: date,
+        picks: int = 3,
+        lookback: int = DEFAULT_LOOKBACK
+    ) -> List[Dict]:
+        """
+        Backtest các chiến lược trên các tỉnh, tính kết quả từ kỳ `since` tới nay
+
+        Returns:
+            [{"strategy", "province_code", "picks", "since", + các trường của replay()}]
+            sắp theo roi giảm dần; [] nếu lỗi
+        """
+        try:
+            unknown = [name for name in strategies if name not in STRATEGIES]
+            if unknown:
+                raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
+            specs = [BacktestSpec(name, since, picks, lookback) for name in strategies]
+
+            versions = await self._load_versions(province_codes)
+            missing = [
+                code for code in province_codes
+                if any(self._cache.get((spec, code), (None,))[0] != versions[code] for spec in specs)
+            ]
+
+            if missing:
+                started = time.perf_counter()
+                histories = await self._load_histories(missing)
+                computed = await asyncio.get_running_loop().run_in_executor(
+                    None, run_backtests, histories, specs, self.workers
+                )
+                for (spec, code), result in computed.items():
+                    self._cache[(spec, code)] = (versions[code], result)
+                logger.info(
+                    f"✅ Backtest {len(specs)} strategies × {len(missing)} provinces "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+
+            results = []
+            for spec in specs:
+                for code in province_codes:
+                    cached = self._cache.get((spec, code))
+                    if cached is None:
+                        continue
+                    results.append({
+                        "strategy": spec.strategy,
+                        "province_code": code,
+                        "picks": spec.picks,
+                        "since": spec.since,
+                        **cached[1],
+                    })
+            results.sort(key=lambda item: item["roi"], reverse=True)
+            return results
+
+        except Exception as e:
+            logger.error(f"❌ Error running backtest: {e}")
+            return []
+
+    async def _load_versions(self, province_codes: Sequence[str]) -> Dict[str, Tuple]:
+        """Version lottery_results từng tỉnh (version_query, như DrawMatrixService)"""
+        async with DatabaseSession(read_only=True) as session:
+            rows = (await session.execute(
+                version_query().add_columns(LotteryResult.province_code)
+                .where(LotteryResult.province_code.in_(list(province_codes)))
+                .group_by(LotteryResult.province_code)
+            )).all()
+        versions = {row[-1]: to_version(row[:-1]) for row in rows}
+        return {code: versions.get(code, (0, None, 0)) for code in province_codes}
+
+    async def _load_histories(self, province_codes: Sequence[str]) -> List[ProvinceHistory]:
+        histories = []
+        async with DatabaseSession(read_only=True) as session:
+            for code in province_codes:
+                rows = (await session.execute(
+                    lo_gan_window_query(code, HISTORY_START, get_vietnam_today())
+                )).all()
+                histories.append(ProvinceHistory.from_rows(code, rows))
+        return histories
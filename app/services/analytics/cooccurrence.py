@@ -0,0 +1,93 @@
+"""Co-occurrence matrix - Lô xiên: các cặp số về cùng kỳ của 1 tỉnh
+
+Mỗi tỉnh 1 ma trận 100×100 (array phẳng 10000 ô):
+- counts[i*100 + j] = số kỳ cả i và j cùng về (i != j)
+- counts[i*100 + i] = số kỳ i về
+
+Thêm 1 kỳ = tích ngoài (outer product) vector có mặt của kỳ đó: ≤ 27² phép
+cộng, thay vì dựng lại O(kỳ × 27²) từ lo_2_so_history. Cửa sổ K kỳ và đồng
+bộ với database: xem draw_matrix.py.
+"""
+
+import logging
+from array import array
+from typing import Dict, List, Optional
+
+from app.services.analytics.draw_matrix import DrawMatrix, DrawMatrixService, outer_add
+
+logger = logging.getLogger(__name__)
+
+
+class CooccurrenceMatrix(DrawMatrix):
+    """Ma trận đồng xuất hiện của 1 tỉnh"""
+
+    def _contribute(self, counts: array, index: int, delta: int) -> None:
+        present = self.draws[index][1]
+        outer_add(counts, present, present, delta)
+
+    def top_pairs(self, draws: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """
+        Các cặp về cùng kỳ nhiều nhất
+
+        Returns:
+            [{"pair": ("05", "27"), "count": 12}] sắp giảm dần
+        """
+        counts = self.window(draws)
+        pairs = [
+            (counts[i * 100 + j], i, j)
+            for i in range(100)
+            for j in range(i + 1, 100)
+            if counts[i * 100 + j]
+        ]
+        pairs.sort(key=lambda pair: pair[0], reverse=True)
+        return [
+            {"pair": (f"{i:02d}", f"{j:02d}"), "count": count}
+            for count, i, j in pairs[:limit]
+        ]
+
+    def partners(self, number, draws: Optional[int] = None, limit: int = 10) -> List[Dict]:
+        """
+        Các số hay về cùng kỳ với `number`
+
+        Returns:
+            [{"number": "27", "count": 12, "rate": 0.35}] - rate = count / số kỳ `number` về
+        """
+        counts = self.window(draws)
+        row = int(number) * 100
+        appearances = counts[row + int(number)]
+
+        partners = [
+            {"number": f"{j:02d}", "count": counts[row + j], "rate": counts[row + j] / appearances}
+            for j in range(100)
+            if j != int(number) and counts[row + j]
+        ]
+        partners.sort(key=lambda item: item["count"], reverse=True)
+        return partners[:limit]
+
+
+class CooccurrenceService(DrawMatrixService):
+    """CooccurrenceMatrix của từng tỉnh, đồng bộ với database"""
+
+    matrix_class = CooccurrenceMatrix
+
+    async def get_top_pairs(self, province_code: str, draws: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """Cặp lô xiên về cùng kỳ nhiều nhất (None = toàn bộ lịch sử)"""
+        try:
+            return (await self.get_matrix(province_code)).top_pairs(draws, limit)
+        except Exception as e:
+            logger.error(f"❌ Error getting top pairs for {province_code}: {e}")
+            return []
+
+    async def get_partners(
+        self,
+        province_code: str,
+        number: str,
+        draws: Optional[int] = None,
+        limit: int = 10
+    ) -> List[Dict]:
+        """Các số hay về cùng kỳ với `number`"""
+        try:
+            return (await self.get_matrix(province_code)).partners(number, draws, limit)
+        except Exception as e:
+            logger.error(f"❌ Error getting partners of {number} for {province_code}: {e}")
+            return []
@@ -0,0 +1,239 @@
+"""Đề series - Chuỗi đề (2 số cuối giải ĐB) theo kỳ của 1 tỉnh
+
+Mỗi kỳ chỉ có 1 số đề, nên cả lịch sử 1 tỉnh chỉ là 2 array song song
+(ngày quay dạng ordinal + số đề 0..99): 20 năm MB ≈ 7300 kỳ ≈ 65 KB. Các
+thống kê đề (gan, đầu / đuôi / tổng / chạm, chuỗi chẵn-lẻ / to-nhỏ) quét
+thẳng đuôi array, không cần GROUP BY trên lo_2_so_history.
+
+Dữ liệu nạp từ partial index idx_lo2so_de (prize_tier = 0) qua hot query
+"de_series"; đồng bộ với database như các ma trận: xem draw_matrix.py.
+"""
+
+import logging
+from array import array
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.services.analytics.draw_matrix import DrawMatrixService
+from app.services.db.hot_queries import de_series_query
+
+logger = logging.getLogger(__name__)
+
+# Các thuộc tính theo dõi chuỗi bệt: tên → hàm số đề → giá trị
+STREAK_KEYS: Dict[str, Callable[[int], object]] = {
+    "dau": lambda number: number // 10,
+    "duoi": lambda number: number % 10,
+    "tong": lambda number: (number // 10 + number % 10) % 10,
+    "chan_le": lambda number: "chẵn" if number % 2 == 0 else "lẻ",
+    "to_nho": lambda number: "to" if number >= 50 else "nhỏ",
+}
+
+
+def category_stats(values: Iterable, keys: Callable[[int], Iterable[int]], size: int = 10) -> List[Dict]:
+    """
+    Đếm + gan theo nhóm trong 1 lượt quét (values cũ → mới)
+
+    Args:
+        values: Các số đề trong cửa sổ
+        keys: Số đề → các nhóm chứa nó (vd. chạm 5 chứa 05, 50, 55...)
+        size: Số nhóm (0..size-1)
+
+    Returns:
+        [{"key": k, "count": số kỳ về, "gan": số kỳ chưa về (None = chưa về trong cửa sổ)}]
+    """
+    counts = [0] * size
+    last_index = [None] * size
+    total = 0
+    for index, number in enumerate(values):
+        for key in keys(number):
+            counts[key] += 1
+            last_index[key] = index
+        total = index + 1
+
+    return [
+        {
+            "key": key,
+            "count": counts[key],
+            "gan": None if last_index[key] is None else total - 1 - last_index[key],
+        }
+        for key in range(size)
+    ]
+
+
+class DeSeries:
+    """Chuỗi số đề của 1 tỉnh (cũ → mới)"""
+
+    def __init__(self, snapshot_every: Optional[int] = None):
+        # snapshot_every: giữ chữ ký chung với DrawMatrix (DrawMatrixService.new_matrix)
+        self.ordinals = array("l")
+        self.numbers = array("B")
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return date.fromordinal(self.ordinals[-1]) if self.ordinals else None
+
+    def add_draw(self, draw_date: date, numbers: Iterable) -> None:
+        """Thêm 1 kỳ (mới hơn mọi kỳ đã có). `numbers` = các số của giải ĐB (1 số)"""
+        self.ordinals.append(draw_date.toordinal())
+        self.numbers.append(int(next(iter(numbers))))
+
+    def truncate(self, from_date: date) -> int:
+        """Bỏ các kỳ từ `from_date` trở đi. Trả về số kỳ đã bỏ"""
+        cutoff = from_date.toordinal()
+        keep = len(self.ordinals)
+        while keep and self.ordinals[keep - 1] >= cutoff:
+            keep -= 1
+
+        removed = len(self.ordinals) - keep
+        del self.ordinals[keep:]
+        del self.numbers[keep:]
+        return removed
+
+    def dump(self) -> Dict[str, array]:
+        """Trạng thái dạng array (ghi snapshot, xem snapshot.py)"""
+        return {"ordinals": self.ordinals, "numbers": self.numbers}
+
+    def restore(self, sections: Dict[str, array]) -> None:
+        """Nạp lại trạng thái từ dump()"""
+        if len(sections["ordinals"]) != len(sections["numbers"]):
+            raise ValueError("Inconsistent DeSeries sections")
+        self.ordinals = sections["ordinals"]
+        self.numbers = sections["numbers"]
+
+    def window(self, draws: Optional[int] = None) -> array:
+        """Số đề của `draws` kỳ gần nhất (None = toàn bộ lịch sử)"""
+        if draws is None or draws >= len(self.numbers):
+            return self.numbers
+        return self.numbers[len(self.numbers) - draws:]
+
+    def gan(self, draws: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """
+        Đề gan: các số lâu chưa về nhất trong cửa sổ
+
+        Returns:
+            [{"number", "gan", "max_gan", "count", "last_date"}] sắp giảm dần theo gan.
+            Số chưa về trong cửa sổ: gan = độ dài cửa sổ, last_date = None.
+        """
+        values = self.window(draws)
+        offset = len(self.numbers) - len(values)
+        last_index = [-1] * 100
+        max_gan = [0] * 100
+        counts = [0] * 100
+
+        for index, number in enumerate(values):
+            max_gan[number] = max(max_gan[number], index - last_index[number] - 1)
+            last_index[number] = index
+            counts[number] += 1
+
+        total = len(values)
+        ranked = []
+        for number in range(100):
+            gan = total - 1 - last_index[number]
+            ranked.append({
+                "number": f"{number:02d}",
+                "gan": gan,
+                "max_gan": max(max_gan[number], gan),
+                "count": counts[number],
+                "last_date": (
+                    date.fromordinal(self.ordinals[offset + last_index[number]])
+                    if last_index[number] >= 0 else None
+                ),
+            })
+
+        ranked.sort(key=lambda item: (-item["gan"], item["number"]))
+        return ranked[:limit]
+
+    def distributions(self, draws: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Thống kê đầu / đuôi / tổng / chạm trong cửa sổ
+
+        Returns:
+            {"dau" | "duoi" | "tong" | "cham": [{"key": 0..9, "count", "gan"}]}
+        """
+        values = self.window(draws)
+        return {
+            "dau": category_stats(values, lambda number: (number // 10,)),
+            "duoi": category_stats(values, lambda number: (number % 10,)),
+            "tong": category_stats(values, lambda number: ((number // 10 + number % 10) % 10,)),
+            "cham": category_stats(values, lambda number: {number // 10, number % 10}),
+        }
+
+    def streaks(self, draws: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Chuỗi bệt (kỳ liên tiếp cùng giá trị) của từng thuộc tính trong STREAK_KEYS
+
+        Returns:
+            {"chan_le": {"value": giá trị kỳ mới nhất, "current": độ dài chuỗi hiện tại,
+                         "longest": chuỗi dài nhất, "longest_value"}, ...} - {} nếu chưa có kỳ
+        """
+        values = self.window(draws)
+        if not values:
+            return {}
+
+        result = {}
+        for name, key in STREAK_KEYS.items():
+            previous, current = None, 0
+            longest, longest_value = 0, None
+            for number in values:
+                value = key(number)
+                current = current + 1 if value == previous else 1
+                previous = value
+                if current > longest:
+                    longest, longest_value = current, value
+            result[name] = {
+                "value": previous,
+                "current": current,
+                "longest": longest,
+                "longest_value": longest_value,
+            }
+        return result
+
+
+class DeService(DrawMatrixService):
+    """DeSeries của từng tỉnh, đồng bộ với database"""
+
+    matrix_class = DeSeries
+    rows_query = staticmethod(de_series_query)
+
+    async def get_gan(self, province_code: str, draws: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """Đề gan của tỉnh (None = toàn bộ lịch sử)"""
+        try:
+            return (await self.get_matrix(province_code)).gan(draws, limit)
+        except Exception as e:
+            logger.error(f"❌ Error getting đề gan for {province_code}: {e}")
+            return []
+
+    async def get_distributions(self, province_code: str, draws: Optional[int] = None) -> Dict:
+        """Đầu / đuôi / tổng / chạm đề của tỉnh"""
+        try:
+            series = await self.get_matrix(province_code)
+            if not len(series):
+                return {}
+            return series.distributions(draws)
+        except Exception as e:
+            logger.error(f"❌ Error getting đề distributions for {province_code}: {e}")
+            return {}
+
+    async def get_streaks(self, province_code: str, draws: Optional[int] = None) -> Dict:
+        """Chuỗi bệt đề (chẵn-lẻ, to-nhỏ, đầu, đuôi, tổng) của tỉnh"""
+        try:
+            return (await self.get_matrix(province_code)).streaks(draws)
+        except Exception as e:
+            logger.error(f"❌ Error getting đề streaks for {province_code}: {e}")
+            return {}
+
+    async def get_latest(self, province_code: str, count: int = 10) -> List[Dict]:
+        """`count` số đề gần nhất (mới → cũ)"""
+        try:
+            series = await self.get_matrix(province_code)
+            start = max(len(series) - count, 0)
+            return [
+                {"date": date.fromordinal(series.ordinals[index]), "number": f"{series.numbers[index]:02d}"}
+                for index in range(len(series) - 1, start - 1, -1)
+            ]
+        except Exception as e:
+            logger.error(f"❌ Error getting latest đề for {province_code}: {e}")
+            return []
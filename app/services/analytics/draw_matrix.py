@@ -0,0 +1,310 @@
+"""Draw matrix - Ma trận đếm 100×100 theo thứ tự kỳ quay của 1 tỉnh (dùng chung)
+
+Mỗi kỳ đóng góp 1 lượng cố định vào ma trận (tích ngoài của vector có mặt),
+nên ma trận được cập nhật tăng dần khi có kỳ mới và cửa sổ K kỳ gần nhất
+tính bằng prefix snapshot: cứ `snapshot_every` kỳ lưu 1 bản sao ma trận cộng
+dồn → window = counts - cumulative(n - K), với cumulative(k) = snapshot gần
+nhất ≤ k + replay < snapshot_every kỳ. Chi phí không phụ thuộc độ dài lịch sử.
+
+Lớp con định nghĩa CELLS và _contribute(counts, index, delta):
+- CooccurrenceMatrix: kỳ i → present ⊗ present (lô xiên)
+- TransitionMatrix: kỳ i → previous ⊗ present (bạc nhớ)
+
+DrawMatrixService giữ ma trận của từng tỉnh trong bộ nhớ và đồng bộ với
+lottery_results / lo_2_so_history. Service dùng được cho mọi store theo kỳ có
+add_draw / truncate / last_date / len() (vd. DeSeries).
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, and_, func, cast, extract, BigInteger
+
+from app.database import DatabaseSession
+from app.models.lottery_result import LotteryResult
+from app.services.analytics.executor import get_analytics_executor
+from app.services.db.hot_queries import lo_gan_window_query
+from app.utils.timezone import get_vietnam_today
+
+logger = logging.getLogger(__name__)
+
+# Khoảng cách giữa 2 prefix snapshot (kỳ). 5 năm MB ≈ 18 snapshot × 40 KB
+SNAPSHOT_EVERY = 100
+
+# Khoảng cách tối thiểu giữa 2 lần kiểm tra dữ liệu mới của 1 tỉnh (giây)
+REFRESH_CHECK_SECONDS = 60
+
+# Ngày bắt đầu khi nạp toàn bộ lịch sử của tỉnh
+HISTORY_START = date(2000, 1, 1)
+
+
+def version_query():
+    """
+    Version của lottery_results: (COUNT, MAX(updated_at), checksum)
+
+    checksum = SUM(id + epoch(updated_at)) bắt được các thay đổi giữ nguyên
+    COUNT / MAX(updated_at): xóa 1 kỳ rồi nhập lại kỳ khác, hoặc sửa kỳ cũ với
+    updated_at cũ hơn kỳ mới nhất. Cùng cách tính trên SQLite và Postgres.
+    """
+    return select(
+        func.count(LotteryResult.id),
+        func.max(LotteryResult.updated_at),
+        func.sum(LotteryResult.id + cast(extract("epoch", LotteryResult.updated_at), BigInteger)),
+    )
+
+
+def to_version(row) -> Tuple:
+    """Dòng của version_query → tuple so sánh được (Postgres trả SUM là Decimal)"""
+    count, updated_at, checksum = row
+    return (count, updated_at, int(checksum or 0))
+
+
+def outer_add(counts: array, rows: Tuple[int, ...], cols: Tuple[int, ...], delta: int) -> None:
+    """counts[i*100 + j] += delta với mọi i ∈ rows, j ∈ cols"""
+    for i in rows:
+        row = i * 100
+        for j in cols:
+            counts[row + j] += delta
+
+
+class DrawMatrix:
+    """Ma trận đếm cộng dồn theo kỳ + prefix snapshots"""
+
+    # Số ô của ma trận (100×100, lớp con có thể thêm ô phụ)
+    CELLS = 100 * 100
+
+    def __init__(self, snapshot_every: int = SNAPSHOT_EVERY):
+        self.snapshot_every = snapshot_every
+        # [(ngày quay, các số về - không trùng, tăng dần)] cũ → mới
+        self.draws: List[Tuple[date, Tuple[int, ...]]] = []
+        self.counts = self._zeros()
+        # snapshots[k] = ma trận cộng dồn sau k × snapshot_every kỳ
+        self.snapshots: List[array] = [self._zeros()]
+        self._windows: Dict[int, array] = {}
+        # Tăng mỗi lần thêm / bỏ kỳ: khóa cache cho các phép tính dẫn xuất (vd. GapProfile)
+        self.epoch = 0
+
+    def _zeros(self) -> array:
+        return array("I", bytes(4 * self.CELLS))
+
+    def _contribute(self, counts: array, index: int, delta: int) -> None:
+        """Cộng (delta = 1) / trừ (delta = -1) phần đóng góp của kỳ draws[index]"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return len(self.draws)
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.draws[-1][0] if self.draws else None
+
+    def add_draw(self, draw_date: date, numbers: Iterable) -> None:
+        """Thêm 1 kỳ (mới hơn mọi kỳ đã có)"""
+        present = tuple(sorted({int(number) for number in numbers}))
+        self.draws.append((draw_date, present))
+        self._contribute(self.counts, len(self.draws) - 1, 1)
+        self._windows.clear()
+        self.epoch += 1
+
+        if len(self.draws) % self.snapshot_every == 0:
+            self.snapshots.append(array("I", self.counts))
+
+    def truncate(self, from_date: date) -> int:
+        """Bỏ các kỳ từ `from_date` trở đi (để nạp lại kết quả đã sửa). Trả về số kỳ đã bỏ"""
+        removed = 0
+        while self.draws and self.draws[-1][0] >= from_date:
+            self._contribute(self.counts, len(self.draws) - 1, -1)
+            self.draws.pop()
+            removed += 1
+
+        del self.snapshots[len(self.draws) // self.snapshot_every + 1:]
+        self._windows.clear()
+        if removed:
+            self.epoch += 1
+        return removed
+
+    def cumulative(self, k: int) -> array:
+        """Ma trận cộng dồn sau k kỳ đầu tiên"""
+        base = k // self.snapshot_every
+        counts = array("I", self.snapshots[base])
+        for index in range(base * self.snapshot_every, k):
+            self._contribute(counts, index, 1)
+        return counts
+
+    def window(self, draws: Optional[int] = None) -> array:
+        """
+        Ma trận của `draws` kỳ gần nhất (None = toàn bộ lịch sử)
+
+        Kết quả được giữ lại tới lần thêm / bỏ kỳ tiếp theo.
+        """
+        if draws is None or draws >= len(self.draws):
+            return self.counts
+        if draws not in self._windows:
+            start = self.cumulative(len(self.draws) - draws)
+            self._windows[draws] = array("I", (total - before for total, before in zip(self.counts, start)))
+        return self._windows[draws]
+
+    def dump(self) -> Dict[str, array]:
+        """Toàn bộ trạng thái dạng array phẳng (ghi snapshot, xem snapshot.py)"""
+        snapshots = array("I")
+        for snapshot in self.snapshots:
+            snapshots.extend(snapshot)
+        return {
+            "ordinals": array("l", (draw_date.toordinal() for draw_date, _ in self.draws)),
+            "sizes": array("B", (len(present) for _, present in self.draws)),
+            "numbers": array("B", (number for _, present in self.draws for number in present)),
+            "counts": self.counts,
+            "snapshots": snapshots,
+        }
+
+    def restore(self, sections: Dict[str, array]) -> None:
+        """Nạp lại trạng thái từ dump() - không replay các kỳ"""
+        ordinals, sizes, numbers = sections["ordinals"], sections["sizes"], sections["numbers"]
+        counts, snapshots = sections["counts"], sections["snapshots"]
+        if (
+            len(ordinals) != len(sizes)
+            or sum(sizes) != len(numbers)
+            or len(counts) != self.CELLS
+            or len(snapshots) != self.CELLS * (len(ordinals) // self.snapshot_every + 1)
+        ):
+            raise ValueError(f"Inconsistent {type(self).__name__} sections")
+
+        draws, position = [], 0
+        for ordinal, size in zip(ordinals, sizes):
+            draws.append((date.fromordinal(ordinal), tuple(numbers[position:position + size])))
+            position += size
+
+        self.draws = draws
+        self.counts = counts
+        self.snapshots = [snapshots[start:start + self.CELLS] for start in range(0, len(snapshots), self.CELLS)]
+        self._windows.clear()
+        self.epoch += 1
+
+
+class DrawMatrixService:
+    """
+    Giữ DrawMatrix của từng tỉnh trong bộ nhớ (nạp khi cần)
+
+    Mỗi lần truy vấn (tối đa 1 lần / REFRESH_CHECK_SECONDS mỗi tỉnh) so
+    version (COUNT, MAX(updated_at), checksum) của lottery_results tỉnh đó:
+    - có kỳ mới / kỳ cuối được lưu lại → truncate từ ngày đổi sớm nhất và
+      add_draw các kỳ từ đó (incremental)
+    - kỳ cũ bị sửa hoặc xóa → dựng lại ma trận của tỉnh
+    """
+
+    matrix_class = DrawMatrix
+    # Statement (province_code, start_date, end_date) → các dòng (number, draw_date) theo ngày
+    rows_query = staticmethod(lo_gan_window_query)
+
+    def __init__(self, snapshot_every: int = SNAPSHOT_EVERY):
+        self.snapshot_every = snapshot_every
+        self._matrices: Dict[str, DrawMatrix] = {}
+        self._versions: Dict[str, Tuple] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_matrix(self, province_code: str) -> DrawMatrix:
+        """Ma trận của tỉnh, đồng bộ với database"""
+        if time.monotonic() - self._checked_at.get(province_code, 0.0) < REFRESH_CHECK_SECONDS:
+            return self._matrices[province_code]
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at.get(province_code, 0.0) >= REFRESH_CHECK_SECONDS:
+                await self._sync(province_code)
+                self._checked_at[province_code] = time.monotonic()
+            return self._matrices[province_code]
+
+    def invalidate(self, province_code: Optional[str] = None) -> None:
+        """Buộc kiểm tra lại dữ liệu ở lần gọi sau"""
+        if province_code:
+            self._checked_at.pop(province_code, None)
+        else:
+            self._checked_at.clear()
+
+    async def _sync(self, province_code: str) -> None:
+        rows = None
+        async with DatabaseSession(read_only=True) as session:
+            version = to_version((await session.execute(
+                version_query().where(LotteryResult.province_code == province_code)
+            )).one())
+
+            matrix = self._matrices.get(province_code)
+            previous = self._versions.get(province_code)
+            if matrix is not None and version == previous:
+                return
+
+            started = time.perf_counter()
+            from_date = None
+            if matrix is not None and previous[1] is not None:
+                # Các ngày có kết quả mới / được lưu lại kể từ lần đồng bộ trước
+                changed = (await session.execute(
+                    select(func.min(LotteryResult.draw_date)).where(and_(
+                        LotteryResult.province_code == province_code,
+                        LotteryResult.updated_at > previous[1]
+                    ))
+                )).scalar()
+                last_date = matrix.last_date
+                if changed is not None and (last_date is None or changed >= last_date):
+                    from_date = changed
+
+            if from_date is not None:
+                matrix.truncate(from_date)
+                added = await self._load(session, province_code, matrix, from_date)
+
+            # Lần đầu, kỳ cũ bị sửa, hoặc số kỳ lệch (kết quả bị xóa) → dựng lại
+            if from_date is None or len(matrix) != version[0]:
+                rows = await self._rows(session, province_code, HISTORY_START)
+
+        if rows is not None:
+            # Replay toàn bộ lịch sử là CPU-bound (~1s với 20 năm MB): dựng ma trận
+            # mới trên analytics executor, xong mới thay ma trận đang dùng
+            matrix = await get_analytics_executor().run(
+                build_store, self.new_matrix(), rows, key=(type(self).__name__, province_code)
+            )
+            added = len(matrix)
+
+        self._matrices[province_code] = matrix
+        self._versions[province_code] = version
+        logger.info(
+            f"✅ {type(matrix).__name__} {province_code}: +{added} draws "
+            f"({len(matrix)} total) in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def new_matrix(self):
+        """Store rỗng cho 1 tỉnh"""
+        return self.matrix_class(self.snapshot_every)
+
+    async def _rows(self, session, province_code: str, from_date: date) -> List:
+        return (await session.execute(
+            self.rows_query(province_code, from_date, get_vietnam_today())
+        )).all()
+
+    async def _load(self, session, province_code: str, matrix, from_date: date) -> int:
+        return add_rows(matrix, await self._rows(session, province_code, from_date))
+
+
+def build_store(store, rows):
+    """Nạp rows vào store rỗng và trả store (chạy trên analytics executor)"""
+    add_rows(store, rows)
+    return store
+
+
+def add_rows(matrix: DrawMatrix, rows) -> int:
+    """rows (number, draw_date) sắp theo ngày → add_draw từng kỳ"""
+    added = 0
+    current_date, numbers = None, []
+    for number, draw_date in rows:
+        if draw_date != current_date:
+            if numbers:
+                matrix.add_draw(current_date, numbers)
+                added += 1
+            current_date, numbers = draw_date, []
+        numbers.append(number)
+    if numbers:
+        matrix.add_draw(current_date, numbers)
+        added += 1
+    return added
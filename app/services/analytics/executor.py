@@ -0,0 +1,201 @@
+"""Analytics executor - Chạy tính toán thống kê nặng ngoài event loop
+
+Các handler chỉ làm I/O (database, Telegram); phần tính toán thuần (lô gan,
+chuỗi liên tiếp...) được đẩy sang thread / process pool:
+
+    result = await get_analytics_executor().run(compute_lo_gan, rows, ...)
+
+- Hàng đợi giới hạn: tối đa `queue_size` task đang chạy + chờ, vượt quá →
+  AnalyticsBusy ngay (không xếp hàng vô hạn khi nhiều user cùng bấm).
+- Hủy theo user: task gắn `key` (mặc định = task_key hiện tại, do
+  button_callback đặt = user id). Task mới cùng key hủy task cũ: chưa chạy
+  thì bỏ khỏi hàng đợi, đang chạy thì kết quả bị bỏ và coroutine đang chờ
+  nhận CancelledError (user đã chuyển sang màn hình khác).
+- Đo thời gian từng task (chờ trong hàng đợi + chạy) → log + stats().
+
+Hàm chạy trong pool phải là hàm cấp module (pickle được khi dùng process).
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import ANALYTICS_EXECUTOR, ANALYTICS_QUEUE_SIZE, ANALYTICS_WORKERS
+from app.services.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Khóa hủy của task hiện tại (vd. user id) - đặt ở đầu mỗi update
+task_key: ContextVar[Optional[Hashable]] = ContextVar("analytics_task_key", default=None)
+
+# Task chạy lâu hơn ngưỡng này (giây) được log ở mức WARNING
+SLOW_TASK_SECONDS = 1.0
+
+
+class AnalyticsBusy(Exception):
+    """Hàng đợi analytics đã đầy"""
+
+
+def _timed(func: Callable, args: Tuple, kwargs: Dict) -> Tuple[Any, float]:
+    """Chạy trong worker: trả về (kết quả, thời gian chạy)"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+class AnalyticsExecutor:
+    """Thread / process pool với hàng đợi giới hạn, hủy theo key và đo thời gian"""
+
+    def __init__(
+        self,
+        kind: str = ANALYTICS_EXECUTOR,
+        workers: int = ANALYTICS_WORKERS,
+        queue_size: int = ANALYTICS_QUEUE_SIZE
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown analytics executor: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._by_key: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+            "run_seconds": 0.0,
+            "max_run_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                import multiprocessing
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="analytics")
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        """Số task đang chạy + chờ"""
+        return self._pending
+
+    async def run(self, func: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> Any:
+        """
+        Chạy func(*args, **kwargs) trong pool và chờ kết quả
+
+        Args:
+            key: Khóa hủy (mặc định task_key hiện tại). Task mới cùng key hủy task cũ.
+
+        Raises:
+            AnalyticsBusy: Hàng đợi đầy
+            asyncio.CancelledError: Bị task mới cùng key thay thế
+        """
+        if self._pending >= self.queue_size:
+            self._stats["rejected"] += 1
+            raise AnalyticsBusy(f"Analytics queue full ({self._pending}/{self.queue_size})")
+
+        key = task_key.get() if key is None else key
+        if key is not None:
+            self.cancel(key)
+
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        concurrent_future = self._get_pool().submit(_timed, func, args, kwargs)
+        self._pending += 1
+        self._stats["submitted"] += 1
+        # Giải phóng chỗ khi worker thật sự xong (kể cả khi coroutine chờ đã bị hủy)
+        concurrent_future.add_done_callback(lambda _: self._release_from_worker(loop))
+
+        future = asyncio.wrap_future(concurrent_future, loop=loop)
+        if key is not None:
+            self._by_key[key] = future
+
+        name = getattr(func, "__name__", repr(func))
+        try:
+            with get_tracer().span(f"analytics.{name}", key=key):
+                result, run_seconds = await future
+        except asyncio.CancelledError:
+            concurrent_future.cancel()
+            self._stats["cancelled"] += 1
+            logger.info("🚫 Analytics task %s cancelled (key=%s)", name, key)
+            raise
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            if key is not None and self._by_key.get(key) is future:
+                del self._by_key[key]
+
+        total_seconds = time.perf_counter() - submitted
+        wait_seconds = max(total_seconds - run_seconds, 0.0)
+        self._stats["completed"] += 1
+        self._stats["run_seconds"] += run_seconds
+        self._stats["max_run_seconds"] = max(self._stats["max_run_seconds"], run_seconds)
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait_seconds)
+
+        log = logger.warning if run_seconds >= SLOW_TASK_SECONDS else logger.debug
+        log("⏱️ Analytics task %s: run %.0fms, queued %.0fms", name, run_seconds * 1000, wait_seconds * 1000)
+        return result
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    def _release_from_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Event loop đã đóng (đang tắt bot)
+            self._pending -= 1
+
+    def cancel(self, key: Hashable) -> bool:
+        """Hủy task đang chờ của `key` (nếu có)"""
+        future = self._by_key.pop(key, None)
+        if future is None or future.done():
+            return False
+        future.cancel()
+        return True
+
+    def stats(self) -> Dict:
+        """Thống kê từ lúc khởi động"""
+        completed = self._stats["completed"]
+        return {
+            **self._stats,
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self._pending,
+            "avg_run_seconds": self._stats["run_seconds"] / completed if completed else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Dừng pool (task chưa chạy bị hủy)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+_executor: Optional[AnalyticsExecutor] = None
+
+
+def get_analytics_executor() -> AnalyticsExecutor:
+    """Executor dùng chung của process (tạo khi cần)"""
+    global _executor
+    if _executor is None:
+        _executor = AnalyticsExecutor()
+    return _executor
+
+
+def shutdown_analytics_executor(wait: bool = True) -> None:
+    """Dừng executor dùng chung (khi tắt bot)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
@@ -0,0 +1,136 @@
+"""Gap scores - Chấm điểm lô gan theo phân phối khoảng cách (gap) thực nghiệm
+
+Ngưỡng cố định của categorize_gan (21/16 ngày MB, 9/6 kỳ MN/MT) không
+phân biệt số hay về với số ít về. Ở đây mỗi số có phân phối gap riêng,
+lấy từ toàn bộ lịch sử của tỉnh:
+
+- gap = số kỳ giữa 2 lần về liên tiếp
+- tail = P(gap ≥ gan hiện tại) = (số gap cũ ≥ gan + 1) / (số gap cũ + 1)
+  (tính cả gap hiện tại đang dở → luôn > 0; tail nhỏ = gan hiếm gặp)
+- hit_rate = số kỳ về / tổng số kỳ, expected_gap = (1 - p) / p,
+  geometric_tail = (1 - p)^gan: cùng câu hỏi nếu các kỳ độc lập
+- score = 1 - tail
+
+GapProfile dựng trong 1 lượt quét các kỳ (không lặp riêng từng số) từ
+lịch sử có mặt của DrawMatrix (CooccurrenceMatrix giữ sẵn toàn bộ lịch sử
+từng tỉnh) và được cache theo epoch của ma trận: chỉ tính lại khi có kỳ
+mới / kỳ bị sửa.
+"""
+
+import asyncio
+import logging
+from array import array
+from bisect import bisect_left
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.analytics.cooccurrence import CooccurrenceService
+from app.services.analytics.draw_matrix import DrawMatrixService
+from app.services.analytics.executor import get_analytics_executor
+from app.utils.lottery_helpers import categorize_gan_tail
+
+logger = logging.getLogger(__name__)
+
+
+class GapProfile:
+    """Phân phối gap + gan hiện tại của 100 số ở 1 tỉnh"""
+
+    def __init__(self, draws: Sequence[Tuple[date, Tuple[int, ...]]]):
+        """
+        Args:
+            draws: [(ngày quay, các số về)] cũ → mới (DrawMatrix.draws)
+        """
+        self.total = len(draws)
+        last_index = [-1] * 100
+        gaps: List[List[int]] = [[] for _ in range(100)]
+
+        for index, (_, present) in enumerate(draws):
+            for number in present:
+                if last_index[number] >= 0:
+                    gaps[number].append(index - last_index[number] - 1)
+                last_index[number] = index
+
+        # gaps đã sắp xếp → tail bằng bisect
+        self.gaps = [array("l", sorted(number_gaps)) for number_gaps in gaps]
+        self.appearances = [len(number_gaps) + (last_index[number] >= 0) for number, number_gaps in enumerate(gaps)]
+        self.current = [self.total - 1 - index if index >= 0 else self.total for index in last_index]
+        self.last_dates = [draws[index][0] if index >= 0 else None for index in last_index]
+
+    def tail(self, number: int, gap: Optional[int] = None) -> float:
+        """P(gap ≥ `gap`) của `number` (mặc định: gan hiện tại)"""
+        gap = self.current[number] if gap is None else gap
+        gaps = self.gaps[number]
+        return (len(gaps) - bisect_left(gaps, gap) + 1) / (len(gaps) + 1)
+
+    def score(self, number: int) -> Dict:
+        """Điểm gan của 1 số"""
+        gan = self.current[number]
+        gaps = self.gaps[number]
+        hit_rate = self.appearances[number] / self.total if self.total else 0.0
+        tail = self.tail(number)
+        return {
+            "number": f"{number:02d}",
+            "gan": gan,
+            "max_gan": max(gaps[-1] if gaps else 0, gan),
+            "appearances": self.appearances[number],
+            "hit_rate": hit_rate,
+            "expected_gap": (1 - hit_rate) / hit_rate if hit_rate else None,
+            "tail": tail,
+            "geometric_tail": (1 - hit_rate) ** gan,
+            "score": 1 - tail,
+            "category": categorize_gan_tail(tail),
+            "last_seen_date": self.last_dates[number],
+        }
+
+    def ranked(self, limit: int = 15) -> List[Dict]:
+        """Các số sắp theo score giảm dần (cùng score: gan dài hơn trước)"""
+        scores = [self.score(number) for number in range(100)]
+        scores.sort(key=lambda item: (-item["score"], -item["gan"], item["number"]))
+        return scores[:limit]
+
+
+class GapScoreService:
+    """GapProfile của từng tỉnh, cache theo epoch của ma trận nguồn"""
+
+    def __init__(self, matrices: Optional[DrawMatrixService] = None):
+        # Dùng chung CooccurrenceService với StatisticsService để không nạp lịch sử 2 lần
+        self.matrices = matrices or CooccurrenceService()
+        self._profiles: Dict[str, Tuple[object, int, GapProfile]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_profile(self, province_code: str) -> GapProfile:
+        """GapProfile của tỉnh (tính lại khi ma trận có kỳ mới / bị dựng lại)"""
+        matrix = await self.matrices.get_matrix(province_code)
+        cached = self._profiles.get(province_code)
+        if cached and cached[0] is matrix and cached[1] == matrix.epoch:
+            return cached[2]
+
+        async with self._lock:
+            cached = self._profiles.get(province_code)
+            if cached and cached[0] is matrix and cached[1] == matrix.epoch:
+                return cached[2]
+
+            # Chép danh sách kỳ: ma trận có thể nhận kỳ mới trong lúc executor đang tính
+            epoch = matrix.epoch
+            profile = await get_analytics_executor().run(
+                GapProfile, list(matrix.draws), key=("gap_profile", province_code)
+            )
+            self._profiles[province_code] = (matrix, epoch, profile)
+            return profile
+
+    async def get_scores(self, province_code: str, limit: int = 15) -> List[Dict]:
+        """
+        Lô gan xếp theo xác suất (tail nhỏ nhất trước)
+
+        Returns:
+            [{"number", "gan", "max_gan", "appearances", "hit_rate", "expected_gap",
+              "tail", "geometric_tail", "score", "category", "last_seen_date"}]
+        """
+        try:
+            profile = await self.get_profile(province_code)
+            if not profile.total:
+                return []
+            return profile.ranked(limit)
+        except Exception as e:
+            logger.error(f"❌ Error getting gap scores for {province_code}: {e}")
+            return []
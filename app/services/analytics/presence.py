@@ -0,0 +1,293 @@
+"""Presence tensor - Ma trận có mặt tỉnh × kỳ × số (lô 2 số) cho thống kê toàn quốc
+
+Mỗi (tỉnh, số) là 1 int dùng làm bitset theo kỳ quay của tỉnh đó:
+bit k = 1 nếu số về ở kỳ thứ k tính từ kỳ mới nhất (bit 0 = kỳ mới nhất).
+35 tỉnh MN/MT × 100 số × 200 kỳ ≈ 90 KB, nạp bằng 1 câu SQL.
+
+- Gan của số = số bit 0 ở cuối (trailing zeros) → gan cả nước là 3500 phép
+  toán trên int, không phải 35 lần get_lo_gan.
+- "Gan ≥ N kỳ" = mask & ((1 << N) - 1) == 0.
+- Số lần về trong K kỳ gần nhất = popcount(mask & ((1 << K) - 1)).
+
+Gan ở đây tính theo kỳ có dữ liệu trong database (không theo lịch quay như
+count_draw_periods) nên có thể lệch 1 kỳ khi kết quả hôm nay chưa về.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.database import DatabaseSession
+from app.services.analytics.draw_matrix import to_version, version_query
+from app.services.analytics.executor import get_analytics_executor
+from app.services.db.hot_queries import presence_window_query
+from app.services.db.region_rollup_service import region_provinces
+from app.utils.lottery_helpers import draw_window_start
+from app.utils.timezone import get_vietnam_today
+
+logger = logging.getLogger(__name__)
+
+# Số kỳ giữ trong tensor (cùng cửa sổ mặc định với get_lo_gan)
+PRESENCE_DRAWS = 200
+
+# Khoảng cách tối thiểu giữa 2 lần kiểm tra dữ liệu mới (giây)
+REFRESH_CHECK_SECONDS = 60
+
+# Mặc định: các tỉnh quay theo tuần (MB quay hằng ngày, gan tính theo ngày)
+DEFAULT_REGIONS = ("MN", "MT")
+
+
+def trailing_zeros(mask: int) -> int:
+    """Số bit 0 ở cuối (mask != 0)"""
+    return (mask & -mask).bit_length() - 1
+
+
+class PresenceTensor:
+    """
+    Bitset có mặt của mọi (tỉnh, số)
+
+    Attributes:
+        draw_dates: {province_code: [ngày quay mới → cũ]}
+        masks: {province_code: [100 int]} - bit k = về ở kỳ draw_dates[k]
+    """
+
+    def __init__(self, draw_dates: Dict[str, List[date]], masks: Dict[str, List[int]]):
+        self.draw_dates = draw_dates
+        self.masks = masks
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, date, str]], draws: int = PRESENCE_DRAWS) -> "PresenceTensor":
+        """Dựng tensor từ các dòng (province_code, draw_date, number), giữ `draws` kỳ mới nhất mỗi tỉnh"""
+        appearances = defaultdict(lambda: defaultdict(set))
+        for province_code, draw_date, number in rows:
+            appearances[province_code][draw_date].add(int(number))
+
+        draw_dates, masks = {}, {}
+        for province_code, by_date in appearances.items():
+            dates = sorted(by_date, reverse=True)[:draws]
+            province_masks = [0] * 100
+            for bit, draw_date in enumerate(dates):
+                for number in by_date[draw_date]:
+                    province_masks[number] |= 1 << bit
+            draw_dates[province_code] = dates
+            masks[province_code] = province_masks
+
+        return cls(draw_dates, masks)
+
+    def dump(self) -> Dict[str, Dict[str, array]]:
+        """{province_code: {"ordinals", "masks"}} - mỗi mask ghi ceil(số kỳ / 8) byte (snapshot.py)"""
+        result = {}
+        for province_code, dates in self.draw_dates.items():
+            width = (len(dates) + 7) // 8
+            masks = array("B")
+            for mask in self.masks[province_code]:
+                masks.frombytes(mask.to_bytes(width, "little"))
+            result[province_code] = {
+                "ordinals": array("l", (draw_date.toordinal() for draw_date in dates)),
+                "masks": masks,
+            }
+        return result
+
+    @classmethod
+    def restore(cls, sections: Dict[str, Dict[str, array]]) -> "PresenceTensor":
+        """Dựng lại tensor từ dump()"""
+        draw_dates, masks = {}, {}
+        for province_code, province_sections in sections.items():
+            ordinals, raw = province_sections["ordinals"], province_sections["masks"].tobytes()
+            width = (len(ordinals) + 7) // 8
+            if len(raw) != 100 * width:
+                raise ValueError(f"Inconsistent presence sections for {province_code}")
+            draw_dates[province_code] = [date.fromordinal(ordinal) for ordinal in ordinals]
+            masks[province_code] = [
+                int.from_bytes(raw[number * width:(number + 1) * width], "little") for number in range(100)
+            ]
+        return cls(draw_dates, masks)
+
+    @property
+    def provinces(self) -> List[str]:
+        return list(self.masks)
+
+    def _select(self, provinces: Optional[Iterable[str]]) -> List[str]:
+        if provinces is None:
+            return self.provinces
+        return [code for code in provinces if code in self.masks]
+
+    def gan(self, provinces: Optional[Iterable[str]] = None) -> Dict[str, List[Optional[int]]]:
+        """
+        Số kỳ chưa về của mọi số ở mọi tỉnh
+
+        Returns:
+            {province_code: [gan số 00, ..., gan số 99]} - None nếu chưa về trong cửa sổ
+        """
+        return {
+            code: [trailing_zeros(mask) if mask else None for mask in self.masks[code]]
+            for code in self._select(provinces)
+        }
+
+    def gan_everywhere(
+        self,
+        min_gan: int = 6,
+        min_provinces: int = 3,
+        provinces: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Các số đang gan ≥ `min_gan` kỳ ở ít nhất `min_provinces` tỉnh
+
+        Returns:
+            [{"number", "province_count", "max_gan", "provinces": [(code, gan), ...]}]
+            sắp theo số tỉnh rồi gan lớn nhất (giảm dần)
+        """
+        recent = (1 << min_gan) - 1
+        overdue = [[] for _ in range(100)]
+
+        for code in self._select(provinces):
+            for number, mask in enumerate(self.masks[code]):
+                # Chưa về trong cửa sổ thì không biết gan thật → bỏ qua (như get_lo_gan)
+                if mask and not mask & recent:
+                    overdue[number].append((code, trailing_zeros(mask)))
+
+        result = []
+        for number, entries in enumerate(overdue):
+            if len(entries) >= min_provinces:
+                entries.sort(key=lambda entry: entry[1], reverse=True)
+                result.append({
+                    "number": f"{number:02d}",
+                    "province_count": len(entries),
+                    "max_gan": entries[0][1],
+                    "provinces": entries,
+                })
+
+        result.sort(key=lambda item: (item["province_count"], item["max_gan"]), reverse=True)
+        return result
+
+    def hottest(self, draws: int = 30, provinces: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Số về nhiều nhất trên mọi tỉnh trong `draws` kỳ gần nhất của từng tỉnh
+
+        Returns:
+            [{"number", "count", "province_count"}] - count tính theo kỳ (1 kỳ về
+            nhiều nháy vẫn tính 1), sắp giảm dần
+        """
+        window = (1 << draws) - 1
+        counts = [0] * 100
+        province_counts = [0] * 100
+
+        for code in self._select(provinces):
+            for number, mask in enumerate(self.masks[code]):
+                hits = (mask & window).bit_count()
+                if hits:
+                    counts[number] += hits
+                    province_counts[number] += 1
+
+        result = [
+            {"number": f"{number:02d}", "count": count, "province_count": province_counts[number]}
+            for number, count in enumerate(counts) if count
+        ]
+        result.sort(key=lambda item: (item["count"], item["province_count"]), reverse=True)
+        return result
+
+
+class PresenceService:
+    """
+    Giữ PresenceTensor trong bộ nhớ, nạp lại khi lottery_results thay đổi
+
+    Kiểm tra thay đổi (version_query, như DrawMatrixService) tối đa mỗi
+    REFRESH_CHECK_SECONDS, nên cả bot lẫn worker ghi kết quả đều được nhận ra.
+    """
+
+    def __init__(self, draws: int = PRESENCE_DRAWS, regions: Iterable[str] = DEFAULT_REGIONS):
+        self.draws = draws
+        self.regions = tuple(regions)
+        self.province_codes = [code for region in self.regions for code in region_provinces(region)]
+
+        self._tensor: Optional[PresenceTensor] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_tensor(self) -> PresenceTensor:
+        """Tensor hiện tại (nạp lại nếu có kết quả mới)"""
+        if self._tensor is not None and time.monotonic() - self._checked_at < REFRESH_CHECK_SECONDS:
+            return self._tensor
+
+        async with self._lock:
+            if self._tensor is not None and time.monotonic() - self._checked_at < REFRESH_CHECK_SECONDS:
+                return self._tensor
+
+            rows = None
+            async with DatabaseSession(read_only=True) as session:
+                version = to_version((await session.execute(version_query())).one())
+
+                if self._tensor is None or version != self._version:
+                    started = time.perf_counter()
+                    end_date = get_vietnam_today()
+                    start_date = min(
+                        (draw_window_start(code, self.draws, end_date) for code in self.province_codes),
+                        default=end_date
+                    )
+                    rows = (await session.execute(
+                        presence_window_query(self.province_codes, start_date, end_date)
+                    )).all()
+
+            if rows is not None:
+                # Dựng tensor ngoài event loop (CPU-bound), xong mới thay tensor đang dùng
+                self._tensor = await get_analytics_executor().run(
+                    PresenceTensor.from_rows, rows, self.draws, key="presence_tensor"
+                )
+                self._version = version
+                logger.info(
+                    f"✅ Presence tensor loaded: {len(self._tensor.masks)} provinces, "
+                    f"{len(rows)} rows in {(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+
+            self._checked_at = time.monotonic()
+            return self._tensor
+
+    def invalidate(self) -> None:
+        """Buộc kiểm tra lại dữ liệu ở lần gọi sau"""
+        self._checked_at = 0.0
+
+    def _scope(self, region: Optional[str]) -> Optional[List[str]]:
+        return region_provinces(region) if region else None
+
+    async def get_all_gan(self, region: Optional[str] = None) -> Dict[str, List[Optional[int]]]:
+        """Gan (kỳ) của mọi số ở mọi tỉnh"""
+        try:
+            return (await self.get_tensor()).gan(self._scope(region))
+        except Exception as e:
+            logger.error(f"❌ Error getting all-province gan: {e}")
+            return {}
+
+    async def get_gan_everywhere(
+        self,
+        min_gan: int = 6,
+        min_provinces: int = 3,
+        region: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """Số gan ≥ `min_gan` kỳ ở ít nhất `min_provinces` tỉnh"""
+        try:
+            tensor = await self.get_tensor()
+            result = tensor.gan_everywhere(min_gan, min_provinces, self._scope(region))
+            logger.info(f"✅ Got {len(result)} numbers gan in ≥{min_provinces} provinces")
+            return result[:limit]
+        except Exception as e:
+            logger.error(f"❌ Error getting gan everywhere: {e}")
+            return []
+
+    async def get_cross_province_hot(
+        self,
+        draws: int = 30,
+        region: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """Số về nhiều nhất trên mọi tỉnh trong `draws` kỳ gần nhất"""
+        try:
+            return (await self.get_tensor()).hottest(draws, self._scope(region))[:limit]
+        except Exception as e:
+            logger.error(f"❌ Error getting cross-province hot numbers: {e}")
+            return []
@@ -0,0 +1,276 @@
+"""Snapshot - Giữ trạng thái analytics trong bộ nhớ qua các lần restart
+
+Khi tắt bot (post_shutdown), các store đã nạp được ghi ra 1 file:
+- ma trận lô xiên / bạc nhớ (DrawMatrix: các kỳ + ma trận cộng dồn + prefix snapshots)
+- chuỗi đề (DeSeries)
+- presence tensor (bitset tỉnh × số)
+
+Khi khởi động, file được mmap và các array được chép thẳng từ vùng nhớ đó
+(không replay kỳ nào, không query lịch sử). Mỗi store mang version
+(COUNT, MAX(updated_at), checksum) của tỉnh lúc nạp (xem version_query),
+so với database bằng 1 câu GROUP BY province_code:
+- khớp → store dùng ngay, không kiểm tra lại trong REFRESH_CHECK_SECONDS
+- lệch (có kỳ mới / kỳ cũ bị sửa sau lần ghi) → vẫn nạp, lần truy vấn đầu
+  đồng bộ như bình thường (chỉ nạp các kỳ mới, xem draw_matrix.py)
+
+Định dạng file (native byte order, kiểm tra khi đọc):
+
+    header  struct "<8sHI": MAGIC, FORMAT_VERSION, độ dài index
+    index   JSON: cấu hình, version từng store, vị trí các section, CRC32
+    data    bytes thô của các array, mỗi section căn 8 byte
+
+File cũ / khác định dạng / hỏng chỉ bị bỏ qua (khởi động nguội như trước).
+ScheduleCache và kết quả xổ số không nằm trong snapshot: ScheduleCache chỉ
+phụ thuộc ngày hiện tại, kết quả đã có Redis / database.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import SNAPSHOT_PATH
+from app.database import DatabaseSession
+from app.models.lottery_result import LotteryResult
+from app.services.analytics.draw_matrix import to_version, version_query
+from app.services.analytics.presence import PresenceTensor
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"XSBMSNAP"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHI")
+ALIGN = 8
+
+# Service (thuộc tính của StatisticsService) có các store theo tỉnh được ghi snapshot
+STORE_SERVICES = ("cooccurrence_service", "transition_service", "de_service")
+
+_TYPECODES = ("B", "I", "l")
+
+
+def _encode_version(version: Tuple) -> List:
+    count, updated_at, checksum = version
+    return [count, updated_at.isoformat() if updated_at else None, checksum]
+
+
+def _decode_version(value: List) -> Tuple:
+    count, updated_at, checksum = value
+    return (count, datetime.fromisoformat(updated_at) if updated_at else None, checksum)
+
+
+class _Layout:
+    """Xếp các array vào vùng data (offset căn ALIGN byte)"""
+
+    def __init__(self):
+        # [(array, các byte 0 đệm cho tròn ALIGN)]
+        self.chunks: List[Tuple[array, bytes]] = []
+        self.size = 0
+
+    def add(self, values: array) -> List:
+        offset = self.size
+        padding = bytes(-len(values) * values.itemsize % ALIGN)
+        self.chunks.append((values, padding))
+        self.size += len(values) * values.itemsize + len(padding)
+        return [values.typecode, offset, len(values)]
+
+    def add_sections(self, sections: Dict[str, array]) -> Dict[str, List]:
+        return {name: self.add(values) for name, values in sections.items()}
+
+
+def save_snapshot(statistics_service, path: str = SNAPSHOT_PATH) -> Optional[Dict]:
+    """
+    Ghi các store đã nạp ra `path` (ghi file tạm rồi đổi tên)
+
+    Returns:
+        {"stores": số store, "bytes": kích thước file} - None nếu không có gì để ghi / lỗi
+    """
+    if not getattr(statistics_service, "use_database", False):
+        return None
+
+    try:
+        started = time.perf_counter()
+        layout = _Layout()
+        stores = []
+        for service_name in STORE_SERVICES:
+            service = getattr(statistics_service, service_name)
+            for province_code, store in service._matrices.items():
+                stores.append({
+                    "service": service_name,
+                    "province": province_code,
+                    "snapshot_every": service.snapshot_every,
+                    "version": _encode_version(service._versions[province_code]),
+                    "sections": layout.add_sections(store.dump()),
+                })
+
+        presence = None
+        presence_service = statistics_service.presence_service
+        if presence_service._tensor is not None:
+            presence = {
+                "draws": presence_service.draws,
+                "regions": list(presence_service.regions),
+                "version": _encode_version(presence_service._version),
+                "provinces": {
+                    province_code: layout.add_sections(sections)
+                    for province_code, sections in presence_service._tensor.dump().items()
+                },
+            }
+
+        if not stores and presence is None:
+            return None
+
+        crc = 0
+        for values, padding in layout.chunks:
+            crc = zlib.crc32(padding, zlib.crc32(values, crc))
+
+        index = json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "byteorder": sys.byteorder,
+            "itemsize": {typecode: array(typecode).itemsize for typecode in _TYPECODES},
+            "data_bytes": layout.size,
+            "crc32": crc,
+            "stores": stores,
+            "presence": presence,
+        }).encode()
+        head = HEADER.pack(MAGIC, FORMAT_VERSION, len(index)) + index
+        head += bytes(-len(head) % ALIGN)
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(target.name + ".tmp")
+        with open(temp, "wb") as f:
+            f.write(head)
+            for values, padding in layout.chunks:
+                f.write(values)
+                f.write(padding)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, target)
+
+        size = len(head) + layout.size
+        logger.info(
+            "💾 Analytics snapshot saved: %d stores, %.1f MB in %.0fms → %s",
+            len(stores), size / 1024 / 1024, (time.perf_counter() - started) * 1000, target
+        )
+        return {"stores": len(stores), "bytes": size}
+
+    except Exception as e:
+        logger.error("❌ Error saving analytics snapshot: %s", e)
+        return None
+
+
+def _read_index(view: memoryview) -> Tuple[Dict, int]:
+    """Kiểm tra header / định dạng / CRC → (index, offset vùng data)"""
+    magic, version, index_size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+
+    index = json.loads(bytes(view[HEADER.size:HEADER.size + index_size]))
+    itemsize = {typecode: array(typecode).itemsize for typecode in _TYPECODES}
+    if index["byteorder"] != sys.byteorder or index["itemsize"] != itemsize:
+        raise ValueError("snapshot written on an incompatible platform")
+
+    data_start = -(-(HEADER.size + index_size) // ALIGN) * ALIGN
+    data = view[data_start:data_start + index["data_bytes"]]
+    if len(data) != index["data_bytes"] or zlib.crc32(data) != index["crc32"]:
+        raise ValueError("snapshot data is truncated or corrupt")
+    return index, data_start
+
+
+def _sections(view: memoryview, data_start: int, specs: Dict[str, List]) -> Dict[str, array]:
+    sections = {}
+    for name, (typecode, offset, length) in specs.items():
+        values = array(typecode)
+        start = data_start + offset
+        values.frombytes(view[start:start + length * values.itemsize])
+        sections[name] = values
+    return sections
+
+
+async def _db_versions() -> Dict[str, Tuple]:
+    """{province_code: version} - cùng version DrawMatrixService dùng"""
+    async with DatabaseSession(read_only=True) as session:
+        rows = (await session.execute(
+            version_query().add_columns(LotteryResult.province_code).group_by(LotteryResult.province_code)
+        )).all()
+    return {row[-1]: to_version(row[:-1]) for row in rows}
+
+
+async def load_snapshot(statistics_service, path: str = SNAPSHOT_PATH) -> Optional[Dict]:
+    """
+    Nạp snapshot vào các service analytics (store đã có trong bộ nhớ được giữ nguyên)
+
+    Returns:
+        {"fresh": số store khớp database, "stale": số store cần đồng bộ tăng dần,
+         "presence": "fresh" | "stale" | None} - None nếu không có file / file không dùng được
+    """
+    if not getattr(statistics_service, "use_database", False) or not os.path.exists(path):
+        return None
+
+    try:
+        started = time.perf_counter()
+        db_versions = await _db_versions()
+        summary = {"fresh": 0, "stale": 0, "presence": None}
+        now = time.monotonic()
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                index, data_start = _read_index(view)
+
+                for entry in index["stores"]:
+                    service = getattr(statistics_service, entry["service"])
+                    province_code = entry["province"]
+                    if entry["snapshot_every"] != service.snapshot_every or province_code in service._matrices:
+                        continue
+
+                    store = service.new_matrix()
+                    store.restore(_sections(view, data_start, entry["sections"]))
+                    version = _decode_version(entry["version"])
+                    service._matrices[province_code] = store
+                    service._versions[province_code] = version
+                    if version == db_versions.get(province_code, (0, None, 0)):
+                        service._checked_at[province_code] = now
+                        summary["fresh"] += 1
+                    else:
+                        summary["stale"] += 1
+
+                presence = index["presence"]
+                presence_service = statistics_service.presence_service
+                if (
+                    presence is not None
+                    and presence_service._tensor is None
+                    and presence["draws"] == presence_service.draws
+                    and tuple(presence["regions"]) == presence_service.regions
+                ):
+                    presence_service._tensor = PresenceTensor.restore({
+                        province_code: _sections(view, data_start, specs)
+                        for province_code, specs in presence["provinces"].items()
+                    })
+                    presence_service._version = _decode_version(presence["version"])
+                    current = (
+                        sum(count for count, _, _ in db_versions.values()),
+                        max((updated_at for _, updated_at, _ in db_versions.values() if updated_at), default=None),
+                        sum(checksum for _, _, checksum in db_versions.values()),
+                    )
+                    if presence_service._version == current:
+                        presence_service._checked_at = now
+                        summary["presence"] = "fresh"
+                    else:
+                        summary["presence"] = "stale"
+
+        logger.info(
+            "💾 Analytics snapshot loaded (%s): %s in %.0fms",
+            index["created_at"], summary, (time.perf_counter() - started) * 1000
+        )
+        return summary
+
+    except Exception as e:
+        logger.warning("⚠️ Analytics snapshot ignored (%s): %s", path, e)
+        return None
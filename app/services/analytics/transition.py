@@ -0,0 +1,104 @@
+"""Transition matrix - Bạc nhớ: kỳ này về X thì kỳ sau (cùng tỉnh) hay về gì
+
+Mỗi tỉnh 1 ma trận chuyển 100×100 theo thứ tự kỳ quay + 100 ô tổng:
+- counts[i*100 + j] = số lần i về ở 1 kỳ và j về ở kỳ kế tiếp
+- counts[10000 + i] = số lần i về ở 1 kỳ có kỳ kế tiếp
+
+→ P(j kỳ sau | i kỳ này) = counts[i*100 + j] / counts[10000 + i].
+
+Kỳ thứ k đóng góp previous ⊗ present (tích ngoài của kỳ k-1 và kỳ k), nên
+cửa sổ K kỳ = K lần chuyển gần nhất. Cập nhật tăng dần / cửa sổ / đồng bộ
+với database: xem draw_matrix.py.
+"""
+
+import logging
+from array import array
+from typing import Dict, Iterable, Optional
+
+from app.services.analytics.draw_matrix import DrawMatrix, DrawMatrixService, outer_add
+
+logger = logging.getLogger(__name__)
+
+_SOURCE = 100 * 100
+
+
+class TransitionMatrix(DrawMatrix):
+    """Ma trận chuyển giữa 2 kỳ liên tiếp của 1 tỉnh"""
+
+    CELLS = 100 * 100 + 100
+
+    def _contribute(self, counts: array, index: int, delta: int) -> None:
+        if index == 0:
+            return
+        previous = self.draws[index - 1][1]
+        outer_add(counts, previous, self.draws[index][1], delta)
+        for i in previous:
+            counts[_SOURCE + i] += delta
+
+    def next_after(self, numbers: Iterable, draws: Optional[int] = None, limit: int = 10) -> Dict:
+        """
+        Số hay về ở kỳ kế tiếp sau khi các số `numbers` về
+
+        Cộng các hàng của `numbers` (1 số hoặc cả bộ số của 1 kỳ).
+
+        Returns:
+            {"occurrences": số lần các số nguồn về (có kỳ sau),
+             "next": [{"number", "count", "rate"}] sắp giảm dần}
+        """
+        counts = self.window(draws)
+        sources = sorted({int(number) for number in numbers})
+
+        totals = [0] * 100
+        for i in sources:
+            row = counts[i * 100:(i + 1) * 100]
+            totals = [total + value for total, value in zip(totals, row)]
+        occurrences = sum(counts[_SOURCE + i] for i in sources)
+
+        ranked = [
+            {"number": f"{j:02d}", "count": count, "rate": count / occurrences}
+            for j, count in enumerate(totals) if count
+        ]
+        ranked.sort(key=lambda item: item["count"], reverse=True)
+        return {"occurrences": occurrences, "next": ranked[:limit]}
+
+
+class TransitionService(DrawMatrixService):
+    """TransitionMatrix của từng tỉnh, đồng bộ với database"""
+
+    matrix_class = TransitionMatrix
+
+    async def get_next_after(
+        self,
+        province_code: str,
+        number: str,
+        draws: Optional[int] = None,
+        limit: int = 10
+    ) -> Dict:
+        """Bạc nhớ theo 1 số: kỳ sau hay về gì khi `number` về"""
+        try:
+            return (await self.get_matrix(province_code)).next_after([number], draws, limit)
+        except Exception as e:
+            logger.error(f"❌ Error getting transitions of {number} for {province_code}: {e}")
+            return {"occurrences": 0, "next": []}
+
+    async def get_next_after_latest(self, province_code: str, draws: Optional[int] = None, limit: int = 10) -> Dict:
+        """
+        Bạc nhớ theo kỳ mới nhất của tỉnh
+
+        Returns:
+            {"date": ngày kỳ mới nhất, "numbers": [các số đã về], "occurrences", "next"}
+        """
+        try:
+            matrix = await self.get_matrix(province_code)
+            if not matrix.draws:
+                return {}
+
+            draw_date, present = matrix.draws[-1]
+            result = matrix.next_after(present, draws, limit)
+            result["date"] = draw_date
+            result["numbers"] = [f"{number:02d}" for number in present]
+            return result
+
+        except Exception as e:
+            logger.error(f"❌ Error getting transitions after latest draw for {province_code}: {e}")
+            return {}
@@ -4,9 +4,12 @@ import httpx
 from typing import Dict, List, Optional
 import logging
 
+from app.services.tracing import trace_methods
+
 logger = logging.getLogger(__name__)
 
 
+@trace_methods("mu88")
 class MU88APIClient:
     """Client for MU88 Lottery API"""
 
@@ -114,7 +117,7 @@ class MU88APIClient:
 
             params = {"limitNum": limit, "gameCode": game_code}
 
-            logger.info(f"📡 Fetching {province_code} ({game_code}) - limit {limit}")
+            logger.info("📡 Fetching %s (%s) - limit %s", province_code, game_code, limit)
 
             async with httpx.AsyncClient(timeout=self.timeout) as client:
                 response = await client.get(self.BASE_URL, params=params)
@@ -124,15 +127,15 @@ class MU88APIClient:
 
                 # Check if API request was successful
                 if not data.get("success"):
-                    logger.error(f"❌ API returned error: {data.get('msg')}")
+                    logger.error("❌ API returned error: %s", data.get('msg'))
                     return None
 
-                logger.info(f"✅ Fetched {province_code} successfully")
+                logger.info("✅ Fetched %s successfully", province_code)
                 return data
 
         except httpx.HTTPError as e:
-            logger.error(f"❌ HTTP Error fetching {province_code}: {e}")
+            logger.error("❌ HTTP Error fetching %s: %s", province_code, e)
             return None
         except Exception as e:
-            logger.error(f"❌ Error fetching {province_code}: {e}")
+            logger.error("❌ Error fetching %s: %s", province_code, e)
             return None
@@ -4,9 +4,12 @@ import json
 import logging
 from typing import Any, Optional
 
+from app.services.tracing import trace_methods
+
 logger = logging.getLogger(__name__)
 
 
+@trace_methods("cache")
 class CacheService:
     """Redis cache service with graceful fallback"""
     
@@ -33,7 +36,7 @@ class CacheService:
         except ImportError:
             logger.warning("⚠️ Redis package not installed, cache disabled")
         except Exception as e:
-            logger.warning(f"⚠️ Redis not available, cache disabled: {e}")
+            logger.warning("⚠️ Redis not available, cache disabled: %s", e)
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -54,7 +57,7 @@ class CacheService:
                 return json.loads(cached)
             return None
         except Exception as e:
-            logger.warning(f"Redis get error for key '{key}': {e}")
+            logger.warning("Redis get error for key '%s': %s", key, e)
             return None
     
     def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
@@ -80,7 +83,7 @@ class CacheService:
             )
             return True
         except Exception as e:
-            logger.warning(f"Redis set error for key '{key}': {e}")
+            logger.warning("Redis set error for key '%s': %s", key, e)
             return False
     
     def delete(self, key: str) -> bool:
@@ -100,7 +103,7 @@ class CacheService:
             self.redis_client.delete(key)
             return True
         except Exception as e:
-            logger.warning(f"Redis delete error for key '{key}': {e}")
+            logger.warning("Redis delete error for key '%s': %s", key, e)
             return False
     
     def clear_pattern(self, pattern: str) -> int:
@@ -122,7 +125,7 @@ class CacheService:
                 return self.redis_client.delete(*keys)
             return 0
         except Exception as e:
-            logger.warning(f"Redis clear_pattern error for pattern '{pattern}': {e}")
+            logger.warning("Redis clear_pattern error for pattern '%s': %s", pattern, e)
             return 0
     
     def get_stats(self) -> dict:
@@ -145,5 +148,5 @@ class CacheService:
                 "misses": info.get("keyspace_misses", 0),
             }
         except Exception as e:
-            logger.warning(f"Redis get_stats error: {e}")
+            logger.warning("Redis get_stats error: %s", e)
             return {"available": False, "error": str(e)}
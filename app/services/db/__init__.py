@@ -2,5 +2,6 @@
 
 from .lottery_db_service import LotteryDBService
 from .statistics_db_service import StatisticsDBService
+from .region_rollup_service import RegionRollupService
 
-__all__ = ["LotteryDBService", "StatisticsDBService"]
+__all__ = ["LotteryDBService", "StatisticsDBService", "RegionRollupService"]
@@ -0,0 +1,158 @@
+"""Batch loader - Gom các lần đọc đồng thời thành 1 query (kiểu DataLoader)
+
+Nhiều user mở nhiều tỉnh cùng lúc → mỗi handler gọi get_latest_result(tỉnh)
+riêng, mỗi lần 1 câu SELECT ... LIMIT 1. BatchLoader gom các key được hỏi
+trong DB_BATCH_WINDOW_MS rồi giải quyết bằng 1 query (IN (...) + row_number()
+theo tỉnh, xem hot_queries.py):
+
+    loader = BatchLoader("latest_result", load_latest_results)
+    result = await loader.load("TPHCM")     # các lời gọi cùng lúc chung 1 query
+
+- Key trùng trong 1 batch chỉ hỏi 1 lần, các caller nhận cùng giá trị
+- Batch chạy trong context rỗng: không tính vào trace / unit of work của
+  caller đầu tiên
+- Caller bị hủy không làm hủy batch của các caller khác
+- Lỗi của batch được trả cho mọi caller trong batch (service tự bắt như cũ)
+
+Số round trip tỉ lệ với số batch (tick), không với số user: xem stats().
+"""
+
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+from app.config import DB_BATCH_MAX_KEYS, DB_BATCH_WINDOW_MS
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Nhãn histogram kích thước batch: (cận trên, nhãn)
+BATCH_BUCKETS = ((1, "1"), (4, "2-4"), (16, "5-16"), (64, "17-64"), (float("inf"), "65+"))
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Gom key theo cửa sổ thời gian, gọi `batch_fn(keys)` 1 lần mỗi batch
+
+    Args:
+        name: Tên loader (metrics)
+        batch_fn: async [keys] → {key: value}; key thiếu → `default`
+        window: Thời gian gom (giây); 0 = chỉ gom trong cùng 1 vòng event loop
+        max_keys: Đủ số key này → chạy batch ngay
+        default: Giá trị cho key không có trong kết quả
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = DB_BATCH_WINDOW_MS / 1000,
+        max_keys: int = DB_BATCH_MAX_KEYS,
+        default: Optional[V] = None
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_keys = max_keys
+        self.default = default
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.keys = 0
+        self.max_batch = 0
+        self.histogram: Counter = Counter()
+
+    async def load(self, key: K) -> V:
+        """Giá trị của `key` (chờ batch chứa nó)"""
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Loop mới (restart / test): batch dở của loop cũ không bao giờ chạy
+            self._loop, self._pending, self._timer = loop, {}, None
+
+        future = self._pending.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_keys:
+                self._dispatch()
+            elif self._timer is None:
+                # Context rỗng: batch không thuộc update / trace của caller nào
+                self._timer = loop.call_later(self.window, self._dispatch, context=contextvars.Context())
+
+        # shield: caller bị hủy không hủy future chung của cả batch
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> List[V]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        task = self._loop.create_task(self._run(batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[K, asyncio.Future]) -> None:
+        self._record(len(batch))
+        try:
+            results = await self.batch_fn(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error("❌ Batch %s (%s keys) failed: %s", self.name, len(batch), e)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key, self.default))
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.keys += size
+        self.max_batch = max(self.max_batch, size)
+        self.histogram[next(label for limit, label in BATCH_BUCKETS if size <= limit)] += 1
+
+    def stats(self) -> Dict:
+        """{"requests", "batches", "keys", "avg_batch", "max_batch", "histogram": [(nhãn, số batch)]}"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "keys": self.keys,
+            "avg_batch": self.keys / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "histogram": [(label, self.histogram[label]) for _, label in BATCH_BUCKETS],
+        }
+
+
+_loaders: Dict[str, BatchLoader] = {}
+
+
+def register_loader(loader: BatchLoader) -> BatchLoader:
+    """Đăng ký loader dùng chung của process (metrics: loader_stats)"""
+    _loaders[loader.name] = loader
+    return loader
+
+
+def loader_stats() -> Dict[str, Dict]:
+    """Metrics của mọi loader đã đăng ký"""
+    return {name: loader.stats() for name, loader in _loaders.items()}
@@ -0,0 +1,268 @@
+"""Hot queries - Các câu SQL chạy nhiều nhất của bot
+
+Services dựng statement qua các hàm ở đây, và mỗi hàm được đăng ký vào
+HOT_QUERIES kèm index bắt buộc phải dùng + row estimate tối đa. Test
+tests/test_query_plans.py chạy EXPLAIN cho từng statement (SQLite, và
+Postgres nếu có TEST_POSTGRES_URL) → đổi model/index làm mất index thì
+test fail thay vì âm thầm thành full scan.
+"""
+
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import Select, select, and_, bindparam, desc, func
+from sqlalchemy.orm import aliased
+
+from app.models.lottery_result import LotteryResult, Lo2SoHistory, UserSubscription
+from app.models.types import PrizeTier
+
+
+class HotQuery(NamedTuple):
+    """1 statement nóng + kỳ vọng về plan"""
+
+    name: str
+    build: Callable[..., Select]
+    # Plan phải dùng ít nhất 1 trong các index này
+    indexes: Tuple[str, ...]
+    # Row estimate tối đa của node gốc (Postgres) trên dataset synthetic 365 ngày
+    max_rows: int
+    # Tham số mẫu theo ngày cuối của dataset
+    example: Callable[[date], Dict]
+
+
+HOT_QUERIES: Dict[str, HotQuery] = {}
+
+
+def hot_query(name: str, indexes: Tuple[str, ...], max_rows: int, example: Callable[[date], Dict]):
+    """Đăng ký statement builder vào HOT_QUERIES"""
+    def decorator(build: Callable[..., Select]) -> Callable[..., Select]:
+        HOT_QUERIES[name] = HotQuery(name, build, tuple(indexes), max_rows, example)
+        return build
+    return decorator
+
+
+@hot_query(
+    "lo2so_frequency",
+    indexes=("idx_lo2so_province_date_number",),
+    max_rows=100,
+    example=lambda end: {"province_code": "MB", "start_date": end - timedelta(days=30), "end_date": end},
+)
+def lo2so_frequency_query(province_code: str, start_date: date, end_date: date) -> Select:
+    """Tần suất lô 2 số trong khoảng ngày (StatisticsDBService.get_lo2so_frequency)"""
+    return select(
+        Lo2SoHistory.number,
+        func.count().label("count")
+    ).where(
+        and_(
+            Lo2SoHistory.province_code == province_code,
+            Lo2SoHistory.draw_date >= start_date,
+            Lo2SoHistory.draw_date <= end_date
+        )
+    ).group_by(Lo2SoHistory.number)
+
+
+@hot_query(
+    "lo_gan_window",
+    indexes=("idx_lo2so_province_date_number",),
+    max_rows=10000,
+    example=lambda end: {"province_code": "MB", "start_date": end - timedelta(days=200), "end_date": end},
+)
+def lo_gan_window_query(province_code: str, start_date: date, end_date: date) -> Select:
+    """Mọi lần xuất hiện trong cửa sổ phân tích lô gan (StatisticsDBService.get_lo_gan)"""
+    return select(
+        Lo2SoHistory.number,
+        Lo2SoHistory.draw_date
+    ).where(
+        and_(
+            Lo2SoHistory.province_code == province_code,
+            Lo2SoHistory.draw_date >= start_date,
+            Lo2SoHistory.draw_date <= end_date
+        )
+    ).order_by(Lo2SoHistory.draw_date)
+
+
+@hot_query(
+    "presence_window",
+    indexes=("idx_lo2so_province_date_number",),
+    max_rows=100000,
+    example=lambda end: {
+        "province_codes": ["TPHCM", "DOTH", "CAMA", "DANA", "KHHO"],
+        "start_date": end - timedelta(days=365),
+        "end_date": end,
+    },
+)
+def presence_window_query(province_codes: List[str], start_date: date, end_date: date) -> Select:
+    """Mọi lần xuất hiện của nhiều tỉnh trong 1 cửa sổ (PresenceService - gan toàn quốc)"""
+    return select(
+        Lo2SoHistory.province_code,
+        Lo2SoHistory.draw_date,
+        Lo2SoHistory.number
+    ).where(
+        and_(
+            Lo2SoHistory.province_code.in_(province_codes),
+            Lo2SoHistory.draw_date >= start_date,
+            Lo2SoHistory.draw_date <= end_date
+        )
+    )
+
+
+@hot_query(
+    "de_series",
+    indexes=("idx_lo2so_de",),
+    max_rows=400,
+    example=lambda end: {"province_code": "MB", "start_date": end - timedelta(days=365), "end_date": end},
+)
+def de_series_query(province_code: str, start_date: date, end_date: date) -> Select:
+    """Chuỗi đề (2 số cuối giải ĐB) của 1 tỉnh theo ngày (DeService)"""
+    # literal_execute: "prize_tier = 0" nằm thẳng trong SQL để planner chọn
+    # được partial index idx_lo2so_de (bind param thì không khớp điều kiện index)
+    return select(
+        Lo2SoHistory.number,
+        Lo2SoHistory.draw_date
+    ).where(
+        and_(
+            Lo2SoHistory.province_code == province_code,
+            Lo2SoHistory.prize_type == bindparam("de_tier", "DB", type_=PrizeTier(), literal_execute=True),
+            Lo2SoHistory.draw_date >= start_date,
+            Lo2SoHistory.draw_date <= end_date
+        )
+    ).order_by(Lo2SoHistory.draw_date)
+
+
+@hot_query(
+    "number_history",
+    indexes=("idx_lo2so_province_number_date",),
+    max_rows=20,
+    example=lambda end: {"province_code": "MB", "number": "45", "limit": 20},
+)
+def number_history_query(province_code: str, number: str, limit: int = 20) -> Select:
+    """Các lần xuất hiện gần nhất của 1 số (StatisticsDBService.get_number_history)"""
+    return select(
+        Lo2SoHistory.draw_date,
+        Lo2SoHistory.prize_type
+    ).where(
+        and_(
+            Lo2SoHistory.province_code == province_code,
+            Lo2SoHistory.number == number
+        )
+    ).order_by(desc(Lo2SoHistory.draw_date)).limit(limit)
+
+
+@hot_query(
+    "latest_result",
+    indexes=("idx_province_date",),
+    max_rows=1,
+    example=lambda end: {"province_code": "TPHCM"},
+)
+def latest_result_query(province_code: str) -> Select:
+    """Kết quả mới nhất của 1 tỉnh (LotteryDBService.get_latest_result)"""
+    return select(LotteryResult).where(
+        LotteryResult.province_code == province_code
+    ).order_by(desc(LotteryResult.draw_date)).limit(1)
+
+
+@hot_query(
+    "latest_results",
+    indexes=("idx_province_date",),
+    max_rows=100,
+    example=lambda end: {
+        "province_codes": ["TPHCM", "DOTH", "CAMA", "MB", "DANA"],
+        "since": end - timedelta(days=14),
+    },
+)
+def latest_results_query(province_codes: List[str], since: date) -> Select:
+    """Kết quả mới nhất của nhiều tỉnh trong 1 câu (BatchLoader latest_result)
+
+    row_number() theo tỉnh trên các kỳ từ `since` (tỉnh không có kỳ nào từ
+    `since` thì không có dòng, caller tự hỏi lại bằng latest_result_query).
+    """
+    ranked = select(
+        LotteryResult,
+        func.row_number().over(
+            partition_by=LotteryResult.province_code,
+            order_by=desc(LotteryResult.draw_date)
+        ).label("rank")
+    ).where(
+        and_(
+            LotteryResult.province_code.in_(province_codes),
+            LotteryResult.draw_date >= since
+        )
+    ).subquery()
+    return select(aliased(LotteryResult, ranked)).where(ranked.c.rank == 1)
+
+
+@hot_query(
+    "province_history",
+    indexes=("idx_province_date",),
+    max_rows=100,
+    example=lambda end: {"province_code": "TPHCM", "limit": 30},
+)
+def province_history_query(province_code: str, limit: int) -> Select:
+    """`limit` kết quả gần nhất của 1 tỉnh (BatchLoader history, batch 1 key)"""
+    return select(LotteryResult).where(
+        LotteryResult.province_code == province_code
+    ).order_by(desc(LotteryResult.draw_date)).limit(limit)
+
+
+@hot_query(
+    "history_by_provinces",
+    indexes=("idx_province_date", "ix_lottery_results_province_code"),
+    max_rows=2000,
+    example=lambda end: {
+        "province_codes": ["TPHCM", "DOTH", "CAMA", "MB", "DANA"],
+        "limit": 30,
+        "since": end - timedelta(days=250),
+    },
+)
+def history_by_provinces_query(province_codes: List[str], limit: int, since: date) -> Select:
+    """`limit` kết quả gần nhất của mỗi tỉnh trong 1 câu (BatchLoader history)
+
+    row_number() theo tỉnh chỉ trên các kỳ từ `since` (tỉnh có ít hơn `limit`
+    kỳ từ `since` thì caller hỏi lại với date.min, như latest_results_query).
+    """
+    ranked = select(
+        LotteryResult,
+        func.row_number().over(
+            partition_by=LotteryResult.province_code,
+            order_by=desc(LotteryResult.draw_date)
+        ).label("rank")
+    ).where(
+        and_(
+            LotteryResult.province_code.in_(province_codes),
+            LotteryResult.draw_date >= since
+        )
+    ).subquery()
+    result = aliased(LotteryResult, ranked)
+    return select(result).where(ranked.c.rank <= limit).order_by(result.province_code, desc(result.draw_date))
+
+
+@hot_query(
+    "subscriptions_by_users",
+    indexes=("ix_user_subscriptions_user_id",),
+    max_rows=500,
+    example=lambda end: {"user_ids": [1000001, 1000002, 1000003]},
+)
+def subscriptions_by_users_query(user_ids: List[int]) -> Select:
+    """Subscriptions đang bật của nhiều user (BatchLoader subscriptions)"""
+    return select(UserSubscription).where(
+        and_(
+            UserSubscription.user_id.in_(user_ids),
+            UserSubscription.is_active == True
+        )
+    ).order_by(UserSubscription.user_id, UserSubscription.province_code)
+
+
+@hot_query(
+    "subscribers_by_province",
+    indexes=("ix_user_subscriptions_province_code",),
+    max_rows=2000,
+    example=lambda end: {"province_code": "TPHCM"},
+)
+def subscribers_by_province_query(province_code: str) -> Select:
+    """Users đang đăng ký 1 tỉnh (SubscriptionService.get_subscribers_by_province)"""
+    return select(UserSubscription).where(
+        and_(
+            UserSubscription.province_code == province_code,
+            UserSubscription.is_active == True
+        )
+    )
@@ -1,8 +1,9 @@
 """Database service for storing and retrieving lottery results"""
 
 import logging
-from datetime import date, datetime
-from typing import List, Dict, Optional
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 
 from sqlalchemy import select, and_, desc, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,11 +11,113 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.models import LotteryResult, Lo2SoHistory, Lo3SoHistory
-from app.database import DatabaseSession
+from app.database import DatabaseSession, run_write
+from app.database.routing import recently_wrote
+from app.services.db.batch_loader import BatchLoader, register_loader
+from app.services.db.hot_queries import (
+    history_by_provinces_query,
+    latest_result_query,
+    latest_results_query,
+    province_history_query,
+)
+from app.services.db.region_rollup_service import refresh_region_rollup
+from app.services.tracing import trace_methods
+from app.utils.lottery_helpers import draw_window_start
+from app.utils.timezone import get_vietnam_today
 
 logger = logging.getLogger(__name__)
 
-
+PRIZE_KEYS = ["DB", "G1", "G2", "G3", "G4", "G5", "G6", "G7", "G8"]
+
+# Kết quả mới nhất tìm trong N ngày gần đây trước (MN/MT quay hằng tuần)
+LATEST_LOOKBACK_DAYS = 14
+
+
+def extract_lo_numbers(prizes: Dict, width: int) -> List[Tuple[str, str]]:
+    """
+    Lấy `width` chữ số cuối của mọi giải
+
+    Args:
+        prizes: Dict {prize_key: [numbers]} (hoặc chuỗi đơn)
+        width: 2 (lô 2 số) hoặc 3 (lô 3 số)
+
+    Returns:
+        List (number, prize_key) theo thứ tự giải
+    """
+    numbers = []
+    for prize_key in PRIZE_KEYS:
+        prize_values = prizes.get(prize_key) if prizes else None
+        if not prize_values:
+            continue
+        if isinstance(prize_values, str):
+            prize_values = [prize_values]
+
+        for num_str in prize_values:
+            if len(num_str) >= width:
+                numbers.append((num_str[-width:], prize_key))
+
+    return numbers
+
+
+async def load_latest_results(province_codes: List[str]) -> Dict[str, LotteryResult]:
+    """Batch: kết quả mới nhất của các tỉnh (1 tỉnh → LIMIT 1 như trước)"""
+    async with DatabaseSession(read_only=True) as session:
+        if len(province_codes) == 1:
+            result = (await session.execute(latest_result_query(province_codes[0]))).scalar_one_or_none()
+            return {province_codes[0]: result} if result else {}
+
+        since = get_vietnam_today() - timedelta(days=LATEST_LOOKBACK_DAYS)
+        results = {
+            row.province_code: row
+            for row in (await session.execute(latest_results_query(province_codes, since))).scalars()
+        }
+        missing = [code for code in province_codes if code not in results]
+        if missing:
+            # Tỉnh lâu chưa có kỳ mới (hoặc chưa có dữ liệu): tìm trên toàn bộ lịch sử
+            for row in (await session.execute(latest_results_query(missing, date.min))).scalars():
+                results[row.province_code] = row
+        return results
+
+
+async def load_histories(keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], List[LotteryResult]]:
+    """
+    Batch: (province_code, limit) → `limit` kết quả gần nhất (1 query cho mỗi limit khác nhau)
+
+    1 tỉnh → ORDER BY draw_date DESC LIMIT như trước; nhiều tỉnh → row_number()
+    giới hạn theo draw_window_start, tỉnh thiếu kỳ mới tìm lại trên toàn bộ lịch sử.
+    """
+    provinces_by_limit = defaultdict(list)
+    for province_code, limit in keys:
+        provinces_by_limit[limit].append(province_code)
+
+    histories = {key: [] for key in keys}
+    today = get_vietnam_today()
+    async with DatabaseSession(read_only=True) as session:
+        for limit, province_codes in provinces_by_limit.items():
+            if len(province_codes) == 1:
+                key = (province_codes[0], limit)
+                histories[key] = list((await session.execute(province_history_query(*key))).scalars())
+                continue
+
+            since = min(draw_window_start(code, limit, today) for code in province_codes)
+            for row in (await session.execute(history_by_provinces_query(province_codes, limit, since))).scalars():
+                histories[(row.province_code, limit)].append(row)
+
+            short = [code for code in province_codes if len(histories[(code, limit)]) < limit]
+            if short:
+                # Tỉnh lâu chưa có kỳ mới (hoặc ít dữ liệu): tìm trên toàn bộ lịch sử
+                for code in short:
+                    histories[(code, limit)] = []
+                for row in (await session.execute(history_by_provinces_query(short, limit, date.min))).scalars():
+                    histories[(row.province_code, limit)].append(row)
+    return histories
+
+
+_latest_loader = register_loader(BatchLoader("latest_result", load_latest_results))
+_history_loader = register_loader(BatchLoader("history", load_histories, default=[]))
+
+
+@trace_methods("db.lottery")
 class LotteryDBService:
     """Service for managing lottery results in database"""
 
@@ -32,66 +135,71 @@ class LotteryDBService:
             LotteryResult object or None if error
         """
         try:
-            async with DatabaseSession() as session:
-                # Parse date
-                draw_date = result_data.get("date")
-                if isinstance(draw_date, str):
-                    # Thử format DD/MM/YYYY trước (từ API)
-                    try:
-                        draw_date = datetime.strptime(draw_date, "%d/%m/%Y").date()
-                    except ValueError:
-                        # Nếu không được thì dùng format YYYY-MM-DD
-                        draw_date = datetime.strptime(draw_date, "%Y-%m-%d").date()
-                elif isinstance(draw_date, datetime):
-                    draw_date = draw_date.date()
-
-                # Upsert (insert or update)
-                stmt = insert(LotteryResult).values(
-                    province_code=result_data.get("province_code"),
-                    province_name=result_data.get("province", result_data.get("province_name")),
-                    region=result_data.get("region"),
-                    draw_date=draw_date,
-                    prizes=result_data.get("prizes", result_data),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                )
-
-                # On conflict, update the prizes and updated_at
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=["province_code", "draw_date"],
-                    set_={
-                        "prizes": stmt.excluded.prizes,
-                        "updated_at": datetime.utcnow(),
-                    }
-                )
-
-                result = await session.execute(stmt)
-                await session.commit()
-
-                # Get the saved record
-                query = select(LotteryResult).where(
-                    and_(
-                        LotteryResult.province_code == result_data.get("province_code"),
-                        LotteryResult.draw_date == draw_date
-                    )
-                )
-                result = await session.execute(query)
-                lottery_result = result.scalar_one_or_none()
+            return await run_write(lambda session: self._save_result(session, result_data))
 
-                if lottery_result:
-                    logger.info(f"✅ Saved lottery result: {lottery_result.province_code} - {lottery_result.draw_date}")
+        except Exception as e:
+            logger.error("❌ Error saving lottery result: %s", e)
+            return None
 
-                    # Extract and save lo 2 so numbers
-                    await self._extract_and_save_lo2so(session, lottery_result)
-                    
-                    # Extract and save lo 3 so numbers
-                    await self._extract_and_save_lo3so(session, lottery_result)
+    async def _save_result(self, session: AsyncSession, result_data: Dict) -> Optional[LotteryResult]:
+        """Upsert kết quả + lo2so/lo3so trong 1 transaction (write op)"""
+        # Parse date
+        draw_date = result_data.get("date")
+        if isinstance(draw_date, str):
+            # Thử format DD/MM/YYYY trước (từ API)
+            try:
+                draw_date = datetime.strptime(draw_date, "%d/%m/%Y").date()
+            except ValueError:
+                # Nếu không được thì dùng format YYYY-MM-DD
+                draw_date = datetime.strptime(draw_date, "%Y-%m-%d").date()
+        elif isinstance(draw_date, datetime):
+            draw_date = draw_date.date()
+
+        # Upsert (insert or update)
+        stmt = insert(LotteryResult).values(
+            province_code=result_data.get("province_code"),
+            province_name=result_data.get("province", result_data.get("province_name")),
+            region=result_data.get("region"),
+            draw_date=draw_date,
+            prizes=result_data.get("prizes", result_data),
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+
+        # On conflict, update the prizes and updated_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["province_code", "draw_date"],
+            set_={
+                "prizes": stmt.excluded.prizes,
+                "updated_at": datetime.utcnow(),
+            }
+        )
+
+        await session.execute(stmt)
+
+        # Get the saved record
+        query = select(LotteryResult).where(
+            and_(
+                LotteryResult.province_code == result_data.get("province_code"),
+                LotteryResult.draw_date == draw_date
+            )
+        )
+        result = await session.execute(query)
+        lottery_result = result.scalar_one_or_none()
+
+        if lottery_result:
+            logger.info("✅ Saved lottery result: %s - %s", lottery_result.province_code, lottery_result.draw_date)
+
+            # Extract and save lo 2 so numbers
+            await self._extract_and_save_lo2so(session, lottery_result)
+            
+            # Extract and save lo 3 so numbers
+            await self._extract_and_save_lo3so(session, lottery_result)
 
-                return lottery_result
+            # Cập nhật rollup của cả miền trong ngày (thống kê theo miền)
+            await refresh_region_rollup(session, lottery_result.region, lottery_result.draw_date)
 
-        except Exception as e:
-            logger.error(f"❌ Error saving lottery result: {e}")
-            return None
+        return lottery_result
 
     async def _extract_and_save_lo2so(self, session: AsyncSession, lottery_result: LotteryResult) -> None:
         """
@@ -102,44 +210,35 @@ class LotteryDBService:
             lottery_result: LotteryResult object
         """
         try:
-            prizes = lottery_result.prizes
-
-            # Delete existing lo2so records for this result
-            stmt = delete(Lo2SoHistory).where(Lo2SoHistory.lottery_result_id == lottery_result.id)
+            # Delete existing lo2so records for this result (covered by province/date index)
+            stmt = delete(Lo2SoHistory).where(
+                and_(
+                    Lo2SoHistory.province_code == lottery_result.province_code,
+                    Lo2SoHistory.draw_date == lottery_result.draw_date
+                )
+            )
             await session.execute(stmt)
 
-            # Extract all 2-digit numbers
-            prize_keys = ["DB", "G1", "G2", "G3", "G4", "G5", "G6", "G7", "G8"]
-            lo2so_records = []
-
-            for prize_key in prize_keys:
-                if prize_key in prizes and prizes[prize_key]:
-                    prize_values = prizes[prize_key]
-                    if isinstance(prize_values, str):
-                        prize_values = [prize_values]
-                    
-                    for num_str in prize_values:
-                        if len(num_str) >= 2:
-                            lo2 = num_str[-2:]  # Last 2 digits
-                            lo2so_records.append({
-                                "lottery_result_id": lottery_result.id,
-                                "province_code": lottery_result.province_code,
-                                "region": lottery_result.region,
-                                "draw_date": lottery_result.draw_date,
-                                "number": lo2,
-                                "prize_type": prize_key,
-                                "position": "last_2",
-                                "created_at": datetime.utcnow(),
-                            })
+            lo2so_records = [
+                {
+                    "lottery_result_id": lottery_result.id,
+                    "province_code": lottery_result.province_code,
+                    "region": lottery_result.region,
+                    "draw_date": lottery_result.draw_date,
+                    "number": number,
+                    "prize_type": prize_key,
+                }
+                for number, prize_key in extract_lo_numbers(lottery_result.prizes, 2)
+            ]
 
             # Bulk insert
             if lo2so_records:
                 stmt = insert(Lo2SoHistory).values(lo2so_records)
                 await session.execute(stmt)
-                logger.info(f"✅ Saved {len(lo2so_records)} lo2so numbers for {lottery_result.province_code}")
+                logger.info("✅ Saved %s lo2so numbers for %s", len(lo2so_records), lottery_result.province_code)
 
         except Exception as e:
-            logger.error(f"❌ Error extracting lo2so: {e}")
+            logger.error("❌ Error extracting lo2so: %s", e)
 
     async def _extract_and_save_lo3so(self, session: AsyncSession, lottery_result: LotteryResult) -> None:
         """
@@ -150,44 +249,35 @@ class LotteryDBService:
             lottery_result: LotteryResult object
         """
         try:
-            prizes = lottery_result.prizes
-
             # Delete existing lo3so records for this result
-            stmt = delete(Lo3SoHistory).where(Lo3SoHistory.lottery_result_id == lottery_result.id)
+            stmt = delete(Lo3SoHistory).where(
+                and_(
+                    Lo3SoHistory.province_code == lottery_result.province_code,
+                    Lo3SoHistory.draw_date == lottery_result.draw_date
+                )
+            )
             await session.execute(stmt)
 
-            # Extract all 3-digit numbers
-            prize_keys = ["DB", "G1", "G2", "G3", "G4", "G5", "G6", "G7", "G8"]
-            lo3so_records = []
-
-            for prize_key in prize_keys:
-                if prize_key in prizes and prizes[prize_key]:
-                    prize_values = prizes[prize_key]
-                    if isinstance(prize_values, str):
-                        prize_values = [prize_values]
-                    
-                    for idx, num_str in enumerate(prize_values):
-                        if len(num_str) >= 3:
-                            lo3 = num_str[-3:]  # Last 3 digits
-                            lo3so_records.append({
-                                "lottery_result_id": lottery_result.id,
-                                "province_code": lottery_result.province_code,
-                                "region": lottery_result.region,
-                                "draw_date": lottery_result.draw_date,
-                                "number": lo3,
-                                "prize_type": prize_key,
-                                "position": f"{prize_key}_{idx}",
-                                "created_at": datetime.utcnow(),
-                            })
+            lo3so_records = [
+                {
+                    "lottery_result_id": lottery_result.id,
+                    "province_code": lottery_result.province_code,
+                    "region": lottery_result.region,
+                    "draw_date": lottery_result.draw_date,
+                    "number": number,
+                    "prize_type": prize_key,
+                }
+                for number, prize_key in extract_lo_numbers(lottery_result.prizes, 3)
+            ]
 
             # Bulk insert
             if lo3so_records:
                 stmt = insert(Lo3SoHistory).values(lo3so_records)
                 await session.execute(stmt)
-                logger.info(f"✅ Saved {len(lo3so_records)} lo3so numbers for {lottery_result.province_code}")
+                logger.info("✅ Saved %s lo3so numbers for %s", len(lo3so_records), lottery_result.province_code)
 
         except Exception as e:
-            logger.error(f"❌ Error extracting lo3so: {e}")
+            logger.error("❌ Error extracting lo3so: %s", e)
 
     async def get_result(self, province_code: str, draw_date: date) -> Optional[LotteryResult]:
         """
@@ -201,7 +291,7 @@ class LotteryDBService:
             LotteryResult or None
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 query = select(LotteryResult).where(
                     and_(
                         LotteryResult.province_code == province_code,
@@ -212,7 +302,7 @@ class LotteryDBService:
                 return result.scalar_one_or_none()
 
         except Exception as e:
-            logger.error(f"❌ Error getting lottery result: {e}")
+            logger.error("❌ Error getting lottery result: %s", e)
             return None
 
     async def get_latest_result(self, province_code: str) -> Optional[LotteryResult]:
@@ -226,16 +316,13 @@ class LotteryDBService:
             LotteryResult or None
         """
         try:
-            async with DatabaseSession() as session:
-                query = select(LotteryResult).where(
-                    LotteryResult.province_code == province_code
-                ).order_by(desc(LotteryResult.draw_date)).limit(1)
-
-                result = await session.execute(query)
-                return result.scalar_one_or_none()
+            if recently_wrote():
+                # Vừa ghi trong context này: đọc ngay (routing đọc primary), không qua batch
+                return (await load_latest_results([province_code])).get(province_code)
+            return await _latest_loader.load(province_code)
 
         except Exception as e:
-            logger.error(f"❌ Error getting latest result: {e}")
+            logger.error("❌ Error getting latest result: %s", e)
             return None
 
     async def get_history(
@@ -258,7 +345,13 @@ class LotteryDBService:
             List of LotteryResult objects
         """
         try:
-            async with DatabaseSession() as session:
+            if start_date is None and end_date is None:
+                key = (province_code, limit)
+                if recently_wrote():
+                    return list((await load_histories([key]))[key])
+                return list(await _history_loader.load(key))
+
+            async with DatabaseSession(read_only=True) as session:
                 query = select(LotteryResult).where(
                     LotteryResult.province_code == province_code
                 )
@@ -274,7 +367,7 @@ class LotteryDBService:
                 return list(result.scalars().all())
 
         except Exception as e:
-            logger.error(f"❌ Error getting history: {e}")
+            logger.error("❌ Error getting history: %s", e)
             return []
 
     async def get_results_count(self, province_code: Optional[str] = None) -> int:
@@ -288,7 +381,7 @@ class LotteryDBService:
             Count of results
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 query = select(func.count(LotteryResult.id))
 
                 if province_code:
@@ -298,7 +391,7 @@ class LotteryDBService:
                 return result.scalar() or 0
 
         except Exception as e:
-            logger.error(f"❌ Error getting results count: {e}")
+            logger.error("❌ Error getting results count: %s", e)
             return 0
 
     async def get_date_range(self, province_code: str) -> Optional[Dict]:
@@ -312,7 +405,7 @@ class LotteryDBService:
             Dict with min_date and max_date or None
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 query = select(
                     func.min(LotteryResult.draw_date).label("min_date"),
                     func.max(LotteryResult.draw_date).label("max_date")
@@ -331,6 +424,6 @@ class LotteryDBService:
                 return None
 
         except Exception as e:
-            logger.error(f"❌ Error getting date range: {e}")
+            logger.error("❌ Error getting date range: %s", e)
             return None
             
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Query plan harness - EXPLAIN các hot queries và kiểm tra index usage
+
+Dùng bởi tests/test_query_plans.py và scripts/benchmarks/bench_query_plans.py.
+Các hàm nhận sync Connection; với AsyncConnection dùng `await conn.run_sync(...)`.
+
+- SQLite: EXPLAIN QUERY PLAN → index dùng (SEARCH ... USING INDEX) và
+  full scans (SCAN <table>). SQLite không có row estimate.
+- Postgres: EXPLAIN (FORMAT JSON) → Index Scan / Index Only Scan / Bitmap
+  Index Scan, Seq Scan và Plan Rows của node gốc. Index trên partition được
+  quy về index của bảng cha.
+"""
+
+import json
+import re
+import statistics
+import time
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import Connection, Select, insert, text
+
+from app.data.synthetic import generate_results, generate_subscriptions
+from app.database.config import analyze_tables
+from app.models.lottery_result import LotteryResult, Lo2SoHistory, Lo3SoHistory, UserSubscription
+from app.services.db.hot_queries import HotQuery
+from app.services.db.lottery_db_service import extract_lo_numbers
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+_SQLITE_COROUTINE = re.compile(r"^CO-ROUTINE (\w+)")
+
+_PG_INDEX_NODES = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+class QueryPlan(NamedTuple):
+    """Kết quả EXPLAIN đã chuẩn hóa"""
+
+    dialect: str
+    lines: List[str]
+    indexes: Set[str]
+    full_scans: Set[str]
+    estimated_rows: Optional[float]
+
+
+def compile_sql(conn: Connection, statement: Select) -> str:
+    """SQL với tham số inline (EXPLAIN không nhận bind params trên mọi driver)"""
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain(conn: Connection, statement: Select) -> QueryPlan:
+    """EXPLAIN statement trên dialect của connection"""
+    sql = compile_sql(conn, statement)
+    if conn.dialect.name == "postgresql":
+        return _explain_postgres(conn, sql)
+    return _explain_sqlite(conn, sql)
+
+
+def _explain_sqlite(conn: Connection, sql: str) -> QueryPlan:
+    lines = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    indexes, full_scans = set(), set()
+    # Subquery (vd. row_number() theo tỉnh) chạy như co-routine: SCAN nó không phải full scan bảng
+    coroutines = {match.group(1) for match in map(_SQLITE_COROUTINE.match, lines) if match}
+
+    for line in lines:
+        indexes.update(_SQLITE_INDEX.findall(line))
+        scan = _SQLITE_SCAN.match(line)
+        if scan and scan.group(1) not in coroutines:
+            full_scans.add(scan.group(1))
+
+    return QueryPlan("sqlite", lines, indexes, full_scans, None)
+
+
+def _explain_postgres(conn: Connection, sql: str) -> QueryPlan:
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    parents = _partition_index_parents(conn)
+    lines, indexes, full_scans = [], set(), set()
+
+    def walk(node, depth=0):
+        node_type = node["Node Type"]
+        target = node.get("Index Name") or node.get("Relation Name") or ""
+        lines.append(f"{'  ' * depth}{node_type} {target} (rows={node.get('Plan Rows')})".rstrip())
+
+        if node_type in _PG_INDEX_NODES:
+            indexes.add(parents.get(node["Index Name"], node["Index Name"]))
+        elif node_type == "Seq Scan":
+            full_scans.add(node["Relation Name"])
+
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    root = plan[0]["Plan"]
+    walk(root)
+    return QueryPlan("postgresql", lines, indexes, full_scans, root.get("Plan Rows"))
+
+
+def _partition_index_parents(conn: Connection) -> Dict[str, str]:
+    """index của partition → index của bảng cha (kể cả nhiều cấp)"""
+    rows = conn.execute(text("""
+        SELECT child.relname, parent.relname
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        WHERE child.relkind = 'i'
+    """)).all()
+    parents = dict(rows)
+
+    def root(name):
+        while name in parents:
+            name = parents[name]
+        return name
+
+    return {child: root(child) for child in parents}
+
+
+def check_plan(query: HotQuery, plan: QueryPlan) -> List[str]:
+    """Danh sách vi phạm (rỗng = plan đạt yêu cầu)"""
+    problems = []
+
+    if not plan.indexes & set(query.indexes):
+        problems.append(f"{query.name}: không dùng index {', '.join(query.indexes)} (dùng: {sorted(plan.indexes)})")
+    if plan.full_scans:
+        problems.append(f"{query.name}: full scan {sorted(plan.full_scans)}")
+    if plan.estimated_rows is not None and plan.estimated_rows > query.max_rows:
+        problems.append(f"{query.name}: row estimate {plan.estimated_rows:.0f} > {query.max_rows}")
+
+    return problems
+
+
+def time_statement(conn: Connection, statement: Select, repeat: int = 20) -> float:
+    """Median thời gian chạy (ms), sau 1 lần warm up"""
+    conn.execute(statement).all()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(statement).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def load_synthetic_dataset(
+    conn: Connection,
+    days: int = 365,
+    end_date: Optional[date] = None,
+    subscribers: int = 5000,
+    analyze: bool = False
+) -> None:
+    """
+    Nạp dataset synthetic (kết quả + lô 2/3 số + subscriptions) vào schema đã tạo
+
+    Args:
+        conn: Connection (schema đã create_all)
+        days: Số ngày kết quả
+        end_date: Ngày cuối (mặc định hôm nay)
+        subscribers: Số subscriptions
+        analyze: Cập nhật thống kê planner sau khi nạp (như init_db với SQLite
+            production profile / autovacuum trên Postgres)
+    """
+    results, lo2_rows, lo3_rows = [], [], []
+
+    for result_id, result in enumerate(generate_results(days, end_date=end_date), start=1):
+        draw_date = date.fromisoformat(result["date"])
+        results.append({
+            "id": result_id,
+            "province_code": result["province_code"],
+            "province_name": result["province_name"],
+            "region": result["region"],
+            "draw_date": draw_date,
+            "prizes": result["prizes"],
+        })
+        # executemany dùng tên cột (province_id...), giá trị vẫn là chuỗi (app/models/types.py)
+        base = {
+            "lottery_result_id": result_id,
+            "province_id": result["province_code"],
+            "region_id": result["region"],
+            "draw_date": draw_date,
+        }
+        for rows, width in ((lo2_rows, 2), (lo3_rows, 3)):
+            rows.extend(
+                dict(base, number=number, prize_tier=prize_key)
+                for number, prize_key in extract_lo_numbers(result["prizes"], width)
+            )
+
+    conn.execute(insert(LotteryResult), results)
+    conn.execute(insert(Lo2SoHistory), lo2_rows)
+    conn.execute(insert(Lo3SoHistory), lo3_rows)
+    if subscribers:
+        conn.execute(insert(UserSubscription), list(generate_subscriptions(subscribers)))
+
+    if analyze:
+        analyze_tables(conn)
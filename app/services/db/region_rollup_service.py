@@ -0,0 +1,230 @@
+"""Region rollup service - Thống kê lô 2 số theo miền từ region_lo_rollup
+
+Mỗi dòng region_lo_rollup là vector đếm 100 số của cả miền trong 1 ngày.
+- Ghi: refresh_region_rollup() chạy trong transaction của save_result, tính
+  lại dòng (miền, ngày) từ lo_2_so_history → lưu lại kết quả là idempotent.
+- Đọc: tần suất / lô gan / đầu-đuôi theo miền cộng dồn vài trăm vector.
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, and_, delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import PROVINCES
+from app.database import DatabaseSession, run_write
+from app.models.lottery_result import Lo2SoHistory
+from app.models.region_rollup import RegionLoRollup
+from app.utils.lottery_helpers import categorize_gan
+from app.utils.timezone import get_vietnam_today
+
+logger = logging.getLogger(__name__)
+
+REGIONS = ("MB", "MT", "MN")
+
+# Số dòng (miền, ngày) mỗi transaction khi backfill
+BACKFILL_BATCH = 200
+
+
+def region_provinces(region: str) -> List[str]:
+    """Các tỉnh thuộc miền"""
+    return [code for code, province in PROVINCES.items() if province["region"] == region]
+
+
+def encode_counts(counts: Dict[str, int]) -> bytes:
+    """{"05": 3, ...} → 100 bytes"""
+    vector = bytearray(100)
+    for number, count in counts.items():
+        vector[int(number)] = min(count, 255)
+    return bytes(vector)
+
+
+def decode_counts(blob: bytes) -> List[int]:
+    """100 bytes → [count số 00, ..., count số 99]"""
+    return list(blob)
+
+
+async def refresh_region_rollup(session: AsyncSession, region: str, draw_date: date) -> None:
+    """Tính lại dòng rollup (miền, ngày) từ lo_2_so_history (trong transaction hiện tại)"""
+    provinces = region_provinces(region)
+    window = and_(
+        Lo2SoHistory.province_code.in_(provinces),
+        Lo2SoHistory.draw_date == draw_date
+    )
+
+    rows = (await session.execute(
+        select(Lo2SoHistory.number, func.count()).where(window).group_by(Lo2SoHistory.number)
+    )).all()
+    province_count = (await session.execute(
+        select(func.count(func.distinct(Lo2SoHistory.province_code))).where(window)
+    )).scalar()
+
+    await session.execute(
+        delete(RegionLoRollup).where(
+            and_(RegionLoRollup.region == region, RegionLoRollup.draw_date == draw_date)
+        )
+    )
+    if rows:
+        await session.execute(insert(RegionLoRollup).values(
+            region=region,
+            draw_date=draw_date,
+            province_count=province_count,
+            counts=encode_counts(dict(rows)),
+        ))
+
+
+class RegionRollupService:
+    """Truy vấn thống kê theo miền trên region_lo_rollup"""
+
+    async def backfill(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """
+        Dựng lại rollup từ lo_2_so_history (dữ liệu có trước khi có bảng rollup)
+
+        Returns:
+            Số dòng rollup đã ghi
+        """
+        try:
+            async with DatabaseSession(read_only=True) as session:
+                conditions = []
+                if start_date:
+                    conditions.append(Lo2SoHistory.draw_date >= start_date)
+                if end_date:
+                    conditions.append(Lo2SoHistory.draw_date <= end_date)
+
+                days = (await session.execute(
+                    select(Lo2SoHistory.region, Lo2SoHistory.draw_date).where(*conditions).distinct()
+                )).all()
+
+            written = 0
+            for offset in range(0, len(days), BACKFILL_BATCH):
+                batch = days[offset:offset + BACKFILL_BATCH]
+
+                async def _refresh(session: AsyncSession, batch=batch) -> int:
+                    for region, draw_date in batch:
+                        await refresh_region_rollup(session, region, draw_date)
+                    return len(batch)
+
+                written += await run_write(_refresh)
+
+            logger.info(f"✅ Region rollup backfilled: {written} rows")
+            return written
+
+        except Exception as e:
+            logger.error(f"❌ Error backfilling region rollup: {e}")
+            return 0
+
+    async def get_window(
+        self,
+        region: str,
+        days: Optional[int] = None,
+        draws: Optional[int] = None,
+        end_date: Optional[date] = None
+    ) -> List[Tuple[date, List[int]]]:
+        """
+        Các vector đếm của miền (cũ → mới)
+
+        Args:
+            region: MB, MT, MN
+            days: Cửa sổ theo số ngày lịch
+            draws: Cửa sổ theo số ngày quay gần nhất (ưu tiên nếu có)
+            end_date: Ngày cuối (mặc định hôm nay giờ VN)
+        """
+        end_date = end_date or get_vietnam_today()
+        query = select(RegionLoRollup.draw_date, RegionLoRollup.counts).where(
+            and_(RegionLoRollup.region == region, RegionLoRollup.draw_date <= end_date)
+        )
+        if draws is not None:
+            query = query.order_by(RegionLoRollup.draw_date.desc()).limit(draws)
+        else:
+            query = query.where(
+                RegionLoRollup.draw_date >= end_date - timedelta(days=days or 30)
+            ).order_by(RegionLoRollup.draw_date.desc())
+
+        async with DatabaseSession(read_only=True) as session:
+            rows = (await session.execute(query)).all()
+
+        return [(draw_date, decode_counts(counts)) for draw_date, counts in reversed(rows)]
+
+    async def get_region_frequency(self, region: str, days: int = 30) -> Dict[str, int]:
+        """Tần suất lô 2 số của cả miền (cùng format với get_lo2so_frequency)"""
+        try:
+            totals = _sum_vectors(vector for _, vector in await self.get_window(region, days=days))
+            frequency = {f"{number:02d}": count for number, count in enumerate(totals) if count}
+
+            logger.info(f"✅ Got region frequency for {region}: {len(frequency)} unique numbers")
+            return frequency
+
+        except Exception as e:
+            logger.error(f"❌ Error getting region frequency: {e}")
+            return {}
+
+    async def get_region_head_tail(self, region: str, days: int = 30) -> Dict[str, List[int]]:
+        """Số lần về theo đầu (chữ số hàng chục) và đuôi (hàng đơn vị)"""
+        try:
+            totals = _sum_vectors(vector for _, vector in await self.get_window(region, days=days))
+            return {
+                "head": [sum(totals[head * 10:head * 10 + 10]) for head in range(10)],
+                "tail": [sum(totals[tail::10]) for tail in range(10)],
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error getting region head/tail: {e}")
+            return {"head": [0] * 10, "tail": [0] * 10}
+
+    async def get_region_lo_gan(self, region: str, draws: int = 200, limit: int = 15) -> List[Dict]:
+        """
+        Lô gan của cả miền trong `draws` ngày quay gần nhất
+
+        Miền nào cũng quay hằng ngày → tính theo ngày như lô gan MB.
+        Cùng format với StatisticsDBService.get_lo_gan (dùng được format_lo_gan).
+        """
+        try:
+            end_date = get_vietnam_today()
+            window = await self.get_window(region, draws=draws, end_date=end_date)
+            if not window:
+                return []
+
+            lo_gan = []
+            for number in range(100):
+                seen = [index for index, (_, vector) in enumerate(window) if vector[number]]
+                if not seen:
+                    continue
+
+                last_date = window[seen[-1]][0]
+                days_since = max(0, (end_date - last_date).days - 1)
+                periods_since = len(window) - 1 - seen[-1]
+                gaps = [seen[0]] + [b - a - 1 for a, b in zip(seen, seen[1:])]
+                max_cycle = max([days_since] + gaps)
+
+                if days_since >= 10:
+                    lo_gan.append({
+                        "number": f"{number:02d}",
+                        "gan_value": days_since,
+                        "days_since_last": days_since,
+                        "periods_since_last": periods_since,
+                        "last_seen_date": last_date.strftime("%d/%m/%Y"),
+                        "max_cycle": max_cycle,
+                        "is_daily": True,
+                        "category": categorize_gan(days_since, True),
+                        "analysis_draws": len(window),
+                        "analysis_days": (end_date - window[0][0]).days,
+                        "analysis_window": f"{len(window)} kỳ",
+                    })
+
+            lo_gan.sort(key=lambda item: item["gan_value"], reverse=True)
+            logger.info(f"✅ Got {len(lo_gan)} region lo gan numbers for {region}")
+            return lo_gan[:limit]
+
+        except Exception as e:
+            logger.error(f"❌ Error getting region lo gan: {e}")
+            return []
+
+
+def _sum_vectors(vectors: Iterable[List[int]]) -> List[int]:
+    totals = [0] * 100
+    for vector in vectors:
+        for number, count in enumerate(vector):
+            totals[number] += count
+    return totals
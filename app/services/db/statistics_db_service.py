@@ -4,17 +4,155 @@ import logging
 from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional
 
-from sqlalchemy import select, and_, desc, func
+from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import LotteryResult, Lo2SoHistory
 from app.database import DatabaseSession
+from app.services.analytics.executor import AnalyticsBusy
+from app.services.db.hot_queries import (
+    lo2so_frequency_query,
+    lo_gan_window_query,
+    number_history_query,
+)
+from app.services.tracing import trace_methods
 
 from app.utils.timezone import get_vietnam_today
 
 logger = logging.getLogger(__name__)
 
 
+def compute_lo_gan(
+    province_code: str,
+    appearances: List[tuple],
+    start_date: date,
+    end_date: date,
+    actual_draws: Optional[int],
+    analysis_days: int
+) -> List[Dict]:
+    """
+    Tính lô gan từ các lần xuất hiện trong cửa sổ (thuần, không I/O)
+
+    Chạy trong AnalyticsExecutor: với MN/MT gọi count_draw_periods cho từng
+    khoảng giữa 2 lần về của từng số (hàng nghìn lần / 200 kỳ).
+
+    Args:
+        province_code: Province code
+        appearances: [(number, draw_date)] - lo_gan_window_query
+        start_date: Đầu cửa sổ phân tích
+        end_date: Cuối cửa sổ (hôm nay)
+        actual_draws: Số kỳ phân tích (None = dùng analysis_days)
+        analysis_days: Số ngày của cửa sổ
+
+    Returns:
+        Danh sách lô gan sắp giảm dần theo gan_value (kèm metadata cửa sổ)
+    """
+    from app.utils.lottery_helpers import (
+        count_draw_periods,
+        is_daily_draw_province,
+        categorize_gan
+    )
+
+    is_daily = is_daily_draw_province(province_code)
+
+    # Get all 2-digit numbers (00-99)
+    all_numbers = [f"{i:02d}" for i in range(100)]
+
+    # Group by number
+    number_dates = {}
+    for num, draw_date in appearances:
+        if num not in number_dates:
+            number_dates[num] = []
+        number_dates[num].append(draw_date)
+
+    # Calculate gan for each number
+    lo_gan = []
+
+    for num in all_numbers:
+        if num in number_dates:
+            dates = sorted(number_dates[num])
+            last_date = dates[-1]
+
+            # Calculate BOTH days and periods since last appearance
+            days_since = (end_date - last_date).days - 1
+            if days_since < 0:
+                days_since = 0
+
+            periods_since = count_draw_periods(province_code, last_date, end_date)
+
+            # Determine which metric to use
+            gan_value = days_since if is_daily else periods_since
+
+            # Calculate max cycle
+            if is_daily:
+                # For MB, use days
+                # Start with current gan value
+                max_cycle = days_since
+
+                # 1. Gap from window start to first appearance
+                if dates:
+                    gap = (dates[0] - start_date).days
+                    gan_gap = max(0, gap - 1)
+                    if gan_gap > max_cycle:
+                        max_cycle = gan_gap
+
+                # 2. Gaps between consecutive appearances
+                for i in range(1, len(dates)):
+                    gap = (dates[i] - dates[i-1]).days
+                    gan_gap = max(0, gap - 1)
+                    if gan_gap > max_cycle:
+                        max_cycle = gan_gap
+            else:
+                # For MN/MT, use periods
+                # Start with current gan value
+                max_cycle = periods_since
+
+                # 1. Gap from window start to first appearance
+                if dates:
+                    gap = count_draw_periods(province_code, start_date, dates[0],
+                                            exclude_start=True, exclude_end=True)
+                    if gap > max_cycle:
+                        max_cycle = gap
+
+                # 2. Gaps between consecutive appearances
+                for i in range(1, len(dates)):
+                    gap = count_draw_periods(province_code, dates[i-1], dates[i],
+                                            exclude_start=True, exclude_end=True)
+                    if gap > max_cycle:
+                        max_cycle = gap
+
+            # Threshold: 10 days for MB, 3 periods for MN/MT
+            threshold = 10 if is_daily else 3
+
+            if gan_value >= threshold and gan_value <= (actual_draws if actual_draws and not is_daily else analysis_days):
+                category = categorize_gan(gan_value, is_daily)
+
+                lo_gan.append({
+                    "number": num,
+                    "gan_value": gan_value,  # Primary display value
+                    "days_since_last": days_since,
+                    "periods_since_last": periods_since,
+                    "last_seen_date": last_date.strftime("%d/%m/%Y"),
+                    "max_cycle": max_cycle,
+                    "is_daily": is_daily,
+                    "category": category
+                })
+        # Don't include numbers that never appeared in window
+        # They have no historical pattern to analyze
+
+    # Sort by gan_value (descending)
+    lo_gan.sort(key=lambda x: x["gan_value"], reverse=True)
+
+    # Add analysis window metadata to results
+    for item in lo_gan:
+        item['analysis_draws'] = actual_draws
+        item['analysis_days'] = analysis_days
+        item['analysis_window'] = f"{actual_draws or analysis_days} {'kỳ' if actual_draws else 'ngày'}"
+
+    return lo_gan
+
+
+@trace_methods("db.stats")
 class StatisticsDBService:
     """Service for querying lottery statistics from database"""
 
@@ -41,7 +179,7 @@ class StatisticsDBService:
             Dict of {number: count}
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 # Set date range
                 if not end_date:
                     end_date = get_vietnam_today()
@@ -49,16 +187,7 @@ class StatisticsDBService:
                     start_date = end_date - timedelta(days=days)
 
                 # Query frequency
-                query = select(
-                    Lo2SoHistory.number,
-                    func.count(Lo2SoHistory.id).label("count")
-                ).where(
-                    and_(
-                        Lo2SoHistory.province_code == province_code,
-                        Lo2SoHistory.draw_date >= start_date,
-                        Lo2SoHistory.draw_date <= end_date
-                    )
-                ).group_by(Lo2SoHistory.number)
+                query = lo2so_frequency_query(province_code, start_date, end_date)
 
                 result = await session.execute(query)
 
@@ -66,11 +195,11 @@ class StatisticsDBService:
                 for row in result:
                     frequency[row.number] = row.count
 
-                logger.info(f"✅ Got frequency for {province_code}: {len(frequency)} unique numbers")
+                logger.info("✅ Got frequency for %s: %s unique numbers", province_code, len(frequency))
                 return frequency
 
         except Exception as e:
-            logger.error(f"❌ Error getting lo2so frequency: {e}")
+            logger.error("❌ Error getting lo2so frequency: %s", e)
             return {}
     async def get_lo_gan(
         self,
@@ -101,14 +230,11 @@ class StatisticsDBService:
             await get_lo_gan('ANGI', days=1400)
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 from app.utils.timezone import get_vietnam_today
-                from app.utils.lottery_helpers import (
-                    count_draw_periods, 
-                    is_daily_draw_province,
-                    categorize_gan
-                )
+                from app.utils.lottery_helpers import is_daily_draw_province
                 from app.constants.draw_schedules import PROVINCE_DRAW_SCHEDULE
+                from app.services.analytics.executor import get_analytics_executor
                 
                 end_date = get_vietnam_today()
                 is_daily = is_daily_draw_province(province_code)
@@ -131,16 +257,14 @@ class StatisticsDBService:
                         actual_draws = draws
                     
                     logger.info(
-                        f"Analyzing lo gan for {province_code}: "
-                        f"{draws} draws ≈ {analysis_days} days"
+                        "Analyzing lo gan for %s: %s draws ≈ %s days", province_code, draws, analysis_days
                     )
                 elif days is not None:
                     # Use days parameter (backward compatibility)
                     analysis_days = days
                     actual_draws = None
                     logger.warning(
-                        f"Using deprecated 'days' parameter for {province_code}. "
-                        f"Consider using 'draws' instead."
+                        "Using deprecated 'days' parameter for %s. Consider using 'draws' instead.", province_code
                     )
                 else:
                     # Default: 200 draws
@@ -158,126 +282,35 @@ class StatisticsDBService:
                 unit = "days" if is_daily else "periods"
                 
                 logger.info(
-                    f"Analyzing lo gan for {province_code}: "
-                    f"{start_date} to {end_date} "
-                    f"({analysis_days} days, {actual_draws or '?'} draws)"
+                    "Analyzing lo gan for %s: %s to %s (%s days, %s draws)",
+                    province_code, start_date, end_date, analysis_days, actual_draws or '?'
                 )
                 
-                # Get all 2-digit numbers (00-99)
-                all_numbers = [f"{i:02d}" for i in range(100)]
-                
                 # Query: Get ALL appearances within the analysis window
-                query = select(
-                    Lo2SoHistory.number,
-                    Lo2SoHistory.draw_date
-                ).where(
-                    and_(
-                        Lo2SoHistory.province_code == province_code,
-                        Lo2SoHistory.draw_date >= start_date,
-                        Lo2SoHistory.draw_date <= end_date
-                    )
-                ).order_by(Lo2SoHistory.draw_date)
+                query = lo_gan_window_query(province_code, start_date, end_date)
                 
                 result = await session.execute(query)
-                all_appearances = result.all()
-                
-                # Group by number
-                number_dates = {}
-                for row in all_appearances:
-                    num = row.number
-                    if num not in number_dates:
-                        number_dates[num] = []
-                    number_dates[num].append(row.draw_date)
-                
-                # Calculate gan for each number
-                lo_gan = []
-                
-                for num in all_numbers:
-                    if num in number_dates:
-                        dates = sorted(number_dates[num])
-                        last_date = dates[-1]
-                        
-                        # Calculate BOTH days and periods since last appearance
-                        days_since = (end_date - last_date).days - 1
-                        if days_since < 0:
-                            days_since = 0
-                        
-                        periods_since = count_draw_periods(province_code, last_date, end_date)
-                        
-                        # Determine which metric to use
-                        gan_value = days_since if is_daily else periods_since
-                        
-                        # Calculate max cycle
-                        if is_daily:
-                            # For MB, use days
-                            # Start with current gan value
-                            max_cycle = days_since
-                            
-                            # 1. Gap from window start to first appearance
-                            if dates:
-                                gap = (dates[0] - start_date).days
-                                gan_gap = max(0, gap - 1)
-                                if gan_gap > max_cycle:
-                                    max_cycle = gan_gap
-                            
-                            # 2. Gaps between consecutive appearances
-                            for i in range(1, len(dates)):
-                                gap = (dates[i] - dates[i-1]).days
-                                gan_gap = max(0, gap - 1)
-                                if gan_gap > max_cycle:
-                                    max_cycle = gan_gap
-                        else:
-                            # For MN/MT, use periods
-                            # Start with current gan value
-                            max_cycle = periods_since
-                            
-                            # 1. Gap from window start to first appearance
-                            if dates:
-                                gap = count_draw_periods(province_code, start_date, dates[0],
-                                                        exclude_start=True, exclude_end=True)
-                                if gap > max_cycle:
-                                    max_cycle = gap
-                            
-                            # 2. Gaps between consecutive appearances
-                            for i in range(1, len(dates)):
-                                gap = count_draw_periods(province_code, dates[i-1], dates[i],
-                                                        exclude_start=True, exclude_end=True)
-                                if gap > max_cycle:
-                                    max_cycle = gap
-                        
-                        # Threshold: 10 days for MB, 3 periods for MN/MT
-                        threshold = 10 if is_daily else 3
-                        
-                        if gan_value >= threshold and gan_value <= (actual_draws if actual_draws and not is_daily else analysis_days):
-                            category = categorize_gan(gan_value, is_daily)
-                            
-                            lo_gan.append({
-                                "number": num,
-                                "gan_value": gan_value,  # Primary display value
-                                "days_since_last": days_since,
-                                "periods_since_last": periods_since,
-                                "last_seen_date": last_date.strftime("%d/%m/%Y"),
-                                "max_cycle": max_cycle,
-                                "is_daily": is_daily,
-                                "category": category
-                            })
-                    # Don't include numbers that never appeared in window
-                    # They have no historical pattern to analyze
-                
-                # Sort by gan_value (descending)
-                lo_gan.sort(key=lambda x: x["gan_value"], reverse=True)
-                
-                # Add analysis window metadata to results
-                for item in lo_gan:
-                    item['analysis_draws'] = actual_draws
-                    item['analysis_days'] = analysis_days
-                    item['analysis_window'] = f"{actual_draws or analysis_days} {'kỳ' if actual_draws else 'ngày'}"
-                
-                logger.info(f"✅ Got {len(lo_gan)} lo gan numbers for {province_code}")
-                return lo_gan[:limit]
-                
+                all_appearances = [(row.number, row.draw_date) for row in result]
+            
+            # Tính toán thuần (count_draw_periods cho từng số) chạy ngoài event loop
+            lo_gan = await get_analytics_executor().run(
+                compute_lo_gan,
+                province_code,
+                all_appearances,
+                start_date,
+                end_date,
+                actual_draws,
+                analysis_days
+            )
+            
+            logger.info("✅ Got %s lo gan numbers for %s", len(lo_gan), province_code)
+            return lo_gan[:limit]
+        
+        except AnalyticsBusy:
+            # Hàng đợi analytics đầy: handler báo "đang bận", không phải "không có dữ liệu"
+            raise
         except Exception as e:
-            logger.error(f"❌ Error getting lo gan: {e}")
+            logger.error("❌ Error getting lo gan: %s", e)
             import traceback
             logger.error(traceback.format_exc())
             return []
@@ -308,11 +341,11 @@ class StatisticsDBService:
                 for num, count in sorted(frequency.items(), key=lambda x: x[1], reverse=True)
             ]
 
-            logger.info(f"✅ Got {len(hot)} hot numbers for {province_code}")
+            logger.info("✅ Got %s hot numbers for %s", len(hot), province_code)
             return hot[:limit]
 
         except Exception as e:
-            logger.error(f"❌ Error getting hot numbers: {e}")
+            logger.error("❌ Error getting hot numbers: %s", e)
             return []
 
     async def get_cold_numbers(
@@ -341,11 +374,11 @@ class StatisticsDBService:
                 for num, count in sorted(frequency.items(), key=lambda x: x[1])
             ]
 
-            logger.info(f"✅ Got {len(cold)} cold numbers for {province_code}")
+            logger.info("✅ Got %s cold numbers for %s", len(cold), province_code)
             return cold[:limit]
 
         except Exception as e:
-            logger.error(f"❌ Error getting cold numbers: {e}")
+            logger.error("❌ Error getting cold numbers: %s", e)
             return []
 
     async def get_number_history(
@@ -366,16 +399,8 @@ class StatisticsDBService:
             List of dicts with {date, prize_type}
         """
         try:
-            async with DatabaseSession() as session:
-                query = select(
-                    Lo2SoHistory.draw_date,
-                    Lo2SoHistory.prize_type
-                ).where(
-                    and_(
-                        Lo2SoHistory.province_code == province_code,
-                        Lo2SoHistory.number == number
-                    )
-                ).order_by(desc(Lo2SoHistory.draw_date)).limit(limit)
+            async with DatabaseSession(read_only=True) as session:
+                query = number_history_query(province_code, number, limit)
 
                 result = await session.execute(query)
 
@@ -386,11 +411,11 @@ class StatisticsDBService:
                         "prize_type": row.prize_type
                     })
 
-                logger.info(f"✅ Got history for number {number}: {len(history)} occurrences")
+                logger.info("✅ Got history for number %s: %s occurrences", number, len(history))
                 return history
 
         except Exception as e:
-            logger.error(f"❌ Error getting number history: {e}")
+            logger.error("❌ Error getting number history: %s", e)
             return []
 
     async def get_statistics_summary(self, province_code: str, days: int = 30) -> Dict:
@@ -405,7 +430,7 @@ class StatisticsDBService:
             Dict with various statistics
         """
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 end_date = get_vietnam_today()
                 start_date = end_date - timedelta(days=days)
 
@@ -446,7 +471,7 @@ class StatisticsDBService:
                 }
 
         except Exception as e:
-            logger.error(f"❌ Error getting statistics summary: {e}")
+            logger.error("❌ Error getting statistics summary: %s", e)
             return {}
 
     async def get_lo3so_frequency_stats(
@@ -469,7 +494,7 @@ class StatisticsDBService:
         from datetime import datetime, timedelta
         
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 # Calculate date range
                 end_date = datetime.now().date()
                 start_date = end_date - timedelta(days=days)
@@ -493,9 +518,9 @@ class StatisticsDBService:
                 # Convert to dict
                 frequency = {row[0]: row[1] for row in rows}
                 
-                logger.info(f"✅ Got lo3so frequency for {province_code}: {len(frequency)} unique numbers")
+                logger.info("✅ Got lo3so frequency for %s: %s unique numbers", province_code, len(frequency))
                 return frequency
                 
         except Exception as e:
-            logger.error(f"❌ Error getting lo3so frequency: {e}")
-            return {}
\ No newline at end of file
+            logger.error("❌ Error getting lo3so frequency: %s", e)
+            return {}
@@ -0,0 +1,152 @@
+"""Drain - Tắt process êm khi deploy (SIGTERM): không mất / lặp việc
+
+    drain = get_drain()
+    async with drain.track("update"):   # update / fan-out đang chạy
+        ...
+    if drain.draining:                  # fan-out: lưu checkpoint rồi dừng
+        ...
+    await drain.drain(pending=...)      # chờ việc đang chạy tới deadline
+
+Trình tự tắt bot (app/main.py):
+1. begin(): bắt đầu drain, deadline = now + DRAIN_TIMEOUT_SECONDS
+2. dừng polling (không nhận update mới) + dừng scheduler (không chạy job mới)
+3. chờ các update đã nhận và fan-out đang chạy xong (fan-out thấy `draining`
+   → lưu vị trí đã gửi, dừng ở ranh giới user); quá deadline → hủy phần còn lại
+4. Application.stop() → snapshot analytics, đóng HTTP / DB pool, flush log
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+from telegram.ext import SimpleUpdateProcessor
+
+from app.config import DRAIN_TIMEOUT_SECONDS
+from app.database import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+# Chu kỳ kiểm tra khi chờ việc đang chạy (giây)
+POLL_INTERVAL = 0.05
+
+
+class DrainCoordinator:
+    """Đếm việc đang chạy theo loại và điều phối drain có deadline"""
+
+    def __init__(self, timeout: float = DRAIN_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.inflight: Dict[str, int] = {}
+        self.completed: Dict[str, int] = {}
+        self.cancelled = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def draining(self) -> bool:
+        return self.deadline is not None
+
+    def begin(self, timeout: Optional[float] = None) -> bool:
+        """Bắt đầu drain. Returns: False nếu đã drain từ trước"""
+        if self.draining:
+            return False
+        self.deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        logger.info("🛑 Draining: %s in flight, deadline %.0fs", self.inflight, self.remaining())
+        return True
+
+    def remaining(self) -> float:
+        """Số giây còn lại tới deadline (chưa drain → timeout đầy đủ)"""
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def busy(self) -> int:
+        return sum(self.inflight.values())
+
+    @asynccontextmanager
+    async def track(self, kind: str) -> AsyncIterator[None]:
+        """Đánh dấu 1 việc đang chạy (task có thể bị hủy nếu quá deadline)"""
+        task = asyncio.current_task()
+        self.inflight[kind] = self.inflight.get(kind, 0) + 1
+        if task is not None:
+            self._tasks.add(task)
+        try:
+            yield
+        finally:
+            self.inflight[kind] -= 1
+            self.completed[kind] = self.completed.get(kind, 0) + 1
+            if task is not None:
+                self._tasks.discard(task)
+
+    async def drain(self, pending: Callable[[], int] = lambda: 0) -> bool:
+        """
+        Chờ mọi việc đang chạy (và `pending()` việc đã nhận chưa chạy) tới deadline
+
+        Quá deadline → hủy các task còn lại.
+
+        Returns:
+            True nếu xong trước deadline
+        """
+        self.begin()
+        started = time.monotonic()
+        while (self.busy or pending()) and self.remaining() > 0:
+            await asyncio.sleep(POLL_INTERVAL)
+
+        clean = not (self.busy or pending())
+        if clean:
+            logger.info("✅ Drained in %.2fs (%s)", time.monotonic() - started, self.completed)
+        else:
+            current = asyncio.current_task()
+            tasks = [task for task in self._tasks if task is not current and not task.done()]
+            self.cancelled += len(tasks)
+            for task in tasks:
+                task.cancel()
+            logger.warning(
+                "⚠️ Drain deadline reached: cancelled %d tasks (%s in flight, %d pending)",
+                len(tasks), self.inflight, pending()
+            )
+        return clean
+
+    def stats(self) -> Dict:
+        return {
+            "draining": self.draining,
+            "remaining": round(self.remaining(), 1),
+            "inflight": dict(self.inflight),
+            "completed": dict(self.completed),
+            "cancelled": self.cancelled,
+        }
+
+
+class TrackingUpdateProcessor(SimpleUpdateProcessor):
+    """
+    Update processor của PTB: đếm các update đang xử lý cho drain và mở
+    1 unit of work read-only cho mỗi update (service lồng nhau dùng chung session)
+    """
+
+    def __init__(self, max_concurrent_updates: int, drain: Optional[DrainCoordinator] = None):
+        super().__init__(max_concurrent_updates)
+        self.drain = drain or get_drain()
+
+    async def process_update(self, update, coroutine) -> None:
+        # Tính cả update đang chờ semaphore (đã nhận nhưng chưa chạy)
+        async with self.drain.track("update"):
+            await super().process_update(update, self._scoped(coroutine))
+
+    @staticmethod
+    async def _scoped(coroutine) -> None:
+        # Scope mở sau semaphore: update đang chờ không giữ gì của database
+        async with unit_of_work(read_only=True, kind="update"):
+            await coroutine
+
+
+_drain: Optional[DrainCoordinator] = None
+
+
+def get_drain() -> DrainCoordinator:
+    """Coordinator dùng chung của process"""
+    global _drain
+    if _drain is None:
+        _drain = DrainCoordinator()
+    return _drain
@@ -0,0 +1,312 @@
+"""Job Queue - Hàng đợi công việc dùng bảng job_queue (SQLite/Postgres)
+
+Handler processes chỉ phục vụ updates; notification/ingest jobs được đẩy vào
+bảng job_queue và 1 hoặc nhiều worker processes (app/worker.py) lấy ra xử lý.
+
+Đảm bảo:
+- Enqueue idempotent theo dedupe_key (unique) trong lúc job còn pending/running
+  → nhiều producer / nhiều lần check không tạo job trùng; job done/failed trả
+  lại khóa để lần check sau enqueue được
+- Claim bằng UPDATE có điều kiện → mỗi lần chỉ 1 worker giữ job (lease)
+- Ack/fail chỉ có hiệu lực với worker đang giữ lease
+- Job đã done không bao giờ được claim lại; job lỗi được retry có backoff
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.database import DatabaseSession
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class JobQueue:
+    """Hàng đợi job dựa trên bảng database"""
+
+    def __init__(self, retry_base_seconds: int = 30, max_retry_delay: int = 900):
+        self.retry_base_seconds = retry_base_seconds
+        self.max_retry_delay = max_retry_delay
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Optional[Dict] = None,
+        dedupe_key: Optional[str] = None,
+        run_after: Optional[datetime] = None,
+        max_attempts: int = 5
+    ) -> Optional[int]:
+        """
+        Thêm job vào hàng đợi
+
+        Args:
+            kind: Loại job (notify_province, ingest_province, ...)
+            payload: Tham số cho handler (JSON)
+            dedupe_key: Khóa chống trùng; job cùng khóa đang pending/running → bỏ qua
+            run_after: Chỉ chạy sau thời điểm này (UTC)
+            max_attempts: Số lần thử tối đa
+
+        Returns:
+            ID job mới, None nếu trùng dedupe_key hoặc lỗi
+        """
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                job = Job(
+                    kind=kind,
+                    payload=payload or {},
+                    dedupe_key=dedupe_key,
+                    status=STATUS_PENDING,
+                    attempts=0,
+                    max_attempts=max_attempts,
+                    run_after=run_after or datetime.utcnow(),
+                    created_at=datetime.utcnow(),
+                )
+                session.add(job)
+                await session.flush()
+                job_id = job.id
+
+            logger.info("📥 Enqueued job %s: %s %s", job_id, kind, payload or {})
+            return job_id
+
+        except IntegrityError:
+            logger.info("⏭️  Job already queued: %s", dedupe_key)
+            return None
+        except Exception as e:
+            logger.error("❌ Error enqueueing job %s: %s", kind, e)
+            return None
+
+    async def claim(
+        self,
+        worker_id: str,
+        kinds: Optional[List[str]] = None,
+        lease_seconds: int = 300
+    ) -> Optional[Dict]:
+        """
+        Lấy 1 job sẵn sàng và giữ lease
+
+        Job "running" có lease đã hết hạn (worker chết) được claim lại nếu còn
+        lượt thử; hết lượt → failed ("lease expired"), vì worker crash / bị
+        OOM-kill không bao giờ gọi tới fail().
+
+        Args:
+            worker_id: ID worker đang claim
+            kinds: Chỉ lấy các loại job này (None = tất cả)
+            lease_seconds: Thời gian giữ lease
+
+        Returns:
+            Dict {id, kind, payload, attempts} hoặc None nếu không có job
+        """
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Job.status == STATUS_PENDING, Job.run_after <= now),
+            and_(Job.status == STATUS_RUNNING, Job.locked_until < now, Job.attempts < Job.max_attempts),
+        )
+
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                expired = await session.execute(
+                    update(Job).where(and_(
+                        Job.status == STATUS_RUNNING,
+                        Job.locked_until < now,
+                        Job.attempts >= Job.max_attempts,
+                    )).values(
+                        status=STATUS_FAILED,
+                        dedupe_key=None,
+                        locked_until=None,
+                        last_error="lease expired",
+                        updated_at=now,
+                    )
+                )
+                if expired.rowcount:
+                    await session.commit()
+                    logger.error("❌ %s job(s) failed permanently: lease expired after max attempts", expired.rowcount)
+
+                query = select(Job.id).where(claimable)
+                if kinds:
+                    query = query.where(Job.kind.in_(kinds))
+                query = query.order_by(Job.run_after, Job.id).limit(5)
+
+                candidates = (await session.execute(query)).scalars().all()
+
+                for job_id in candidates:
+                    # Chỉ 1 worker thắng: UPDATE có điều kiện, kiểm tra rowcount
+                    stmt = update(Job).where(
+                        and_(Job.id == job_id, claimable)
+                    ).values(
+                        status=STATUS_RUNNING,
+                        locked_by=worker_id,
+                        locked_until=now + timedelta(seconds=lease_seconds),
+                        attempts=Job.attempts + 1,
+                        updated_at=now,
+                    )
+                    result = await session.execute(stmt)
+
+                    if result.rowcount == 1:
+                        await session.commit()
+                        job = await session.get(Job, job_id)
+                        logger.info(
+                            "🔒 Worker %s claimed job %s: %s (attempt %s)", worker_id, job_id, job.kind, job.attempts
+                        )
+                        return {
+                            "id": job.id,
+                            "kind": job.kind,
+                            "payload": job.payload or {},
+                            "attempts": job.attempts,
+                        }
+
+                return None
+
+        except Exception as e:
+            logger.error("❌ Error claiming job: %s", e)
+            return None
+
+    async def extend_lease(self, job_id: int, worker_id: str, lease_seconds: int = 300) -> bool:
+        """
+        Gia hạn lease của job đang chạy (fan-out lớn chạy lâu hơn lease)
+
+        Returns:
+            False nếu worker không còn giữ lease (hoặc lỗi) → phải dừng job
+        """
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                now = datetime.utcnow()
+                stmt = update(Job).where(
+                    and_(
+                        Job.id == job_id,
+                        Job.status == STATUS_RUNNING,
+                        Job.locked_by == worker_id,
+                    )
+                ).values(
+                    locked_until=now + timedelta(seconds=lease_seconds),
+                    updated_at=now,
+                )
+                result = await session.execute(stmt)
+
+                if result.rowcount != 1:
+                    logger.warning("⚠️ Job %s lease extension refused: lease lost by %s", job_id, worker_id)
+                    return False
+                return True
+
+        except Exception as e:
+            logger.error("❌ Error extending lease of job %s: %s", job_id, e)
+            return False
+
+    async def ack(self, job_id: int, worker_id: str) -> bool:
+        """Đánh dấu job hoàn thành (chỉ worker đang giữ lease)"""
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                stmt = update(Job).where(
+                    and_(
+                        Job.id == job_id,
+                        Job.status == STATUS_RUNNING,
+                        Job.locked_by == worker_id,
+                    )
+                ).values(
+                    status=STATUS_DONE,
+                    dedupe_key=None,
+                    locked_until=None,
+                    updated_at=datetime.utcnow(),
+                )
+                result = await session.execute(stmt)
+
+                if result.rowcount != 1:
+                    logger.warning("⚠️ Job %s ack ignored: lease lost by %s", job_id, worker_id)
+                    return False
+
+                logger.info("✅ Job %s done", job_id)
+                return True
+
+        except Exception as e:
+            logger.error("❌ Error acking job %s: %s", job_id, e)
+            return False
+
+    async def release(self, job_id: int, worker_id: str) -> bool:
+        """
+        Trả job về hàng đợi khi worker tắt giữa chừng (drain): không tính là 1 lần thử
+
+        Handler đã lưu checkpoint nên lần chạy sau làm tiếp phần còn lại.
+        """
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                stmt = update(Job).where(
+                    and_(
+                        Job.id == job_id,
+                        Job.status == STATUS_RUNNING,
+                        Job.locked_by == worker_id,
+                    )
+                ).values(
+                    status=STATUS_PENDING,
+                    attempts=Job.attempts - 1,
+                    locked_by=None,
+                    locked_until=None,
+                    run_after=datetime.utcnow(),
+                    updated_at=datetime.utcnow(),
+                )
+                result = await session.execute(stmt)
+
+                if result.rowcount != 1:
+                    logger.warning("⚠️ Job %s release ignored: lease lost by %s", job_id, worker_id)
+                    return False
+
+                logger.info("↩️ Job %s released back to queue", job_id)
+                return True
+
+        except Exception as e:
+            logger.error("❌ Error releasing job %s: %s", job_id, e)
+            return False
+
+    async def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+        Ghi nhận job lỗi: retry có backoff, hoặc failed nếu hết lượt
+
+        Returns:
+            True nếu job sẽ được retry, False nếu đã failed hẳn
+        """
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                job = await session.get(Job, job_id)
+
+                if not job or job.status != STATUS_RUNNING or job.locked_by != worker_id:
+                    logger.warning("⚠️ Job %s fail ignored: lease lost by %s", job_id, worker_id)
+                    return False
+
+                now = datetime.utcnow()
+                job.last_error = error[:2000]
+                job.locked_until = None
+                job.updated_at = now
+
+                if job.attempts >= job.max_attempts:
+                    job.status = STATUS_FAILED
+                    job.dedupe_key = None
+                    logger.error("❌ Job %s failed permanently after %s attempts: %s", job_id, job.attempts, error)
+                    return False
+
+                delay = min(self.retry_base_seconds * (2 ** (job.attempts - 1)), self.max_retry_delay)
+                job.status = STATUS_PENDING
+                job.run_after = now + timedelta(seconds=delay)
+                logger.warning("🔁 Job %s failed (attempt %s), retry in %ss: %s", job_id, job.attempts, delay, error)
+                return True
+
+        except Exception as e:
+            logger.error("❌ Error failing job %s: %s", job_id, e)
+            return False
+
+    async def get_stats(self) -> Dict[str, int]:
+        """Đếm số job theo trạng thái"""
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                query = select(Job.status, func.count(Job.id)).group_by(Job.status)
+                result = await session.execute(query)
+                return {status: count for status, count in result.all()}
+        except Exception as e:
+            logger.error("❌ Error getting job stats: %s", e)
+            return {}
@@ -0,0 +1,130 @@
+"""Leader Election - Chỉ 1 replica chạy scheduler (lease row trong database)
+
+Nhiều replica của app.main cùng phục vụ updates, nhưng chỉ leader được
+poll MU88 và gửi notifications. Leader giữ lease bằng 1 dòng trong bảng
+scheduler_lease và gia hạn định kỳ (mỗi lease_seconds / 3). Leader chết
+→ lease hết hạn sau tối đa lease_seconds → replica khác chiếm lease.
+
+Chạy được trên cả SQLite và Postgres (không cần advisory lock hay Redis).
+"""
+
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import update, and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.database import DatabaseSession
+from app.models.scheduler_lease import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Lease-based leader election"""
+
+    def __init__(
+        self,
+        name: str = "scheduler",
+        holder_id: Optional[str] = None,
+        lease_seconds: int = 30
+    ):
+        self.name = name
+        self.holder_id = holder_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.is_leader = False
+
+    @property
+    def renew_interval(self) -> int:
+        """Chu kỳ gia hạn: đủ ngắn để không mất lease vì 1 lần trễ"""
+        return max(1, self.lease_seconds // 3)
+
+    async def acquire_or_renew(self) -> bool:
+        """
+        Chiếm lease (nếu trống/hết hạn) hoặc gia hạn lease đang giữ
+
+        Returns:
+            True nếu replica này là leader
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        was_leader = self.is_leader
+
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                # UPDATE có điều kiện: chỉ thắng nếu đang giữ hoặc lease đã hết hạn
+                stmt = update(SchedulerLease).where(
+                    and_(
+                        SchedulerLease.name == self.name,
+                        or_(
+                            SchedulerLease.holder == self.holder_id,
+                            SchedulerLease.expires_at < now,
+                        )
+                    )
+                ).values(
+                    holder=self.holder_id,
+                    expires_at=expires_at,
+                )
+                result = await session.execute(stmt)
+
+                renewed = result.rowcount == 1
+
+                if renewed and not was_leader:
+                    # Vừa chiếm lease của replica khác
+                    await session.execute(
+                        update(SchedulerLease)
+                        .where(SchedulerLease.name == self.name)
+                        .values(acquired_at=now)
+                    )
+
+            # Chưa có dòng lease (hoặc đang bị giữ) → thử tạo; replica khác có thể tạo trước
+            self.is_leader = renewed or await self._try_insert(now, expires_at)
+
+        except Exception as e:
+            # Không xác nhận được lease → coi như mất quyền leader (an toàn hơn gửi trùng)
+            logger.error("❌ Error renewing %s lease: %s", self.name, e)
+            self.is_leader = False
+
+        if self.is_leader and not was_leader:
+            logger.info("👑 %s became %s leader (lease %ss)", self.holder_id, self.name, self.lease_seconds)
+        elif was_leader and not self.is_leader:
+            logger.warning("⚠️ %s lost %s leadership", self.holder_id, self.name)
+
+        return self.is_leader
+
+    async def _try_insert(self, now: datetime, expires_at: datetime) -> bool:
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                session.add(SchedulerLease(
+                    name=self.name,
+                    holder=self.holder_id,
+                    expires_at=expires_at,
+                    acquired_at=now,
+                ))
+            return True
+        except IntegrityError:
+            return False
+
+    async def release(self):
+        """Nhả lease khi shutdown để replica khác lên leader ngay"""
+        if not self.is_leader:
+            return
+
+        try:
+            async with DatabaseSession(scoped=False) as session:
+                await session.execute(
+                    update(SchedulerLease).where(
+                        and_(
+                            SchedulerLease.name == self.name,
+                            SchedulerLease.holder == self.holder_id,
+                        )
+                    ).values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+                )
+            logger.info("👋 %s released %s lease", self.holder_id, self.name)
+        except Exception as e:
+            logger.error("❌ Error releasing %s lease: %s", self.name, e)
+        finally:
+            self.is_leader = False
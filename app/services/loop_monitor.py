@@ -0,0 +1,287 @@
+"""Loop monitor - Đo độ trễ event loop và tìm code chặn loop
+
+- Lag probe: task ngủ `interval` giây rồi đo trễ so với lúc đáng lẽ thức dậy.
+  Loop rảnh → trễ ~0; có callback đồng bộ chạy lâu (Redis sync, logging
+  handler ghi file, vòng lặp thống kê...) → trễ đúng bằng thời gian bị chặn.
+- Slow-callback capture: thread watchdog thấy probe quá hạn hơn ngưỡng →
+  lấy mẫu stack của thread chạy loop (sys._current_frames) ngay lúc đang bị
+  chặn, quy về handler (app/handlers) và hàm trong app/ sâu nhất trên stack.
+- Histogram trễ theo cửa sổ trượt → log định kỳ (📈) và lệnh admin /loop.
+
+    monitor = get_loop_monitor()
+    monitor.start()          # trong event loop
+    monitor.snapshot()       # {"p50_ms", "p99_ms", "histogram", "sites", ...}
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.config import (
+    LOOP_METRICS_LOG_SECONDS,
+    LOOP_MONITOR_INTERVAL,
+    LOOP_MONITOR_WINDOW_SECONDS,
+    LOOP_SLOW_CALLBACK_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cận trên các bucket histogram (ms); mẫu lớn hơn bucket cuối → "+inf"
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_APP_DIR = os.path.join(_ROOT_DIR, "app") + os.sep
+_HANDLERS_DIR = os.path.join(_APP_DIR, "handlers") + os.sep
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _frame_name(frame: traceback.FrameSummary) -> str:
+    """app/services/cache.py:get → app.services.cache:get"""
+    filename = os.path.abspath(frame.filename)
+    if filename.startswith(_ROOT_DIR + os.sep):
+        module = os.path.relpath(filename, _ROOT_DIR)
+    else:
+        module = os.path.basename(filename)
+    return f"{os.path.splitext(module)[0].replace(os.sep, '.')}:{frame.name}"
+
+
+def attribute_stack(stack: Optional[List[traceback.FrameSummary]]) -> Tuple[str, Optional[str]]:
+    """
+    Quy một stack về (site, handler)
+
+    site: hàm sâu nhất thuộc app/ (không có → hàm sâu nhất ngoài asyncio)
+    handler: hàm nông nhất thuộc app/handlers (update handler gây chặn)
+    """
+    if not stack:
+        return "unknown", None
+
+    frames = [
+        frame for frame in stack
+        if os.path.abspath(frame.filename) != _THIS_FILE
+        and not os.path.abspath(frame.filename).startswith(_ASYNCIO_DIR)
+    ]
+    app_frames = [frame for frame in frames if os.path.abspath(frame.filename).startswith(_APP_DIR)]
+    handler_frames = [frame for frame in app_frames if os.path.abspath(frame.filename).startswith(_HANDLERS_DIR)]
+
+    site_frames = app_frames or frames
+    site = _frame_name(site_frames[-1]) if site_frames else "unknown"
+    handler = _frame_name(handler_frames[0]) if handler_frames else None
+    return site, handler
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LoopMonitor:
+    """Lag probe + watchdog lấy mẫu stack + histogram cửa sổ trượt"""
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        slow_callback_ms: int = LOOP_SLOW_CALLBACK_MS,
+        window_seconds: int = LOOP_MONITOR_WINDOW_SECONDS,
+        log_seconds: int = LOOP_METRICS_LOG_SECONDS,
+        max_sites: int = 50
+    ):
+        self.interval = interval
+        self.slow_seconds = slow_callback_ms / 1000
+        self.window_seconds = window_seconds
+        self.log_seconds = log_seconds
+        self.max_sites = max_sites
+
+        self.total_stalls = 0
+        self._samples: Deque[Tuple[float, float]] = deque()  # (monotonic, lag giây)
+        self._sites: Dict[str, Dict] = {}
+
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._expected_wake: Optional[float] = None
+
+        # Stack do watchdog lấy trong lần chặn hiện tại (gắn với _expected_wake lúc lấy)
+        self._lock = threading.Lock()
+        self._stall_stack: Optional[List[traceback.FrameSummary]] = None
+        self._stall_wake: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Bắt đầu đo (gọi từ trong event loop cần theo dõi)"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"🩺 Loop monitor started (interval {self.interval}s, slow ≥ {self.slow_seconds * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Dừng probe + watchdog"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self._expected_wake = None
+
+    async def _probe(self) -> None:
+        last_log = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            self._expected_wake = expected
+            await asyncio.sleep(self.interval)
+
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            stack = self._take_stack(expected) if lag >= self.slow_seconds else None
+            self.record(lag, stack, now)
+
+            if self.log_seconds and now - last_log >= self.log_seconds:
+                self.log_metrics()
+                last_log = now
+
+    def _watchdog(self) -> None:
+        """Thread riêng: probe quá hạn ≥ ngưỡng → loop đang bị chặn → lấy mẫu stack"""
+        period = max(self.slow_seconds / 4, 0.005)
+        while not self._stop.wait(period):
+            expected = self._expected_wake
+            if expected is None or self._stall_wake == expected:
+                continue
+            if time.monotonic() - expected < self.slow_seconds:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                stack = traceback.extract_stack(frame)
+            finally:
+                del frame
+            with self._lock:
+                self._stall_stack = stack
+                self._stall_wake = expected
+
+    def _take_stack(self, expected: float) -> Optional[List[traceback.FrameSummary]]:
+        with self._lock:
+            if self._stall_wake != expected:
+                return None
+            stack, self._stall_stack = self._stall_stack, None
+            return stack
+
+    def record(
+        self,
+        lag: float,
+        stack: Optional[List[traceback.FrameSummary]] = None,
+        now: Optional[float] = None
+    ) -> None:
+        """Ghi 1 mẫu trễ (giây); trễ ≥ ngưỡng → ghi nhận 1 lần chặn"""
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, lag))
+        cutoff = now - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+        if lag < self.slow_seconds:
+            return
+
+        self.total_stalls += 1
+        site, handler = attribute_stack(stack)
+        key = f"{handler} → {site}" if handler and handler != site else site
+
+        entry = self._sites.get(key)
+        if entry is None:
+            if len(self._sites) >= self.max_sites:
+                del self._sites[min(self._sites, key=lambda name: self._sites[name]["total_seconds"])]
+            entry = self._sites[key] = {
+                "site": site, "handler": handler, "count": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "stack": [],
+            }
+        entry["count"] += 1
+        entry["total_seconds"] += lag
+        entry["max_seconds"] = max(entry["max_seconds"], lag)
+        entry["last_seen"] = time.time()
+        if stack:
+            entry["stack"] = [
+                f"{_frame_name(frame)}:{frame.lineno}" for frame in stack[-8:]
+                if os.path.abspath(frame.filename) != _THIS_FILE
+            ]
+
+        logger.warning(f"🐢 Event loop blocked {lag * 1000:.0f}ms at {key}")
+
+    def histogram(self) -> List[Tuple[str, int]]:
+        """[(bucket, số mẫu)] trong cửa sổ: "≤1ms", "≤5ms", ..., "+inf" """
+        counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        for _, lag in self._samples:
+            lag_ms = lag * 1000
+            for index, bound in enumerate(LAG_BUCKETS_MS):
+                if lag_ms <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        labels = [f"≤{bound}ms" for bound in LAG_BUCKETS_MS] + ["+inf"]
+        return list(zip(labels, counts))
+
+    def snapshot(self, top: int = 5) -> Dict:
+        """Trạng thái hiện tại cho metrics / lệnh admin"""
+        lags = sorted(lag for _, lag in self._samples)
+        sites = sorted(self._sites.values(), key=lambda entry: entry["total_seconds"], reverse=True)
+        return {
+            "running": self.running,
+            "samples": len(lags),
+            "window_seconds": self.window_seconds,
+            "slow_ms": self.slow_seconds * 1000,
+            "p50_ms": _percentile(lags, 0.50) * 1000,
+            "p95_ms": _percentile(lags, 0.95) * 1000,
+            "p99_ms": _percentile(lags, 0.99) * 1000,
+            "max_ms": (lags[-1] if lags else 0.0) * 1000,
+            "stalls": sum(1 for lag in lags if lag >= self.slow_seconds),
+            "total_stalls": self.total_stalls,
+            "histogram": self.histogram(),
+            "sites": [dict(entry) for entry in sites[:top]],
+        }
+
+    def log_metrics(self) -> None:
+        """Xuất histogram ra log (1 dòng, dễ parse)"""
+        snap = self.snapshot(top=1)
+        buckets = " ".join(f"{label}={count}" for label, count in snap["histogram"] if count)
+        top_site = snap["sites"][0]["site"] if snap["sites"] else "-"
+        logger.info(
+            f"📈 loop_lag p50={snap['p50_ms']:.1f}ms p95={snap['p95_ms']:.1f}ms "
+            f"p99={snap['p99_ms']:.1f}ms max={snap['max_ms']:.1f}ms stalls={snap['stalls']} "
+            f"top={top_site} buckets[{buckets}]"
+        )
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    """Monitor dùng chung của process (tạo khi cần)"""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor()
+    return _monitor
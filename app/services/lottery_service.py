@@ -6,10 +6,12 @@ from .api.client import MU88APIClient
 from .api.transformer import DataTransformer
 from .mock_data import get_mock_lottery_result  # Fallback
 from app.services.cache import CacheService
+from app.services.tracing import trace_methods
 
 logger = logging.getLogger(__name__)
 
 
+@trace_methods("lottery")
 class LotteryService:
     """Main service for fetching and managing lottery data"""
 
@@ -26,7 +28,7 @@ class LotteryService:
                 self.db_service = LotteryDBService()
                 logger.info("✅ Database integration enabled")
             except Exception as e:
-                logger.warning(f"⚠️  Database integration disabled: {e}")
+                logger.warning("⚠️  Database integration disabled: %s", e)
                 self.use_database = False
 
     async def get_latest_result(self, province_code: str, force_api: bool = False) -> Dict:
@@ -46,7 +48,7 @@ class LotteryService:
             Standardized result dict
         """
         try:
-            logger.info(f"🎯 Getting latest result for {province_code}")
+            logger.info("🎯 Getting latest result for %s", province_code)
             
             today = date.today()
             cache_key = f"lottery:result:{province_code}:{today}"
@@ -58,10 +60,10 @@ class LotteryService:
                     if cache_service.available:
                         cached_result = cache_service.get(cache_key)
                         if cached_result:
-                            logger.info(f"⚡ Redis cache HIT for {province_code} (0.001s)")
+                            logger.info("⚡ Redis cache HIT for %s (0.001s)", province_code)
                             return cached_result
                 except Exception as e:
-                    logger.warning(f"Redis cache failed: {e}")
+                    logger.warning("Redis cache failed: %s", e)
             
             # Layer 2: Database cache (FAST)
             if not force_api and self.use_database and self.db_service:
@@ -75,17 +77,17 @@ class LotteryService:
                         cache_service = CacheService()
                         if cache_service.available:
                             cache_service.set(cache_key, result_dict, ttl=3600)
-                            logger.info(f"💾 Saved to Redis cache: {province_code}")
+                            logger.info("💾 Saved to Redis cache: %s", province_code)
                     except Exception as e:
-                        logger.warning(f"Failed to cache: {e}")
+                        logger.warning("Failed to cache: %s", e)
                     
-                    logger.info(f"🚀 DB cache HIT for {province_code} (0.02s)")
+                    logger.info("🚀 DB cache HIT for %s (0.02s)", province_code)
                     return result_dict
                 elif db_result:
-                    logger.info(f"🔄 DB has old result ({db_result.draw_date}), fetching from API...")
+                    logger.info("🔄 DB has old result (%s), fetching from API...", db_result.draw_date)
 
             # Layer 3: API fetch (SLOW)
-            logger.info(f"📡 Fetching from API for {province_code}...")
+            logger.info("📡 Fetching from API for %s...", province_code)
             api_response = await self.api_client.fetch_results(province_code, limit=1)
 
             if api_response:
@@ -93,7 +95,7 @@ class LotteryService:
                 
                 if results:
                     latest = results[0]
-                    logger.info(f"✅ Got latest result from API for {province_code}: {latest.get('date')}")
+                    logger.info("✅ Got latest result from API for %s: %s", province_code, latest.get('date'))
                     
                     # Save to database
                     if self.use_database and self.db_service:
@@ -103,36 +105,36 @@ class LotteryService:
                             latest["province_code"] = province_code
                             latest["region"] = province_info.get("region", "MN")
                             await self.db_service.save_result(latest)
-                            logger.info(f"💾 Saved {province_code} result to DB: {latest.get('date')}")
+                            logger.info("💾 Saved %s result to DB: %s", province_code, latest.get('date'))
                             
                             # Also save to Redis cache
                             try:
                                 cache_service = CacheService()
                                 if cache_service.available:
                                     cache_service.set(cache_key, latest, ttl=3600)
-                                    logger.info(f"⚡ Saved to Redis: {province_code}")
+                                    logger.info("⚡ Saved to Redis: %s", province_code)
                             except Exception as e:
-                                logger.warning(f"Redis cache save failed: {e}")
+                                logger.warning("Redis cache save failed: %s", e)
                                 
                         except Exception as e:
-                            logger.warning(f"⚠️  Failed to save to DB: {e}")
+                            logger.warning("⚠️  Failed to save to DB: %s", e)
                     
                     return latest
 
             # Fallback to DB (any date)
-            logger.warning(f"⚠️ API failed for {province_code}, trying DB fallback...")
+            logger.warning("⚠️ API failed for %s, trying DB fallback...", province_code)
             if self.use_database and self.db_service:
                 db_result = await self.db_service.get_latest_result(province_code)
                 if db_result:
-                    logger.info(f"✅ Got result from DB fallback: {db_result.draw_date}")
+                    logger.info("✅ Got result from DB fallback: %s", db_result.draw_date)
                     return db_result.to_dict()
 
             # Last resort: mock data
-            logger.warning(f"⚠️ All sources failed for {province_code}, using mock data")
+            logger.warning("⚠️ All sources failed for %s, using mock data", province_code)
             return get_mock_lottery_result(province_code)
 
         except Exception as e:
-            logger.exception(f"❌ Error getting latest result for {province_code}")
+            logger.exception("❌ Error getting latest result for %s", province_code)
             return get_mock_lottery_result(province_code)
 
     async def get_history(self, province_code: str, limit: int = 60) -> List[Dict]:
@@ -147,7 +149,7 @@ class LotteryService:
             List of standardized result dicts
         """
         try:
-            logger.info(f"📊 Getting {limit} results for {province_code}")
+            logger.info("📊 Getting %s results for %s", limit, province_code)
 
             # Check database first if enabled
             if self.use_database and self.db_service:
@@ -155,21 +157,21 @@ class LotteryService:
                 
                 # Only use DB if we have enough data
                 if db_results and len(db_results) >= limit:
-                    logger.info(f"✅ Got {len(db_results)} historical results from DB for {province_code}")
+                    logger.info("✅ Got %s historical results from DB for %s", len(db_results), province_code)
                     return [r.to_dict() for r in db_results]
                 elif db_results:
-                    logger.info(f"⚠️  DB only has {len(db_results)}/{limit} results, fetching from API...")
+                    logger.info("⚠️  DB only has %s/%s results, fetching from API...", len(db_results), limit)
 
             # Fetch from API
-            logger.info(f"📡 Fetching {limit} results from API for {province_code}...")
+            logger.info("📡 Fetching %s results from API for %s...", limit, province_code)
             api_response = await self.api_client.fetch_results(province_code, limit)
 
             if not api_response:
-                logger.warning(f"⚠️ API failed for {province_code}")
+                logger.warning("⚠️ API failed for %s", province_code)
                 return []
 
             results = self.transformer.transform_results(api_response)
-            logger.info(f"✅ Got {len(results)} historical results for {province_code}")
+            logger.info("✅ Got %s historical results for %s", len(results), province_code)
             
             # Save to database if enabled
             if self.use_database and self.db_service:
@@ -183,12 +185,12 @@ class LotteryService:
                         result["region"] = region
                         await self.db_service.save_result(result)
                 except Exception as e:
-                    logger.warning(f"⚠️  Failed to save history to DB: {e}")
+                    logger.warning("⚠️  Failed to save history to DB: %s", e)
             
             return results
 
         except Exception as e:
-            logger.exception(f"❌ Error getting history for {province_code}")
+            logger.exception("❌ Error getting history for %s", province_code)
             return []
 
     async def close(self):
@@ -1,30 +1,97 @@
 """Notification Service - Gửi thông báo kết quả xổ số"""
 
+import asyncio
 import logging
-from typing import List, Optional
-from datetime import date, datetime
+from collections import defaultdict
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
 
 from telegram import Bot
 from telegram.error import TelegramError
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, delete
 
-from app.config import TELEGRAM_TOKEN as BOT_TOKEN, PROVINCES
+from app.config import (
+    TELEGRAM_TOKEN as BOT_TOKEN,
+    PROVINCES,
+    NOTIFICATION_DELIVERY_MODE,
+    DIGEST_WAIT_SECONDS,
+    BROADCAST_CHANNEL_ID,
+    CHANNEL_PUBLISH_MODES,
+    FANOUT_CHECKPOINT_EVERY,
+    get_publish_mode,
+)
 from app.services.subscription_service import SubscriptionService
 from app.services.lottery_service import LotteryService
 from app.ui.formatters import format_lottery_result
-from app.database import DatabaseSession
-from app.models.lottery_result import NotificationLog
+from app.database import DatabaseSession, run_write
+from app.models.lottery_result import NotificationCheckpoint, NotificationLog
+from app.services.drain import get_drain
 
 logger = logging.getLogger(__name__)
 
+# Giới hạn độ dài 1 tin nhắn Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+NOTIFICATION_HEADER = "🔔 <b>THÔNG BÁO KẾT QUẢ XỔ SỐ</b>\n\n"
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━━━━━━━━━━━\n\n"
+
+# Các chế độ gửi cần đăng lên broadcast channel trước
+CHANNEL_MODES = ("copy", "forward", "follow")
+
+
+def build_digest_messages(
+    blocks: List[str],
+    header: str = NOTIFICATION_HEADER,
+    max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH
+) -> List[str]:
+    """
+    Gộp các block kết quả (mỗi tỉnh 1 block) thành ít tin nhắn nhất có thể
+    
+    Block không bao giờ bị cắt giữa chừng; chỉ tách sang tin nhắn mới
+    khi tin hiện tại vượt quá max_length.
+    
+    Args:
+        blocks: Danh sách block đã render (HTML)
+        header: Header đặt ở đầu tin nhắn đầu tiên
+        max_length: Độ dài tối đa 1 tin nhắn
+        
+    Returns:
+        Danh sách tin nhắn cần gửi
+    """
+    messages = []
+    current = header
+    has_block = False
+    
+    for block in blocks:
+        candidate = current + (DIGEST_SEPARATOR if has_block else "") + block
+        if has_block and len(candidate) > max_length:
+            messages.append(current)
+            current = block
+        else:
+            current = candidate
+        has_block = True
+    
+    if has_block:
+        messages.append(current)
+    
+    return messages
+
 
 class NotificationService:
     """Service gửi thông báo tự động"""
     
-    def __init__(self, bot=None):
+    def __init__(self, bot=None, delivery_mode: Optional[str] = None):
         self.subscription_service = SubscriptionService()
         self.lottery_service = LotteryService(use_database=True)
         self.bot = bot
+        self.delivery_mode = delivery_mode or NOTIFICATION_DELIVERY_MODE
+        self.channel_id = BROADCAST_CHANNEL_ID
+        self.publish_modes = CHANNEL_PUBLISH_MODES
+    
+    @property
+    def digest_enabled(self) -> bool:
+        """Có đang bật chế độ gửi gộp (digest) không"""
+        return self.delivery_mode == "digest"
     
     async def check_and_send_if_new_result(
         self,
@@ -44,21 +111,59 @@ class NotificationService:
         if check_date is None:
             check_date = date.today()
         
-        logger.info(f"🔍 Checking new result for {province_code} - {check_date}")
+        logger.info("🔍 Checking new result for %s - %s", province_code, check_date)
         
         # 1. Kiểm tra đã gửi chưa (tránh gửi trùng)
         if await self._already_sent(province_code, check_date):
-            logger.info(f"⏭️  Already sent {province_code} - {check_date}, skipping")
+            logger.info("⏭️  Already sent %s - %s, skipping", province_code, check_date)
+            return None
+        
+        # 2-4. Kiểm tra có kết quả mới, đúng ngày và đủ giải chưa
+        result = await self._get_complete_result(province_code, check_date)
+        if not result:
             return None
         
-        # 2. Kiểm tra có kết quả mới không
+        logger.info("✅ Result complete for %s, sending notifications...", province_code)
+        
+        # 5. ĐỦ GIẢI → GỬI NGAY!
+        summary = await self.send_result_notification(
+            province_code=province_code,
+            result_date=check_date
+        )
+        
+        # 6. Bị drain giữa chừng → chưa đánh dấu, lần sau gửi tiếp từ checkpoint
+        if summary and summary.get("interrupted"):
+            return summary
+        
+        # 7. Đánh dấu đã gửi (follow: đã đăng lên channel)
+        if summary and (summary.get('success', 0) > 0 or summary.get('mode') == "follow"):
+            await self._mark_as_sent(province_code, check_date, summary)
+        await self._clear_checkpoint(self._checkpoint_key(province_code, check_date))
+        
+        return summary
+    
+    async def _get_complete_result(
+        self,
+        province_code: str,
+        check_date: date
+    ) -> Optional[dict]:
+        """
+        Lấy kết quả của ngày check_date nếu đã đủ giải
+        
+        Args:
+            province_code: Mã tỉnh
+            check_date: Ngày kiểm tra
+            
+        Returns:
+            Dict kết quả nếu đúng ngày và đủ giải, None nếu chưa
+        """
         result = await self.lottery_service.get_latest_result(province_code)
         
         if not result:
-            logger.info(f"ℹ️  No result found for {province_code}")
+            logger.info("ℹ️  No result found for %s", province_code)
             return None
         
-        # 3. Parse result date và so sánh
+        # Parse result date và so sánh
         result_date_str = result.get('date')
         
         # Convert to date object for comparison
@@ -70,37 +175,25 @@ class NotificationService:
                 # Try yyyy-mm-dd format (DB format)
                 result_date = datetime.strptime(result_date_str, '%Y-%m-%d').date()
             except (ValueError, TypeError):
-                logger.error(f"❌ Cannot parse date: {result_date_str}")
+                logger.error("❌ Cannot parse date: %s", result_date_str)
                 return None
         
         # Chỉ gửi nếu là kết quả của ngày check_date
         if result_date != check_date:
-            logger.info(f"⏭️  Result date {result_date} != check date {check_date}, skipping")
+            logger.info("⏭️  Result date %s != check date %s, skipping", result_date, check_date)
             return None
         
-        logger.info(f"✅ Result date {result_date} matches check date {check_date}")
+        logger.info("✅ Result date %s matches check date %s", result_date, check_date)
         
-        # 4. Kiểm tra đủ số giải chưa
+        # Kiểm tra đủ số giải chưa
         province = PROVINCES.get(province_code, {})
         region = province.get("region", "MN")
         
         if not self._is_result_complete(result, region):
-            logger.info(f"⏳ Result incomplete for {province_code}, waiting...")
+            logger.info("⏳ Result incomplete for %s, waiting...", province_code)
             return None
         
-        logger.info(f"✅ Result complete for {province_code}, sending notifications...")
-        
-        # 5. ĐỦ GIẢI → GỬI NGAY!
-        summary = await self.send_result_notification(
-            province_code=province_code,
-            result_date=check_date
-        )
-        
-        # 6. Đánh dấu đã gửi
-        if summary and summary.get('success', 0) > 0:
-            await self._mark_as_sent(province_code, check_date, summary)
-        
-        return summary
+        return result
     
     def _is_result_complete(self, result: dict, region: str) -> bool:
         """
@@ -152,15 +245,15 @@ class NotificationService:
         if result_date is None:
             result_date = date.today()
         
-        logger.info(f"📤 Sending notifications for {province_code} - {result_date}")
+        logger.info("📤 Sending notifications for %s - %s", province_code, result_date)
         
         # Lấy danh sách subscribers
         subscribers = await self.subscription_service.get_subscribers_by_province(
             province_code
         )
         
-        if not subscribers:
-            logger.info(f"ℹ️ No subscribers for {province_code}")
+        if not subscribers and get_publish_mode(province_code, self.publish_modes) != "follow":
+            logger.info("ℹ️ No subscribers for %s", province_code)
             return {"total": 0, "success": 0, "failed": 0}
         
         # Lấy kết quả xổ số
@@ -169,7 +262,7 @@ class NotificationService:
             result = await self.lottery_service.get_latest_result(province_code)
             
             if not result:
-                logger.warning(f"⚠️ No result found for {province_code} - {result_date}")
+                logger.warning("⚠️ No result found for %s - %s", province_code, result_date)
                 return {"total": len(subscribers), "success": 0, "failed": 0, "error": "no_result"}
             
             # Format message
@@ -178,46 +271,419 @@ class NotificationService:
             message = format_lottery_result(result, region)
             
             # Thêm header cho notification
-            notification_header = f"🔔 <b>THÔNG BÁO KẾT QUẢ XỔ SỐ</b>\n\n"
-            full_message = notification_header + message
+            full_message = NOTIFICATION_HEADER + message
             
         except Exception as e:
-            logger.error(f"❌ Error getting result: {e}")
+            logger.error("❌ Error getting result: %s", e)
             return {"total": len(subscribers), "success": 0, "failed": 0, "error": str(e)}
         
+        # Fan-out bị drain lần trước → gửi tiếp sau user cuối đã xử lý
+        checkpoint_key = self._checkpoint_key(province_code, result_date)
+        checkpoint = await self._load_checkpoint(checkpoint_key)
+        
+        # Chế độ gửi: direct hoặc qua channel (đăng 1 lần, copy/forward cho từng user)
+        mode = get_publish_mode(province_code, self.publish_modes)
+        channel_message_id = None
+        
+        if checkpoint:
+            mode = checkpoint["state"].get("mode", mode)
+            channel_message_id = checkpoint["state"].get("channel_message_id")
+        elif mode in CHANNEL_MODES:
+            channel_message_id = await self._publish_to_channel(full_message)
+            if channel_message_id is None:
+                logger.warning("⚠️ Channel publish failed for %s, falling back to direct send", province_code)
+                mode = "direct"
+        
         # Gửi cho từng subscriber
         success_count = 0
         failed_count = 0
+        channel_only = 0
+        
+        if mode == "follow":
+            # Subscribers theo dõi channel, không gửi riêng (không tính là gửi thành công)
+            channel_only = len(subscribers)
+            subscribers = []
+        
+        # Thứ tự user_id tăng dần: checkpoint = user cuối cùng đã xử lý
+        subscribers = sorted(subscribers, key=lambda subscriber: subscriber.user_id)
+        if checkpoint:
+            success_count, failed_count = checkpoint["success"], checkpoint["failed"]
+            subscribers = [s for s in subscribers if s.user_id > checkpoint["last_user_id"]]
+            logger.info(
+                "↩️ Resuming fan-out %s after user %s (%s done, %s left)",
+                checkpoint_key, checkpoint["last_user_id"], success_count + failed_count, len(subscribers)
+            )
         
-        for subscriber in subscribers:
+        state = {"mode": mode, "channel_message_id": channel_message_id}
+        drain = get_drain()
+        last_user_id = checkpoint["last_user_id"] if checkpoint else 0
+        interrupted = False
+        
+        async with drain.track("fanout"):
             try:
-                await self.bot.send_message(
-                    chat_id=subscriber.user_id,
-                    text=full_message,
-                    parse_mode="HTML"
-                )
-                success_count += 1
-                logger.info(f"✅ Sent to user {subscriber.user_id}")
-                
-            except TelegramError as e:
-                failed_count += 1
-                logger.error(f"❌ Failed to send to user {subscriber.user_id}: {e}")
+                for index, subscriber in enumerate(subscribers):
+                    if drain.draining:
+                        interrupted = True
+                        break
+                    
+                    try:
+                        if mode == "copy":
+                            await self.bot.copy_message(
+                                chat_id=subscriber.user_id,
+                                from_chat_id=self.channel_id,
+                                message_id=channel_message_id
+                            )
+                        elif mode == "forward":
+                            await self.bot.forward_message(
+                                chat_id=subscriber.user_id,
+                                from_chat_id=self.channel_id,
+                                message_id=channel_message_id
+                            )
+                        else:
+                            await self.bot.send_message(
+                                chat_id=subscriber.user_id,
+                                text=full_message,
+                                parse_mode="HTML"
+                            )
+                        success_count += 1
+                        logger.info("✅ Sent to user %s", subscriber.user_id)
+                        
+                    except TelegramError as e:
+                        failed_count += 1
+                        logger.error("❌ Failed to send to user %s: %s", subscriber.user_id, e)
+                    
+                    last_user_id = subscriber.user_id
+                    if (index + 1) % FANOUT_CHECKPOINT_EVERY == 0:
+                        await self._save_checkpoint(checkpoint_key, last_user_id, success_count, failed_count, state)
+            
+            except asyncio.CancelledError:
+                # Quá deadline drain: vẫn lưu vị trí đã gửi trước khi dừng
+                interrupted = True
+                raise
+            finally:
+                if interrupted:
+                    await self._save_checkpoint(checkpoint_key, last_user_id, success_count, failed_count, state)
         
         summary = {
-            "total": len(subscribers),
+            "total": success_count + failed_count,
             "success": success_count,
             "failed": failed_count,
             "province": province_code,
-            "date": str(result_date)
+            "date": str(result_date),
+            "mode": mode,
         }
+        if mode == "follow":
+            summary["channel_only"] = channel_only
+        if channel_message_id is not None:
+            summary["channel_message_id"] = channel_message_id
+        if interrupted:
+            summary["interrupted"] = True
+            logger.warning("⏸️ Fan-out %s interrupted by drain after user %s", checkpoint_key, last_user_id)
         
-        logger.info(f"📊 Notification summary: {summary}")
+        logger.info("📊 Notification summary: %s", summary)
         return summary
     
+    async def _publish_to_channel(self, text: str) -> Optional[int]:
+        """
+        Đăng tin lên broadcast channel
+        
+        Returns:
+            message_id trên channel, None nếu chưa cấu hình hoặc lỗi
+        """
+        if not self.channel_id:
+            logger.warning("⚠️ BROADCAST_CHANNEL_ID not configured")
+            return None
+        
+        try:
+            message = await self.bot.send_message(
+                chat_id=self.channel_id,
+                text=text,
+                parse_mode="HTML"
+            )
+            logger.info("📢 Published to channel %s: message %s", self.channel_id, message.message_id)
+            return message.message_id
+        except TelegramError as e:
+            logger.error("❌ Failed to publish to channel %s: %s", self.channel_id, e)
+            return None
+    
+    async def check_and_send_region_digest(
+        self,
+        region: str,
+        province_codes: List[str],
+        check_date: date = None,
+        deadline: Optional[datetime] = None
+    ) -> Optional[dict]:
+        """
+        Gửi gộp kết quả các tỉnh cùng miền: mỗi user nhận 1 tin nhắn
+        
+        Chờ tới khi tất cả tỉnh chưa gửi đều đủ giải, hoặc đã quá
+        DIGEST_WAIT_SECONDS kể từ lúc tỉnh đầu tiên đủ giải, hoặc đã tới
+        `deadline`. Mốc tỉnh đầu tiên đủ giải lưu trong DB (restart / đổi
+        worker / đổi leader vẫn giữ). Mỗi tỉnh chỉ được render 1 lần và
+        dùng chung cho tất cả users.
+        
+        Args:
+            region: Miền (MB/MT/MN)
+            province_codes: Các tỉnh quay hôm nay của miền (theo thứ tự lịch)
+            check_date: Ngày kiểm tra (mặc định: hôm nay)
+            deadline: Gửi phần đã đủ giải nếu tới thời điểm này (UTC, lần
+                check cuối của khung giờ); None = chỉ theo DIGEST_WAIT_SECONDS
+            
+        Returns:
+            Dict thống kê nếu đã gửi, None nếu chưa gửi
+        """
+        if check_date is None:
+            check_date = date.today()
+        
+        logger.info("🔍 Checking digest for %s - %s: %s", region, check_date, province_codes)
+        
+        # 1. Bỏ qua các tỉnh đã gửi
+        pending = []
+        for province_code in province_codes:
+            if await self._already_sent(province_code, check_date):
+                logger.info("⏭️  Already sent %s - %s, skipping", province_code, check_date)
+            else:
+                pending.append(province_code)
+        
+        if not pending:
+            return None
+        
+        # 2. Tỉnh nào đã đủ giải
+        ready: Dict[str, dict] = {}
+        for province_code in pending:
+            try:
+                result = await self._get_complete_result(province_code, check_date)
+                if result:
+                    ready[province_code] = result
+            except Exception as e:
+                logger.error("❌ Error checking %s: %s", province_code, e)
+        
+        if not ready:
+            return None
+        
+        # 3. Tin gộp gửi dở (bị drain) → gửi tiếp đúng bộ tỉnh đó, không chờ thêm
+        checkpoint = await self._load_checkpoint(self._checkpoint_key(f"digest:{region}", check_date))
+        if checkpoint:
+            ready = {code: ready[code] for code in checkpoint["state"]["provinces"] if code in ready}
+        
+        # 4. Chờ các tỉnh còn lại, tối đa DIGEST_WAIT_SECONDS và không quá lần check cuối
+        wait_key = self._checkpoint_key(f"digest_wait:{region}", check_date)
+        now = datetime.utcnow()
+        send_by = await self._digest_first_ready(wait_key, now) + timedelta(seconds=DIGEST_WAIT_SECONDS)
+        if deadline is not None:
+            send_by = min(send_by, deadline)
+        
+        if not checkpoint and len(ready) < len(pending) and now < send_by:
+            logger.info(
+                "⏳ Digest %s: %s/%s provinces ready, waiting for siblings (%ss left)",
+                region, len(ready), len(pending), int((send_by - now).total_seconds())
+            )
+            return None
+        
+        # 5. Gửi
+        summary = await self.send_region_digest(region, ready, check_date)
+        if summary.get("interrupted"):
+            return summary
+        
+        # 6. Đánh dấu đã gửi từng tỉnh
+        for province_code, province_summary in summary.get("provinces", {}).items():
+            if province_summary.get("success", 0) > 0:
+                await self._mark_as_sent(province_code, check_date, province_summary)
+        await self._clear_checkpoint(self._checkpoint_key(f"digest:{region}", check_date))
+        
+        if len(ready) == len(pending):
+            await self._clear_checkpoint(wait_key)
+        
+        return summary
+    
+    async def send_region_digest(
+        self,
+        region: str,
+        results: Dict[str, dict],
+        result_date: date
+    ) -> dict:
+        """
+        Gửi 1 tin nhắn gộp cho mỗi user đăng ký ít nhất 1 tỉnh trong results
+        
+        Args:
+            region: Miền (MB/MT/MN)
+            results: {province_code: result dict} theo thứ tự hiển thị
+            result_date: Ngày mở thưởng
+            
+        Returns:
+            Dict thống kê tổng + thống kê theo từng tỉnh (key "provinces")
+        """
+        province_summaries = {
+            code: {"total": 0, "success": 0, "failed": 0, "province": code, "date": str(result_date)}
+            for code in results
+        }
+        summary = {
+            "region": region,
+            "date": str(result_date),
+            "users": 0,
+            "messages": 0,
+            "success": 0,
+            "failed": 0,
+            "provinces": province_summaries,
+        }
+        
+        if self.bot is None:
+            logger.error("Bot instance not provided!")
+            summary["error"] = "no_bot"
+            return summary
+        
+        # Render mỗi tỉnh 1 lần, dùng chung cho tất cả users
+        blocks = {
+            code: format_lottery_result(result, PROVINCES.get(code, {}).get("region", region))
+            for code, result in results.items()
+        }
+        
+        subscriptions = await self.subscription_service.get_subscribers_by_provinces(list(results))
+        
+        # Gom các tỉnh theo user (giữ thứ tự tỉnh theo lịch)
+        order = {code: idx for idx, code in enumerate(results)}
+        provinces_by_user = defaultdict(set)
+        for sub in subscriptions:
+            provinces_by_user[sub.user_id].add(sub.province_code)
+        
+        summary["users"] = len(provinces_by_user)
+        
+        # Thứ tự user_id tăng dần; gửi dở lần trước → tiếp tục sau user cuối đã xử lý
+        checkpoint_key = self._checkpoint_key(f"digest:{region}", result_date)
+        checkpoint = await self._load_checkpoint(checkpoint_key)
+        last_user_id = 0
+        if checkpoint:
+            last_user_id = checkpoint["last_user_id"]
+            summary = {**checkpoint["state"]["summary"], "users": summary["users"]}
+            province_summaries = summary["provinces"]
+            logger.info("↩️ Resuming digest %s after user %s", checkpoint_key, last_user_id)
+        
+        user_ids = sorted(user_id for user_id in provinces_by_user if user_id > last_user_id)
+        drain = get_drain()
+        interrupted = False
+        
+        def state() -> dict:
+            return {"provinces": list(results), "summary": summary}
+        
+        async with drain.track("fanout"):
+            try:
+                for index, user_id in enumerate(user_ids):
+                    if drain.draining:
+                        interrupted = True
+                        break
+                    
+                    codes = sorted(provinces_by_user[user_id], key=order.get)
+                    messages = build_digest_messages([blocks[code] for code in codes])
+                    
+                    sent_ok = True
+                    for text in messages:
+                        try:
+                            await self.bot.send_message(
+                                chat_id=user_id,
+                                text=text,
+                                parse_mode="HTML"
+                            )
+                            summary["messages"] += 1
+                        except TelegramError as e:
+                            sent_ok = False
+                            logger.error("❌ Failed to send digest to user %s: %s", user_id, e)
+                            break
+                    
+                    summary["success" if sent_ok else "failed"] += 1
+                    for code in codes:
+                        province_summaries[code]["total"] += 1
+                        province_summaries[code]["success" if sent_ok else "failed"] += 1
+                    
+                    last_user_id = user_id
+                    if (index + 1) % FANOUT_CHECKPOINT_EVERY == 0:
+                        await self._save_checkpoint(
+                            checkpoint_key, last_user_id, summary["success"], summary["failed"], state()
+                        )
+            
+            except asyncio.CancelledError:
+                interrupted = True
+                raise
+            finally:
+                if interrupted:
+                    await self._save_checkpoint(
+                        checkpoint_key, last_user_id, summary["success"], summary["failed"], state()
+                    )
+        
+        if interrupted:
+            summary["interrupted"] = True
+            logger.warning("⏸️ Digest %s interrupted by drain after user %s", checkpoint_key, last_user_id)
+        
+        logger.info(
+            "📊 Digest summary %s: %s users, %s messages, %s provinces",
+            region, summary['users'], summary['messages'], len(results)
+        )
+        return summary
+    
+    async def _digest_first_ready(self, key: str, now: datetime) -> datetime:
+        """Thời điểm (UTC) tỉnh đầu tiên của miền đủ giải; lần đầu gọi → ghi `now`"""
+        checkpoint = await self._load_checkpoint(key)
+        if checkpoint and checkpoint["state"].get("first_ready"):
+            return datetime.fromisoformat(checkpoint["state"]["first_ready"])
+        
+        await self._save_checkpoint(key, 0, 0, 0, {"first_ready": now.isoformat()})
+        return now
+    
+    @staticmethod
+    def _checkpoint_key(scope: str, result_date: date) -> str:
+        """"MB:2026-10-19" / "digest:MN:2026-10-19" """
+        return f"{scope}:{result_date}"
+    
+    async def _load_checkpoint(self, key: str) -> Optional[dict]:
+        """Checkpoint fan-out gửi dở: {"last_user_id", "success", "failed", "state"} hoặc None"""
+        try:
+            async with DatabaseSession(read_only=True, fresh=True) as session:
+                checkpoint = await session.get(NotificationCheckpoint, key)
+                if checkpoint is None:
+                    return None
+                return {
+                    "last_user_id": checkpoint.last_user_id,
+                    "success": checkpoint.success_count,
+                    "failed": checkpoint.failed_count,
+                    "state": checkpoint.state or {},
+                }
+        except Exception as e:
+            logger.error("Error loading checkpoint %s: %s", key, e)
+            return None
+    
+    async def _save_checkpoint(self, key: str, last_user_id: int, success: int, failed: int, state: dict):
+        """Ghi vị trí fan-out (user cuối cùng đã xử lý)"""
+        async def _upsert(session):
+            checkpoint = await session.get(NotificationCheckpoint, key)
+            if checkpoint is None:
+                checkpoint = NotificationCheckpoint(key=key)
+                session.add(checkpoint)
+            checkpoint.last_user_id = last_user_id
+            checkpoint.success_count = success
+            checkpoint.failed_count = failed
+            checkpoint.state = state
+            checkpoint.updated_at = datetime.utcnow()
+            await session.flush()
+        
+        try:
+            await run_write(_upsert)
+            logger.info("💾 Checkpoint %s: user %s (%s ok, %s failed)", key, last_user_id, success, failed)
+        except Exception as e:
+            logger.error("Error saving checkpoint %s: %s", key, e)
+    
+    async def _clear_checkpoint(self, key: str):
+        """Xóa checkpoint khi fan-out đã hoàn tất"""
+        async def _delete(session):
+            await session.execute(delete(NotificationCheckpoint).where(NotificationCheckpoint.key == key))
+        
+        try:
+            await run_write(_delete)
+        except Exception as e:
+            logger.error("Error clearing checkpoint %s: %s", key, e)
+    
     async def _already_sent(self, province_code: str, result_date: date) -> bool:
-        """Kiểm tra đã gửi thông báo chưa"""
+        """Kiểm tra đã gửi thông báo chưa (đọc primary: replica trễ → gửi trùng)"""
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True, fresh=True) as session:
                 query = select(NotificationLog).where(
                     and_(
                         NotificationLog.province_code == province_code,
@@ -231,7 +697,7 @@ class NotificationService:
                 return log is not None
                 
         except Exception as e:
-            logger.error(f"Error checking notification log: {e}")
+            logger.error("Error checking notification log: %s", e)
             return False
     
     async def _mark_as_sent(
@@ -241,24 +707,24 @@ class NotificationService:
         summary: dict
     ):
         """Đánh dấu đã gửi thông báo"""
+        async def _insert_log(session):
+            session.add(NotificationLog(
+                province_code=province_code,
+                result_date=result_date,
+                sent_at=datetime.utcnow(),
+                total_sent=summary.get("total", 0),
+                success_count=summary.get("success", 0),
+                failed_count=summary.get("failed", 0)
+            ))
+            await session.flush()
+        
         try:
-            async with DatabaseSession() as session:
-                log = NotificationLog(
-                    province_code=province_code,
-                    result_date=result_date,
-                    sent_at=datetime.utcnow(),
-                    total_sent=summary.get("total", 0),
-                    success_count=summary.get("success", 0),
-                    failed_count=summary.get("failed", 0)
-                )
-                
-                session.add(log)
-                await session.commit()
-                
-                logger.info(f"✅ Marked as sent: {province_code} - {result_date}")
+            await run_write(_insert_log)
+            
+            logger.info("✅ Marked as sent: %s - %s", province_code, result_date)
                 
         except Exception as e:
-            logger.error(f"Error marking as sent: {e}")
+            logger.error("Error marking as sent: %s", e)
     
     async def send_test_notification(self, user_id: int, province_code: str) -> bool:
         """Gửi thông báo test"""
@@ -290,9 +756,9 @@ class NotificationService:
                 parse_mode="HTML"
             )
             
-            logger.info(f"✅ Sent test notification to user {user_id}")
+            logger.info("✅ Sent test notification to user %s", user_id)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error sending test notification: {e}")
+            logger.error("❌ Error sending test notification: %s", e)
             return False
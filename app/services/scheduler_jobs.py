@@ -5,20 +5,31 @@ from datetime import date, datetime
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from zoneinfo import ZoneInfo
 
-from app.config import PROVINCES, SCHEDULE
+from app.config import PROVINCES, SCHEDULE, USE_DATABASE, get_publish_mode
+from app.database.config import get_database_url
+from app.database.partitioning import ensure_partitions
 from app.services.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
 
+# Mỗi miền check mỗi 3 phút trong khung giờ quay (6 lần)
+CHECK_MINUTES = '30,33,36,39,42,45'
+LAST_CHECK_MINUTE = 45
+
 
 class SchedulerJobs:
     """Quản lý các scheduled jobs"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, job_queue=None, leader=None):
         self.scheduler = AsyncIOScheduler()
         self.notification_service = NotificationService(bot=bot)
+        # Có job_queue: chỉ enqueue, worker processes sẽ xử lý (xem app/worker.py)
+        self.job_queue = job_queue
+        # Có leader (LeaderElection): chỉ replica giữ lease mới chạy jobs
+        self.leader = leader
     
     def setup_jobs(self):
         """Thiết lập các jobs"""
@@ -30,7 +41,7 @@ class SchedulerJobs:
             self.check_mb_new_results,
             CronTrigger(
                 hour=18,
-                minute='30,33,36,39,42,45',
+                minute=CHECK_MINUTES,
                 timezone=vietnam_tz
             ),
             id='check_mb_results',
@@ -43,7 +54,7 @@ class SchedulerJobs:
             self.check_mt_new_results,
             CronTrigger(
                 hour=17,
-                minute='30,33,36,39,42,45',
+                minute=CHECK_MINUTES,
                 timezone=vietnam_tz
             ),
             id='check_mt_results',
@@ -56,7 +67,7 @@ class SchedulerJobs:
             self.check_mn_new_results,
             CronTrigger(
                 hour=16,
-                minute='30,33,36,39,42,45',
+                minute=CHECK_MINUTES,
                 timezone=vietnam_tz
             ),
             id='check_mn_results',
@@ -64,6 +75,28 @@ class SchedulerJobs:
             replace_existing=True
         )
         
+        if self.leader:
+            # Gia hạn lease định kỳ; chạy ngay để bầu leader khi khởi động
+            self.scheduler.add_job(
+                self.leader.acquire_or_renew,
+                IntervalTrigger(seconds=self.leader.renew_interval),
+                id='renew_scheduler_lease',
+                name='Gia hạn scheduler lease',
+                next_run_time=datetime.now(vietnam_tz),
+                replace_existing=True
+            )
+        
+        if USE_DATABASE and get_database_url().startswith("postgresql"):
+            # Postgres: tạo trước partition năm hiện tại + năm sau cho lịch sử lô
+            self.scheduler.add_job(
+                self.ensure_history_partitions,
+                CronTrigger(hour=3, minute=0, timezone=vietnam_tz),
+                id='ensure_history_partitions',
+                name='Tạo partition năm mới (03:00)',
+                next_run_time=datetime.now(vietnam_tz),
+                replace_existing=True
+            )
+        
         logger.info("✅ Scheduler jobs đã được thiết lập (HIGH FREQUENCY MODE - GIỜ VIỆT NAM)")
         logger.info("   🕐 MB: 18:30-18:48 VN (mỗi 3 phút, 6 lần)")
         logger.info("   🕐 MT: 17:30-17:48 VN (mỗi 3 phút, 6 lần)")
@@ -72,28 +105,27 @@ class SchedulerJobs:
     async def check_mb_new_results(self):
         """Check kết quả Miền Bắc mới (18:10-18:45)"""
         current_time = datetime.now().strftime("%H:%M")
-        logger.info(f"🔍 [{current_time}] Checking MB new results...")
+        logger.info("🔍 [%s] Checking MB new results...", current_time)
+        
+        if not await self._is_leader():
+            logger.info("⏭️  [%s] MB: not scheduler leader, skipping", current_time)
+            return
         
         today = date.today()
         
-        try:
-            summary = await self.notification_service.check_and_send_if_new_result(
-                province_code="MB",
-                check_date=today
-            )
-            
-            if summary:
-                logger.info(f"✅ [{current_time}] MB notification sent: {summary}")
-            else:
-                logger.info(f"ℹ️ [{current_time}] MB: No new complete result or already sent")
-                
-        except Exception as e:
-            logger.error(f"❌ Error checking MB: {e}")
+        summary = await self._check_province("MB", today, current_time)
+        
+        if summary is None and not self.job_queue:
+            logger.info("ℹ️ [%s] MB: No new complete result or already sent", current_time)
     
     async def check_mt_new_results(self):
         """Check kết quả Miền Trung mới (17:20-17:45)"""
         current_time = datetime.now().strftime("%H:%M")
-        logger.info(f"🔍 [{current_time}] Checking MT new results...")
+        logger.info("🔍 [%s] Checking MT new results...", current_time)
+        
+        if not await self._is_leader():
+            logger.info("⏭️  [%s] MT: not scheduler leader, skipping", current_time)
+            return
         
         today = date.today()
         weekday = today.weekday()
@@ -102,25 +134,23 @@ class SchedulerJobs:
         # Lấy tỉnh Miền Trung quay hôm nay
         provinces_today = SCHEDULE["MT"].get(schedule_day, [])
         
-        logger.info(f"📋 MT provinces today: {provinces_today}")
+        logger.info("📋 MT provinces today: %s", provinces_today)
+        
+        if self.notification_service.digest_enabled:
+            await self._check_region_digest("MT", provinces_today, today, current_time)
+            return
         
         for province_code in provinces_today:
-            try:
-                summary = await self.notification_service.check_and_send_if_new_result(
-                    province_code=province_code,
-                    check_date=today
-                )
-                
-                if summary:
-                    logger.info(f"✅ [{current_time}] {province_code} sent: {summary}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error checking {province_code}: {e}")
+            await self._check_province(province_code, today, current_time)
     
     async def check_mn_new_results(self):
         """Check kết quả Miền Nam mới (16:20-16:45)"""
         current_time = datetime.now().strftime("%H:%M")
-        logger.info(f"🔍 [{current_time}] Checking MN new results...")
+        logger.info("🔍 [%s] Checking MN new results...", current_time)
+        
+        if not await self._is_leader():
+            logger.info("⏭️  [%s] MN: not scheduler leader, skipping", current_time)
+            return
         
         today = date.today()
         weekday = today.weekday()
@@ -129,20 +159,116 @@ class SchedulerJobs:
         # Lấy tỉnh Miền Nam quay hôm nay
         provinces_today = SCHEDULE["MN"].get(schedule_day, [])
         
-        logger.info(f"📋 MN provinces today: {provinces_today}")
+        logger.info("📋 MN provinces today: %s", provinces_today)
+        
+        if self.notification_service.digest_enabled:
+            await self._check_region_digest("MN", provinces_today, today, current_time)
+            return
+        
+        for province_code in provinces_today:
+            await self._check_province(province_code, today, current_time)
+    
+    async def ensure_history_partitions(self):
+        """Đảm bảo có partition cho năm hiện tại và năm sau"""
+        if not await self._is_leader():
+            return
+        
+        try:
+            await ensure_partitions(years_ahead=1)
+        except Exception as e:
+            logger.error("❌ Error ensuring history partitions: %s", e)
+    
+    async def _is_leader(self) -> bool:
+        """Xác nhận lại lease trước mỗi lần chạy (không có leader election → luôn True)"""
+        if not self.leader:
+            return True
+        return await self.leader.acquire_or_renew()
+    
+    async def _check_province(self, province_code, today, current_time):
+        """Check và gửi 1 tỉnh (hoặc enqueue cho worker nếu có job_queue)"""
+        if self.job_queue:
+            # Khóa theo tỉnh + ngày: lần check sau không enqueue khi job trước còn chạy
+            await self._enqueue_after_ingest(
+                [province_code], today, "notify_province",
+                {"province_code": province_code, "check_date": today.isoformat()},
+                dedupe_key=f"notify_province:{province_code}:{today}"
+            )
+            return None
         
+        try:
+            summary = await self.notification_service.check_and_send_if_new_result(
+                province_code=province_code,
+                check_date=today
+            )
+            
+            if summary:
+                logger.info("✅ [%s] %s sent: %s", current_time, province_code, summary)
+            
+            return summary
+                
+        except Exception as e:
+            logger.error("❌ Error checking %s: %s", province_code, e)
+            return None
+    
+    async def _enqueue_after_ingest(self, province_codes, today, kind, payload, dedupe_key):
+        """
+        Enqueue ingest_province cho từng tỉnh; worker ingest xong mới enqueue
+        job notify (kind, payload), xem build_default_handlers
+        """
+        follow_up = {"kind": kind, "payload": payload, "dedupe_key": dedupe_key}
+        for province_code in province_codes:
+            await self.job_queue.enqueue(
+                "ingest_province",
+                {"province_code": province_code, "check_date": today.isoformat(), "then": follow_up},
+                dedupe_key=f"ingest_province:{province_code}:{today}"
+            )
+    
+    async def _check_region_digest(self, region, provinces_today, today, current_time):
+        """Gửi gộp kết quả cả miền (chế độ digest)"""
+        # Tỉnh đăng qua broadcast channel dùng chung 1 payload, không gộp digest
+        digest_provinces = []
         for province_code in provinces_today:
-            try:
-                summary = await self.notification_service.check_and_send_if_new_result(
-                    province_code=province_code,
-                    check_date=today
+            if get_publish_mode(province_code, self.notification_service.publish_modes) == "direct":
+                digest_provinces.append(province_code)
+            else:
+                await self._check_province(province_code, today, current_time)
+        
+        if not digest_provinces:
+            return
+        
+        # Lần check cuối của khung giờ: gửi phần đã đủ giải, không chờ tỉnh chậm
+        # (UTC; giờ VN lệch số giờ chẵn nên phút giữ nguyên)
+        deadline = datetime.utcnow().replace(minute=LAST_CHECK_MINUTE, second=0, microsecond=0)
+        
+        if self.job_queue:
+            await self._enqueue_after_ingest(
+                digest_provinces, today, "notify_region_digest",
+                {
+                    "region": region,
+                    "province_codes": digest_provinces,
+                    "check_date": today.isoformat(),
+                    "deadline": deadline.isoformat(),
+                },
+                dedupe_key=f"notify_region_digest:{region}:{today}"
+            )
+            return
+        
+        try:
+            summary = await self.notification_service.check_and_send_region_digest(
+                region=region,
+                province_codes=digest_provinces,
+                check_date=today,
+                deadline=deadline
+            )
+            
+            if summary:
+                logger.info(
+                    "✅ [%s] %s digest sent: %s users, %s messages",
+                    current_time, region, summary.get('users', 0), summary.get('messages', 0)
                 )
                 
-                if summary:
-                    logger.info(f"✅ [{current_time}] {province_code} sent: {summary}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error checking {province_code}: {e}")
+        except Exception as e:
+            logger.error("❌ Error checking %s digest: %s", region, e)
     
     def start(self):
         """Khởi động scheduler"""
@@ -151,6 +277,16 @@ class SchedulerJobs:
         logger.info("   ⏰ Chỉ check trong khung giờ cụ thể")
         logger.info("   ✅ Kiểm tra đủ giải mới gửi")
     
+    def pause(self):
+        """Không chạy job mới (drain); job đang chạy vẫn chạy tiếp
+
+        shutdown() của AsyncIOScheduler hủy các coroutine job đang chạy, nên
+        khi drain chỉ pause trước rồi shutdown sau khi fan-out đã xong.
+        """
+        if self.scheduler.running:
+            self.scheduler.pause()
+            logger.info("⏸️ Scheduler paused")
+    
     def shutdown(self):
         """Tắt scheduler"""
         self.scheduler.shutdown()
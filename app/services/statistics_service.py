@@ -3,24 +3,126 @@
 import logging
 from typing import Dict, List, Optional
 
+from app.services.analytics.executor import AnalyticsBusy
+
 logger = logging.getLogger(__name__)
 
 
+def compute_streaks(
+    draw_dates: List,
+    rows: List[tuple],
+    numbers: Optional[List[str]] = None,
+    min_streak: int = 2,
+    limit: int = 15
+) -> dict:
+    """
+    Chuỗi liên tiếp (thuần, không I/O - chạy trong AnalyticsExecutor)
+
+    Args:
+        draw_dates: Các ngày quay sắp tăng dần
+        rows: [(draw_date, number)]
+        numbers: Các số cần xét (None = mọi số có trong rows)
+        min_streak: Ngưỡng tối thiểu
+        limit: Số dòng tối đa mỗi danh sách
+
+    Returns:
+        Dict {current_streaks: [...], max_streaks: [...]}
+    """
+    draws_by_date = {}
+    for draw_date, number in rows:
+        if draw_date not in draws_by_date:
+            draws_by_date[draw_date] = set()
+        draws_by_date[draw_date].add(number)
+
+    if numbers is None:
+        numbers = sorted({number for _, number in rows})
+
+    current_streaks = {}
+    max_streaks = {}
+
+    for number in numbers:
+        temp_streak = 0
+        temp_start = None
+        max_streak_val = 0
+        max_streak_date = None
+
+        for draw_date in draw_dates:
+            if number in draws_by_date.get(draw_date, set()):
+                if temp_streak == 0:
+                    temp_start = draw_date
+                temp_streak += 1
+                if temp_streak > max_streak_val:
+                    max_streak_val = temp_streak
+                    max_streak_date = draw_date
+            else:
+                temp_streak = 0
+
+        # Current streak (cuối cùng)
+        if temp_streak >= min_streak:
+            current_streaks[number] = {
+                "streak": temp_streak,
+                "start_date": temp_start,
+                "end_date": draw_dates[-1]
+            }
+
+        # Max streak (lịch sử)
+        if max_streak_val >= min_streak:
+            max_streaks[number] = {
+                "max_streak": max_streak_val,
+                "last_streak_date": max_streak_date
+            }
+
+    current_list = [
+        {
+            "number": n,
+            "streak": d["streak"],
+            "start_date": d["start_date"].strftime("%d/%m/%Y"),
+            "end_date": d["end_date"].strftime("%d/%m/%Y")
+        }
+        for n, d in sorted(current_streaks.items(), key=lambda x: x[1]["streak"], reverse=True)
+    ][:limit]
+
+    max_list = [
+        {
+            "number": n,
+            "max_streak": d["max_streak"],
+            "last_streak_date": d["last_streak_date"].strftime("%d/%m/%Y")
+        }
+        for n, d in sorted(max_streaks.items(), key=lambda x: x[1]["max_streak"], reverse=True)
+    ][:limit]
+
+    return {"current_streaks": current_list, "max_streaks": max_list}
+
+
 class StatisticsService:
     """Service for lottery statistics and analysis"""
     
     def __init__(self, use_database: bool = False):
         self.use_database = use_database
         self.db_service = None
+        self.region_service = None
+        self.presence_service = None
+        self.cooccurrence_service = None
+        self.transition_service = None
+        self.de_service = None
+        self.gap_score_service = None
         
         # Initialize database service if enabled
         if use_database:
             try:
                 from .db.statistics_db_service import StatisticsDBService
+                from .db.region_rollup_service import RegionRollupService
+                from .analytics import CooccurrenceService, DeService, GapScoreService, PresenceService, TransitionService
                 self.db_service = StatisticsDBService()
+                self.region_service = RegionRollupService()
+                self.presence_service = PresenceService()
+                self.cooccurrence_service = CooccurrenceService()
+                self.transition_service = TransitionService()
+                self.de_service = DeService()
+                self.gap_score_service = GapScoreService(self.cooccurrence_service)
                 logger.info("✅ Database statistics enabled")
             except Exception as e:
-                logger.warning(f"⚠️  Database statistics disabled: {e}")
+                logger.warning("⚠️  Database statistics disabled: %s", e)
                 self.use_database = False
 
     def analyze_lo_2_so(self, result_data: dict) -> dict:
@@ -96,7 +198,7 @@ class StatisticsService:
             }
 
         except Exception as e:
-            logger.error(f"Error analyzing lo 2 so: {e}")
+            logger.error("Error analyzing lo 2 so: %s", e)
             return {
                 'all_numbers': [],
                 'frequency': {},
@@ -155,7 +257,7 @@ class StatisticsService:
             }
 
         except Exception as e:
-            logger.error(f"Error analyzing lo 3 so: {e}")
+            logger.error("Error analyzing lo 3 so: %s", e)
             return {
                 'all_numbers': [],
                 'frequency': {},
@@ -181,14 +283,14 @@ class StatisticsService:
         # Use database if available
         if self.use_database and self.db_service:
             try:
-                logger.info(f"Getting frequency stats from DB for {province_code} ({days} days)")
+                logger.info("Getting frequency stats from DB for %s (%s days)", province_code, days)
                 frequency = await self.db_service.get_lo2so_frequency(province_code, days)
                 return frequency
             except Exception as e:
-                logger.warning(f"⚠️  DB query failed, using mock data: {e}")
+                logger.warning("⚠️  DB query failed, using mock data: %s", e)
         
         # Fallback to mock data
-        logger.info(f"Getting frequency stats (mock) for {province_code} over {days} days")
+        logger.info("Getting frequency stats (mock) for %s over %s days", province_code, days)
         
         import random
         random.seed(hash(str(province_code) + str(days)))
@@ -200,6 +302,113 @@ class StatisticsService:
         
         return stats
     
+    async def get_region_frequency(self, region: str, days: int = 30) -> dict:
+        """
+        Tần suất lô 2 số của cả miền (MB, MT, MN) từ region rollup
+
+        Args:
+            region: Mã miền
+            days: Số ngày phân tích
+
+        Returns:
+            Frequency stats dict {number: count}
+        """
+        if self.region_service:
+            return await self.region_service.get_region_frequency(region, days)
+
+        # Không có database: mock data như get_frequency_stats
+        return await self.get_frequency_stats(region, days)
+
+    async def get_region_head_tail(self, region: str, days: int = 30) -> dict:
+        """Số lần về theo đầu/đuôi của cả miền ({"head": [10], "tail": [10]})"""
+        if self.region_service:
+            return await self.region_service.get_region_head_tail(region, days)
+        return {"head": [0] * 10, "tail": [0] * 10}
+
+    async def get_region_lo_gan(self, region: str, draws: int = 200, limit: int = 15) -> list:
+        """Lô gan của cả miền trong `draws` ngày quay gần nhất"""
+        if self.region_service:
+            return await self.region_service.get_region_lo_gan(region, draws, limit)
+        return []
+
+    async def get_national_gan(self, min_gan: int = 6, min_provinces: int = 3, limit: int = 20) -> list:
+        """Số đang gan ≥ `min_gan` kỳ ở ít nhất `min_provinces` tỉnh MN/MT (presence tensor)"""
+        if self.presence_service:
+            return await self.presence_service.get_gan_everywhere(min_gan, min_provinces, limit=limit)
+        return []
+
+    async def get_national_hot(self, draws: int = 30, limit: int = 20) -> list:
+        """Số về nhiều nhất trên mọi tỉnh MN/MT trong `draws` kỳ gần nhất"""
+        if self.presence_service:
+            return await self.presence_service.get_cross_province_hot(draws, limit=limit)
+        return []
+
+    async def get_lo_gan_scored(self, province_code: str, limit: int = 15) -> list:
+        """Lô gan xếp theo xác suất gan (phân phối gap của từng số trên toàn bộ lịch sử)"""
+        if self.gap_score_service:
+            return await self.gap_score_service.get_scores(province_code, limit)
+        return []
+
+    async def get_lo_xien(self, province_code: str, draws: Optional[int] = 200, limit: int = 15) -> list:
+        """Cặp lô xiên (2 số về cùng kỳ) nhiều nhất trong `draws` kỳ gần nhất (None = toàn bộ)"""
+        if self.cooccurrence_service:
+            return await self.cooccurrence_service.get_top_pairs(province_code, draws, limit)
+        return []
+
+    async def get_lo_xien_partners(
+        self,
+        province_code: str,
+        number: str,
+        draws: Optional[int] = 200,
+        limit: int = 10
+    ) -> list:
+        """Các số hay về cùng kỳ với `number`"""
+        if self.cooccurrence_service:
+            return await self.cooccurrence_service.get_partners(province_code, number, draws, limit)
+        return []
+
+    async def get_bac_nho(self, province_code: str, draws: Optional[int] = 200, limit: int = 10) -> dict:
+        """Bạc nhớ: số hay về ở kỳ sau, theo bộ số của kỳ mới nhất (transition matrix)"""
+        if self.transition_service:
+            return await self.transition_service.get_next_after_latest(province_code, draws, limit)
+        return {}
+
+    async def get_bac_nho_number(
+        self,
+        province_code: str,
+        number: str,
+        draws: Optional[int] = 200,
+        limit: int = 10
+    ) -> dict:
+        """Bạc nhớ theo 1 số: kỳ sau hay về gì khi `number` về"""
+        if self.transition_service:
+            return await self.transition_service.get_next_after(province_code, number, draws, limit)
+        return {"occurrences": 0, "next": []}
+
+    async def get_de_gan(self, province_code: str, draws: Optional[int] = None, limit: int = 20) -> list:
+        """Đề gan (2 số cuối giải ĐB lâu chưa về) - None = toàn bộ lịch sử"""
+        if self.de_service:
+            return await self.de_service.get_gan(province_code, draws, limit)
+        return []
+
+    async def get_de_distributions(self, province_code: str, draws: Optional[int] = 100) -> dict:
+        """Đầu / đuôi / tổng / chạm đề trong `draws` kỳ gần nhất"""
+        if self.de_service:
+            return await self.de_service.get_distributions(province_code, draws)
+        return {}
+
+    async def get_de_streaks(self, province_code: str, draws: Optional[int] = None) -> dict:
+        """Chuỗi bệt đề: chẵn-lẻ, to-nhỏ, đầu, đuôi, tổng"""
+        if self.de_service:
+            return await self.de_service.get_streaks(province_code, draws)
+        return {}
+
+    async def get_de_latest(self, province_code: str, count: int = 10) -> list:
+        """`count` số đề gần nhất (mới → cũ)"""
+        if self.de_service:
+            return await self.de_service.get_latest(province_code, count)
+        return []
+
     async def get_lo3so_frequency_stats(
         self, 
         province_code: str, 
@@ -218,15 +427,15 @@ class StatisticsService:
         # Use database if available
         if self.use_database and self.db_service:
             try:
-                logger.info(f"Getting lo3so frequency stats from DB for {province_code} ({days} days)")
+                logger.info("Getting lo3so frequency stats from DB for %s (%s days)", province_code, days)
                 frequency = await self.db_service.get_lo3so_frequency_stats(province_code, days)
                 return frequency
             except Exception as e:
-                logger.warning(f"⚠️  DB query failed for lo3so: {e}")
+                logger.warning("⚠️  DB query failed for lo3so: %s", e)
                 return {}
     
         # No fallback - return empty if DB not available
-        logger.warning(f"Database not enabled for lo3so frequency stats")
+        logger.warning("Database not enabled for lo3so frequency stats")
         return {}
     async def get_lo_gan(
         self, 
@@ -250,18 +459,20 @@ class StatisticsService:
         # Use database if available
         if self.use_database and self.db_service:
             try:
-                logger.info(f"Getting lô gan from DB for {province_code} ({draws} draws)")
+                logger.info("Getting lô gan from DB for %s (%s draws)", province_code, draws)
                 lo_gan = await self.db_service.get_lo_gan(
                     province_code,
                     draws=draws,
                     limit=limit
                 )
                 return lo_gan
+            except AnalyticsBusy:
+                raise
             except Exception as e:
-                logger.warning(f"⚠️  DB query failed, using mock data: {e}")
+                logger.warning("⚠️  DB query failed, using mock data: %s", e)
         
         # Fallback to mock data
-        logger.info(f"Getting lô gan (mock) for {province_code}")
+        logger.info("Getting lô gan (mock) for %s", province_code)
         
         import random
         random.seed(hash(str(province_code) + str(draws)))
@@ -305,11 +516,11 @@ class StatisticsService:
         # Use database if available
         if self.use_database and self.db_service:
             try:
-                logger.info(f"Getting hot numbers from DB for {province_code} ({days} days)")
+                logger.info("Getting hot numbers from DB for %s (%s days)", province_code, days)
                 hot = await self.db_service.get_hot_numbers(province_code, days, limit)
                 return hot
             except Exception as e:
-                logger.warning(f"⚠️  DB query failed, using mock data: {e}")
+                logger.warning("⚠️  DB query failed, using mock data: %s", e)
         
         # Fallback to mock data
         frequency = await self.get_frequency_stats(province_code, days)
@@ -340,6 +551,30 @@ class StatisticsService:
             lines.append(f"• <b>{num}</b>: {count} lần")
 
         return "\n".join(lines)
+    async def _recent_draw_dates(self, session, model, province_code: str, draws: int) -> List:
+        """
+        Ngày của `draws` kỳ quay gần nhất (cũ → mới)
+        
+        Có cận dưới draw_date để Postgres chỉ quét partition các năm gần đây;
+        dữ liệu thưa hơn lịch quay (thiếu kỳ) → truy vấn lại không giới hạn.
+        """
+        from datetime import date
+        from sqlalchemy import select, and_
+        from app.utils.lottery_helpers import draw_window_start
+        
+        def recent(*conditions):
+            return select(model.draw_date).where(
+                and_(model.province_code == province_code, *conditions)
+            ).distinct().order_by(model.draw_date.desc()).limit(draws)
+        
+        start = draw_window_start(province_code, draws, date.today())
+        draw_dates = (await session.execute(recent(model.draw_date >= start))).scalars().all()
+        
+        if len(draw_dates) < draws:
+            draw_dates = (await session.execute(recent())).scalars().all()
+        
+        return sorted(draw_dates)
+    
     async def get_lo2so_streaks(self, province_code: str, draws: int = 200, min_streak: int = 2) -> dict:
         """
         Phân tích chuỗi liên tiếp cho lô 2 số
@@ -354,186 +589,75 @@ class StatisticsService:
         """
         from app.database import DatabaseSession
         from app.models.lottery_result import Lo2SoHistory, Lo3SoHistory
+        from app.services.analytics.executor import get_analytics_executor
         from sqlalchemy import select, and_
         
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
                 # Lấy danh sách ngày quay
-                date_query = select(Lo2SoHistory.draw_date).where(
-                    Lo2SoHistory.province_code == province_code
-                ).distinct().order_by(Lo2SoHistory.draw_date.desc()).limit(draws)
-                
-                date_result = await session.execute(date_query)
-                draw_dates = sorted([row[0] for row in date_result.fetchall()])
+                draw_dates = await self._recent_draw_dates(session, Lo2SoHistory, province_code, draws)
                 
                 if not draw_dates:
                     return {"current_streaks": [], "max_streaks": []}
                 
                 # Lấy dữ liệu lô 2 số
                 data_query = select(Lo2SoHistory.draw_date, Lo2SoHistory.number).where(
-                    and_(Lo2SoHistory.province_code == province_code, Lo2SoHistory.draw_date.in_(draw_dates))
+                    and_(
+                        Lo2SoHistory.province_code == province_code,
+                        Lo2SoHistory.draw_date.between(draw_dates[0], draw_dates[-1])
+                    )
                 ).order_by(Lo2SoHistory.draw_date.asc())
                 
                 data_result = await session.execute(data_query)
-                all_data = data_result.fetchall()
-                
-                # Tổ chức theo ngày
-                draws_by_date = {}
-                for draw_date, number in all_data:
-                    if draw_date not in draws_by_date:
-                        draws_by_date[draw_date] = set()
-                    draws_by_date[draw_date].add(number)
-                
-                # Phân tích streak cho tất cả số 00-99
-                all_numbers = [f"{i:02d}" for i in range(100)]
-                current_streaks = {}
-                max_streaks = {}
-                
-                for number in all_numbers:
-                    temp_streak = 0
-                    temp_start = None
-                    max_streak_val = 0
-                    max_streak_date = None
-                    
-                    for draw_date in draw_dates:
-                        if number in draws_by_date.get(draw_date, set()):
-                            if temp_streak == 0:
-                                temp_start = draw_date
-                            temp_streak += 1
-                            if temp_streak > max_streak_val:
-                                max_streak_val = temp_streak
-                                max_streak_date = draw_date
-                        else:
-                            temp_streak = 0
-                    
-                    # Current streak (cuối cùng)
-                    if temp_streak >= min_streak:
-                        current_streaks[number] = {
-                            "streak": temp_streak,
-                            "start_date": temp_start,
-                            "end_date": draw_dates[-1]
-                        }
-                    
-                    # Max streak (lịch sử)
-                    if max_streak_val >= min_streak:
-                        max_streaks[number] = {
-                            "max_streak": max_streak_val,
-                            "last_streak_date": max_streak_date
-                        }
-                
-                # Format kết quả
-                current_list = [
-                    {
-                        "number": n,
-                        "streak": d["streak"],
-                        "start_date": d["start_date"].strftime("%d/%m/%Y"),
-                        "end_date": d["end_date"].strftime("%d/%m/%Y")
-                    }
-                    for n, d in sorted(current_streaks.items(), key=lambda x: x[1]["streak"], reverse=True)
-                ][:15]
-                
-                max_list = [
-                    {
-                        "number": n,
-                        "max_streak": d["max_streak"],
-                        "last_streak_date": d["last_streak_date"].strftime("%d/%m/%Y")
-                    }
-                    for n, d in sorted(max_streaks.items(), key=lambda x: x[1]["max_streak"], reverse=True)
-                ][:15]
-                
-                logger.info(f"✅ Lo2so streaks: {len(current_list)} current, {len(max_list)} max")
-                return {"current_streaks": current_list, "max_streaks": max_list}
+                all_data = [(draw_date, number) for draw_date, number in data_result]
+            
+            # Phân tích streak cho tất cả số 00-99 (ngoài event loop)
+            result = await get_analytics_executor().run(
+                compute_streaks, draw_dates, all_data, [f"{i:02d}" for i in range(100)], min_streak
+            )
+            
+            logger.info(
+                "✅ Lo2so streaks: %s current, %s max", len(result['current_streaks']), len(result['max_streaks'])
+            )
+            return result
+        except AnalyticsBusy:
+            raise
         except Exception as e:
-            logger.error(f"Error in get_lo2so_streaks: {e}")
+            logger.error("Error in get_lo2so_streaks: %s", e)
             return {"current_streaks": [], "max_streaks": []}
     
     async def get_lo3so_streaks(self, province_code: str, draws: int = 200, min_streak: int = 2) -> dict:
         """Phân tích chuỗi liên tiếp cho lô 3 số"""
         from app.database import DatabaseSession
         from app.models.lottery_result import Lo2SoHistory, Lo3SoHistory
+        from app.services.analytics.executor import get_analytics_executor
         from sqlalchemy import select, and_
         
         try:
-            async with DatabaseSession() as session:
-                date_query = select(Lo3SoHistory.draw_date).where(
-                    Lo3SoHistory.province_code == province_code
-                ).distinct().order_by(Lo3SoHistory.draw_date.desc()).limit(draws)
-                
-                date_result = await session.execute(date_query)
-                draw_dates = sorted([row[0] for row in date_result.fetchall()])
+            async with DatabaseSession(read_only=True) as session:
+                draw_dates = await self._recent_draw_dates(session, Lo3SoHistory, province_code, draws)
                 
                 if not draw_dates:
                     return {"current_streaks": [], "max_streaks": []}
                 
                 data_query = select(Lo3SoHistory.draw_date, Lo3SoHistory.number).where(
-                    and_(Lo3SoHistory.province_code == province_code, Lo3SoHistory.draw_date.in_(draw_dates))
+                    and_(
+                        Lo3SoHistory.province_code == province_code,
+                        Lo3SoHistory.draw_date.between(draw_dates[0], draw_dates[-1])
+                    )
                 ).order_by(Lo3SoHistory.draw_date.asc())
                 
                 data_result = await session.execute(data_query)
-                all_data = data_result.fetchall()
-                
-                draws_by_date = {}
-                unique_numbers = set()
-                for draw_date, number in all_data:
-                    if draw_date not in draws_by_date:
-                        draws_by_date[draw_date] = set()
-                    draws_by_date[draw_date].add(number)
-                    unique_numbers.add(number)
-                
-                current_streaks = {}
-                max_streaks = {}
-                
-                for number in unique_numbers:
-                    temp_streak = 0
-                    temp_start = None
-                    max_streak_val = 0
-                    max_streak_date = None
-                    
-                    for draw_date in draw_dates:
-                        if number in draws_by_date.get(draw_date, set()):
-                            if temp_streak == 0:
-                                temp_start = draw_date
-                            temp_streak += 1
-                            if temp_streak > max_streak_val:
-                                max_streak_val = temp_streak
-                                max_streak_date = draw_date
-                        else:
-                            temp_streak = 0
-                    
-                    if temp_streak >= min_streak:
-                        current_streaks[number] = {
-                            "streak": temp_streak,
-                            "start_date": temp_start,
-                            "end_date": draw_dates[-1]
-                        }
-                    
-                    if max_streak_val >= min_streak:
-                        max_streaks[number] = {
-                            "max_streak": max_streak_val,
-                            "last_streak_date": max_streak_date
-                        }
-                
-                current_list = [
-                    {
-                        "number": n,
-                        "streak": d["streak"],
-                        "start_date": d["start_date"].strftime("%d/%m/%Y"),
-                        "end_date": d["end_date"].strftime("%d/%m/%Y")
-                    }
-                    for n, d in sorted(current_streaks.items(), key=lambda x: x[1]["streak"], reverse=True)
-                ][:15]
-                
-                max_list = [
-                    {
-                        "number": n,
-                        "max_streak": d["max_streak"],
-                        "last_streak_date": d["last_streak_date"].strftime("%d/%m/%Y")
-                    }
-                    for n, d in sorted(max_streaks.items(), key=lambda x: x[1]["max_streak"], reverse=True)
-                ][:15]
-                
-                logger.info(f"✅ Lo3so streaks: {len(current_list)} current, {len(max_list)} max")
-                return {"current_streaks": current_list, "max_streaks": max_list}
+                all_data = [(draw_date, number) for draw_date, number in data_result]
+            
+            result = await get_analytics_executor().run(compute_streaks, draw_dates, all_data, None, min_streak)
+            
+            logger.info(
+                "✅ Lo3so streaks: %s current, %s max", len(result['current_streaks']), len(result['max_streaks'])
+            )
+            return result
+        except AnalyticsBusy:
+            raise
         except Exception as e:
-            logger.error(f"Error in get_lo3so_streaks: {e}")
+            logger.error("Error in get_lo3so_streaks: %s", e)
             return {"current_streaks": [], "max_streaks": []}
\ No newline at end of file
@@ -1,18 +1,33 @@
 """Subscription Service - Quản lý đăng ký nhận thông báo"""
 
 import logging
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy import select, and_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import DatabaseSession
+from app.database import DatabaseSession, run_write
 from app.models.lottery_result import UserSubscription
+from app.services.db.batch_loader import BatchLoader, register_loader
+from app.services.db.hot_queries import subscribers_by_province_query, subscriptions_by_users_query
 
 logger = logging.getLogger(__name__)
 
 
+async def load_user_subscriptions(user_ids: List[int]) -> Dict[int, List[UserSubscription]]:
+    """Batch: subscriptions đang bật của nhiều user trong 1 query"""
+    subscriptions = defaultdict(list)
+    async with DatabaseSession(read_only=True, fresh=True) as session:
+        for subscription in (await session.execute(subscriptions_by_users_query(user_ids))).scalars():
+            subscriptions[subscription.user_id].append(subscription)
+    return subscriptions
+
+
+_subscriptions_loader = register_loader(BatchLoader("subscriptions", load_user_subscriptions, default=[]))
+
+
 class SubscriptionService:
     """Service quản lý subscriptions"""
     
@@ -35,81 +50,76 @@ class SubscriptionService:
         Returns:
             True nếu thành công
         """
-        try:
-            async with DatabaseSession() as session:
-                # Kiểm tra đã subscribe chưa
-                existing = await self._get_subscription(
-                    session, user_id, province_code
+        async def _subscribe(session: AsyncSession) -> bool:
+            # Kiểm tra đã subscribe chưa
+            existing = await self._get_subscription(
+                session, user_id, province_code
+            )
+            
+            if existing:
+                # Đã có, chỉ cần activate lại
+                existing.is_active = True
+                existing.updated_at = datetime.utcnow()
+                if notification_time:
+                    existing.notification_time = notification_time
+                logger.info("✅ Reactivated subscription: user %s -> %s", user_id, province_code)
+            else:
+                # Tạo mới
+                subscription = UserSubscription(
+                    user_id=user_id,
+                    username=username,
+                    province_code=province_code,
+                    notification_time=notification_time,
+                    is_active=True,
+                    created_at=datetime.utcnow()
                 )
-                
-                if existing:
-                    # Đã có, chỉ cần activate lại
-                    existing.is_active = True
-                    existing.updated_at = datetime.utcnow()
-                    if notification_time:
-                        existing.notification_time = notification_time
-                    logger.info(f"✅ Reactivated subscription: user {user_id} -> {province_code}")
-                else:
-                    # Tạo mới
-                    subscription = UserSubscription(
-                        user_id=user_id,
-                        username=username,
-                        province_code=province_code,
-                        notification_time=notification_time,
-                        is_active=True,
-                        created_at=datetime.utcnow()
-                    )
-                    session.add(subscription)
-                    logger.info(f"✅ New subscription: user {user_id} -> {province_code}")
-                
-                await session.commit()
-                return True
+                session.add(subscription)
+                logger.info("✅ New subscription: user %s -> %s", user_id, province_code)
+            
+            await session.flush()
+            return True
+        
+        try:
+            return await run_write(_subscribe)
                 
         except Exception as e:
-            logger.error(f"❌ Error subscribing: {e}")
+            logger.error("❌ Error subscribing: %s", e)
             return False
     
     async def unsubscribe(self, user_id: int, province_code: str) -> bool:
         """Hủy đăng ký"""
+        async def _unsubscribe(session: AsyncSession) -> bool:
+            subscription = await self._get_subscription(
+                session, user_id, province_code
+            )
+            
+            if subscription:
+                subscription.is_active = False
+                subscription.updated_at = datetime.utcnow()
+                await session.flush()
+                logger.info("✅ Unsubscribed: user %s -> %s", user_id, province_code)
+                return True
+            
+            logger.warning("⚠️ Subscription not found: user %s -> %s", user_id, province_code)
+            return False
+        
         try:
-            async with DatabaseSession() as session:
-                subscription = await self._get_subscription(
-                    session, user_id, province_code
-                )
-                
-                if subscription:
-                    subscription.is_active = False
-                    subscription.updated_at = datetime.utcnow()
-                    await session.commit()
-                    logger.info(f"✅ Unsubscribed: user {user_id} -> {province_code}")
-                    return True
-                
-                logger.warning(f"⚠️ Subscription not found: user {user_id} -> {province_code}")
-                return False
+            return await run_write(_unsubscribe)
                 
         except Exception as e:
-            logger.error(f"❌ Error unsubscribing: {e}")
+            logger.error("❌ Error unsubscribing: %s", e)
             return False
     
     async def get_user_subscriptions(self, user_id: int) -> List[UserSubscription]:
-        """Lấy tất cả subscriptions của user"""
+        """Lấy tất cả subscriptions của user (đọc primary: vừa bật / tắt xong là thấy)"""
         try:
-            async with DatabaseSession() as session:
-                query = select(UserSubscription).where(
-                    and_(
-                        UserSubscription.user_id == user_id,
-                        UserSubscription.is_active == True
-                    )
-                ).order_by(UserSubscription.province_code)
-                
-                result = await session.execute(query)
-                subscriptions = result.scalars().all()
-                
-                logger.info(f"📋 User {user_id} has {len(subscriptions)} subscriptions")
-                return list(subscriptions)
+            subscriptions = list(await _subscriptions_loader.load(user_id))
+            
+            logger.info("📋 User %s has %s subscriptions", user_id, len(subscriptions))
+            return subscriptions
                 
         except Exception as e:
-            logger.error(f"❌ Error getting subscriptions: {e}")
+            logger.error("❌ Error getting subscriptions: %s", e)
             return []
     
     async def get_subscribers_by_province(
@@ -117,43 +127,64 @@ class SubscriptionService:
     ) -> List[UserSubscription]:
         """Lấy tất cả users đăng ký nhận thông báo của 1 tỉnh"""
         try:
-            async with DatabaseSession() as session:
+            async with DatabaseSession(read_only=True) as session:
+                result = await session.execute(subscribers_by_province_query(province_code))
+                subscribers = result.scalars().all()
+                
+                logger.info("📋 Province %s has %s subscribers", province_code, len(subscribers))
+                return list(subscribers)
+                
+        except Exception as e:
+            logger.error("❌ Error getting subscribers: %s", e)
+            return []
+
+    async def get_subscribers_by_provinces(
+        self, province_codes: List[str]
+    ) -> List[UserSubscription]:
+        """Lấy subscriptions của nhiều tỉnh trong 1 query (dùng cho digest)"""
+        if not province_codes:
+            return []
+
+        try:
+            async with DatabaseSession(read_only=True) as session:
                 query = select(UserSubscription).where(
                     and_(
-                        UserSubscription.province_code == province_code,
+                        UserSubscription.province_code.in_(province_codes),
                         UserSubscription.is_active == True
                     )
                 )
-                
+
                 result = await session.execute(query)
                 subscribers = result.scalars().all()
-                
-                logger.info(f"📋 Province {province_code} has {len(subscribers)} subscribers")
+
+                logger.info("📋 Provinces %s have %s subscriptions", province_codes, len(subscribers))
                 return list(subscribers)
-                
+
         except Exception as e:
-            logger.error(f"❌ Error getting subscribers: {e}")
+            logger.error("❌ Error getting subscribers: %s", e)
             return []
-    
+
     async def delete_subscription(self, user_id: int, province_code: str) -> bool:
         """Xóa hoàn toàn subscription (không chỉ deactivate)"""
-        try:
-            async with DatabaseSession() as session:
-                stmt = delete(UserSubscription).where(
-                    and_(
-                        UserSubscription.user_id == user_id,
-                        UserSubscription.province_code == province_code
-                    )
+        async def _delete(session: AsyncSession) -> bool:
+            stmt = delete(UserSubscription).where(
+                and_(
+                    UserSubscription.user_id == user_id,
+                    UserSubscription.province_code == province_code
                 )
-                
-                await session.execute(stmt)
-                await session.commit()
-                
-                logger.info(f"🗑️ Deleted subscription: user {user_id} -> {province_code}")
-                return True
+            )
+            
+            await session.execute(stmt)
+            return True
+        
+        try:
+            await run_write(_delete)
+            
+            logger.info("🗑️ Deleted subscription: user %s -> %s", user_id, province_code)
+            return True
                 
         except Exception as e:
-            logger.error(f"❌ Error deleting subscription: {e}")
+            logger.error("❌ Error deleting subscription: %s", e)
             return False
     
     async def _get_subscription(
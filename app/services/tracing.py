@@ -0,0 +1,282 @@
+"""Tracing - Trace theo từng Telegram update: handler → service → cache → DB → MU88
+
+Mỗi update được lấy mẫu (TRACE_SAMPLE_RATE) thành 1 trace; trace id và span
+hiện tại truyền theo contextvars nên đi theo cả các task con (asyncio.gather).
+Update không được lấy mẫu chỉ tốn 1 lần đọc ContextVar mỗi lời gọi.
+
+    @traced_update                      # handler: mở trace cho update
+    async def button_callback(update, context): ...
+
+    @trace_methods("cache")             # service: span cho mọi method public
+    class CacheService: ...
+
+    with get_tracer().span("render", rows=10):
+        ...
+
+Trace xong → ring buffer trong bộ nhớ (lệnh admin /trace) và file JSONL
+(TRACE_FILE, nếu đặt). File được ghi ở thread nền qua QueueListener riêng
+(như pipeline log, xem logging_helper.py): event loop chỉ đưa trace vào queue.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from app.config import TRACE_BUFFER_SIZE, TRACE_FILE, TRACE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """1 update: tên (callback data / lệnh), thời điểm bắt đầu, danh sách span"""
+
+    __slots__ = ("trace_id", "name", "attrs", "started_at", "start", "duration_ms", "spans")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.spans: List["Span"] = []
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "duration_ms": round(self.duration_ms, 3),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class Span:
+    """1 lời gọi trong trace; span gốc có parent_id = None"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "depth", "start", "duration_ms", "attrs", "error")
+
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        trace.spans.append(self)
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id của update đang xử lý (None nếu không được lấy mẫu)"""
+    span = _current_span.get()
+    return span.trace.trace_id if span else None
+
+
+class TraceFormatter(logging.Formatter):
+    """record.msg là dict của trace → 1 dòng JSON (chạy ở thread listener)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+class Tracer:
+    """Lấy mẫu, tạo span, xuất trace ra ring buffer + file"""
+
+    def __init__(
+        self,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        buffer_size: int = TRACE_BUFFER_SIZE,
+        file_path: str = TRACE_FILE
+    ):
+        self.sample_rate = sample_rate
+        self.file_path = file_path
+        self.buffer: Deque[Dict] = deque(maxlen=buffer_size)
+        self.started = 0
+        self.sampled = 0
+        self._writer: Optional[logging.handlers.QueueListener] = None
+
+    @contextmanager
+    def trace(self, name: str, **attrs) -> Iterator[Optional[Span]]:
+        """Mở trace mới (trong trace khác → chỉ là 1 span con)"""
+        if _current_span.get() is not None:
+            with self.span(name, **attrs) as span:
+                yield span
+            return
+
+        self.started += 1
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        self.sampled += 1
+        trace = Trace(name, attrs)
+        root = Span(trace, name, None, {})
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            root.finish()
+            _current_span.reset(token)
+            trace.duration_ms = root.duration_ms
+            self.export(trace)
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Optional[Span]]:
+        """Span con của span hiện tại (không có trace → không làm gì)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(parent.trace, name, parent, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+
+    def export(self, trace: Trace) -> None:
+        record = trace.to_dict()
+        self.buffer.append(record)
+        if self.file_path:
+            self._get_writer().queue.put_nowait(logging.makeLogRecord({"msg": record}))
+
+    def _get_writer(self) -> logging.handlers.QueueListener:
+        """QueueListener ghi file TRACE_FILE (tạo khi export lần đầu)"""
+        if self._writer is None:
+            handler = logging.FileHandler(self.file_path, encoding="utf-8", delay=True)
+            handler.setFormatter(TraceFormatter())
+            self._writer = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+            self._writer.start()
+        return self._writer
+
+    def close(self) -> None:
+        """Ghi nốt các trace còn trong queue và đóng file"""
+        if self._writer is not None:
+            self._writer.stop()
+            for handler in self._writer.handlers:
+                handler.close()
+            self._writer = None
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        """Các trace gần nhất, mới → cũ"""
+        return list(reversed(self.buffer))[:limit]
+
+    def find(self, trace_id: str) -> Optional[Dict]:
+        """Tìm trace theo id (hoặc tiền tố id)"""
+        for record in reversed(self.buffer):
+            if record["trace_id"].startswith(trace_id):
+                return record
+        return None
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Tracer dùng chung của process (tạo khi cần)"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        atexit.register(_tracer.close)
+    return _tracer
+
+
+def traced(name: str) -> Callable:
+    """Decorator: bọc hàm (sync hoặc async) trong 1 span khi đang có trace"""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with get_tracer().span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with get_tracer().span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(prefix: str) -> Callable:
+    """Class decorator: span "<prefix>.<method>" cho mọi method public"""
+    def decorator(cls):
+        for attr_name, attr in list(vars(cls).items()):
+            if not attr_name.startswith("_") and inspect.isfunction(attr):
+                setattr(cls, attr_name, traced(f"{prefix}.{attr_name}")(attr))
+        return cls
+    return decorator
+
+
+def trace_functions(namespace: Dict[str, Any], prefix: str, name_prefix: str = "format_") -> None:
+    """Bọc các hàm `name_prefix*` định nghĩa trong module (gọi ở cuối module)"""
+    module = namespace["__name__"]
+    for attr_name, attr in list(namespace.items()):
+        if attr_name.startswith(name_prefix) and inspect.isfunction(attr) and attr.__module__ == module:
+            namespace[attr_name] = traced(f"{prefix}.{attr_name}")(attr)
+
+
+def _update_name(update: Any) -> str:
+    query = getattr(update, "callback_query", None)
+    if query is not None and query.data:
+        return query.data
+    message = getattr(update, "effective_message", None)
+    text = getattr(message, "text", None) or ""
+    return text.split(maxsplit=1)[0] if text else "update"
+
+
+def traced_update(handler: Callable) -> Callable:
+    """Decorator cho Telegram handler: mỗi update 1 trace (nếu được lấy mẫu)"""
+    @functools.wraps(handler)
+    async def wrapper(update, context, *args, **kwargs):
+        user = getattr(update, "effective_user", None)
+        with get_tracer().trace(_update_name(update), user_id=getattr(user, "id", None)):
+            return await handler(update, context, *args, **kwargs)
+    return wrapper
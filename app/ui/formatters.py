@@ -1,5 +1,8 @@
 """Result formatters - Format kết quả xổ số với các kiểu hiển thị khác nhau"""
 
+from app.config import PROVINCES
+from app.services.tracing import trace_functions
+
 
 def format_result_mb_full(result_data: dict) -> str:
     """
@@ -356,6 +359,416 @@ def format_lo_3_so_mn_mt(result_data: dict) -> str:
     return message
 
 
+def format_region_head_tail(head_tail: dict) -> str:
+    """
+    Số lần về theo Đầu / Đuôi của cả miền (từ region rollup)
+
+    Args:
+        head_tail: {"head": [10 counts], "tail": [10 counts]}
+    """
+    heads = head_tail.get("head", [0] * 10)
+    tails = head_tail.get("tail", [0] * 10)
+
+    message = "🔢 <b>Đầu - Đuôi:</b>\n"
+    for digit in range(10):
+        message += f"  Đầu {digit}: <b>{heads[digit]:3d}</b>   |   Đuôi {digit}: <b>{tails[digit]:3d}</b>\n"
+
+    return message
+
+
+def format_national_gan(gan_data: list, hot_data: list, min_gan: int, draws: int) -> str:
+    """
+    Gan toàn quốc: số gan ở nhiều tỉnh MN/MT cùng lúc + số về nhiều nhất
+
+    Args:
+        gan_data: [{"number", "province_count", "max_gan", "provinces": [(code, gan)]}]
+        hot_data: [{"number", "count", "province_count"}]
+        min_gan: Ngưỡng gan (kỳ)
+        draws: Số kỳ gần nhất dùng cho số về nhiều
+    """
+    message = "🌐 <b>GAN TOÀN QUỐC - MIỀN NAM + MIỀN TRUNG</b>\n"
+    message += f"📅 Gan ≥ {min_gan} kỳ, tính riêng theo lịch quay từng đài\n\n"
+
+    if gan_data:
+        message += "❄️ <b>Số gan ở nhiều đài:</b>\n"
+        for item in gan_data:
+            top = ", ".join(
+                f"{PROVINCES.get(code, {}).get('name', code)} {gan}" for code, gan in item["provinces"][:3]
+            )
+            message += f"  <code>{item['number']}</code> - <b>{item['province_count']}</b> đài"
+            message += f" (max {item['max_gan']} kỳ)\n"
+            message += f"     └ {top}\n"
+    else:
+        message += "❄️ Không có số nào gan ở nhiều đài\n"
+
+    if hot_data:
+        message += f"\n🔥 <b>Về nhiều nhất {draws} kỳ gần nhất:</b>\n"
+        for idx, item in enumerate(hot_data[:10], 1):
+            message += f"  {idx:2d}. <code>{item['number']}</code> - {item['count']} kỳ"
+            message += f" / {item['province_count']} đài\n"
+
+    return message
+
+
+def format_lo_xien(recent_pairs: list, all_pairs: list, province_name: str, draws: int) -> str:
+    """
+    Lô xiên 2: các cặp số về cùng kỳ nhiều nhất
+
+    Args:
+        recent_pairs: [{"pair": ("05", "27"), "count": 12}] trong `draws` kỳ gần nhất
+        all_pairs: Như trên, toàn bộ lịch sử
+        province_name: Tên tỉnh
+        draws: Số kỳ của recent_pairs
+    """
+    if not recent_pairs and not all_pairs:
+        return f"🔗 <b>LÔ XIÊN {province_name.upper()}</b>\n\n⚠️ Chưa có dữ liệu"
+
+    message = f"🔗 <b>LÔ XIÊN 2 - {province_name.upper()}</b>\n\n"
+
+    message += f"📅 <b>{draws} kỳ gần nhất:</b>\n"
+    for idx, item in enumerate(recent_pairs, 1):
+        first, second = item["pair"]
+        message += f"  {idx:2d}. <code>{first}-{second}</code> - {item['count']} kỳ\n"
+
+    if all_pairs:
+        message += "\n📚 <b>Toàn bộ lịch sử:</b>\n"
+        for idx, item in enumerate(all_pairs, 1):
+            first, second = item["pair"]
+            message += f"  {idx:2d}. <code>{first}-{second}</code> - {item['count']} kỳ\n"
+
+    message += "\n💡 <i>Chọn 1 số để xem các số hay về cùng</i>"
+    return message
+
+
+def format_lo_xien_partners(number: str, partners: list, province_name: str, draws: int) -> str:
+    """
+    Các số hay về cùng kỳ với 1 số
+
+    Args:
+        number: Số đang xem
+        partners: [{"number", "count", "rate"}]
+        province_name: Tên tỉnh
+        draws: Số kỳ phân tích
+    """
+    message = f"🔗 <b>LÔ XIÊN VỚI {number} - {province_name.upper()}</b>\n"
+    message += f"📅 {draws} kỳ gần nhất\n\n"
+
+    if not partners:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    for idx, item in enumerate(partners, 1):
+        message += f"  {idx:2d}. <code>{number}-{item['number']}</code> - {item['count']} kỳ"
+        message += f" ({item['rate']:.0%} số kỳ {number} về)\n"
+
+    return message
+
+
+def format_bac_nho(bac_nho: dict, province_name: str, draws: int, number: str = "") -> str:
+    """
+    Bạc nhớ: các số hay về ở kỳ kế tiếp
+
+    Args:
+        bac_nho: {"occurrences", "next": [{"number", "count", "rate"}]} (+ "date",
+            "numbers" khi tính theo kỳ mới nhất)
+        province_name: Tên tỉnh
+        draws: Số kỳ phân tích
+        number: Số nguồn (rỗng = cả bộ số của kỳ mới nhất)
+    """
+    if number:
+        message = f"🔮 <b>BẠC NHỚ {number} - {province_name.upper()}</b>\n"
+        message += f"📅 {draws} kỳ gần nhất: {number} về {bac_nho.get('occurrences', 0)} lần\n\n"
+    else:
+        message = f"🔮 <b>BẠC NHỚ - {province_name.upper()}</b>\n"
+        if bac_nho.get("date"):
+            message += f"📅 Theo kỳ {bac_nho['date'].strftime('%d/%m/%Y')}, thống kê {draws} kỳ gần nhất\n"
+            message += f"🔢 Kỳ này về: {', '.join(bac_nho.get('numbers', []))}\n\n"
+
+    if not bac_nho.get("next"):
+        return message + "⚠️ Chưa có dữ liệu"
+
+    message += "🎯 <b>Kỳ sau hay về:</b>\n"
+    for idx, item in enumerate(bac_nho["next"], 1):
+        message += f"  {idx:2d}. <code>{item['number']}</code> - {item['count']} lần ({item['rate']:.0%})\n"
+
+    if not number:
+        message += "\n💡 <i>Chọn 1 số đã về để xem bạc nhớ riêng</i>"
+    return message
+
+
+def format_lo_gan_scored(scores: list, province_name: str, is_daily: bool) -> str:
+    """
+    Lô gan xếp theo xác suất: gan hiện tại so với phân phối gap của chính số đó
+
+    Args:
+        scores: [{"number", "gan", "max_gan", "hit_rate", "expected_gap", "tail",
+                  "category", "last_seen_date"}] (GapScoreService)
+        province_name: Tên tỉnh
+        is_daily: Tỉnh quay hằng ngày (MB) → đơn vị "ngày"
+    """
+    message = f"📈 <b>LÔ GAN THEO XÁC SUẤT - {province_name.upper()}</b>\n"
+    if not scores:
+        return message + "\n⚠️ Chưa có dữ liệu"
+
+    unit = "ngày" if is_daily else "kỳ"
+    icons = {"cuc_gan": "🔴", "gan_lon": "🟠", "gan_thuong": "🟢"}
+    message += f"📅 Toàn bộ lịch sử, xếp theo P(gan ≥ hiện tại)\n\n"
+
+    for i, item in enumerate(scores, 1):
+        expected = f"{item['expected_gap']:.1f}" if item["expected_gap"] is not None else "-"
+        last_seen = item["last_seen_date"].strftime("%d/%m/%Y") if item["last_seen_date"] else "chưa về"
+        message += f"{icons[item['category']]} {i:2d}. <code>{item['number']}</code> - "
+        message += f"<b>{item['gan']}</b> {unit} (P = {item['tail']:.1%})\n"
+        message += f"     └ TB {expected} {unit}/lần, gan max {item['max_gan']}, lần cuối {last_seen}\n"
+
+    message += "\n🔴 P ≤ 5%  🟠 P ≤ 15%  🟢 còn lại\n"
+    message += "💡 <i>P = tỉ lệ các lần gan trước đây dài ít nhất bằng hiện tại</i>"
+    return message
+
+
+def format_backtest(results: list, years: int, picks: int, limit: int = 15) -> str:
+    """
+    Kết quả backtest chiến lược chọn số (BacktestService.run)
+
+    Args:
+        results: [{"strategy", "province_code", "draws", "hit_rate", "avg_hits",
+                   "max_miss_streak", "roi"}] sắp theo roi
+        years: Số năm đã backtest
+        picks: Số con chọn mỗi kỳ
+        limit: Số dòng tối đa
+    """
+    message = f"🧪 <b>BACKTEST {years} NĂM - {picks} CON / KỲ</b>\n\n"
+    if not results:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    for item in results[:limit]:
+        province_name = PROVINCES.get(item["province_code"], {}).get("name", item["province_code"])
+        icon = "🟢" if item["roi"] >= 0 else "🔴"
+        message += f"{icon} <b>{item['strategy']}</b> - {province_name} ({item['draws']} kỳ)\n"
+        message += (
+            f"     └ Trúng {item['hit_rate']:.1%} kỳ, TB {item['avg_hits']:.2f} nháy/kỳ, "
+            f"trượt dài nhất {item['max_miss_streak']} kỳ\n"
+        )
+        message += f"     └ Lãi/lỗ: <b>{item['roi']:+.1%}</b>\n"
+
+    if len(results) > limit:
+        message += f"\n… và {len(results) - limit} kết quả khác"
+    return message
+
+
+def format_loop_health(snapshot: dict) -> str:
+    """
+    Độ trễ event loop + các chỗ gây chặn loop (LoopMonitor.snapshot)
+
+    Args:
+        snapshot: {"running", "samples", "window_seconds", "p50_ms", "p95_ms", "p99_ms",
+                   "max_ms", "stalls", "total_stalls", "histogram", "sites"}
+    """
+    message = "🩺 <b>EVENT LOOP</b>\n\n"
+    if not snapshot["running"]:
+        message += "⚠️ Loop monitor chưa chạy\n\n"
+    if not snapshot["samples"]:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    message += f"⏱️ <b>Độ trễ ({snapshot['window_seconds'] // 60} phút, {snapshot['samples']} mẫu):</b>\n"
+    message += (
+        f"  p50 {snapshot['p50_ms']:.1f}ms · p95 {snapshot['p95_ms']:.1f}ms · "
+        f"p99 {snapshot['p99_ms']:.1f}ms · max {snapshot['max_ms']:.0f}ms\n\n"
+    )
+
+    peak = max(count for _, count in snapshot["histogram"])
+    message += "<code>"
+    for label, count in snapshot["histogram"]:
+        if count:
+            bar = "█" * max(1, round(count / peak * 12))
+            message += f"{label:>8} {bar} {count}\n"
+    message += "</code>\n"
+
+    message += f"🐢 <b>Bị chặn:</b> {snapshot['stalls']} lần (tổng {snapshot['total_stalls']} từ lúc khởi động)\n"
+    for entry in snapshot["sites"]:
+        message += f"\n• <code>{entry['site']}</code>\n"
+        if entry["handler"]:
+            message += f"     └ handler: <code>{entry['handler']}</code>\n"
+        message += (
+            f"     └ {entry['count']} lần, max {entry['max_seconds'] * 1000:.0f}ms, "
+            f"tổng {entry['total_seconds']:.1f}s\n"
+        )
+    return message
+
+
+def format_db_scopes(snapshot: dict, routing: dict = None) -> str:
+    """
+    Số connection database lấy ra mỗi update / job (UnitOfWorkStats.snapshot)
+
+    Args:
+        snapshot: {"kinds": {kind: {"scopes", "avg", "max"}}, "histogram": [(nhãn, số scope)]}
+        routing: ReadRouter.snapshot - {"enabled", "lag", "lagging", "routes"}
+    """
+    message = "🗄️ <b>DB CONNECTIONS / UPDATE</b>\n\n"
+    if routing and routing["enabled"]:
+        lag = "?" if routing["lag"] is None else f"{routing['lag']:.1f}s"
+        message += f"🔀 Replica: trễ {lag}{' ⚠️ → primary' if routing['lagging'] else ''}\n"
+        routes = " · ".join(f"{route} {count}" for route, count in sorted(routing["routes"].items()))
+        if routes:
+            message += f"     └ {routes}\n"
+        message += "\n"
+    if not snapshot["kinds"]:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    for kind, entry in sorted(snapshot["kinds"].items(), key=lambda item: item[1]["scopes"], reverse=True):
+        message += (
+            f"• <code>{kind}</code>: {entry['scopes']} lần, "
+            f"tb {entry['avg']:.2f} · max {entry['max']}\n"
+        )
+
+    peak = max(count for _, count in snapshot["histogram"])
+    if peak:
+        message += "\n<code>"
+        for label, count in snapshot["histogram"]:
+            if count:
+                bar = "█" * max(1, round(count / peak * 12))
+                message += f"{label:>3} {bar} {count}\n"
+        message += "</code>"
+    return message
+
+
+def format_batch_loaders(stats: dict) -> str:
+    """
+    Kích thước batch của các BatchLoader (loader_stats)
+
+    Args:
+        stats: {name: {"requests", "batches", "keys", "avg_batch", "max_batch", "histogram"}}
+    """
+    message = "📦 <b>DB BATCH</b>\n\n"
+    loaders = {name: entry for name, entry in stats.items() if entry["requests"]}
+    if not loaders:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    for name, entry in sorted(loaders.items()):
+        message += (
+            f"• <code>{name}</code>: {entry['requests']} lần đọc → {entry['batches']} query, "
+            f"tb {entry['avg_batch']:.1f} key · max {entry['max_batch']}\n"
+        )
+        buckets = " · ".join(f"{label}: {count}" for label, count in entry["histogram"] if count)
+        if buckets:
+            message += f"     └ {buckets}\n"
+    return message.rstrip("\n")
+
+
+def format_trace_list(traces: list, stats: dict) -> str:
+    """
+    Danh sách trace gần nhất (Tracer.recent)
+
+    Args:
+        traces: [{"trace_id", "name", "started_at", "duration_ms", "spans"}] mới → cũ
+        stats: {"sample_rate", "started", "sampled"}
+    """
+    message = "🧵 <b>TRACES</b>\n"
+    message += (
+        f"Lấy mẫu {stats['sample_rate']:.0%} · {stats['sampled']}/{stats['started']} update\n\n"
+    )
+    if not traces:
+        return message + "⚠️ Chưa có trace nào"
+
+    for record in traces:
+        icon = "🔴" if any(span["error"] for span in record["spans"]) else "🟢"
+        message += (
+            f"{icon} <code>{record['trace_id'][:8]}</code> {record['started_at'][11:19]} "
+            f"<b>{record['name']}</b> {record['duration_ms']:.0f}ms ({len(record['spans'])} span)\n"
+        )
+    message += "\nXem chi tiết: <code>/trace &lt;id&gt;</code>"
+    return message
+
+
+def format_trace_waterfall(record: dict, width: int = 12) -> str:
+    """
+    Waterfall 1 trace: mỗi span 1 dòng, thụt lề theo độ sâu
+
+    Args:
+        record: Trace.to_dict()
+        width: Số cột của thanh thời gian
+    """
+    total = record["duration_ms"] or 1.0
+    message = f"🧵 <b>{record['name']}</b> · {record['duration_ms']:.0f}ms\n"
+    message += f"<code>{record['trace_id']}</code> · {record['started_at']}\n\n<code>"
+
+    for span in record["spans"]:
+        offset = min(int(span["start_ms"] / total * width), width - 1)
+        length = max(1, min(round(span["duration_ms"] / total * width), width - offset))
+        bar = " " * offset + "█" * length + " " * (width - offset - length)
+        name = ("  " * span["depth"] + span["name"])[:28]
+        mark = " ❌" if span["error"] else ""
+        message += f"{name:<28} |{bar}| {span['duration_ms']:>7.1f}ms{mark}\n"
+    message += "</code>"
+    return message
+
+
+_DE_STREAK_LABELS = {
+    "chan_le": "Chẵn / lẻ",
+    "to_nho": "To / nhỏ",
+    "dau": "Đầu",
+    "duoi": "Đuôi",
+    "tong": "Tổng",
+}
+
+
+def format_de_gan(gan_data: list, streaks: dict, latest: list, province_name: str) -> str:
+    """
+    Đề gan + chuỗi bệt + các số đề gần nhất
+
+    Args:
+        gan_data: [{"number", "gan", "max_gan", "count", "last_date"}]
+        streaks: {"chan_le" | "to_nho" | ...: {"value", "current", "longest", "longest_value"}}
+        latest: [{"date", "number"}] mới → cũ
+        province_name: Tên tỉnh
+    """
+    message = f"🎯 <b>ĐỀ - {province_name.upper()}</b>\n\n"
+    if not gan_data:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    if latest:
+        message += "📅 <b>Đề gần nhất:</b> "
+        message += ", ".join(f"<code>{item['number']}</code>" for item in latest) + "\n\n"
+
+    message += "🔥 <b>Đề gan:</b>\n"
+    for idx, item in enumerate(gan_data, 1):
+        last_seen = item["last_date"].strftime("%d/%m/%Y") if item["last_date"] else "chưa về"
+        message += (
+            f"  {idx:2d}. <code>{item['number']}</code> - {item['gan']} kỳ "
+            f"(max {item['max_gan']}, {last_seen})\n"
+        )
+
+    if streaks:
+        message += "\n📈 <b>Chuỗi bệt hiện tại:</b>\n"
+        for key, label in _DE_STREAK_LABELS.items():
+            streak = streaks[key]
+            message += (
+                f"  • {label}: {streak['value']} × {streak['current']} kỳ "
+                f"(dài nhất: {streak['longest_value']} × {streak['longest']})\n"
+            )
+    return message
+
+
+def format_de_distribution(distributions: dict, province_name: str, draws: int) -> str:
+    """
+    Đầu / đuôi / tổng / chạm đề trong `draws` kỳ gần nhất
+
+    Args:
+        distributions: {"dau" | "duoi" | "tong" | "cham": [{"key", "count", "gan"}]}
+    """
+    message = f"🔢 <b>ĐẦU ĐUÔI ĐỀ - {province_name.upper()}</b>\n"
+    message += f"📅 {draws} kỳ gần nhất\n\n"
+    if not distributions:
+        return message + "⚠️ Chưa có dữ liệu"
+
+    for key, label in (("dau", "Đầu"), ("duoi", "Đuôi"), ("tong", "Tổng"), ("cham", "Chạm")):
+        message += f"<b>{label}</b> (số lần / gan):\n"
+        for item in distributions[key]:
+            gan = "-" if item["gan"] is None else item["gan"]
+            message += f"  {item['key']}: {item['count']:3d} / {gan}\n"
+        message += "\n"
+    return message.rstrip() + "\n"
+
+
 def format_dau_lo(result_data: dict) -> str:
     """
     Thống kê Đầu Lô - Nhóm theo chữ số đầu (0-9)
@@ -793,4 +1206,8 @@ def format_lo_3_so_streaks(streaks_data: dict, province_name: str = "") -> str:
     result += "🏆 Max = Kỷ lục dài nhất\n"
     result += "\n📊 <i>Dữ liệu từ database</i>"
     
-    return result
\ No newline at end of file
+    return result
+
+
+# Span "format.<tên hàm>" khi update đang được trace
+trace_functions(globals(), "format")
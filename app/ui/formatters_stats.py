@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 """Statistics formatters - Format streak analysis results"""
 
+from app.services.tracing import trace_functions
+
 
 def format_lo_2_so_streaks(streaks_data: dict, province_name: str = "") -> str:
     """Format lô 2 số streak analysis"""
@@ -144,3 +146,7 @@ def format_lo_3_so_streaks(streaks_data: dict, province_name: str = "") -> str:
     result += "\n📊 <i>Dữ liệu từ database</i>"
     
     return result
+
+
+# Span "format.<tên hàm>" khi update đang được trace
+trace_functions(globals(), "format")
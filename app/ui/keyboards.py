@@ -177,11 +177,24 @@ def get_stats_menu_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton("📊 Lô 2 Số MT", callback_data="stats_MT_2digit")],
         [InlineKeyboardButton("📈 Đầu-Đuôi ĐB", callback_data="stats_headtail")],
         [InlineKeyboardButton("❄️ Lô Gan", callback_data="stats_gan")],
+        [InlineKeyboardButton("🌐 Gan toàn quốc", callback_data="stats_national_gan")],
         [InlineKeyboardButton("🔙 Quay lại", callback_data="back_to_main")],
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
+def get_region_stats_keyboard(region: str) -> InlineKeyboardMarkup:
+    """Keyboard của thống kê lô 2 số theo miền"""
+    keyboard = [
+        [
+            InlineKeyboardButton("📊 Tần suất", callback_data=f"stats_{region}_2digit"),
+            InlineKeyboardButton("❄️ Lô Gan miền", callback_data=f"stats_{region}_regiongan"),
+        ],
+        [InlineKeyboardButton("🔙 Quay lại", callback_data="stats_menu")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
 def get_province_detail_keyboard(province_key: str) -> InlineKeyboardMarkup:
     """Keyboard with 10 buttons: 7 stats + notification + 2 navigation"""
     keyboard = [
@@ -203,6 +216,13 @@ def get_province_detail_keyboard(province_key: str) -> InlineKeyboardMarkup:
             InlineKeyboardButton("🔥 Lô Gan", callback_data=f"stats_gan_{province_key}"),
             InlineKeyboardButton("✨ Lọc số đẹp", callback_data=f"beautiful_{province_key}"),
         ],
+        [
+            InlineKeyboardButton("🔗 Lô xiên", callback_data=f"stats_xien_{province_key}"),
+            InlineKeyboardButton("🔮 Bạc nhớ", callback_data=f"stats_bacnho_{province_key}"),
+        ],
+        [
+            InlineKeyboardButton("🎯 Đề", callback_data=f"stats_de_{province_key}"),
+        ],
         # NEW: Notification button
         [
             InlineKeyboardButton("🔔 Đăng ký nhận KQ", callback_data=f"subscribe_{province_key}"),
@@ -214,6 +234,52 @@ def get_province_detail_keyboard(province_key: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+def _number_keyboard(numbers: list, callback_prefix: str, back_callback: str) -> InlineKeyboardMarkup:
+    """Mỗi số 1 nút (5 nút / hàng) + nút quay lại"""
+    buttons = [
+        InlineKeyboardButton(number, callback_data=f"{callback_prefix}{number}")
+        for number in numbers
+    ]
+    keyboard = [buttons[i:i + 5] for i in range(0, len(buttons), 5)]
+    keyboard.append([InlineKeyboardButton("🔙 Quay lại", callback_data=back_callback)])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_lo_xien_keyboard(province_key: str, numbers: list) -> InlineKeyboardMarkup:
+    """Keyboard lô xiên: mỗi số 1 nút xem các số hay về cùng"""
+    return _number_keyboard(numbers, f"stats_xienp_{province_key}_", f"stats_xien_{province_key}")
+
+
+def get_bac_nho_keyboard(province_key: str, numbers: list) -> InlineKeyboardMarkup:
+    """Keyboard bạc nhớ: mỗi số 1 nút xem kỳ sau hay về gì"""
+    return _number_keyboard(numbers, f"stats_bacnhop_{province_key}_", f"stats_bacnho_{province_key}")
+
+
+def get_lo_gan_keyboard(province_key: str, scored: bool = False) -> InlineKeyboardMarkup:
+    """Keyboard lô gan: chuyển giữa xếp theo số kỳ gan và xếp theo xác suất"""
+    if scored:
+        toggle = InlineKeyboardButton("🔢 Xếp theo số kỳ gan", callback_data=f"stats_gan_{province_key}")
+    else:
+        toggle = InlineKeyboardButton("📈 Xếp theo xác suất", callback_data=f"stats_ganp_{province_key}")
+    keyboard = [
+        [toggle],
+        [InlineKeyboardButton("🔙 Quay lại", callback_data=f"province_{province_key}")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_de_keyboard(province_key: str) -> InlineKeyboardMarkup:
+    """Keyboard thống kê đề: gan / chuỗi ↔ đầu đuôi, tổng, chạm"""
+    keyboard = [
+        [
+            InlineKeyboardButton("🎯 Đề gan", callback_data=f"stats_de_{province_key}"),
+            InlineKeyboardButton("🔢 Đầu đuôi - Tổng - Chạm", callback_data=f"stats_dedt_{province_key}"),
+        ],
+        [InlineKeyboardButton("🔙 Quay lại", callback_data=f"province_{province_key}")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
 def get_province_detail_menu(province_key: str) -> InlineKeyboardMarkup:
     """Alias for get_province_detail_keyboard for backward compatibility"""
     return get_province_detail_keyboard(province_key)
@@ -62,6 +62,9 @@ Vui lòng thử lại sau hoặc liên hệ admin nếu lỗi vẫn tiếp tục
 """
 
 
+BUSY_MESSAGE = "⏳ Hệ thống đang bận, vui lòng thử lại sau ít giây."
+
+
 NO_DATA_MESSAGE = """
 😔 <b>Chưa có dữ liệu</b>
 
@@ -1,59 +1,191 @@
-"""Logging configuration helper"""
+"""Logging configuration helper
 
+Pipeline không chặn event loop:
+
+    logger.info("✅ Sent to user %s", user_id)
+        → QueueHandler (thread gọi log: lọc mẫu + gắn trace_id, KHÔNG format)
+        → queue
+        → QueueListener (thread nền: format text/JSON + ghi console / file xoay vòng)
+
+Message dùng %-style để việc format chỉ diễn ra ở thread nền (và chỉ khi
+record được giữ lại). Log INFO/DEBUG khối lượng lớn có thể lấy mẫu theo
+logger (LOG_SAMPLING); WARNING trở lên luôn được ghi.
+"""
+
+import atexit
+import json
 import logging
 import logging.handlers
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.config import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLING
+from app.services.tracing import current_trace_id
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Số message template tối đa SamplingFilter đếm cùng lúc
+SAMPLING_MAX_TEMPLATES = 1024
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler giữ nguyên record: message được format ở thread listener
+
+    QueueHandler mặc định format message ngay trong thread gọi log (để record
+    pickle được khi gửi sang process khác). Queue ở đây cùng process nên chỉ
+    cần đưa nguyên record vào queue. Args được format muộn nên không truyền
+    object sẽ bị sửa ngay sau lời gọi log (truyền giá trị / bản sao).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class TraceContextFilter(logging.Filter):
+    """Gắn trace_id của update đang xử lý (contextvar chỉ đọc được ở thread gọi log)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Giữ 1/N record INFO/DEBUG mỗi mẫu message của các logger cấu hình
+
+    Đếm theo (logger, message template) - template %-style không đổi giữa các
+    lần gọi nên "✅ Sent to user %s" được đếm chung cho mọi user. Log f-string
+    tạo template mới mỗi lần gọi, nên bộ đếm chỉ giữ `max_templates` template
+    dùng gần nhất (LRU), bộ nhớ không tăng theo thời gian chạy.
+    """
+
+    def __init__(self, rates: Dict[str, int], max_templates: int = SAMPLING_MAX_TEMPLATES):
+        super().__init__()
+        self.rates = rates
+        self.max_templates = max_templates
+        self.counts: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rate(self, name: str) -> int:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1
 
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        every = self._rate(record.name)
+        if every <= 1:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            count = self.counts.pop(key, 0)
+            self.counts[key] = count + 1
+            if len(self.counts) > self.max_templates:
+                self.counts.popitem(last=False)
+        if count % every:
+            return False
+        record.sample_rate = every
+        return True
 
-def setup_logging():
-    """Setup comprehensive logging configuration"""
+
+class JsonFormatter(logging.Formatter):
+    """1 object JSON / dòng"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "file": f"{record.filename}:{record.lineno}",
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            data["trace_id"] = trace_id
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate:
+            data["sample_rate"] = sample_rate
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _file_handler(path: Path, level: int, max_bytes: int, backup_count: int, formatter) -> logging.Handler:
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setLevel(level)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, sampling: Dict[str, int] = None):
+    """Setup comprehensive logging configuration (gọi lại → cấu hình lại)"""
+    global _listener, _queue_handler
+
+    shutdown_logging()
 
     # Create logs directory
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT)
 
-    # Formatter
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-    # Console handler (INFO level)
+    # Console handler (LOG_LEVEL)
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
 
-    # File handler - All logs (DEBUG level)
-    file_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "app.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"  # 10MB
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    # File handlers: tất cả / chỉ lỗi / riêng cache
+    file_handler = _file_handler(log_dir / "app.log", logging.DEBUG, 10 * 1024 * 1024, 5, formatter)  # 10MB
+    error_handler = _file_handler(log_dir / "error.log", logging.ERROR, 10 * 1024 * 1024, 5, formatter)
+    cache_handler = _file_handler(log_dir / "cache.log", logging.DEBUG, 5 * 1024 * 1024, 3, formatter)  # 5MB
+    cache_handler.addFilter(logging.Filter("app.utils.cache"))
 
-    # File handler - Errors only (ERROR level)
-    error_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "error.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"  # 10MB
+    # Ghi file ở thread nền; event loop chỉ đưa record vào queue
+    _listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(),
+        console_handler, file_handler, error_handler, cache_handler,
+        respect_handler_level=True,
     )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
+    _queue_handler = LazyQueueHandler(_listener.queue)
+    _queue_handler.addFilter(SamplingFilter(LOG_SAMPLING if sampling is None else sampling))
+    _queue_handler.addFilter(TraceContextFilter())
 
-    # File handler - Cache logs (DEBUG level)
-    cache_handler = logging.handlers.RotatingFileHandler(
-        log_dir / "cache.log", maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"  # 5MB
-    )
-    cache_handler.setLevel(logging.DEBUG)
-    cache_handler.setFormatter(formatter)
+    # Root giữ DEBUG để app.log / cache.log nhận record DEBUG; LOG_LEVEL chỉ lọc console
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(_queue_handler)
+    _listener.start()
+
+    logging.info("✅ Logging system initialized (%s, queue listener)", log_format)
+
+
+def shutdown_logging():
+    """Dừng listener: ghi nốt các record còn trong queue"""
+    global _listener, _queue_handler
 
-    # Add handlers to root logger
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(error_handler)
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
-    # Cache-specific logger
-    cache_logger = logging.getLogger("app.utils.cache")
-    cache_logger.addHandler(cache_handler)
 
-    logging.info("✅ Logging system initialized")
+atexit.register(shutdown_logging)
@@ -1,5 +1,6 @@
 """Helper functions for lottery calculations"""
 
+import math
 from datetime import date, timedelta
 from app.constants.draw_schedules import PROVINCE_DRAW_SCHEDULE
 
@@ -47,6 +48,32 @@ def count_draw_periods(
     return count
 
 
+def draw_window_start(province_code: str, draws: int, end_date: date, slack: float = 0.25) -> date:
+    """
+    Lower bound of draw_date for the last `draws` draw periods of a province.
+
+    Used as an extra `draw_date >= ...` filter so window queries only touch
+    recent rows (and recent partitions on Postgres). Adds `slack` (25%) plus
+    one week of margin for skipped draws (e.g. Tết).
+
+    Args:
+        province_code: Province code
+        draws: Number of draw periods in the window
+        end_date: Last date of the window
+        slack: Extra fraction of days added to the window
+
+    Returns:
+        Earliest date the window can start at
+
+    Examples:
+        >>> draw_window_start('MB', 200, date(2025, 10, 13))
+        datetime.date(2025, 1, 29)
+    """
+    schedule = PROVINCE_DRAW_SCHEDULE.get(province_code, [0, 1, 2, 3, 4, 5, 6])
+    days = math.ceil(draws * 7 / len(schedule) * (1 + slack)) + 7
+    return end_date - timedelta(days=days)
+
+
 def is_daily_draw_province(province_code: str) -> bool:
     """
     Check if province draws daily (Miền Bắc).
@@ -87,3 +114,25 @@ def categorize_gan(value: int, is_daily: bool) -> str:
             return "gan_lon"
         else:
             return "gan_thuong"
+
+
+def categorize_gan_tail(tail: float) -> str:
+    """
+    Categorize gan level from the tail probability of the current gap.
+
+    Unlike categorize_gan, the thresholds do not depend on draw frequency:
+    tail = share of the number's historical gaps at least as long as the
+    current one (see app/services/analytics/gap_scores.py).
+
+    Args:
+        tail: Empirical P(gap >= current gap), 0 < tail <= 1
+
+    Returns:
+        Category string: "cuc_gan", "gan_lon", or "gan_thuong"
+    """
+    if tail <= 0.05:
+        return "cuc_gan"
+    elif tail <= 0.15:
+        return "gan_lon"
+    else:
+        return "gan_thuong"
@@ -0,0 +1,270 @@
+"""Worker process - Xử lý notification/ingest jobs từ job_queue
+
+Chạy tách biệt với bot xử lý updates:
+    RUN_MODE=handler python -m app.main   # chỉ phục vụ updates
+    python -m app.worker                  # scheduler (producer) + consumer
+
+Có thể chạy nhiều worker; enqueue theo dedupe_key (tỉnh / miền + ngày) nên
+mỗi tỉnh chỉ có 1 job pending/running: các scheduler chạy song song hay lần
+check sau không tạo fan-out thứ 2 khi fan-out trước còn đang gửi.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.config import (
+    LOG_LEVEL,
+    TELEGRAM_TOKEN,
+    WORKER_CONCURRENCY,
+    WORKER_POLL_INTERVAL,
+    SCHEDULER_LEADER_ELECTION,
+    SCHEDULER_LEASE_SECONDS,
+    LOOP_MONITOR_ENABLED,
+)
+from app.database import unit_of_work
+from app.services.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[object]]
+
+
+def build_default_handlers(notification_service, lottery_service, job_queue=None) -> Dict[str, JobHandler]:
+    """
+    Các loại job mặc định: notification và ingest
+
+    ingest_province lấy kết quả mới từ API (lưu DB + Redis) rồi enqueue job
+    notify trong payload["then"], nên notify chỉ đọc kết quả vừa ingest.
+    """
+
+    def _date(payload: Dict) -> Optional[date]:
+        value = payload.get("check_date")
+        return date.fromisoformat(value) if value else None
+
+    async def notify_province(payload: Dict):
+        return await notification_service.check_and_send_if_new_result(
+            province_code=payload["province_code"],
+            check_date=_date(payload)
+        )
+
+    async def notify_region_digest(payload: Dict):
+        deadline = payload.get("deadline")
+        return await notification_service.check_and_send_region_digest(
+            region=payload["region"],
+            province_codes=payload["province_codes"],
+            check_date=_date(payload),
+            deadline=datetime.fromisoformat(deadline) if deadline else None
+        )
+
+    async def ingest_province(payload: Dict):
+        province_code = payload["province_code"]
+        check_date = _date(payload)
+        if check_date and await notification_service._already_sent(province_code, check_date):
+            # Đã gửi hôm nay: không poll API nữa
+            return {"province_code": province_code, "skipped": "already_sent"}
+
+        result = await lottery_service.get_latest_result(province_code, force_api=True)
+
+        follow_up = payload.get("then")
+        if follow_up and job_queue is not None:
+            await job_queue.enqueue(follow_up["kind"], follow_up["payload"], dedupe_key=follow_up.get("dedupe_key"))
+        return {"province_code": province_code, "date": (result or {}).get("date")}
+
+    return {
+        "notify_province": notify_province,
+        "notify_region_digest": notify_region_digest,
+        "ingest_province": ingest_province,
+    }
+
+
+class JobWorker:
+    """Vòng lặp claim → chạy handler → ack/fail"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        worker_id: Optional[str] = None,
+        concurrency: int = WORKER_CONCURRENCY,
+        poll_interval: float = WORKER_POLL_INTERVAL,
+        lease_seconds: int = 300
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        """Dừng nhận job mới (job đang chạy vẫn hoàn thành)"""
+        self._stopping.set()
+
+    async def run_once(self) -> bool:
+        """
+        Xử lý 1 job nếu có
+
+        Returns:
+            True nếu đã xử lý 1 job, False nếu hàng đợi trống
+        """
+        job = await self.queue.claim(
+            self.worker_id,
+            kinds=list(self.handlers),
+            lease_seconds=self.lease_seconds
+        )
+        if not job:
+            return False
+
+        handler = self.handlers[job["kind"]]
+        start = time.perf_counter()
+        task = asyncio.create_task(self._handle(handler, job))
+        lease_lost = asyncio.Event()
+        keeper = asyncio.create_task(self._keep_lease(job["id"], task, lease_lost))
+
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if lease_lost.is_set() and not asyncio.current_task().cancelling():
+                # Mất lease: worker khác có thể đã claim lại, dừng fan-out (đã lưu checkpoint)
+                logger.error("❌ Job %s (%s) stopped: lease lost", job['id'], job['kind'])
+                return True
+            # Quá deadline drain: trả job lại (handler đã lưu checkpoint) rồi dừng
+            await self.queue.release(job["id"], self.worker_id)
+            raise
+        except Exception as e:
+            logger.exception("❌ Job %s (%s) raised: %s", job['id'], job['kind'], e)
+            await self.queue.fail(job["id"], self.worker_id, repr(e))
+        else:
+            if isinstance(result, dict) and result.get("interrupted"):
+                # Fan-out dừng giữa chừng vì drain → worker khác làm tiếp từ checkpoint
+                await self.queue.release(job["id"], self.worker_id)
+            else:
+                await self.queue.ack(job["id"], self.worker_id)
+                logger.info("⏱️ Job %s (%s) took %.2fs", job['id'], job['kind'], time.perf_counter() - start)
+        finally:
+            keeper.cancel()
+
+        return True
+
+    async def _handle(self, handler: JobHandler, job: Dict):
+        async with unit_of_work(read_only=True, kind=job["kind"]):
+            return await handler(job["payload"])
+
+    async def _keep_lease(self, job_id: int, task: asyncio.Task, lease_lost: asyncio.Event):
+        """Gia hạn lease mỗi 1/3 lease_seconds; không gia hạn được → hủy job"""
+        while not task.done():
+            await asyncio.sleep(self.lease_seconds / 3)
+            if task.done():
+                return
+            if not await self.queue.extend_lease(job_id, self.worker_id, self.lease_seconds):
+                lease_lost.set()
+                task.cancel()
+                return
+
+    async def _consume(self):
+        while not self._stopping.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.exception("❌ Worker loop error: %s", e)
+                processed = False
+
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run(self):
+        """Chạy `concurrency` consumer song song tới khi stop()"""
+        logger.info(
+            "👷 Worker %s started (%s consumers, kinds=%s)", self.worker_id, self.concurrency, list(self.handlers)
+        )
+        await asyncio.gather(*(self._consume() for _ in range(self.concurrency)))
+        logger.info("🛑 Worker %s stopped", self.worker_id)
+
+
+async def run_worker():
+    """Entry point: scheduler ở chế độ enqueue + consumer"""
+    import signal
+    from telegram import Bot
+
+    from app.database import init_db, close_db
+    from app.services.drain import get_drain
+    from app.services.scheduler_jobs import SchedulerJobs
+
+    if not TELEGRAM_TOKEN:
+        logger.error("❌ TELEGRAM_BOT_TOKEN không được thiết lập!")
+        return
+
+    await init_db()
+
+    queue = JobQueue()
+    bot = Bot(TELEGRAM_TOKEN)
+    await bot.initialize()
+
+    leader = None
+    if SCHEDULER_LEADER_ELECTION:
+        from app.services.leader_election import LeaderElection
+        leader = LeaderElection(lease_seconds=SCHEDULER_LEASE_SECONDS)
+
+    # Mọi worker consume jobs; chỉ leader enqueue (dedupe_key vẫn chống trùng)
+    scheduler = SchedulerJobs(bot=bot, job_queue=queue, leader=leader)
+    scheduler.setup_jobs()
+    scheduler.start()
+
+    worker = JobWorker(
+        queue,
+        build_default_handlers(
+            scheduler.notification_service, scheduler.notification_service.lottery_service, queue
+        )
+    )
+
+    drain = get_drain()
+    run_task = asyncio.current_task()
+    deadline = []
+
+    def begin_drain():
+        # Không claim job mới; job đang chạy xong (fan-out lưu checkpoint) trước deadline
+        if drain.begin():
+            worker.stop()
+            scheduler.pause()
+            deadline.append(loop.call_later(drain.remaining(), run_task.cancel))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, begin_drain)
+
+    monitor = None
+    if LOOP_MONITOR_ENABLED:
+        from app.services.loop_monitor import get_loop_monitor
+        monitor = get_loop_monitor()
+        monitor.start()
+
+    try:
+        await worker.run()
+        for handle in deadline:
+            handle.cancel()
+    except asyncio.CancelledError:
+        logger.warning("⚠️ Drain deadline reached, stopping worker")
+    finally:
+        if monitor:
+            await monitor.stop()
+        scheduler.shutdown()
+        if leader:
+            await leader.release()
+        await bot.shutdown()
+        await close_db()
+
+
+if __name__ == "__main__":
+    from app.utils.logging_helper import setup_logging
+
+    setup_logging(LOG_LEVEL)
+    asyncio.run(run_worker())
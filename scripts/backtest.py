@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Backtest chiến lược chọn số lô trên lịch sử (app/services/analytics/backtest.py)
+
+Mặc định đọc lịch sử từ database (DATABASE_URL). --synthetic N chạy trên N
+ngày dữ liệu synthetic trong bộ nhớ (không cần database).
+
+Usage:
+    python scripts/backtest.py --strategy gan --province MB --years 5 --picks 3
+    python scripts/backtest.py --region MN --years 3 --workers 4
+    python scripts/backtest.py --synthetic 1825 --province MB TPHCM DANA
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import PROVINCES
+from app.services.analytics.backtest import (
+    DEFAULT_LOOKBACK,
+    STRATEGIES,
+    BacktestService,
+    BacktestSpec,
+    ProvinceHistory,
+    run_backtests,
+)
+
+
+def synthetic_histories(days: int, province_codes: list) -> list:
+    """Lịch sử synthetic `days` ngày gần nhất của các tỉnh"""
+    from app.data.synthetic import generate_results
+    from app.services.db.lottery_db_service import extract_lo_numbers
+
+    rows = {code: [] for code in province_codes}
+    for result in generate_results(days):
+        if result["province_code"] in rows:
+            draw_date = date.fromisoformat(result["date"])
+            rows[result["province_code"]].extend(
+                (number, draw_date) for number, _ in extract_lo_numbers(result["prizes"], 2)
+            )
+    return [ProvinceHistory.from_rows(code, code_rows) for code, code_rows in rows.items()]
+
+
+def run_synthetic(args, province_codes: list, since: date) -> list:
+    histories = synthetic_histories(args.synthetic, province_codes)
+    specs = [BacktestSpec(name, since, args.picks, args.lookback) for name in args.strategy]
+    computed = run_backtests(histories, specs, args.workers)
+
+    results = [
+        {"strategy": spec.strategy, "province_code": code, **result}
+        for (spec, code), result in computed.items()
+    ]
+    results.sort(key=lambda item: item["roi"], reverse=True)
+    return results
+
+
+async def run_database(args, province_codes: list, since: date) -> list:
+    from app.database import init_db, close_db
+
+    await init_db()
+    try:
+        service = BacktestService(workers=args.workers)
+        return await service.run(args.strategy, province_codes, since, args.picks, args.lookback)
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest lô strategies")
+    parser.add_argument("--strategy", nargs="+", choices=sorted(STRATEGIES), default=sorted(STRATEGIES))
+    parser.add_argument("--province", nargs="+", help="Province codes (default: MB)")
+    parser.add_argument("--region", choices=["MB", "MN", "MT"], help="All provinces of a region")
+    parser.add_argument("--years", type=int, default=5, help="Evaluate the last N years (default: 5)")
+    parser.add_argument("--picks", type=int, default=3, help="Numbers picked per draw (default: 3)")
+    parser.add_argument("--lookback", type=int, default=DEFAULT_LOOKBACK, help="Draws used by hot / cold")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (1 = no pool)")
+    parser.add_argument("--synthetic", type=int, metavar="DAYS", help="Use N days of synthetic data")
+    args = parser.parse_args()
+
+    if args.region:
+        province_codes = [code for code, info in PROVINCES.items() if info.get("region") == args.region]
+    else:
+        province_codes = [code.upper() for code in (args.province or ["MB"])]
+
+    since = date.today() - timedelta(days=365 * args.years)
+    started = time.perf_counter()
+    if args.synthetic:
+        results = run_synthetic(args, province_codes, since)
+    else:
+        results = asyncio.run(run_database(args, province_codes, since))
+    elapsed = time.perf_counter() - started
+
+    print(f"{'strategy':<8} {'province':<8} {'draws':>6} {'hit%':>7} {'hits/draw':>10} {'miss':>5} {'roi':>8}")
+    for item in results:
+        print(
+            f"{item['strategy']:<8} {item['province_code']:<8} {item['draws']:>6} "
+            f"{item['hit_rate']:>7.1%} {item['avg_hits']:>10.2f} {item['max_miss_streak']:>5} {item['roi']:>+8.1%}"
+        )
+    print(f"\n{len(results)} backtests in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks - Đo hiệu năng các đường nóng (không chạy trong pytest)"""
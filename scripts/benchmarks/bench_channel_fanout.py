@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gửi trực tiếp vs đăng channel rồi copy/forward
+
+Usage:
+    python scripts/benchmarks/bench_channel_fanout.py
+    python scripts/benchmarks/bench_channel_fanout.py --recipients 10000 --latency-ms 0.5
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.services.mock_data import get_mock_lottery_result
+from app.services.notification_service import NotificationService
+from scripts.benchmarks.fake_bot_api import create_fake_bot
+
+
+async def run_mode(mode: str, recipients: int, latency: float) -> dict:
+    """Chạy 1 lượt fan-out cho MB với chế độ mode"""
+    bot, request = await create_fake_bot(latency=latency)
+
+    service = NotificationService(bot=bot)
+    service.channel_id = "@xsbamien_bench"
+    service.publish_modes = {"MB": mode}
+
+    subscribers = [SimpleNamespace(user_id=100000 + i) for i in range(recipients)]
+
+    async def get_subscribers(province_code):
+        return subscribers
+
+    async def get_latest_result(province_code):
+        result = get_mock_lottery_result(province_code)
+        result.setdefault("prizes", {k: v for k, v in result.items() if k.startswith(("DB", "G"))})
+        return result
+
+    service.subscription_service.get_subscribers_by_province = get_subscribers
+    service.lottery_service.get_latest_result = get_latest_result
+
+    start = time.perf_counter()
+    summary = await service.send_result_notification("MB")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "success": summary.get("success", 0),
+        "requests": request.total_requests,
+        "bytes": request.total_bytes,
+        "seconds": elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark channel fan-out")
+    parser.add_argument("--recipients", type=int, default=10000, help="Số subscribers (default: 10000)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Độ trễ giả lập mỗi request (ms)")
+    args = parser.parse_args()
+
+    # Log từng user làm sai lệch thời gian đo
+    logging.disable(logging.CRITICAL)
+
+    print(f"📊 Fan-out MB tới {args.recipients} subscribers (latency {args.latency_ms}ms/request)\n")
+    print(f"{'mode':<10}{'requests':>10}{'bytes':>14}{'bytes/user':>12}{'seconds':>10}")
+
+    for mode in ("direct", "copy", "forward", "follow"):
+        r = await run_mode(mode, args.recipients, args.latency_ms / 1000)
+        per_user = r["bytes"] / args.recipients if args.recipients else 0
+        print(f"{r['mode']:<10}{r['requests']:>10}{r['bytes']:>14,}{per_user:>12.1f}{r['seconds']:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
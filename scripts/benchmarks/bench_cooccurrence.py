@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lô xiên từ SQL self-join vs CooccurrenceMatrix (app/services/analytics/cooccurrence.py)
+
+Với mỗi độ dài lịch sử (năm) và tỉnh (MB quay hằng ngày 27 lô, TPHCM 2 kỳ/tuần
+18 lô), nạp dữ liệu synthetic vào SQLite tạm rồi đo:
+- sql_ms:    top cặp bằng self-join lo_2_so_history (cách làm ngây thơ, mỗi truy vấn)
+- build_ms:  dựng ma trận từ đầu (1 lần khi nạp)
+- add_us:    thêm 1 kỳ mới (tích ngoài, khi lưu kết quả)
+- top_ms:    top cặp toàn bộ lịch sử
+- win_ms:    top cặp ~200 kỳ gần nhất, cửa sổ chưa có trong cache (prefix snapshot)
+- partner_ms: số đi cùng 1 số, 200 kỳ gần nhất (cửa sổ đã cache)
+
+Usage:
+    python scripts/benchmarks/bench_cooccurrence.py
+    python scripts/benchmarks/bench_cooccurrence.py --years 1 5 10 --repeat 20
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import create_engine, insert, text
+
+from app.data.synthetic import generate_results
+from app.models import Base
+from app.models.lottery_result import Lo2SoHistory
+from app.services.analytics.cooccurrence import CooccurrenceMatrix
+from app.services.db.lottery_db_service import extract_lo_numbers
+
+END_DATE = date(2026, 10, 19)
+PROVINCES = {"MB": "MB", "TPHCM": "MN"}
+
+SELF_JOIN = text("""
+    SELECT a.number, b.number, COUNT(*) AS together
+    FROM lo_2_so_history a
+    JOIN lo_2_so_history b
+      ON b.province_id = a.province_id AND b.draw_date = a.draw_date AND b.number > a.number
+    WHERE a.province_id = :province
+    GROUP BY a.number, b.number
+    ORDER BY together DESC
+    LIMIT 20
+""")
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def load(engine, days: int) -> dict:
+    """Nạp synthetic vào SQLite, trả về {province: [(date, [numbers])]} cũ → mới"""
+    draws = {code: [] for code in PROVINCES}
+    rows = []
+    regions = sorted(set(PROVINCES.values()))
+    for result in generate_results(days, end_date=END_DATE, regions=regions):
+        if result["province_code"] not in PROVINCES:
+            continue
+        draw_date = date.fromisoformat(result["date"])
+        numbers = [number for number, _ in extract_lo_numbers(result["prizes"], 2)]
+        draws[result["province_code"]].append((draw_date, numbers))
+        rows.extend(
+            {"lottery_result_id": 0, "province_id": result["province_code"], "region_id": result["region"],
+             "draw_date": draw_date, "number": number, "prize_tier": prize_key}
+            for number, prize_key in extract_lo_numbers(result["prizes"], 2)
+        )
+
+    with engine.begin() as conn:
+        conn.execute(insert(Lo2SoHistory), rows)
+    return draws
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lô xiên co-occurrence")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10], help="Độ dài lịch sử (default: 1 5 10)")
+    parser.add_argument("--repeat", type=int, default=10, help="Số lần lặp mỗi phép đo (default: 10)")
+    args = parser.parse_args()
+
+    print(f"{'years':>5} {'province':<8}{'draws':>7}{'sql_ms':>9}{'build_ms':>10}{'add_us':>8}"
+          f"{'top_ms':>8}{'win_ms':>8}{'partner_ms':>11}{'snap_kb':>9}")
+
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/cooccurrence.db")
+            Base.metadata.create_all(engine)
+            draws = load(engine, years * 365)
+
+            for province, history in draws.items():
+                # province_id lưu dạng smallint (app/models/types.py)
+                province_id = Lo2SoHistory.__table__.c.province_id.type.process_bind_param(province, None)
+                with engine.connect() as conn:
+                    sql_ms = median_ms(
+                        lambda: conn.execute(SELF_JOIN, {"province": province_id}).all(), max(1, args.repeat // 5)
+                    )
+
+                def build():
+                    matrix = CooccurrenceMatrix()
+                    for draw_date, numbers in history:
+                        matrix.add_draw(draw_date, numbers)
+                    return matrix
+
+                build_ms = median_ms(build, max(1, args.repeat // 5))
+                matrix = build()
+
+                last_date, last_numbers = history[-1]
+                add_timings = []
+                for offset in range(1, args.repeat + 1):
+                    start = time.perf_counter()
+                    matrix.add_draw(last_date + timedelta(days=offset), last_numbers)
+                    add_timings.append((time.perf_counter() - start) * 1_000_000)
+                matrix.truncate(last_date + timedelta(days=1))
+
+                top_ms = median_ms(lambda: matrix.top_pairs(None, 20), args.repeat)
+                # Mỗi lần 1 cửa sổ khác nhau → không trúng cache của window()
+                sizes = iter(range(200, 200 + args.repeat))
+                win_ms = median_ms(lambda: matrix.top_pairs(next(sizes), 20), args.repeat)
+                partner_ms = median_ms(lambda: matrix.partners("05", 200, 10), args.repeat)
+                snap_kb = sum(len(snapshot) * snapshot.itemsize for snapshot in matrix.snapshots) / 1024
+
+                print(f"{years:>5} {province:<8}{len(history):>7}{sql_ms:>9.1f}{build_ms:>10.1f}"
+                      f"{statistics.median(add_timings):>8.1f}{top_ms:>8.2f}{win_ms:>8.2f}"
+                      f"{partner_ms:>11.2f}{snap_kb:>9,.0f}")
+
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark: layout cũ (chuỗi + 9 indexes) vs layout gọn (smallint + 2 covering indexes)
+của lo_2_so_history / lo_3_so_history
+
+Nạp cùng 1 bộ dữ liệu synthetic (app/data/synthetic.py) vào 2 file SQLite tạm,
+đo dung lượng đĩa, thời gian insert (1 transaction / kỳ quay như khi ingest)
+và thời gian các truy vấn nóng.
+
+Usage:
+    python scripts/benchmarks/bench_lo_storage.py
+    python scripts/benchmarks/bench_lo_storage.py --days 730 --repeat 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import (
+    Column, Date, DateTime, Index, Integer, MetaData, String, Table,
+    and_, create_engine, desc, func, insert, select, text,
+)
+
+from app.data.synthetic import generate_results
+from app.models.lottery_result import LotteryResult, Lo2SoHistory, Lo3SoHistory
+from app.services.db.lottery_db_service import extract_lo_numbers
+
+# Layout trước migration compact_lo_history
+legacy_metadata = MetaData()
+
+
+def _legacy_table(name: str, width: int, index_prefix: str) -> Table:
+    return Table(
+        name, legacy_metadata,
+        Column("id", Integer, primary_key=True),
+        Column("lottery_result_id", Integer, nullable=False, index=True),
+        Column("province_code", String(20), nullable=False, index=True),
+        Column("region", String(10), nullable=False, index=True),
+        Column("draw_date", Date, nullable=False, index=True),
+        Column("number", String(width), nullable=False, index=True),
+        Column("prize_type", String(10), nullable=False),
+        Column("position", String(20), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index(f"{index_prefix}number_date", "number", "draw_date"),
+        Index(f"{index_prefix}province_number_date", "province_code", "number", "draw_date"),
+        Index(f"{index_prefix}region_number_date", "region", "number", "draw_date"),
+        Index(f"{index_prefix}draw_date_number", "draw_date", "number"),
+    )
+
+
+LEGACY_LO2 = _legacy_table("lo_2_so_history", 2, "idx_")
+LEGACY_LO3 = _legacy_table("lo_3_so_history", 3, "idx_lo3so_")
+
+
+def build_rows(results, legacy: bool):
+    """1 list rows (lo2, lo3) cho mỗi kỳ quay"""
+    for result_id, result in enumerate(results, start=1):
+        base = {
+            "lottery_result_id": result_id,
+            "province_code": result["province_code"],
+            "region": result["region"],
+            "draw_date": date.fromisoformat(result["date"]),
+        }
+        lo2, lo3 = [], []
+        for width, rows in ((2, lo2), (3, lo3)):
+            for idx, (number, prize_key) in enumerate(extract_lo_numbers(result["prizes"], width)):
+                row = dict(base, number=number, prize_type=prize_key)
+                if legacy:
+                    row["position"] = "last_2" if width == 2 else f"{prize_key}_{idx}"
+                    row["created_at"] = datetime.utcnow()
+                rows.append(row)
+        yield lo2, lo3
+
+
+def load(path: str, results, legacy: bool) -> float:
+    """Tạo schema + nạp dữ liệu, trả về thời gian insert (giây)"""
+    engine = create_engine(f"sqlite:///{path}")
+    if legacy:
+        legacy_metadata.create_all(engine)
+        lo2_target, lo3_target = LEGACY_LO2, LEGACY_LO3
+    else:
+        LotteryResult.metadata.create_all(
+            engine, tables=[LotteryResult.__table__, Lo2SoHistory.__table__, Lo3SoHistory.__table__]
+        )
+        lo2_target, lo3_target = Lo2SoHistory, Lo3SoHistory
+
+    start = time.perf_counter()
+    for lo2, lo3 in build_rows(results, legacy):
+        # Multi-row INSERT như LotteryDBService._extract_and_save_lo*so
+        with engine.begin() as conn:
+            conn.execute(insert(lo2_target).values(lo2))
+            conn.execute(insert(lo3_target).values(lo3))
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    engine.dispose()
+    return elapsed
+
+
+def hot_queries(c, end_date: date):
+    """Các truy vấn nóng: tần suất 30 ngày, lô gan, lịch sử 1 số"""
+    return {
+        "frequency_30d": select(c.number, func.count()).where(
+            and_(c.province_code == "MB", c.draw_date >= end_date - timedelta(days=30))
+        ).group_by(c.number),
+        "lo_gan": select(c.number, func.max(c.draw_date)).where(
+            c.province_code == "MB"
+        ).group_by(c.number),
+        "number_history": select(c.draw_date, c.prize_type).where(
+            and_(c.province_code == "MB", c.number == "45")
+        ).order_by(desc(c.draw_date)).limit(30),
+    }
+
+
+def time_queries(path: str, legacy: bool, end_date: date, repeat: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    columns = LEGACY_LO2.c if legacy else Lo2SoHistory
+    timings = {}
+
+    with engine.connect() as conn:
+        for name, query in hot_queries(columns, end_date).items():
+            conn.execute(query).all()  # warm up
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(query).all()
+            timings[name] = (time.perf_counter() - start) / repeat * 1000
+
+    engine.dispose()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lô history storage layouts")
+    parser.add_argument("--days", type=int, default=365, help="Số ngày dữ liệu synthetic (default: 365)")
+    parser.add_argument("--repeat", type=int, default=20, help="Số lần lặp mỗi truy vấn (default: 20)")
+    args = parser.parse_args()
+
+    end_date = date.today()
+    results = list(generate_results(args.days, end_date=end_date))
+    lo2_rows = sum(len(extract_lo_numbers(r["prizes"], 2)) for r in results)
+
+    print(f"📊 {args.days} ngày synthetic: {len(results)} kỳ quay, {lo2_rows:,} dòng lô 2 số\n")
+    print(f"{'layout':<10}{'size_kb':>10}{'insert_s':>10}{'freq_ms':>10}{'gan_ms':>10}{'hist_ms':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("legacy", "compact"):
+            legacy = layout == "legacy"
+            path = os.path.join(tmp, f"{layout}.db")
+            insert_seconds = load(path, results, legacy)
+            size_kb = os.path.getsize(path) / 1024
+            q = time_queries(path, legacy, end_date, args.repeat)
+            print(f"{layout:<10}{size_kb:>10,.0f}{insert_seconds:>10.2f}"
+                  f"{q['frequency_30d']:>10.2f}{q['lo_gan']:>10.2f}{q['number_history']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: độ trễ đọc SQLite trong khi backfill đang ghi
+
+So sánh SQLITE_PROFILE=default (rollback journal, NullPool, mỗi write tự
+giành lock) với SQLITE_PROFILE=production (WAL, pragmas, reader pool,
+writer queue). Mỗi profile chạy trên 1 file database tạm mới.
+
+Usage:
+    python scripts/benchmarks/bench_sqlite_concurrency.py
+    python scripts/benchmarks/bench_sqlite_concurrency.py --days 365 --writers 8 --readers 8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import select, func, and_
+
+import app.database.config as db_config
+from app.data.synthetic import generate_results
+from app.database import DatabaseSession, init_db, close_db
+from app.models.lottery_result import Lo2SoHistory
+from app.services.db import LotteryDBService
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def read_frequency(days: int) -> None:
+    """Truy vấn thống kê tần suất lô (read path điển hình)"""
+    end_date = date.today()
+    async with DatabaseSession(read_only=True) as session:
+        query = select(
+            Lo2SoHistory.number, func.count()
+        ).where(
+            and_(
+                Lo2SoHistory.province_code == "MB",
+                Lo2SoHistory.draw_date >= end_date - timedelta(days=days),
+            )
+        ).group_by(Lo2SoHistory.number)
+        (await session.execute(query)).all()
+
+
+async def run_profile(profile: str, days: int, writers: int, readers: int) -> dict:
+    """Backfill `days` ngày với `writers` coroutine, đồng thời `readers` coroutine đọc liên tục"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ["SQLITE_PROFILE"] = profile
+        db_config._engine = None
+        db_config._session_factory = None
+        db_config._read_engine = None
+        db_config._read_session_factory = None
+        await init_db()
+
+        service = LotteryDBService()
+        pending = list(generate_results(days, regions=["MB"]))
+        done = asyncio.Event()
+        latencies, read_errors, write_errors = [], 0, 0
+
+        async def writer():
+            nonlocal write_errors
+            while pending:
+                if await service.save_result(pending.pop()) is None:
+                    write_errors += 1
+
+        async def reader():
+            nonlocal read_errors
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    await read_frequency(30)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception:
+                    read_errors += 1
+                await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+        await asyncio.gather(*(writer() for _ in range(writers)))
+        backfill_seconds = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*reader_tasks)
+
+        await close_db()
+
+    return {
+        "profile": profile,
+        "backfill_s": backfill_seconds,
+        "write_errors": write_errors,
+        "reads": len(latencies),
+        "read_errors": read_errors,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite read latency during backfill")
+    parser.add_argument("--days", type=int, default=200, help="Số ngày backfill (default: 200)")
+    parser.add_argument("--writers", type=int, default=4, help="Số coroutine ghi (default: 4)")
+    parser.add_argument("--readers", type=int, default=4, help="Số coroutine đọc (default: 4)")
+    args = parser.parse_args()
+
+    # Log từng lần save làm sai lệch thời gian đo
+    logging.disable(logging.CRITICAL)
+
+    print(f"📊 Backfill {args.days} ngày MB ({args.writers} writers) + {args.readers} readers liên tục\n")
+    print(f"{'profile':<12}{'backfill_s':>11}{'w_err':>7}{'reads':>8}{'r_err':>7}"
+          f"{'p50_ms':>9}{'p95_ms':>9}{'p99_ms':>9}{'max_ms':>9}")
+
+    for profile in ("default", "production"):
+        r = await run_profile(profile, args.days, args.writers, args.readers)
+        print(f"{r['profile']:<12}{r['backfill_s']:>11.2f}{r['write_errors']:>7}{r['reads']:>8}{r['read_errors']:>7}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['max']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
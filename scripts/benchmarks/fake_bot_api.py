@@ -0,0 +1,100 @@
+"""
+Fake Telegram Bot API chạy local cho benchmark
+
+Thay thế tầng HTTP của python-telegram-bot: request vẫn được serialize
+đầy đủ như khi gửi thật, nhưng không ra mạng. Ghi lại số request và số
+bytes payload theo từng method.
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+from telegram import Bot
+from telegram.request import BaseRequest, RequestData
+
+
+class FakeBotAPIRequest(BaseRequest):
+    """BaseRequest trả lời như Bot API thật, đếm bytes gửi đi"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = Counter()
+        self.bytes_sent = Counter()
+        self._message_id = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes_sent.values())
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.bytes_sent.clear()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.json_parameters if request_data else {}
+        payload = request_data.json_payload if request_data else b""
+
+        self.requests[api_method] += 1
+        self.bytes_sent[api_method] += len(payload)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, params)}).encode()
+
+    def _result(self, api_method: str, params: dict):
+        if api_method == "getMe":
+            return {
+                "id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                "can_join_groups": True, "can_read_all_group_messages": False,
+                "supports_inline_queries": False,
+            }
+
+        self._message_id += 1
+        if api_method == "copyMessage":
+            return {"message_id": self._message_id}
+
+        chat_id = params.get("chat_id", "0")
+        try:
+            chat = {"id": int(chat_id), "type": "private"}
+        except ValueError:
+            chat = {"id": -1001, "type": "channel", "username": str(chat_id).lstrip("@")}
+
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": chat,
+            "text": params.get("text", ""),
+        }
+
+
+async def create_fake_bot(latency: float = 0.0) -> Tuple[Bot, FakeBotAPIRequest]:
+    """Tạo Bot đã initialize, dùng FakeBotAPIRequest"""
+    request = FakeBotAPIRequest(latency=latency)
+    bot = Bot(token="123456:BENCHMARK", request=request, get_updates_request=FakeBotAPIRequest())
+    await bot.initialize()
+    request.reset()
+    return bot, request
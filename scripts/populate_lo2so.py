@@ -73,7 +73,6 @@ async def populate_lo2so():
                     draw_date=lottery.draw_date,
                     number=num,
                     prize_type=prize_type,
-                    position='last_2'  # ← THÊM (optional)
                 )
                 session.add(lo2so)
                 inserted += 1
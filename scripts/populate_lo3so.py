@@ -2,7 +2,6 @@
 
 import asyncio
 import logging
-from datetime import datetime
 
 from app.database import DatabaseSession
 from app.models import LotteryResult, Lo3SoHistory
@@ -24,7 +23,7 @@ async def extract_lo3so_from_prizes(prizes: dict, lottery_result) -> list[dict]:
             if isinstance(prize_values, str):
                 prize_values = [prize_values]
             
-            for idx, num_str in enumerate(prize_values):
+            for num_str in prize_values:
                 if len(num_str) >= 3:
                     lo3 = num_str[-3:]  # Last 3 digits
                     numbers.append({
@@ -34,8 +33,6 @@ async def extract_lo3so_from_prizes(prizes: dict, lottery_result) -> list[dict]:
                         "draw_date": lottery_result.draw_date,
                         "number": lo3,
                         "prize_type": prize_key,
-                        "position": f"{prize_key}_{idx}",
-                        "created_at": datetime.utcnow(),
                     })
     
     return numbers
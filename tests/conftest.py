@@ -1,8 +1,35 @@
 """Pytest fixtures for XS Ba Miền Bot tests"""
 
+import os
+import shutil
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
 import pytest
+import pytest_asyncio
 from unittest.mock import Mock
 
+import app.database.config as db_config
+from app.data.synthetic import generate_results
+from app.database import init_db, close_db
+from app.utils.timezone import get_vietnam_today
+
+# Đuôi file SQLite chép kèm (journal WAL)
+_SQLITE_SUFFIXES = ("", "-wal", "-shm")
+
+
+def _reset_engines():
+    db_config._engine = None
+    db_config._session_factory = None
+    db_config._read_engine = None
+    db_config._read_session_factory = None
+
+
+@pytest.fixture(scope="session")
+def sqlite_templates(tmp_path_factory) -> Dict:
+    """File SQLite đã seed, dùng chung cả phiên test: {tham số seed: path}"""
+    return {"dir": tmp_path_factory.mktemp("sqlite_templates"), "paths": {}}
+
 
 @pytest.fixture
 def mock_datetime():
@@ -61,3 +88,73 @@ def expected_provinces_by_day():
             "DALAT",
         ],  # Sunday (schedule_day=0)
     }
+
+
+@pytest_asyncio.fixture
+async def sqlite_database(sqlite_templates, tmp_path, monkeypatch):
+    """
+    Database SQLite tạm cho test, seed synthetic từ template chép sẵn
+
+    Lần đầu gặp 1 bộ tham số: init_db + save_result vào file template (1 lần
+    / phiên test); các test sau chỉ chép file. Dùng:
+
+        results = await sqlite_database(40, ["MB"])
+
+    Args (của hàm trả về):
+        days, regions, end_date: như generate_results (end_date mặc định hôm nay)
+        provinces: Chỉ giữ các tỉnh này
+        save_until: Chỉ lưu kết quả tới ngày này (các kỳ sau vẫn được trả về)
+        name: Tên file database của test
+
+    Returns:
+        Các kết quả đã sinh (bản mới mỗi lần gọi, test sửa thoải mái)
+    """
+
+    def results_for(days, regions, provinces, end_date) -> List[Dict]:
+        results = generate_results(days, end_date=end_date, regions=regions) if days else []
+        return [result for result in results if not provinces or result["province_code"] in provinces]
+
+    async def open_database(
+        days: int = 0,
+        regions: Optional[Sequence[str]] = None,
+        provinces: Optional[Sequence[str]] = None,
+        end_date: Optional[date] = None,
+        save_until: Optional[date] = None,
+        name: str = "test.db",
+    ) -> List[Dict]:
+        # Gọi lại trong cùng test: đóng database trước
+        await close_db()
+        end_date = end_date or get_vietnam_today()
+        regions = list(regions) if regions else None
+        key = (
+            days, tuple(regions or ()), tuple(provinces or ()), end_date, save_until,
+            os.getenv("SQLITE_PROFILE"),
+        )
+
+        template = sqlite_templates["paths"].get(key)
+        if template is None:
+            from app.services.db import LotteryDBService
+
+            template = sqlite_templates["dir"] / f"template_{len(sqlite_templates['paths'])}.db"
+            monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{template}")
+            _reset_engines()
+            await init_db()
+            service = LotteryDBService()
+            for result in results_for(days, regions, provinces, end_date):
+                if save_until is None or result["date"] <= save_until.isoformat():
+                    await service.save_result(result)
+            await close_db()
+            sqlite_templates["paths"][key] = template
+
+        target = tmp_path / name
+        for suffix in _SQLITE_SUFFIXES:
+            if os.path.exists(f"{template}{suffix}"):
+                shutil.copyfile(f"{template}{suffix}", f"{target}{suffix}")
+
+        monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{target}")
+        _reset_engines()
+        await init_db()
+        return results_for(days, regions, provinces, end_date)
+
+    yield open_database
+    await close_db()
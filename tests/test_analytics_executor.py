@@ -0,0 +1,217 @@
+"""Unit tests for AnalyticsExecutor and the pure analytics computations it runs"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+import app.services.analytics.executor as executor_module
+from app.services.analytics.executor import AnalyticsBusy, AnalyticsExecutor, task_key
+from app.services.db.statistics_db_service import StatisticsDBService, compute_lo_gan
+from app.services.statistics_service import StatisticsService, compute_streaks
+
+D = date(2026, 1, 1)
+
+
+def wait_for(event: threading.Event, value=None):
+    event.wait(5)
+    return value
+
+
+def spin(seconds: float) -> int:
+    """CPU-bound: giữ worker bận `seconds` giây"""
+    end = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < end:
+        count += 1
+    return count
+
+
+@pytest.fixture
+def executor():
+    executor = AnalyticsExecutor(kind="thread", workers=2, queue_size=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+class TestAnalyticsExecutor:
+    """Hàng đợi giới hạn, hủy theo key, đo thời gian"""
+
+    @pytest.mark.asyncio
+    async def test_run_and_stats(self, executor):
+        assert await executor.run(sorted, [3, 1, 2], reverse=True) == [3, 2, 1]
+
+        stats = executor.stats()
+        assert (stats["submitted"], stats["completed"], stats["pending"]) == (1, 1, 0)
+        assert stats["kind"] == "thread"
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates(self, executor):
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+        assert executor.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue(self, executor):
+        event = threading.Event()
+        running = [asyncio.create_task(executor.run(wait_for, event, n)) for n in range(2)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(AnalyticsBusy):
+            await executor.run(wait_for, event)
+        assert executor.stats()["rejected"] == 1
+
+        event.set()
+        assert await asyncio.gather(*running) == [0, 1]
+        await asyncio.sleep(0.05)
+        assert executor.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_new_task_cancels_same_key(self, executor):
+        event = threading.Event()
+        old = asyncio.create_task(executor.run(wait_for, event, "old", key=42))
+        await asyncio.sleep(0.05)
+
+        new = asyncio.create_task(executor.run(wait_for, event, "new", key=42))
+        await asyncio.sleep(0.05)
+        event.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await old
+        assert await new == "new"
+        assert executor.stats()["cancelled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_other_keys_not_cancelled(self, executor):
+        event = threading.Event()
+        first = asyncio.create_task(executor.run(wait_for, event, 1, key=1))
+        second = asyncio.create_task(executor.run(wait_for, event, 2, key=2))
+        await asyncio.sleep(0.05)
+        event.set()
+
+        assert await asyncio.gather(first, second) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_key_from_context(self, executor):
+        event = threading.Event()
+
+        async def handler(user_id, value):
+            task_key.set(user_id)
+            return await executor.run(wait_for, event, value)
+
+        old = asyncio.create_task(handler(7, "old"))
+        await asyncio.sleep(0.05)
+        new = asyncio.create_task(handler(7, "new"))
+        await asyncio.sleep(0.05)
+        event.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await old
+        assert await new == "new"
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, executor):
+        """Event loop vẫn phục vụ được trong khi worker bận tính toán"""
+        heavy = asyncio.create_task(executor.run(spin, 0.5))
+
+        max_lag = 0.0
+        while not heavy.done():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.01)
+
+        assert await heavy > 0
+        assert max_lag < 0.1
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            AnalyticsExecutor(kind="gpu")
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self):
+        executor = AnalyticsExecutor(kind="process", workers=1, queue_size=2)
+        try:
+            result = await executor.run(compute_streaks, [D], [(D, "05")], None, 1)
+        finally:
+            executor.shutdown()
+
+        assert result["current_streaks"][0]["number"] == "05"
+
+
+class TestBusyPropagation:
+    """Hàng đợi đầy → AnalyticsBusy tới handler, không thành "không có dữ liệu" / mock"""
+
+    @pytest_asyncio.fixture
+    async def full_executor(self, sqlite_database, monkeypatch):
+        # Có kỳ quay để get_lo*so_streaks đi tới bước tính trên executor
+        await sqlite_database(3, ["MB"])
+        full = AnalyticsExecutor(kind="thread", workers=1, queue_size=0)
+        monkeypatch.setattr(executor_module, "_executor", full)
+        yield full
+        full.shutdown(wait=True)
+
+    @pytest.mark.asyncio
+    async def test_db_service_raises_busy(self, full_executor):
+        with pytest.raises(AnalyticsBusy):
+            await StatisticsDBService().get_lo_gan("MB", draws=30)
+        assert full_executor.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_statistics_service_raises_busy(self, full_executor):
+        service = StatisticsService(use_database=True)
+        service.db_service = StatisticsDBService()
+
+        with pytest.raises(AnalyticsBusy):
+            await service.get_lo_gan("MB", draws=30)
+
+    @pytest.mark.asyncio
+    async def test_streaks_raise_busy(self, full_executor):
+        service = StatisticsService(use_database=True)
+
+        with pytest.raises(AnalyticsBusy):
+            await service.get_lo2so_streaks("MB", draws=30)
+        with pytest.raises(AnalyticsBusy):
+            await service.get_lo3so_streaks("MB", draws=30)
+        assert full_executor.stats()["rejected"] == 2
+
+
+class TestPureComputations:
+    """Phần tính toán tách khỏi get_lo_gan / get_lo*so_streaks"""
+
+    def test_compute_lo_gan_daily(self):
+        end = D + timedelta(days=40)
+        appearances = [("05", D + timedelta(days=5)), ("05", D + timedelta(days=20)), ("17", D + timedelta(days=38))]
+
+        result = compute_lo_gan("MB", appearances, D, end, 40, 40)
+
+        assert [item["number"] for item in result] == ["05"]
+        item = result[0]
+        assert item["gan_value"] == (end - (D + timedelta(days=20))).days - 1
+        assert item["max_cycle"] == 19
+        assert item["analysis_window"] == "40 kỳ"
+
+    def test_compute_lo_gan_periodic(self):
+        # An Giang quay thứ 5
+        end = date(2025, 10, 16)
+        appearances = [("05", date(2025, 8, 28))]
+
+        result = compute_lo_gan("ANGI", appearances, date(2025, 6, 1), end, 200, 1407)
+
+        assert result[0]["gan_value"] == 7
+        assert result[0]["is_daily"] is False
+
+    def test_compute_streaks(self):
+        dates = [D + timedelta(days=i) for i in range(5)]
+        rows = [(dates[0], "05"), (dates[1], "05"), (dates[3], "05"), (dates[4], "05"), (dates[4], "11")]
+
+        result = compute_streaks(dates, rows, None, 2)
+
+        assert result["current_streaks"] == [{
+            "number": "05", "streak": 2,
+            "start_date": dates[3].strftime("%d/%m/%Y"), "end_date": dates[4].strftime("%d/%m/%Y"),
+        }]
+        assert result["max_streaks"][0]["max_streak"] == 2
+        assert result["max_streaks"][0]["last_streak_date"] == dates[1].strftime("%d/%m/%Y")
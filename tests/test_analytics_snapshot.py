@@ -0,0 +1,190 @@
+"""Unit tests for analytics snapshots (app/services/analytics/snapshot.py)"""
+
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from app.database import DatabaseSession
+from app.models.lottery_result import LotteryResult
+from app.services.analytics import draw_matrix
+from app.services.analytics.cooccurrence import CooccurrenceMatrix
+from app.services.analytics.presence import PresenceTensor
+from app.services.analytics.snapshot import load_snapshot, save_snapshot
+from app.services.db import LotteryDBService
+from app.services.statistics_service import StatisticsService
+from app.utils.timezone import get_vietnam_today
+
+SERVICES = ("cooccurrence_service", "transition_service", "de_service")
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database, monkeypatch):
+    """21 ngày MB + MN synthetic; kết quả hôm nay chưa lưu (trả về để test lưu sau)"""
+    today = get_vietnam_today()
+    results = await sqlite_database(21, ["MB", "MN"], save_until=today - timedelta(days=1))
+    monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 0)
+
+    yield LotteryDBService(), [result for result in results if result["date"] == today.isoformat()]
+
+
+async def load_all(stats: StatisticsService):
+    for name in SERVICES:
+        await getattr(stats, name).get_matrix("MB")
+    await stats.presence_service.get_tensor()
+
+
+class TestDump:
+    """dump() / restore() của từng store"""
+
+    def test_draw_matrix_roundtrip(self):
+        matrix = CooccurrenceMatrix(snapshot_every=3)
+        start = date(2024, 1, 1)
+        for day in range(10):
+            matrix.add_draw(start + timedelta(days=day), [day, day + 1, (day * 7) % 100])
+
+        restored = CooccurrenceMatrix(snapshot_every=3)
+        restored.restore(matrix.dump())
+
+        assert restored.draws == matrix.draws
+        assert restored.counts == matrix.counts
+        assert restored.snapshots == matrix.snapshots
+        assert restored.window(4) == matrix.window(4)
+
+        restored.add_draw(start + timedelta(days=10), [1, 2])
+        matrix.add_draw(start + timedelta(days=10), [1, 2])
+        assert restored.window(5) == matrix.window(5)
+
+    def test_draw_matrix_rejects_inconsistent_sections(self):
+        matrix = CooccurrenceMatrix(snapshot_every=3)
+        matrix.add_draw(date(2024, 1, 1), [1, 2])
+        sections = matrix.dump()
+        sections["numbers"].append(5)
+
+        with pytest.raises(ValueError):
+            CooccurrenceMatrix(snapshot_every=3).restore(sections)
+
+    def test_presence_roundtrip(self):
+        rows = [("TPHCM", date(2024, 1, day), f"{(day * 3) % 100:02d}") for day in range(1, 29)]
+        rows += [("VL", date(2024, 1, 5), "07")]
+        tensor = PresenceTensor.from_rows(rows)
+
+        restored = PresenceTensor.restore(tensor.dump())
+
+        assert restored.draw_dates == tensor.draw_dates
+        assert restored.masks == tensor.masks
+
+
+class TestSnapshotFile:
+    """Ghi khi tắt, mmap + kiểm tra version khi khởi động"""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip_fresh(self, database, tmp_path, monkeypatch):
+        path = str(tmp_path / "analytics.snapshot")
+        before = StatisticsService(use_database=True)
+        await load_all(before)
+
+        saved = save_snapshot(before, path)
+        after = StatisticsService(use_database=True)
+        summary = await load_snapshot(after, path)
+
+        assert saved["stores"] == 3
+        assert summary == {"fresh": 3, "stale": 0, "presence": "fresh"}
+
+        # Khớp database → không đồng bộ lại
+        async def no_sync(province_code):
+            raise AssertionError("unexpected sync")
+
+        monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 60)
+        for name in SERVICES:
+            monkeypatch.setattr(getattr(after, name), "_sync", no_sync)
+            original = await getattr(before, name).get_matrix("MB")
+            restored = await getattr(after, name).get_matrix("MB")
+            assert restored.dump() == original.dump()
+
+        assert (await after.presence_service.get_tensor()).masks == before.presence_service._tensor.masks
+
+    @pytest.mark.asyncio
+    async def test_stale_store_catches_up(self, database, tmp_path):
+        service, pending = database
+        path = str(tmp_path / "analytics.snapshot")
+        before = StatisticsService(use_database=True)
+        await load_all(before)
+        save_snapshot(before, path)
+        lengths = {name: len(getattr(before, name)._matrices["MB"]) for name in SERVICES}
+
+        for result in pending:
+            await service.save_result(result)
+
+        after = StatisticsService(use_database=True)
+        summary = await load_snapshot(after, path)
+        cold = StatisticsService(use_database=True)
+
+        assert summary["fresh"] == 0 and summary["stale"] == 3
+        for name in SERVICES:
+            caught_up = await getattr(after, name).get_matrix("MB")
+            rebuilt = await getattr(cold, name).get_matrix("MB")
+            assert len(caught_up) == lengths[name] + 1
+            assert caught_up.dump() == rebuilt.dump()
+
+    @pytest.mark.asyncio
+    async def test_old_row_rewritten_is_stale(self, database, tmp_path):
+        path = str(tmp_path / "analytics.snapshot")
+        before = StatisticsService(use_database=True)
+        await load_all(before)
+        save_snapshot(before, path)
+
+        # Sửa kỳ cũ mà COUNT / MAX(updated_at) của tỉnh không đổi
+        async with DatabaseSession(scoped=False) as session:
+            oldest = (await session.execute(
+                select(LotteryResult).where(LotteryResult.province_code == "MB").order_by(LotteryResult.draw_date)
+            )).scalars().first()
+            await session.execute(
+                update(LotteryResult).where(LotteryResult.id == oldest.id)
+                .values(updated_at=oldest.updated_at - timedelta(hours=1))
+            )
+
+        summary = await load_snapshot(StatisticsService(use_database=True), path)
+
+        assert summary == {"fresh": 0, "stale": 3, "presence": "stale"}
+
+    @pytest.mark.asyncio
+    async def test_keeps_stores_already_loaded(self, database, tmp_path):
+        path = str(tmp_path / "analytics.snapshot")
+        before = StatisticsService(use_database=True)
+        await load_all(before)
+        save_snapshot(before, path)
+
+        after = StatisticsService(use_database=True)
+        matrix = await after.cooccurrence_service.get_matrix("MB")
+        summary = await load_snapshot(after, path)
+
+        assert summary["fresh"] == 2
+        assert after.cooccurrence_service._matrices["MB"] is matrix
+
+    @pytest.mark.asyncio
+    async def test_corrupt_file_ignored(self, database, tmp_path):
+        path = tmp_path / "analytics.snapshot"
+        before = StatisticsService(use_database=True)
+        await load_all(before)
+        save_snapshot(before, str(path))
+
+        data = bytearray(path.read_bytes())
+        data[-20] ^= 0xFF
+        path.write_bytes(bytes(data))
+        after = StatisticsService(use_database=True)
+
+        assert await load_snapshot(after, str(path)) is None
+        assert after.cooccurrence_service._matrices == {}
+
+        path.write_bytes(b"not a snapshot")
+        assert await load_snapshot(after, str(path)) is None
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_save(self, tmp_path):
+        path = tmp_path / "analytics.snapshot"
+
+        assert save_snapshot(StatisticsService(use_database=False), str(path)) is None
+        assert await load_snapshot(StatisticsService(use_database=False), str(path)) is None
+        assert not path.exists()
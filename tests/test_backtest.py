@@ -0,0 +1,161 @@
+"""Unit tests for the backtest engine (app/services/analytics/backtest.py)"""
+
+import random
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+from app.handlers.commands import _parse_backtest_args
+from app.services.analytics import STRATEGIES, BacktestService, BacktestSpec, run_backtests
+from app.services.analytics.backtest import LO_PAYOUT, LO_STAKE, ProvinceHistory, ReplayState, replay
+from app.services.db import LotteryDBService
+from app.utils.timezone import get_vietnam_today
+
+D = date(2026, 1, 1)
+
+
+def random_rows(count, per_draw=27, seed=9):
+    """(number, draw_date) mỗi lần về 1 dòng, như lo_gan_window_query"""
+    rng = random.Random(seed)
+    return [
+        (f"{rng.randrange(100):02d}", D + timedelta(days=index))
+        for index in range(count)
+        for _ in range(per_draw)
+    ]
+
+
+def naive_gan_picks(history, index, picks):
+    """Chọn số gan nhất trước kỳ `index` bằng cách quét ngược từng số"""
+    def gan(number):
+        for back in range(index - 1, -1, -1):
+            if history[back * 100 + number]:
+                return index - 1 - back
+        return index
+    return sorted(range(100), key=lambda number: (-gan(number), number))[:picks]
+
+
+class TestReplay:
+    """Replay tuần tự vs tính lại từ đầu mỗi kỳ"""
+
+    def test_gan_matches_naive(self):
+        history = ProvinceHistory.from_rows("MB", random_rows(80)).matrix
+        spec = BacktestSpec("gan", D, picks=3)
+
+        hits = hit_draws = 0
+        for index in range(20, 80):
+            draw_hits = sum(history[index * 100 + number] for number in naive_gan_picks(history, index, 3))
+            hits += draw_hits
+            hit_draws += bool(draw_hits)
+
+        result = replay(memoryview(history), 20, spec, "MB")
+
+        assert (result["draws"], result["hits"], result["hit_draws"]) == (60, hits, hit_draws)
+        assert result["stake"] == 60 * 3 * LO_STAKE["MB"]
+        assert result["payout"] == hits * LO_PAYOUT
+
+    def test_hot_window(self):
+        state = ReplayState(lookback=2)
+        for numbers in ([1, 1, 2], [2, 3], [3, 3, 3]):
+            counts = [0] * 100
+            for number in numbers:
+                counts[number] += 1
+            state.update(counts)
+
+        # Kỳ đầu đã rời cửa sổ 2 kỳ
+        assert state.window_counts[1] == 0
+        assert STRATEGIES["hot"](state, 2) == [3, 2]
+        assert state.streak[3] == 2 and state.streak[2] == 0
+        assert state.gan(1) == 2
+
+    def test_from_rows_counts_duplicates(self):
+        rows = [("05", D), ("05", D), ("17", D), ("42", D + timedelta(days=1))]
+
+        history = ProvinceHistory.from_rows("MB", rows)
+
+        assert history.dates == [D, D + timedelta(days=1)]
+        assert history.matrix[5] == 2 and history.matrix[17] == 1
+        assert history.matrix[100 + 42] == 1
+        assert history.start_index(D + timedelta(days=1)) == 1
+
+    def test_builtin_strategies(self):
+        assert {"hot", "cold", "gan", "streak"} <= set(STRATEGIES)
+
+
+class TestRunBacktests:
+    """Process pool + shared memory cho kết quả như chạy tuần tự"""
+
+    def test_pool_matches_sequential(self):
+        histories = [
+            ProvinceHistory.from_rows("MB", random_rows(60, 27, seed=1)),
+            ProvinceHistory.from_rows("TPHCM", random_rows(40, 18, seed=2)),
+        ]
+        specs = [BacktestSpec(name, D + timedelta(days=10)) for name in ("hot", "gan")]
+
+        sequential = run_backtests(histories, specs, workers=1)
+        parallel = run_backtests(histories, specs, workers=2)
+
+        assert parallel == sequential
+        assert set(sequential) == {(spec, code) for spec in specs for code in ("MB", "TPHCM")}
+
+    def test_empty_history_skipped(self):
+        histories = [ProvinceHistory("ANGI", [], bytearray())]
+
+        assert run_backtests(histories, [BacktestSpec("gan", D)]) == {}
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database):
+    """40 ngày MB synthetic trong SQLite tạm"""
+    return await sqlite_database(40, ["MB"])
+
+
+class TestBacktestService:
+    """Nạp từ database + cache theo phiên bản dữ liệu"""
+
+    @pytest.mark.asyncio
+    async def test_cached_until_data_changes(self, loaded, monkeypatch):
+        service = BacktestService(workers=1)
+        loads = []
+        original = service._load_histories
+
+        async def counting(codes):
+            loads.append(list(codes))
+            return await original(codes)
+
+        monkeypatch.setattr(service, "_load_histories", counting)
+        since = get_vietnam_today() - timedelta(days=20)
+
+        first = await service.run(["gan", "hot"], ["MB"], since)
+        assert await service.run(["gan"], ["MB"], since) == [item for item in first if item["strategy"] == "gan"]
+        assert len(loads) == 1
+        assert first[0]["draws"] == 21
+
+        await LotteryDBService().save_result(loaded[-1])
+        await service.run(["gan"], ["MB"], since)
+        assert len(loads) == 2
+
+    @pytest.mark.asyncio
+    async def test_unknown_strategy(self, loaded):
+        assert await BacktestService(workers=1).run(["martingale"], ["MB"], D) == []
+
+
+class TestParseArgs:
+    """/backtest arguments"""
+
+    def test_defaults(self):
+        strategies, provinces, years, picks = _parse_backtest_args([])
+
+        assert strategies == sorted(STRATEGIES)
+        assert (provinces, years, picks) == (["MB"], 5, 3)
+
+    def test_region(self):
+        _, provinces, _, _ = _parse_backtest_args(["gan", "mt", "2", "4"])
+
+        assert "DANA" in provinces and "MB" not in provinces
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            _parse_backtest_args(["martingale"])
+        with pytest.raises(ValueError):
+            _parse_backtest_args(["gan", "XYZ"])
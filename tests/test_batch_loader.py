@@ -0,0 +1,196 @@
+"""Unit tests for per-tick DB read batching (app/services/db/batch_loader.py)"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.data.synthetic import generate_results
+from app.services.db import LotteryDBService
+from app.services.db import lottery_db_service
+from app.services.db.batch_loader import BatchLoader, loader_stats
+from app.services import subscription_service
+from app.services.subscription_service import SubscriptionService
+from app.ui.formatters import format_batch_loaders
+from app.utils.timezone import get_vietnam_today
+
+
+def recording_loader(window: float = 0.005, max_keys: int = 100, fail: Exception = None, delay: float = 0):
+    """BatchLoader trả key * 10, ghi lại các batch đã chạy"""
+    batches = []
+
+    async def batch_fn(keys):
+        batches.append(sorted(keys))
+        await asyncio.sleep(delay)
+        if fail is not None:
+            raise fail
+        return {key: key * 10 for key in keys if key >= 0}
+
+    return BatchLoader("test", batch_fn, window=window, max_keys=max_keys, default=-1), batches
+
+
+class TestBatchLoader:
+    """Gom key, dedupe, lỗi, hủy, metrics"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_share_one_batch(self):
+        loader, batches = recording_loader()
+
+        values = await asyncio.gather(*(loader.load(key) for key in (3, 1, 2, 1, -5)))
+
+        assert values == [30, 10, 20, 10, -1]
+        assert batches == [[-5, 1, 2, 3]]
+        assert loader.requests == 5 and loader.batches == 1 and loader.keys == 4
+
+    @pytest.mark.asyncio
+    async def test_separate_ticks_separate_batches(self):
+        loader, batches = recording_loader()
+
+        assert await loader.load(1) == 10
+        assert await loader.load(2) == 20
+        assert batches == [[1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_max_keys_dispatches_early(self):
+        loader, batches = recording_loader(window=60, max_keys=3)
+
+        values = await asyncio.wait_for(loader.load_many([1, 2, 3]), timeout=1)
+
+        assert values == [10, 20, 30]
+        assert batches == [[1, 2, 3]]
+
+    @pytest.mark.asyncio
+    async def test_error_reaches_every_caller(self):
+        loader, _ = recording_loader(fail=RuntimeError("db down"))
+
+        results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_batch(self):
+        loader, batches = recording_loader(delay=0.05)
+
+        first = asyncio.create_task(loader.load(1))
+        second = asyncio.create_task(loader.load(1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == 10
+        assert first.cancelled()
+        assert batches == [[1]]
+
+    @pytest.mark.asyncio
+    async def test_stats_histogram(self):
+        loader, _ = recording_loader()
+
+        await loader.load(1)
+        await loader.load_many(list(range(6)))
+        stats = loader.stats()
+
+        assert stats["batches"] == 2 and stats["max_batch"] == 6
+        assert stats["avg_batch"] == 3.5
+        assert dict(stats["histogram"]) == {"1": 1, "2-4": 0, "5-16": 1, "17-64": 0, "65+": 0}
+
+        message = format_batch_loaders({"test": stats})
+        assert "test" in message and "7 lần đọc → 2 query" in message
+        assert "Chưa có dữ liệu" in format_batch_loaders({"test": BatchLoader("x", None).stats()})
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """SQLite 7 ngày MB + MN, 1 tỉnh MT chỉ có kỳ cũ hơn LATEST_LOOKBACK_DAYS"""
+    await sqlite_database(7, ["MB", "MN"])
+    old = next(iter(generate_results(1, end_date=get_vietnam_today() - timedelta(days=30), regions=["MT"])))
+    await LotteryDBService().save_result(old)
+    return old["province_code"]
+
+
+def batches_of(name: str) -> int:
+    return loader_stats()[name]["batches"]
+
+
+class TestServiceBatching:
+    """Service đọc đồng thời → 1 query, kết quả như đọc từng tỉnh"""
+
+    @pytest.mark.asyncio
+    async def test_latest_results_batched(self, database):
+        service = LotteryDBService()
+        codes = ["MB", "TPHCM", "VUTA", "BALI", database, "NONE"]
+        expected = {}
+        for code in codes:
+            result = (await lottery_db_service.load_latest_results([code])).get(code)
+            expected[code] = result and (result.province_code, result.draw_date)
+
+        before = batches_of("latest_result")
+        results = await asyncio.gather(*(service.get_latest_result(code) for code in codes))
+
+        assert batches_of("latest_result") == before + 1
+        assert {code: result and (result.province_code, result.draw_date)
+                for code, result in zip(codes, results)} == expected
+        assert expected[database] is not None and expected["NONE"] is None
+
+    @pytest.mark.asyncio
+    async def test_history_batched(self, database):
+        service = LotteryDBService()
+        expected = {code: await service.get_history(code, limit=3, start_date=get_vietnam_today() - timedelta(days=60))
+                    for code in ("MB", "TPHCM")}
+
+        before = batches_of("history")
+        mb, hcm, mb_again = await asyncio.gather(
+            service.get_history("MB", limit=3),
+            service.get_history("TPHCM", limit=3),
+            service.get_history("MB", limit=3),
+        )
+
+        assert batches_of("history") == before + 1
+        assert [r.draw_date for r in mb] == [r.draw_date for r in expected["MB"]]
+        assert [r.draw_date for r in hcm] == [r.draw_date for r in expected["TPHCM"]]
+        assert mb is not mb_again and len(mb) == 3
+
+    @pytest.mark.asyncio
+    async def test_history_single_key_uses_limit(self, database, monkeypatch):
+        expected = [r.draw_date for r in await LotteryDBService().get_history(
+            "MB", limit=3, start_date=get_vietnam_today() - timedelta(days=60)
+        )]
+
+        def no_window(*args):
+            raise AssertionError("row_number() query for a single key")
+
+        monkeypatch.setattr(lottery_db_service, "history_by_provinces_query", no_window)
+        history = (await lottery_db_service.load_histories([("MB", 3)]))[("MB", 3)]
+
+        assert [r.draw_date for r in history] == expected
+
+    @pytest.mark.asyncio
+    async def test_history_falls_back_to_full_history(self, database):
+        # Tỉnh MT chỉ có kỳ 30 ngày trước: ngoài cửa sổ draw_window_start của 2 kỳ
+        histories = await lottery_db_service.load_histories([("MB", 2), (database, 2)])
+
+        assert len(histories[("MB", 2)]) == 2
+        assert [r.province_code for r in histories[(database, 2)]] == [database]
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_batched(self, database):
+        service = SubscriptionService()
+        await service.subscribe(1, "MB")
+        await service.subscribe(1, "TPHCM")
+        await service.subscribe(2, "MB")
+
+        before = batches_of("subscriptions")
+        first, second, nobody = await asyncio.gather(
+            service.get_user_subscriptions(1),
+            service.get_user_subscriptions(2),
+            service.get_user_subscriptions(3),
+        )
+
+        assert batches_of("subscriptions") == before + 1
+        assert [s.province_code for s in first] == ["MB", "TPHCM"]
+        assert [s.province_code for s in second] == ["MB"]
+        assert nobody == []
+
+        # Vừa bật / tắt xong là thấy (batch sau đọc lại)
+        await service.unsubscribe(1, "MB")
+        assert [s.province_code for s in await service.get_user_subscriptions(1)] == ["TPHCM"]
+        assert subscription_service._subscriptions_loader.stats()["max_batch"] >= 3
@@ -0,0 +1,110 @@
+"""Unit tests for startup phases and warm-up (app/bootstrap.py)"""
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+import app.bootstrap as bootstrap
+from app.bootstrap import StartupTimer, today_provinces, warm_up
+from app.services.statistics_service import StatisticsService
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class FakeLotteryService:
+    """get_latest_result ghi lại các tỉnh được warm-up"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def get_latest_result(self, province_code):
+        self.calls.append(province_code)
+        await asyncio.sleep(self.delay)
+        return {"province_code": province_code} if province_code != "KOTU" else {}
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database, monkeypatch):
+    """20 ngày MB synthetic trong SQLite tạm, hôm nay chỉ MB quay"""
+    await sqlite_database(20, ["MB"])
+    monkeypatch.setattr(bootstrap, "today_provinces", lambda: ["MB"])
+
+
+class TestStartupTimer:
+    def test_phases_and_report(self):
+        timer = StartupTimer()
+        with timer.phase("imports"):
+            pass
+        with pytest.raises(RuntimeError):
+            with timer.phase("services"):
+                raise RuntimeError("boom")
+
+        report = timer.report()
+
+        assert [name for name, _ in timer.phases] == ["imports", "services"]
+        assert report.startswith("imports ") and "services " in report and "total " in report
+
+
+class TestWarmUp:
+    """Từng stage warm-up, timeout không chặn khởi động"""
+
+    def test_today_provinces(self, monkeypatch):
+        monkeypatch.setattr("app.utils.cache.get_cached_schedule_day", lambda: 0)
+
+        assert today_provinces() == ["MB", "THTH", "KHHO", "KOTU", "TIGI", "KIGI", "DALAT"]
+
+    @pytest.mark.asyncio
+    async def test_loads_results_and_matrices(self, loaded):
+        lottery = FakeLotteryService()
+        stats = StatisticsService(use_database=True)
+        timer = StartupTimer()
+
+        summary = await warm_up(lottery, stats, timer)
+
+        assert summary["results"] == 1 and summary["analytics"] == 1
+        assert summary["menus"] > 0
+        assert lottery.calls == ["MB"]
+        assert "MB" in stats.cooccurrence_service._matrices
+        assert "MB" in stats.de_service._matrices
+        assert "MB" in stats.transition_service._matrices
+        assert {name for name, _ in timer.phases} == {"warmup.menus", "warmup.results", "warmup.analytics"}
+
+    @pytest.mark.asyncio
+    async def test_stage_timeout_does_not_block(self, monkeypatch):
+        monkeypatch.setattr(bootstrap, "today_provinces", lambda: ["MB", "KOTU"])
+        lottery = FakeLotteryService(delay=5)
+
+        summary = await warm_up(lottery, StatisticsService(use_database=False), StartupTimer(), timeout=0.05)
+
+        assert summary["results"] == "timeout"
+        assert summary["analytics"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_results_not_counted(self, monkeypatch):
+        monkeypatch.setattr(bootstrap, "today_provinces", lambda: ["MB", "KOTU"])
+
+        summary = await warm_up(FakeLotteryService(), StatisticsService(use_database=False), StartupTimer())
+
+        assert summary["results"] == 1
+
+
+class TestLazyStartup:
+    def test_callbacks_import_does_not_build_services(self):
+        code = (
+            "import app.handlers.callbacks as cb, sys;"
+            "assert cb.lottery_service is None and cb.statistics_service is None;"
+            "cb.init_services(); service = cb.statistics_service; cb.init_services();"
+            "assert cb.statistics_service is service;"
+            "print('app.services.analytics.backtest' in sys.modules)"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+
+        # Backtest (multiprocessing, shared memory) chỉ import khi dùng /backtest
+        assert output.strip() == "False"
@@ -1,7 +1,7 @@
 """Unit tests for configuration"""
 
 import pytest
-from app.config import PROVINCES, SCHEDULE, DRAW_TIMES
+from app.config import PROVINCES, SCHEDULE, DRAW_TIMES, get_publish_mode
 
 
 class TestProvinces:
@@ -110,3 +110,15 @@ class TestDrawTimes:
 
         # MN should start before MT, MT before MB
         assert mn_start < mt_start < mb_start
+
+
+class TestPublishMode:
+    """Test get_publish_mode"""
+
+    def test_default_direct(self):
+        assert get_publish_mode("MB", {}) == "direct"
+
+    def test_province_override(self):
+        modes = {"MB": "copy", "*": "forward"}
+        assert get_publish_mode("mb", modes) == "copy"
+        assert get_publish_mode("TPHCM", modes) == "forward"
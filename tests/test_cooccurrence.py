@@ -0,0 +1,198 @@
+"""Unit tests for CooccurrenceMatrix / CooccurrenceService (lô xiên)"""
+
+import random
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+from itertools import combinations
+from collections import Counter
+
+from sqlalchemy import delete, and_
+
+import app.services.analytics.draw_matrix as draw_matrix
+import app.services.analytics.executor as executor_module
+from app.database import DatabaseSession
+from app.models.lottery_result import LotteryResult, Lo2SoHistory, Lo3SoHistory
+from app.services.analytics import CooccurrenceMatrix, CooccurrenceService
+from app.services.db import LotteryDBService
+from app.services.db.lottery_db_service import extract_lo_numbers
+
+D = date(2026, 1, 1)
+
+
+def random_draws(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        (D + timedelta(days=index), [f"{rng.randrange(100):02d}" for _ in range(27)])
+        for index in range(count)
+    ]
+
+
+def naive_pairs(draws):
+    """Đếm cặp trực tiếp: O(kỳ × 27²)"""
+    counter = Counter()
+    for _, numbers in draws:
+        counter.update(combinations(sorted(set(numbers)), 2))
+    return counter
+
+
+def build(draws, snapshot_every=10):
+    matrix = CooccurrenceMatrix(snapshot_every)
+    for draw_date, numbers in draws:
+        matrix.add_draw(draw_date, numbers)
+    return matrix
+
+
+class TestCooccurrenceMatrix:
+    """Tích ngoài + prefix snapshots"""
+
+    def test_counts_match_naive(self):
+        draws = random_draws(35)
+        matrix = build(draws)
+        expected = naive_pairs(draws)
+
+        for (a, b), count in expected.items():
+            assert matrix.counts[int(a) * 100 + int(b)] == count
+            assert matrix.counts[int(b) * 100 + int(a)] == count
+        assert matrix.counts[5 * 100 + 5] == sum(1 for _, numbers in draws if "05" in numbers)
+
+    def test_snapshots(self):
+        matrix = build(random_draws(35), snapshot_every=10)
+
+        assert len(matrix.snapshots) == 4  # 0, 10, 20, 30 kỳ
+
+    @pytest.mark.parametrize("window", [1, 9, 10, 17, 34])
+    def test_window_matches_naive(self, window):
+        draws = random_draws(35)
+        matrix = build(draws)
+
+        top = matrix.top_pairs(window, limit=5000)
+        assert {item["pair"]: item["count"] for item in top} == dict(naive_pairs(draws[-window:]))
+
+    def test_window_larger_than_history(self):
+        matrix = build(random_draws(5))
+
+        assert matrix.top_pairs(200) == matrix.top_pairs(None)
+
+    def test_top_pairs_sorted(self):
+        top = build(random_draws(35)).top_pairs(limit=10)
+
+        assert len(top) == 10
+        assert [item["count"] for item in top] == sorted((item["count"] for item in top), reverse=True)
+        assert all(first < second for first, second in (item["pair"] for item in top))
+
+    def test_partners(self):
+        draws = random_draws(35)
+        matrix = build(draws)
+        appearances = sum(1 for _, numbers in draws if "05" in numbers)
+
+        partners = matrix.partners("05", limit=100)
+        expected = naive_pairs(draws)
+
+        for item in partners:
+            pair = tuple(sorted(("05", item["number"])))
+            assert item["count"] == expected[pair]
+            assert item["rate"] == item["count"] / appearances
+        assert "05" not in {item["number"] for item in partners}
+
+    def test_truncate(self):
+        draws = random_draws(35)
+        matrix = build(draws)
+
+        assert matrix.truncate(draws[21][0]) == 14
+        assert matrix.counts == build(draws[:21]).counts
+        assert len(matrix.snapshots) == 3
+
+        # Nạp lại → như dựng từ đầu
+        for draw_date, numbers in draws[21:]:
+            matrix.add_draw(draw_date, numbers)
+        assert matrix.top_pairs(12, limit=50) == build(draws).top_pairs(12, limit=50)
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database, monkeypatch):
+    """60 ngày TPHCM + MB synthetic trong SQLite tạm"""
+    results = await sqlite_database(60, provinces=["MB", "TPHCM"])
+    monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 0)
+    return results
+
+
+def result_draws(results, province_code):
+    return [
+        (r["date"], [number for number, _ in extract_lo_numbers(r["prizes"], 2)])
+        for r in results if r["province_code"] == province_code
+    ]
+
+
+class TestCooccurrenceService:
+    """Đồng bộ ma trận với database"""
+
+    @pytest.mark.asyncio
+    async def test_loads_history(self, loaded):
+        service = CooccurrenceService()
+        draws = result_draws(loaded, "MB")
+
+        top = await service.get_top_pairs("MB", draws=None, limit=5000)
+
+        assert {item["pair"]: item["count"] for item in top} == dict(naive_pairs(draws))
+        assert (await service.get_matrix("MB")).draws[-1][0].isoformat() == draws[-1][0]
+
+    @pytest.mark.asyncio
+    async def test_resave_latest_is_incremental(self, loaded):
+        service = CooccurrenceService()
+        matrix = await service.get_matrix("TPHCM")
+
+        latest = [r for r in loaded if r["province_code"] == "TPHCM"][-1]
+        latest["prizes"]["G8"] = ["42"]
+        await LotteryDBService().save_result(latest)
+
+        # Cùng object: chỉ truncate + nạp lại kỳ cuối
+        assert await service.get_matrix("TPHCM") is matrix
+        partners = {item["number"] for item in await service.get_partners("TPHCM", "42", draws=1, limit=100)}
+        numbers = {number for number, _ in extract_lo_numbers(latest["prizes"], 2)} - {"42"}
+        assert partners == numbers
+
+    @pytest.mark.asyncio
+    async def test_deleted_result_rebuilds(self, loaded):
+        service = CooccurrenceService()
+        matrix = await service.get_matrix("TPHCM")
+        first = [r for r in loaded if r["province_code"] == "TPHCM"][0]
+
+        # Xóa thủ công 1 kết quả cũ (kèm lô 2 số)
+        draw_date = date.fromisoformat(first["date"])
+        async with DatabaseSession() as session:
+            for model in (Lo2SoHistory, Lo3SoHistory, LotteryResult):
+                await session.execute(delete(model).where(and_(
+                    model.province_code == "TPHCM", model.draw_date == draw_date
+                )))
+
+        rebuilt = await service.get_matrix("TPHCM")
+        assert rebuilt is not matrix
+        assert len(rebuilt.draws) == len(matrix.draws) - 1
+        assert rebuilt.draws[0][0] > draw_date
+
+    @pytest.mark.asyncio
+    async def test_rebuild_runs_on_executor(self, loaded, monkeypatch):
+        executor = executor_module.AnalyticsExecutor(kind="thread", workers=1)
+        monkeypatch.setattr(executor_module, "_executor", executor)
+        service = CooccurrenceService()
+
+        await service.get_matrix("TPHCM")
+        assert executor.stats()["completed"] == 1
+
+        # Lưu lại kỳ cuối: nạp tăng dần ngay trên event loop
+        latest = [r for r in loaded if r["province_code"] == "TPHCM"][-1]
+        latest["prizes"]["G8"] = ["42"]
+        await LotteryDBService().save_result(latest)
+        matrix = await service.get_matrix("TPHCM")
+        assert executor.stats()["completed"] == 1
+        assert 42 in matrix.draws[-1][1]
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_empty_province(self, loaded):
+        service = CooccurrenceService()
+
+        assert await service.get_top_pairs("ANGI") == []
+        assert await service.get_partners("ANGI", "05") == []
@@ -74,8 +74,6 @@ class TestLo2SoHistory:
             draw_date=date(2025, 10, 15),
             number="45",
             prize_type="DB",
-            position="last_2",
-            created_at=datetime.utcnow()
         )
         
         assert lo2so.lottery_result_id == 1
@@ -93,7 +91,6 @@ class TestLo2SoHistory:
             draw_date=date(2025, 10, 15),
             number="78",
             prize_type="G7",
-            position="last_2"
         )
         
         lo2so_dict = lo2so.to_dict()
@@ -112,7 +109,6 @@ class TestLo2SoHistory:
             draw_date=date(2025, 10, 15),
             number="45",
             prize_type="DB",
-            position="last_2"
         )
         
         assert "Lo2So" in repr(lo2so)
@@ -0,0 +1,173 @@
+"""Unit tests for DeSeries / DeService (thống kê đề)"""
+
+import random
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+import app.services.analytics.draw_matrix as draw_matrix
+from app.services.analytics import DeSeries, DeService
+from app.services.analytics.de_series import STREAK_KEYS
+from app.services.db import LotteryDBService
+from app.services.statistics_service import StatisticsService
+
+D = date(2026, 1, 1)
+
+
+def random_draws(count, seed=3):
+    rng = random.Random(seed)
+    return [(D + timedelta(days=index), [f"{rng.randrange(100):02d}"]) for index in range(count)]
+
+
+def build(draws):
+    series = DeSeries()
+    for draw_date, numbers in draws:
+        series.add_draw(draw_date, numbers)
+    return series
+
+
+def naive_gan(numbers, number):
+    """Số kỳ từ lần về cuối của `number` (đếm ngược từ kỳ mới nhất)"""
+    for distance, value in enumerate(reversed(numbers)):
+        if value == number:
+            return distance
+    return len(numbers)
+
+
+class TestDeSeries:
+    """Thống kê trên chuỗi đề trong bộ nhớ"""
+
+    def test_gan_matches_naive(self):
+        draws = random_draws(300)
+        numbers = [int(numbers[0]) for _, numbers in draws]
+
+        ranked = build(draws).gan(limit=100)
+
+        assert len(ranked) == 100
+        for item in ranked:
+            assert item["gan"] == naive_gan(numbers, int(item["number"]))
+            assert item["count"] == numbers.count(int(item["number"]))
+        assert [item["gan"] for item in ranked] == sorted((item["gan"] for item in ranked), reverse=True)
+
+    def test_gan_window_and_last_date(self):
+        draws = random_draws(300)
+        window = [int(numbers[0]) for _, numbers in draws[-50:]]
+
+        ranked = build(draws).gan(draws=50, limit=100)
+
+        for item in ranked:
+            number = int(item["number"])
+            assert item["gan"] == naive_gan(window, number)
+            if number in window:
+                assert item["last_date"] == draws[-1 - item["gan"]][0]
+            else:
+                assert item["last_date"] is None and item["gan"] == 50
+
+    def test_max_gan(self):
+        draws = [(D + timedelta(days=index), [number]) for index, number in enumerate(
+            ["05", "11", "12", "13", "05", "14", "05", "15"]
+        )]
+
+        item = next(item for item in build(draws).gan(limit=100) if item["number"] == "05")
+
+        assert (item["gan"], item["max_gan"], item["count"]) == (1, 3, 3)
+
+    def test_distributions(self):
+        draws = random_draws(120)
+        window = [int(numbers[0]) for _, numbers in draws[-80:]]
+
+        stats = build(draws).distributions(80)
+
+        for digit in range(10):
+            assert stats["dau"][digit]["count"] == sum(1 for n in window if n // 10 == digit)
+            assert stats["duoi"][digit]["count"] == sum(1 for n in window if n % 10 == digit)
+            assert stats["tong"][digit]["count"] == sum(1 for n in window if (n // 10 + n % 10) % 10 == digit)
+            assert stats["cham"][digit]["count"] == sum(1 for n in window if digit in (n // 10, n % 10))
+
+            touched = [index for index, n in enumerate(window) if digit in (n // 10, n % 10)]
+            expected = len(window) - 1 - touched[-1] if touched else None
+            assert stats["cham"][digit]["gan"] == expected
+
+    def test_streaks(self):
+        draws = [(D + timedelta(days=index), [number]) for index, number in enumerate(
+            ["10", "32", "54", "71", "93", "95", "68"]
+        )]
+
+        streaks = build(draws).streaks()
+
+        # chẵn: 10 32 54 → 3 kỳ, lẻ: 71 93 95 → 3 kỳ, rồi 68 chẵn
+        assert streaks["chan_le"] == {"value": "chẵn", "current": 1, "longest": 3, "longest_value": "chẵn"}
+        # to: 54 71 93 95 68 → 5 kỳ liên tiếp tới hiện tại
+        assert streaks["to_nho"] == {"value": "to", "current": 5, "longest": 5, "longest_value": "to"}
+        assert set(streaks) == set(STREAK_KEYS)
+
+    def test_truncate_and_reload(self):
+        draws = random_draws(50)
+        series = build(draws)
+
+        assert series.truncate(draws[30][0]) == 20
+        assert series.last_date == draws[29][0]
+
+        for draw_date, numbers in draws[30:]:
+            series.add_draw(draw_date, numbers)
+        assert series.gan(limit=100) == build(draws).gan(limit=100)
+
+    def test_empty(self):
+        series = DeSeries()
+
+        assert len(series) == 0
+        assert series.last_date is None
+        assert series.streaks() == {}
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database, monkeypatch):
+    """45 ngày MB + TPHCM synthetic trong SQLite tạm"""
+    results = await sqlite_database(45, provinces=["MB", "TPHCM"])
+    monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 0)
+    return results
+
+
+def result_de(results, province_code):
+    return [
+        (date.fromisoformat(r["date"]), r["prizes"]["DB"][0][-2:])
+        for r in results if r["province_code"] == province_code
+    ]
+
+
+class TestDeService:
+    """Nạp chuỗi đề từ partial index"""
+
+    @pytest.mark.asyncio
+    async def test_loads_special_prize_only(self, loaded):
+        series = await DeService().get_matrix("MB")
+
+        expected = result_de(loaded, "MB")
+        assert len(series) == len(expected)
+        assert [f"{number:02d}" for number in series.numbers] == [number for _, number in expected]
+        assert series.last_date == expected[-1][0]
+
+    @pytest.mark.asyncio
+    async def test_resaved_latest_draw(self, loaded):
+        service = DeService()
+        series = await service.get_matrix("TPHCM")
+
+        latest = [r for r in loaded if r["province_code"] == "TPHCM"][-1]
+        latest["prizes"]["DB"] = ["123477"]
+        await LotteryDBService().save_result(latest)
+
+        assert await service.get_matrix("TPHCM") is series
+        assert (await service.get_latest("TPHCM", count=1))[0]["number"] == "77"
+
+    @pytest.mark.asyncio
+    async def test_statistics_service(self, loaded):
+        stats = StatisticsService(use_database=True)
+
+        assert len(await stats.get_de_gan("MB", limit=10)) == 10
+        assert set(await stats.get_de_distributions("MB")) == {"dau", "duoi", "tong", "cham"}
+        assert await stats.get_de_distributions("ANGI") == {}
+        assert [item["number"] for item in await stats.get_de_latest("MB", count=3)] == [
+            number for _, number in reversed(result_de(loaded, "MB")[-3:])
+        ]
+        assert await StatisticsService(use_database=False).get_de_streaks("MB") == {}
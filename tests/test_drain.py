@@ -0,0 +1,230 @@
+"""Unit tests for graceful drain (app/services/drain.py) and fan-out checkpoints"""
+
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+import app.services.notification_service as notification_module
+from app.services.drain import DrainCoordinator, TrackingUpdateProcessor
+from app.services.notification_service import NotificationService
+
+RESULT_DATE = date(2026, 10, 19)
+
+
+class TestDrainCoordinator:
+    """track / drain / deadline"""
+
+    @pytest.mark.asyncio
+    async def test_track_counts_inflight(self):
+        drain = DrainCoordinator(timeout=1)
+
+        async with drain.track("update"):
+            assert drain.busy == 1
+            assert drain.inflight == {"update": 1}
+
+        assert drain.busy == 0
+        assert drain.completed == {"update": 1}
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_inflight(self):
+        drain = DrainCoordinator(timeout=5)
+        release = asyncio.Event()
+
+        async def handler():
+            async with drain.track("update"):
+                await release.wait()
+
+        task = asyncio.create_task(handler())
+        await asyncio.sleep(0)
+        asyncio.get_running_loop().call_later(0.1, release.set)
+
+        assert await drain.drain() is True
+        assert task.done() and not task.cancelled()
+        assert drain.stats()["cancelled"] == 0
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_pending_queue(self):
+        drain = DrainCoordinator(timeout=5)
+        queue = [1, 2]
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, queue.pop)
+        loop.call_later(0.1, queue.pop)
+
+        assert await drain.drain(pending=lambda: len(queue)) is True
+        assert queue == []
+
+    @pytest.mark.asyncio
+    async def test_deadline_cancels_tracked_tasks(self):
+        drain = DrainCoordinator(timeout=0.1)
+
+        async def stuck():
+            async with drain.track("fanout"):
+                await asyncio.sleep(60)
+
+        task = asyncio.create_task(stuck())
+        await asyncio.sleep(0)
+
+        assert await drain.drain() is False
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert drain.cancelled == 1
+        assert drain.busy == 0
+
+    def test_begin_once(self):
+        drain = DrainCoordinator(timeout=10)
+
+        assert drain.draining is False
+        assert drain.remaining() == 10
+        assert drain.begin() is True
+        assert drain.begin() is False
+        assert drain.draining is True
+        assert 0 < drain.remaining() <= 10
+
+    @pytest.mark.asyncio
+    async def test_update_processor_tracks_updates(self):
+        drain = DrainCoordinator(timeout=1)
+        processor = TrackingUpdateProcessor(2, drain=drain)
+        seen = []
+
+        async def handle():
+            seen.append(drain.inflight["update"])
+
+        await processor.process_update(object(), handle())
+
+        assert seen == [1]
+        assert drain.completed == {"update": 1}
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """Database SQLite tạm cho bảng notification_checkpoint"""
+    await sqlite_database()
+
+
+def make_service(monkeypatch, drain: DrainCoordinator, user_ids, mode: str = "direct") -> NotificationService:
+    """NotificationService gửi MB cho `user_ids`, checkpoint ghi database thật"""
+    monkeypatch.setattr(notification_module, "get_drain", lambda: drain)
+    monkeypatch.setattr(notification_module, "format_lottery_result", lambda result, region: "KQ")
+
+    bot = SimpleNamespace(
+        send_message=AsyncMock(return_value=SimpleNamespace(message_id=99)),
+        copy_message=AsyncMock(),
+    )
+    service = NotificationService(bot=bot, delivery_mode="direct")
+    service.channel_id = -100
+    service.publish_modes = {"MB": mode}
+    service.subscription_service.get_subscribers_by_province = AsyncMock(
+        return_value=[SimpleNamespace(user_id=user_id) for user_id in user_ids]
+    )
+    service.lottery_service.get_latest_result = AsyncMock(return_value={"province": "MB"})
+    return service
+
+
+def drain_after(drain: DrainCoordinator, calls: int):
+    """side_effect: bắt đầu drain sau `calls` lần gửi"""
+    sent = []
+
+    async def side_effect(**kwargs):
+        sent.append(kwargs["chat_id"])
+        if len(sent) == calls:
+            drain.begin()
+        return SimpleNamespace(message_id=99)
+
+    return sent, side_effect
+
+
+class TestFanoutCheckpoint:
+    """Fan-out dừng ở ranh giới user khi drain, instance sau gửi tiếp"""
+
+    @pytest.mark.asyncio
+    async def test_interrupted_fanout_resumes(self, database, monkeypatch):
+        user_ids = [5, 1, 4, 2, 3]
+        first_drain = DrainCoordinator(timeout=5)
+        first = make_service(monkeypatch, first_drain, user_ids)
+        first_sent, first.bot.send_message.side_effect = drain_after(first_drain, 2)
+
+        summary = await first.send_result_notification("MB", RESULT_DATE)
+
+        assert summary["interrupted"] is True
+        assert first_sent == [1, 2]
+        checkpoint = await first._load_checkpoint("MB:2026-10-19")
+        assert checkpoint["last_user_id"] == 2
+        assert checkpoint["success"] == 2
+
+        second = make_service(monkeypatch, DrainCoordinator(timeout=5), user_ids)
+        second._already_sent = AsyncMock(return_value=False)
+        second._get_complete_result = AsyncMock(return_value={"province": "MB"})
+        second._mark_as_sent = AsyncMock()
+
+        summary = await second.check_and_send_if_new_result("MB", RESULT_DATE)
+
+        sent = [call.kwargs["chat_id"] for call in second.bot.send_message.await_args_list]
+        assert sent == [3, 4, 5]
+        assert summary["success"] == 5
+        assert "interrupted" not in summary
+        second._mark_as_sent.assert_awaited_once()
+        assert await second._load_checkpoint("MB:2026-10-19") is None
+
+    @pytest.mark.asyncio
+    async def test_interrupted_fanout_not_marked_sent(self, database, monkeypatch):
+        drain = DrainCoordinator(timeout=5)
+        service = make_service(monkeypatch, drain, [1, 2, 3])
+        _, service.bot.send_message.side_effect = drain_after(drain, 1)
+        service._already_sent = AsyncMock(return_value=False)
+        service._get_complete_result = AsyncMock(return_value={"province": "MB"})
+        service._mark_as_sent = AsyncMock()
+
+        summary = await service.check_and_send_if_new_result("MB", RESULT_DATE)
+
+        assert summary["interrupted"] is True
+        service._mark_as_sent.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_resume_does_not_republish_channel(self, database, monkeypatch):
+        user_ids = [1, 2, 3]
+        first_drain = DrainCoordinator(timeout=5)
+        first = make_service(monkeypatch, first_drain, user_ids, mode="copy")
+
+        async def copy_and_drain(**kwargs):
+            first_drain.begin()
+
+        first.bot.copy_message.side_effect = copy_and_drain
+        summary = await first.send_result_notification("MB", RESULT_DATE)
+
+        assert summary["interrupted"] is True
+        assert first.bot.send_message.await_count == 1  # đăng channel 1 lần
+
+        second = make_service(monkeypatch, DrainCoordinator(timeout=5), user_ids, mode="copy")
+        summary = await second.send_result_notification("MB", RESULT_DATE)
+
+        second.bot.send_message.assert_not_awaited()
+        copied = [call.kwargs for call in second.bot.copy_message.await_args_list]
+        assert [kwargs["chat_id"] for kwargs in copied] == [2, 3]
+        assert all(kwargs["message_id"] == 99 for kwargs in copied)
+        assert summary["success"] == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_fanout_saves_checkpoint(self, database, monkeypatch):
+        drain = DrainCoordinator(timeout=5)
+        service = make_service(monkeypatch, drain, [1, 2, 3])
+
+        async def send(**kwargs):
+            if kwargs["chat_id"] == 2:
+                await asyncio.sleep(60)
+
+        service.bot.send_message.side_effect = send
+        task = asyncio.create_task(service.send_result_notification("MB", RESULT_DATE))
+        while not drain.busy:
+            await asyncio.sleep(0.01)
+
+        drain.begin(timeout=0.1)
+        assert await drain.drain() is False
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        checkpoint = await service._load_checkpoint("MB:2026-10-19")
+        assert checkpoint["last_user_id"] == 1
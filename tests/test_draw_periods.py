@@ -4,7 +4,8 @@ from datetime import date
 from app.utils.lottery_helpers import (
     count_draw_periods,
     is_daily_draw_province,
-    categorize_gan
+    categorize_gan,
+    categorize_gan_tail
 )
 
 
@@ -123,6 +124,14 @@ class TestCategorizeGan:
         assert categorize_gan(5, is_daily=False) == "gan_thuong"
         assert categorize_gan(3, is_daily=False) == "gan_thuong"
 
+    def test_tail_categories(self):
+        """Test categorization by tail probability (same thresholds for every region)"""
+        assert categorize_gan_tail(0.01) == "cuc_gan"
+        assert categorize_gan_tail(0.05) == "cuc_gan"
+        assert categorize_gan_tail(0.1) == "gan_lon"
+        assert categorize_gan_tail(0.15) == "gan_lon"
+        assert categorize_gan_tail(0.5) == "gan_thuong"
+
 
 class TestRealWorldScenarios:
     """Test real-world scenarios from the problem statement"""
@@ -0,0 +1,141 @@
+"""Unit tests for GapProfile / GapScoreService (lô gan theo xác suất)"""
+
+import random
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+import app.services.analytics.draw_matrix as draw_matrix
+from app.services.analytics import CooccurrenceMatrix, GapProfile, GapScoreService
+from app.services.db import LotteryDBService
+from app.services.statistics_service import StatisticsService
+
+D = date(2026, 1, 1)
+
+
+def random_draws(count, seed=5):
+    rng = random.Random(seed)
+    return [
+        (D + timedelta(days=index), tuple(sorted({rng.randrange(100) for _ in range(18)})))
+        for index in range(count)
+    ]
+
+
+def naive_gaps(draws, number):
+    """Gap giữa các lần về liên tiếp + gan hiện tại, lặp riêng cho 1 số"""
+    seen = [index for index, (_, present) in enumerate(draws) if number in present]
+    gaps = [later - earlier - 1 for earlier, later in zip(seen, seen[1:])]
+    current = len(draws) - 1 - seen[-1] if seen else len(draws)
+    return gaps, current
+
+
+class TestGapProfile:
+    """1 lượt quét vs đếm riêng từng số"""
+
+    def test_matches_naive(self):
+        draws = random_draws(250)
+        profile = GapProfile(draws)
+
+        for number in range(100):
+            gaps, current = naive_gaps(draws, number)
+            assert list(profile.gaps[number]) == sorted(gaps)
+            assert profile.current[number] == current
+            assert profile.tail(number) == (sum(1 for gap in gaps if gap >= current) + 1) / (len(gaps) + 1)
+
+    def test_score_fields(self):
+        draws = [(D + timedelta(days=index), present) for index, present in enumerate(
+            [(5,), (), (5,), (), (), (), (5,), (), ()]
+        )]
+
+        score = GapProfile(draws).score(5)
+
+        # gaps 1, 3 - gan hiện tại 2 → 1 gap cũ ≥ 2 (+ gap hiện tại) / (2 + 1)
+        assert (score["gan"], score["max_gan"], score["appearances"]) == (2, 3, 3)
+        assert score["tail"] == pytest.approx(2 / 3)
+        assert score["hit_rate"] == pytest.approx(3 / 9)
+        assert score["expected_gap"] == pytest.approx(2.0)
+        assert score["geometric_tail"] == pytest.approx((2 / 3) ** 2)
+        assert score["last_seen_date"] == draws[6][0]
+
+    def test_never_seen(self):
+        draws = [(D + timedelta(days=index), (1,)) for index in range(10)]
+
+        score = GapProfile(draws).score(7)
+
+        assert score["gan"] == 10
+        assert score["tail"] == 1.0
+        assert score["expected_gap"] is None
+        assert score["last_seen_date"] is None
+
+    def test_ranked_by_score(self):
+        ranked = GapProfile(random_draws(300)).ranked(limit=20)
+
+        assert len(ranked) == 20
+        assert [item["score"] for item in ranked] == sorted((item["score"] for item in ranked), reverse=True)
+        assert ranked[0]["category"] in ("cuc_gan", "gan_lon", "gan_thuong")
+
+    def test_rare_gap_ranks_above_common_gap(self):
+        # 1 về đều đặn mỗi 2 kỳ rồi vắng 6 kỳ; 2 luôn vắng ~10 kỳ rồi vắng 8 kỳ
+        sequence = [(1,)] + [(), (1,)] * 20 + [(2,)] + ([()] * 10 + [(2,)]) * 3
+        sequence = sequence + [()] * 6
+        draws = [(D + timedelta(days=index), present) for index, present in enumerate(sequence)]
+
+        ranked = [item["number"] for item in GapProfile(draws).ranked(limit=100)]
+
+        assert ranked.index("01") < ranked.index("02")
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database, monkeypatch):
+    """40 ngày MB synthetic trong SQLite tạm"""
+    results = await sqlite_database(40, ["MB"])
+    monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 0)
+    return results
+
+
+class TestGapScoreService:
+    """Cache theo epoch của ma trận"""
+
+    @pytest.mark.asyncio
+    async def test_profile_cached_per_epoch(self, loaded):
+        service = GapScoreService()
+        profile = await service.get_profile("MB")
+
+        assert await service.get_profile("MB") is profile
+
+        loaded[-1]["prizes"]["G7"] = ["42", "42", "42", "42"]
+        await LotteryDBService().save_result(loaded[-1])
+
+        updated = await service.get_profile("MB")
+        assert updated is not profile
+        assert updated.current[42] == 0
+
+    @pytest.mark.asyncio
+    async def test_scores(self, loaded):
+        scores = await GapScoreService().get_scores("MB", limit=10)
+
+        assert len(scores) == 10
+        assert await GapScoreService().get_scores("ANGI") == []
+
+    @pytest.mark.asyncio
+    async def test_statistics_service_shares_matrix(self, loaded):
+        stats = StatisticsService(use_database=True)
+
+        assert len(await stats.get_lo_gan_scored("MB", limit=5)) == 5
+        assert isinstance(await stats.cooccurrence_service.get_matrix("MB"), CooccurrenceMatrix)
+        assert stats.gap_score_service.matrices is stats.cooccurrence_service
+        assert await StatisticsService(use_database=False).get_lo_gan_scored("MB") == []
+
+
+def test_epoch_changes_on_mutation():
+    matrix = CooccurrenceMatrix(10)
+    draws = random_draws(5)
+    for draw_date, present in draws:
+        matrix.add_draw(draw_date, present)
+
+    epoch = matrix.epoch
+    assert matrix.truncate(D + timedelta(days=100)) == 0
+    assert matrix.epoch == epoch
+    matrix.truncate(draws[-1][0])
+    assert matrix.epoch == epoch + 1
@@ -0,0 +1,332 @@
+"""Unit tests for job queue and worker (SQLite file database)"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock
+
+from sqlalchemy import update
+
+from app.database import DatabaseSession
+from app.models.job import Job
+from app.services.job_queue import JobQueue
+from app.services.scheduler_jobs import SchedulerJobs
+from app.worker import JobWorker, build_default_handlers
+
+
+@pytest_asyncio.fixture
+async def queue(sqlite_database):
+    """JobQueue trên database SQLite tạm"""
+    await sqlite_database()
+    return JobQueue(retry_base_seconds=10)
+
+
+class TestJobQueue:
+    """Test enqueue / claim / ack / fail"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_dedupe(self, queue):
+        first = await queue.enqueue("notify_province", {"province_code": "MB"}, dedupe_key="k1")
+        second = await queue.enqueue("notify_province", {"province_code": "MB"}, dedupe_key="k1")
+
+        assert first is not None
+        assert second is None
+        assert await queue.get_stats() == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test_dedupe_only_while_active(self, queue):
+        job_id = await queue.enqueue("notify_province", dedupe_key="k1")
+        await queue.claim("w1")
+        # Đang chạy: vẫn chặn
+        assert await queue.enqueue("notify_province", dedupe_key="k1") is None
+
+        await queue.ack(job_id, "w1")
+        assert await queue.enqueue("notify_province", dedupe_key="k1") is not None
+
+    @pytest.mark.asyncio
+    async def test_claim_is_exclusive(self, queue):
+        await queue.enqueue("notify_province", {"province_code": "MB"})
+
+        job = await queue.claim("w1")
+        assert job["kind"] == "notify_province"
+        assert job["payload"] == {"province_code": "MB"}
+        assert job["attempts"] == 1
+
+        assert await queue.claim("w2") is None
+
+    @pytest.mark.asyncio
+    async def test_claim_filters_kinds(self, queue):
+        await queue.enqueue("ingest_province", {"province_code": "MB"})
+
+        assert await queue.claim("w1", kinds=["notify_province"]) is None
+        assert await queue.claim("w1", kinds=["ingest_province"]) is not None
+
+    @pytest.mark.asyncio
+    async def test_future_job_not_claimed(self, queue):
+        await queue.enqueue("notify_province", run_after=datetime.utcnow() + timedelta(minutes=5))
+        assert await queue.claim("w1") is None
+
+    @pytest.mark.asyncio
+    async def test_ack_done_never_reclaimed(self, queue):
+        await queue.enqueue("notify_province")
+        job = await queue.claim("w1")
+
+        assert await queue.ack(job["id"], "w1") is True
+        assert await queue.claim("w1") is None
+        assert await queue.get_stats() == {"done": 1}
+
+    @pytest.mark.asyncio
+    async def test_ack_requires_lease(self, queue):
+        await queue.enqueue("notify_province")
+        job = await queue.claim("w1")
+
+        assert await queue.ack(job["id"], "w2") is False
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_reclaimed(self, queue):
+        job_id = await queue.enqueue("notify_province")
+        await queue.claim("w1")
+
+        async with DatabaseSession() as session:
+            await session.execute(
+                update(Job).where(Job.id == job_id).values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+            )
+
+        job = await queue.claim("w2")
+        assert job["id"] == job_id
+        assert job["attempts"] == 2
+        # Worker cũ mất lease
+        assert await queue.ack(job_id, "w1") is False
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_fails_after_max_attempts(self, queue):
+        # Worker crash mỗi lần claim: không bao giờ gọi fail()
+        job_id = await queue.enqueue("notify_province", dedupe_key="k1", max_attempts=3)
+
+        for attempt in range(1, 4):
+            job = await queue.claim(f"w{attempt}")
+            assert job["id"] == job_id and job["attempts"] == attempt
+            async with DatabaseSession() as session:
+                await session.execute(
+                    update(Job).where(Job.id == job_id).values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+                )
+
+        assert await queue.claim("w4") is None
+        assert await queue.get_stats() == {"failed": 1}
+        async with DatabaseSession() as session:
+            job = await session.get(Job, job_id)
+            assert job.last_error == "lease expired"
+            assert job.dedupe_key is None
+
+    @pytest.mark.asyncio
+    async def test_fail_retries_with_backoff(self, queue):
+        job_id = await queue.enqueue("notify_province")
+        await queue.claim("w1")
+
+        assert await queue.fail(job_id, "w1", "boom") is True
+
+        async with DatabaseSession() as session:
+            job = await session.get(Job, job_id)
+            assert job.status == "pending"
+            assert job.last_error == "boom"
+            assert job.run_after > datetime.utcnow()
+
+    @pytest.mark.asyncio
+    async def test_fail_permanently_after_max_attempts(self, queue):
+        job_id = await queue.enqueue("notify_province", max_attempts=1)
+        await queue.claim("w1")
+
+        assert await queue.fail(job_id, "w1", "boom") is False
+        assert await queue.get_stats() == {"failed": 1}
+
+    @pytest.mark.asyncio
+    async def test_release_not_counted_as_attempt(self, queue):
+        job_id = await queue.enqueue("notify_province")
+        await queue.claim("w1")
+
+        assert await queue.release(job_id, "w2") is False
+        assert await queue.release(job_id, "w1") is True
+
+        job = await queue.claim("w2")
+        assert job["id"] == job_id
+        assert job["attempts"] == 1
+
+
+class TestJobWorker:
+    """Test JobWorker.run_once"""
+
+    @pytest.mark.asyncio
+    async def test_run_once_success(self, queue):
+        handler = AsyncMock()
+        await queue.enqueue("notify_province", {"province_code": "MB"})
+        worker = JobWorker(queue, {"notify_province": handler}, worker_id="w1")
+
+        assert await worker.run_once() is True
+        handler.assert_awaited_once_with({"province_code": "MB"})
+        assert await queue.get_stats() == {"done": 1}
+        assert await worker.run_once() is False
+
+    @pytest.mark.asyncio
+    async def test_run_once_failure_requeues(self, queue):
+        handler = AsyncMock(side_effect=RuntimeError("telegram down"))
+        await queue.enqueue("notify_province", {"province_code": "MB"})
+        worker = JobWorker(queue, {"notify_province": handler}, worker_id="w1")
+
+        assert await worker.run_once() is True
+        assert await queue.get_stats() == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test_run_once_interrupted_released(self, queue):
+        handler = AsyncMock(return_value={"success": 2, "interrupted": True})
+        await queue.enqueue("notify_province", {"province_code": "MB"})
+        worker = JobWorker(queue, {"notify_province": handler}, worker_id="w1")
+
+        assert await worker.run_once() is True
+        job = await queue.claim("w2")
+        assert job["attempts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lease_renewed_while_running(self, queue):
+        """Job chạy lâu hơn lease không bị worker khác claim lại"""
+        await queue.enqueue("notify_province", {"province_code": "MB"})
+        worker = JobWorker(queue, {}, worker_id="w1", lease_seconds=0.3)
+        reclaimed = []
+
+        async def slow_fanout(payload):
+            for _ in range(4):
+                await asyncio.sleep(0.2)
+                reclaimed.append(await queue.claim("w2"))
+            return {"success": 1}
+
+        worker.handlers["notify_province"] = slow_fanout
+
+        assert await worker.run_once() is True
+        assert reclaimed == [None] * 4
+        assert await queue.get_stats() == {"done": 1}
+
+    @pytest.mark.asyncio
+    async def test_lease_lost_stops_handler(self, queue):
+        job_id = await queue.enqueue("notify_province", {"province_code": "MB"})
+        worker = JobWorker(queue, {}, worker_id="w1", lease_seconds=0.3)
+        cancelled = asyncio.Event()
+
+        async def fanout(payload):
+            # Worker khác chiếm lease (vd: worker này bị treo quá lease)
+            async with DatabaseSession() as session:
+                await session.execute(update(Job).where(Job.id == job_id).values(locked_by="w2"))
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker.handlers["notify_province"] = fanout
+
+        assert await asyncio.wait_for(worker.run_once(), timeout=2) is True
+        assert cancelled.is_set()
+        assert await queue.get_stats() == {"running": 1}
+
+
+class TestSchedulerEnqueue:
+    """SchedulerJobs có job_queue chỉ enqueue (ingest → notify), không gửi trực tiếp"""
+
+    @staticmethod
+    def _worker(queue, scheduler, worker_id="w1"):
+        """Worker với handlers mặc định; API và fan-out được mock"""
+        service = scheduler.notification_service
+        service._already_sent = AsyncMock(return_value=False)
+        service.lottery_service.get_latest_result = AsyncMock(return_value={"date": "19/10/2026"})
+        service.check_and_send_if_new_result = AsyncMock(return_value=None)
+        handlers = build_default_handlers(service, service.lottery_service, queue)
+        return JobWorker(queue, handlers, worker_id=worker_id)
+
+    @pytest.mark.asyncio
+    async def test_mb_enqueued_once_per_slot(self, queue):
+        scheduler = SchedulerJobs(bot=AsyncMock(), job_queue=queue)
+        scheduler.notification_service.check_and_send_if_new_result = AsyncMock()
+
+        await scheduler.check_mb_new_results()
+        await scheduler.check_mb_new_results()
+
+        scheduler.notification_service.check_and_send_if_new_result.assert_not_awaited()
+        job = await queue.claim("w1")
+        today = date.today().isoformat()
+        assert job["kind"] == "ingest_province"
+        assert job["payload"] == {
+            "province_code": "MB",
+            "check_date": today,
+            "then": {
+                "kind": "notify_province",
+                "payload": {"province_code": "MB", "check_date": today},
+                "dedupe_key": f"notify_province:MB:{today}",
+            },
+        }
+        assert await queue.claim("w1") is None
+
+    @pytest.mark.asyncio
+    async def test_ingest_then_notify(self, queue):
+        scheduler = SchedulerJobs(bot=AsyncMock(), job_queue=queue)
+        worker = self._worker(queue, scheduler)
+        service = scheduler.notification_service
+
+        await scheduler._check_province("MB", date.today(), "18:30")
+
+        assert await worker.run_once() is True
+        service.lottery_service.get_latest_result.assert_awaited_once_with("MB", force_api=True)
+        service.check_and_send_if_new_result.assert_not_awaited()
+
+        assert await worker.run_once() is True
+        service.check_and_send_if_new_result.assert_awaited_once_with(province_code="MB", check_date=date.today())
+        assert await queue.get_stats() == {"done": 2}
+
+    @pytest.mark.asyncio
+    async def test_ingest_skipped_after_sent(self, queue):
+        scheduler = SchedulerJobs(bot=AsyncMock(), job_queue=queue)
+        worker = self._worker(queue, scheduler)
+        scheduler.notification_service._already_sent = AsyncMock(return_value=True)
+
+        await scheduler._check_province("MB", date.today(), "18:45")
+
+        assert await worker.run_once() is True
+        scheduler.notification_service.lottery_service.get_latest_result.assert_not_awaited()
+        assert await worker.run_once() is False
+
+    @pytest.mark.asyncio
+    async def test_next_check_skipped_while_fanout_running(self, queue):
+        """Lần check sau (phút khác) không tạo fan-out thứ 2 khi job trước chưa xong"""
+        scheduler = SchedulerJobs(bot=AsyncMock(), job_queue=queue)
+        worker = self._worker(queue, scheduler)
+
+        await scheduler._check_province("MB", date.today(), "18:30")
+        await worker.run_once()
+        fanout = await queue.claim("w2")
+        assert fanout["kind"] == "notify_province"
+
+        # Tick sau: ingest chạy, nhưng fan-out đang chạy nên không enqueue notify thứ 2
+        await scheduler._check_province("MB", date.today(), "18:33")
+        await worker.run_once()
+        assert await queue.claim("w3") is None
+
+        await queue.ack(fanout["id"], "w2")
+        await scheduler._check_province("MB", date.today(), "18:36")
+        await worker.run_once()
+        assert (await queue.claim("w3"))["kind"] == "notify_province"
+
+
+class TestSchedulerDigest:
+    """Chế độ digest tách các tỉnh đăng qua channel theo publish_modes của service"""
+
+    @pytest.mark.asyncio
+    async def test_instance_publish_modes(self):
+        scheduler = SchedulerJobs(bot=AsyncMock())
+        scheduler.notification_service.publish_modes = {"TPHCM": "copy"}
+        scheduler._check_province = AsyncMock()
+        scheduler.notification_service.check_and_send_region_digest = AsyncMock(return_value=None)
+
+        await scheduler._check_region_digest("MN", ["TPHCM", "DOTH"], date.today(), "16:30")
+
+        scheduler._check_province.assert_awaited_once_with("TPHCM", date.today(), "16:30")
+        kwargs = scheduler.notification_service.check_and_send_region_digest.await_args.kwargs
+        assert kwargs["province_codes"] == ["DOTH"]
@@ -0,0 +1,123 @@
+"""Unit tests for scheduler leader election (SQLite file database)"""
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+from sqlalchemy import update
+
+from app.database import DatabaseSession
+from app.models.scheduler_lease import SchedulerLease
+from app.services.leader_election import LeaderElection
+from app.services.scheduler_jobs import SchedulerJobs
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """Database SQLite tạm"""
+    await sqlite_database()
+
+
+async def _expire_lease(name: str = "scheduler"):
+    async with DatabaseSession() as session:
+        await session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+
+class TestLeaderElection:
+    """Test acquire / renew / failover / release"""
+
+    @pytest.mark.asyncio
+    async def test_single_leader(self, database):
+        a = LeaderElection(holder_id="a")
+        b = LeaderElection(holder_id="b")
+
+        assert await a.acquire_or_renew() is True
+        assert await b.acquire_or_renew() is False
+        # Leader gia hạn được, replica khác vẫn không chiếm được
+        assert await a.acquire_or_renew() is True
+        assert await b.acquire_or_renew() is False
+
+    @pytest.mark.asyncio
+    async def test_failover_after_expiry(self, database):
+        a = LeaderElection(holder_id="a")
+        b = LeaderElection(holder_id="b")
+        await a.acquire_or_renew()
+
+        await _expire_lease()
+
+        assert await b.acquire_or_renew() is True
+        assert await a.acquire_or_renew() is False
+        assert a.is_leader is False
+
+    @pytest.mark.asyncio
+    async def test_release_hands_over_immediately(self, database):
+        a = LeaderElection(holder_id="a")
+        b = LeaderElection(holder_id="b")
+        await a.acquire_or_renew()
+
+        await a.release()
+
+        assert a.is_leader is False
+        assert await b.acquire_or_renew() is True
+
+    @pytest.mark.asyncio
+    async def test_independent_names(self, database):
+        a = LeaderElection(name="scheduler", holder_id="a")
+        b = LeaderElection(name="backfill", holder_id="b")
+
+        assert await a.acquire_or_renew() is True
+        assert await b.acquire_or_renew() is True
+
+    def test_renew_interval(self):
+        assert LeaderElection(lease_seconds=30).renew_interval == 10
+        assert LeaderElection(lease_seconds=1).renew_interval == 1
+
+
+class TestSchedulerLeader:
+    """SchedulerJobs chỉ chạy jobs khi là leader"""
+
+    @pytest.mark.asyncio
+    async def test_follower_skips_checks(self, database):
+        leader = LeaderElection(holder_id="a")
+        await leader.acquire_or_renew()
+
+        follower = SchedulerJobs(bot=AsyncMock(), leader=LeaderElection(holder_id="b"))
+        follower.notification_service.check_and_send_if_new_result = AsyncMock(return_value=None)
+
+        await follower.check_mb_new_results()
+
+        follower.notification_service.check_and_send_if_new_result.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_leader_runs_checks(self, database):
+        scheduler = SchedulerJobs(bot=AsyncMock(), leader=LeaderElection(holder_id="a"))
+        scheduler.notification_service.check_and_send_if_new_result = AsyncMock(return_value=None)
+
+        await scheduler.check_mb_new_results()
+
+        scheduler.notification_service.check_and_send_if_new_result.assert_awaited_once()
+
+    def test_renew_job_registered(self):
+        scheduler = SchedulerJobs(bot=AsyncMock(), leader=LeaderElection(holder_id="a"))
+        scheduler.setup_jobs()
+
+        assert scheduler.scheduler.get_job("renew_scheduler_lease") is not None
+
+    @pytest.mark.asyncio
+    async def test_bot_shutdown_releases_lease(self, database):
+        from types import SimpleNamespace
+        from app.main import post_stop
+
+        scheduler = SchedulerJobs(bot=AsyncMock(), leader=LeaderElection(holder_id="a"))
+        assert await scheduler.leader.acquire_or_renew() is True
+        scheduler.start()
+
+        await post_stop(SimpleNamespace(bot_data={"scheduler": scheduler}))
+
+        # Replica khác lên leader ngay, không chờ SCHEDULER_LEASE_SECONDS
+        assert await LeaderElection(holder_id="b").acquire_or_renew() is True
@@ -0,0 +1,144 @@
+"""Unit tests for compact lô history storage (integer-coded columns)"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+
+from sqlalchemy import select, text
+
+from app.config import PROVINCES
+from app.constants.codes import PROVINCE_IDS, REGION_IDS, PRIZE_TIERS
+from app.data.synthetic import generate_results, provinces_on
+from app.database import DatabaseSession
+from app.models.lottery_result import Lo2SoHistory, Lo3SoHistory
+from app.models.types import LoNumber, ProvinceId, PrizeTier
+from app.services.db import LotteryDBService, StatisticsDBService
+from app.services.db.lottery_db_service import extract_lo_numbers
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """Database SQLite tạm"""
+    await sqlite_database()
+
+
+class TestCodes:
+    """ID tables phải phủ hết tỉnh/miền và không trùng"""
+
+    def test_every_province_has_id(self):
+        assert set(PROVINCES) <= set(PROVINCE_IDS)
+
+    def test_ids_unique(self):
+        for mapping in (PROVINCE_IDS, REGION_IDS, PRIZE_TIERS):
+            assert len(set(mapping.values())) == len(mapping)
+
+
+class TestColumnTypes:
+    """Test TypeDecorators"""
+
+    def test_lo_number_roundtrip(self):
+        lo2, lo3 = LoNumber(2), LoNumber(3)
+        assert lo2.process_bind_param("05", None) == 5
+        assert lo2.process_result_value(5, None) == "05"
+        assert lo3.process_bind_param("007", None) == 7
+        assert lo3.process_result_value(7, None) == "007"
+
+    def test_province_roundtrip(self):
+        province = ProvinceId()
+        assert province.process_result_value(province.process_bind_param("TPHCM", None), None) == "TPHCM"
+
+    def test_unknown_code_binds_null(self):
+        assert ProvinceId().process_bind_param("XXXX", None) is None
+        assert PrizeTier().process_bind_param("G9", None) is None
+
+
+class TestExtractLoNumbers:
+    """Test extract_lo_numbers"""
+
+    def test_lo2_and_lo3(self):
+        prizes = {"DB": ["12345"], "G7": ["25", "42"], "G6": "039"}
+
+        assert extract_lo_numbers(prizes, 2) == [("45", "DB"), ("39", "G6"), ("25", "G7"), ("42", "G7")]
+        assert extract_lo_numbers(prizes, 3) == [("345", "DB"), ("039", "G6")]
+
+    def test_empty(self):
+        assert extract_lo_numbers({}, 2) == []
+        assert extract_lo_numbers(None, 2) == []
+
+
+class TestSyntheticData:
+    """Test app/data/synthetic.py"""
+
+    def test_deterministic(self):
+        end = date(2025, 10, 13)
+        assert list(generate_results(7, end_date=end)) == list(generate_results(7, end_date=end))
+
+    def test_follows_schedule(self):
+        monday = date(2025, 10, 13)
+        results = list(generate_results(1, end_date=monday))
+
+        assert [r["province_code"] for r in results] == provinces_on(monday)
+        assert "TPHCM" in provinces_on(monday)
+
+    def test_prize_counts(self):
+        results = list(generate_results(1, end_date=date(2025, 10, 13)))
+        by_code = {r["province_code"]: r for r in results}
+
+        assert len(extract_lo_numbers(by_code["MB"]["prizes"], 2)) == 27
+        assert len(extract_lo_numbers(by_code["TPHCM"]["prizes"], 2)) == 18
+
+
+class TestCompactStorage:
+    """save_result + truy vấn thống kê trên layout gọn"""
+
+    @pytest.mark.asyncio
+    async def test_save_and_query(self, database):
+        result = {
+            "province_code": "MB",
+            "province_name": "Miền Bắc",
+            "region": "MB",
+            "date": "2025-10-13",
+            "prizes": {"DB": ["56708"], "G1": ["28309"], "G7": ["25", "08", "72", "08"]},
+        }
+
+        saved = await LotteryDBService().save_result(result)
+        assert saved is not None
+
+        async with DatabaseSession(read_only=True) as session:
+            rows = (await session.execute(
+                select(Lo2SoHistory).where(Lo2SoHistory.province_code == "MB")
+            )).scalars().all()
+            raw = (await session.execute(
+                text("SELECT province_id, region_id, number, prize_tier FROM lo_2_so_history ORDER BY id")
+            )).all()
+            lo3_count = len((await session.execute(select(Lo3SoHistory.id))).all())
+
+        assert sorted(r.number for r in rows) == ["08", "08", "08", "09", "25", "72"]
+        assert {r.prize_type for r in rows} == {"DB", "G1", "G7"}
+        assert raw[0] == (PROVINCE_IDS["MB"], REGION_IDS["MB"], 8, PRIZE_TIERS["DB"])
+        assert lo3_count == 2
+
+        frequency = await StatisticsDBService().get_lo2so_frequency(
+            "MB", start_date=date(2025, 10, 1), end_date=date(2025, 10, 31)
+        )
+        assert frequency == {"08": 3, "09": 1, "25": 1, "72": 1}
+
+    @pytest.mark.asyncio
+    async def test_resave_replaces_rows(self, database):
+        service = LotteryDBService()
+        result = {
+            "province_code": "TPHCM",
+            "province_name": "TP. Hồ Chí Minh",
+            "region": "MN",
+            "date": "2025-10-13",
+            "prizes": {"DB": ["123456"], "G8": ["77"]},
+        }
+
+        await service.save_result(result)
+        result["prizes"]["G8"] = ["78"]
+        await service.save_result(result)
+
+        async with DatabaseSession(read_only=True) as session:
+            numbers = (await session.execute(select(Lo2SoHistory.number))).scalars().all()
+
+        assert sorted(numbers) == ["56", "78"]
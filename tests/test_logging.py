@@ -6,7 +6,19 @@ from pathlib import Path
 from unittest.mock import patch
 from datetime import date
 
-from app.utils.logging_helper import setup_logging
+import json
+import sys
+import threading
+
+import app.utils.logging_helper as logging_helper
+from app.services.tracing import Tracer
+from app.utils.logging_helper import (
+    JsonFormatter,
+    LazyQueueHandler,
+    SamplingFilter,
+    setup_logging,
+    shutdown_logging,
+)
 from app.utils.cache import ScheduleCache
 
 
@@ -31,6 +43,18 @@ class TestLoggingConfiguration:
         # No assertions needed, just verify no exceptions
         assert True
 
+    def test_file_handlers_receive_debug(self):
+        """LOG_LEVEL chỉ lọc console, app.log vẫn nhận DEBUG"""
+        setup_logging(level="INFO")
+
+        assert logging.getLogger().getEffectiveLevel() == logging.DEBUG
+        levels = {
+            Path(getattr(handler, "baseFilename", "console")).name: handler.level
+            for handler in logging_helper._listener.handlers
+        }
+        assert levels["console"] == logging.INFO
+        assert levels["app.log"] == levels["cache.log"] == logging.DEBUG
+
 
 class TestCacheLogging:
     """Tests cho cache logging"""
@@ -157,3 +181,125 @@ class TestLoggingIntegration:
         assert "Warning" in caplog.text
         assert "Error" in caplog.text
         assert "Critical" in caplog.text
+
+
+class ThreadRecorder:
+    """Arg ghi lại thread nào format nó"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "recorded"
+
+
+class TestQueuePipeline:
+    """QueueHandler → QueueListener, lấy mẫu, JSON"""
+
+    @pytest.fixture
+    def log_dir(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        yield tmp_path / "logs"
+        shutdown_logging()
+
+    @pytest.fixture
+    def configure(self, log_dir, monkeypatch):
+        """setup_logging; logger test chỉ đi qua queue (không qua handler capture của pytest)"""
+        def configure(name, *args, **kwargs):
+            setup_logging(*args, **kwargs)
+            logger = logging.getLogger(name)
+            monkeypatch.setattr(logger, "propagate", False)
+            monkeypatch.setattr(logger, "handlers", [logging_helper._queue_handler])
+            return logger
+        return configure
+
+    def test_single_queue_handler_after_reconfigure(self, log_dir):
+        setup_logging("INFO", "text")
+        setup_logging("INFO", "text")
+
+        handlers = [h for h in logging.getLogger().handlers if isinstance(h, LazyQueueHandler)]
+        assert len(handlers) == 1
+
+    def test_formatting_happens_in_listener_thread(self, log_dir, configure):
+        logger = configure("app.test_pipeline", "INFO", "text")
+        arg = ThreadRecorder()
+
+        logger.info("value=%s", arg)
+        shutdown_logging()
+
+        assert arg.threads and threading.main_thread().name not in arg.threads
+        assert "value=recorded" in (log_dir / "app.log").read_text(encoding="utf-8")
+
+    def test_json_output_with_trace_id(self, log_dir, configure, monkeypatch):
+        tracer = Tracer(sample_rate=1.0)
+        monkeypatch.setattr("app.services.tracing._tracer", tracer)
+        logger = configure("app.test_pipeline", "INFO", "json")
+
+        with tracer.trace("result_MB"):
+            logger.info("✅ Sent to user %s", 42)
+        shutdown_logging()
+
+        lines = (log_dir / "app.log").read_text(encoding="utf-8").splitlines()
+        record = json.loads(lines[-1])
+        assert record["message"] == "✅ Sent to user 42"
+        assert record["logger"] == "app.test_pipeline"
+        assert record["trace_id"] == tracer.recent()[0]["trace_id"]
+
+    def test_sampling_per_template(self, log_dir, configure):
+        logger = configure(
+            "app.services.notification_service", "INFO", "text",
+            sampling={"app.services.notification_service": 10}
+        )
+        skipped = ThreadRecorder()
+
+        for user_id in range(25):
+            logger.info("✅ Sent to user %s", skipped if user_id % 10 else user_id)
+        logger.info("📊 Notification summary: %s", "once")
+        logger.error("❌ Failed to send to user %s", 1)
+        logger.error("❌ Failed to send to user %s", 2)
+        shutdown_logging()
+
+        text = (log_dir / "app.log").read_text(encoding="utf-8")
+        assert text.count("Sent to user") == 3
+        assert "summary: once" in text
+        assert text.count("Failed to send") == 2
+        # Record bị loại không bao giờ được format
+        assert skipped.threads == []
+
+
+class TestFilters:
+    def test_sampling_rate_by_logger_prefix(self):
+        sampling = SamplingFilter({"app.handlers": 5})
+
+        assert sampling._rate("app.handlers.callbacks") == 5
+        assert sampling._rate("app.services.cache") == 1
+
+    def test_sampling_counts_bounded(self):
+        """Log f-string (template khác nhau mỗi lần) không làm bộ đếm phình mãi"""
+        sampling = SamplingFilter({"app": 2}, max_templates=10)
+        logger = logging.getLogger("app.services.notification_service")
+
+        for user_id in range(100):
+            sampling.filter(logger.makeRecord(logger.name, logging.INFO, __file__, 1, f"sent {user_id}", (), None))
+        assert len(sampling.counts) == 10
+
+        # Template %-style: đếm chung, vẫn lấy mẫu 1/2
+        kept = [
+            sampling.filter(logger.makeRecord(logger.name, logging.INFO, __file__, 1, "sent %s", (n,), None))
+            for n in range(6)
+        ]
+        assert kept == [True, False] * 3
+
+    def test_json_formatter_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.getLogger("x").makeRecord(
+                "x", logging.ERROR, __file__, 1, "failed %s", ("MB",), sys.exc_info()
+            )
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert data["message"] == "failed MB"
+        assert "ValueError: boom" in data["exc"]
@@ -0,0 +1,136 @@
+"""Unit tests for LoopMonitor (app/services/loop_monitor.py)"""
+
+import asyncio
+import time
+import traceback
+
+import pytest
+
+from app.services.loop_monitor import LoopMonitor, attribute_stack
+from app.ui.formatters import format_loop_health
+
+
+def blocking_call(seconds: float):
+    """Giả lập code đồng bộ chặn loop (vd. Redis client sync)"""
+    time.sleep(seconds)
+
+
+def frame(filename: str, name: str) -> traceback.FrameSummary:
+    return traceback.FrameSummary(filename, 1, name, lookup_line=False)
+
+
+class TestAttribution:
+    """Quy stack về handler + hàm gây chặn"""
+
+    def test_handler_and_app_site(self):
+        import app.handlers.callbacks as callbacks
+        import app.services.cache as cache
+
+        stack = [
+            frame(asyncio.__file__, "run"),
+            frame(callbacks.__file__, "button_callback"),
+            frame(cache.__file__, "get"),
+            frame("/usr/lib/python3/site-packages/redis/connection.py", "read_response"),
+        ]
+
+        assert attribute_stack(stack) == ("app.services.cache:get", "app.handlers.callbacks:button_callback")
+
+    def test_outside_app(self):
+        stack = [frame(asyncio.__file__, "_run"), frame("/tmp/job.py", "crunch")]
+
+        assert attribute_stack(stack) == ("job:crunch", None)
+
+    def test_no_stack(self):
+        assert attribute_stack(None) == ("unknown", None)
+
+
+class TestRecording:
+    """Histogram cửa sổ trượt + tổng hợp theo chỗ gây chặn"""
+
+    def test_histogram_and_percentiles(self):
+        monitor = LoopMonitor(slow_callback_ms=100, window_seconds=60)
+        for lag in [0.0005] * 98 + [0.02, 0.3]:
+            monitor.record(lag, now=1000.0)
+
+        snap = monitor.snapshot()
+        histogram = dict(snap["histogram"])
+
+        assert (histogram["≤1ms"], histogram["≤25ms"], histogram["≤500ms"]) == (98, 1, 1)
+        assert snap["p50_ms"] == pytest.approx(0.5)
+        assert snap["max_ms"] == pytest.approx(300)
+        assert snap["stalls"] == 1 and snap["sites"][0]["site"] == "unknown"
+
+    def test_window_expiry(self):
+        monitor = LoopMonitor(slow_callback_ms=100, window_seconds=60)
+        monitor.record(0.5, now=1000.0)
+        monitor.record(0.001, now=1070.0)
+
+        snap = monitor.snapshot()
+
+        assert snap["samples"] == 1 and snap["stalls"] == 0
+        assert snap["total_stalls"] == 1
+
+    def test_sites_aggregated_and_bounded(self):
+        monitor = LoopMonitor(slow_callback_ms=10, max_sites=2)
+        stack = [frame("/tmp/job.py", "crunch")]
+        monitor.record(0.05, stack)
+        monitor.record(0.15, stack)
+        monitor.record(0.02, [frame("/tmp/job.py", "small")])
+        monitor.record(0.04, [frame("/tmp/job.py", "other")])
+
+        sites = {entry["site"]: entry for entry in monitor.snapshot()["sites"]}
+
+        assert set(sites) == {"job:crunch", "job:other"}
+        assert sites["job:crunch"]["count"] == 2
+        assert sites["job:crunch"]["max_seconds"] == pytest.approx(0.15)
+
+
+class TestLiveMonitor:
+    """Probe + watchdog trên event loop thật"""
+
+    @pytest.mark.asyncio
+    async def test_detects_blocking_call(self):
+        monitor = LoopMonitor(interval=0.02, slow_callback_ms=50, log_seconds=0)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            blocking_call(0.3)
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+
+        snap = monitor.snapshot()
+
+        assert snap["stalls"] == 1
+        assert snap["max_ms"] >= 200
+        site = snap["sites"][0]
+        assert site["site"].endswith(":blocking_call")
+        assert any("blocking_call" in line for line in site["stack"])
+
+    @pytest.mark.asyncio
+    async def test_idle_loop_has_no_stalls(self):
+        monitor = LoopMonitor(interval=0.01, slow_callback_ms=100, log_seconds=0)
+        monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+        snap = monitor.snapshot()
+
+        assert snap["samples"] > 5 and snap["stalls"] == 0
+        assert not snap["running"]
+
+
+class TestFormat:
+    def test_format_loop_health(self):
+        monitor = LoopMonitor(slow_callback_ms=100)
+        monitor.record(0.001)
+        monitor.record(0.25, [frame("/tmp/job.py", "crunch")])
+
+        message = format_loop_health(monitor.snapshot())
+
+        assert "EVENT LOOP" in message
+        assert "job:crunch" in message
+        assert "chưa chạy" in message
+
+    def test_format_empty(self):
+        assert "Chưa có dữ liệu" in format_loop_health(LoopMonitor().snapshot())
@@ -0,0 +1,226 @@
+"""Unit tests for notification service (digest delivery)"""
+
+import pytest
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.services.notification_service import (
+    NotificationService,
+    build_digest_messages,
+    NOTIFICATION_HEADER,
+    DIGEST_SEPARATOR,
+)
+
+
+def _complete_result(province: str, draw_date: date) -> dict:
+    """Kết quả MN/MT đủ 18 giải"""
+    prizes = {"DB": ["123456"], "G1": ["12345"], "G2": ["12345"], "G3": ["12345", "23456"],
+              "G4": ["1234"] * 7, "G5": ["1234"], "G6": ["123"] * 3, "G7": ["123"], "G8": ["12"]}
+    return {"province": province, "date": draw_date.strftime("%d/%m/%Y"), "prizes": prizes}
+
+
+class TestBuildDigestMessages:
+    """Test build_digest_messages"""
+
+    def test_single_message(self):
+        messages = build_digest_messages(["A", "B", "C"])
+        assert messages == [NOTIFICATION_HEADER + "A" + DIGEST_SEPARATOR + "B" + DIGEST_SEPARATOR + "C"]
+
+    def test_empty_blocks(self):
+        assert build_digest_messages([]) == []
+
+    def test_split_on_max_length(self):
+        blocks = ["x" * 40, "y" * 40, "z" * 40]
+        messages = build_digest_messages(blocks, header="H", max_length=120)
+        assert len(messages) == 2
+        assert messages[0].startswith("H")
+        assert all(len(m) <= 120 for m in messages)
+        assert "z" * 40 in messages[1]
+
+    def test_block_never_split(self):
+        """Block dài hơn giới hạn vẫn được gửi nguyên vẹn"""
+        messages = build_digest_messages(["x" * 200], header="", max_length=100)
+        assert messages == ["x" * 200]
+
+
+class TestRegionDigest:
+    """Test check_and_send_region_digest"""
+
+    @pytest.fixture
+    def service(self):
+        bot = SimpleNamespace(send_message=AsyncMock())
+        service = NotificationService(bot=bot, delivery_mode="digest")
+        service._already_sent = AsyncMock(return_value=False)
+        service._mark_as_sent = AsyncMock()
+        service._load_checkpoint = AsyncMock(return_value=None)
+        service._save_checkpoint = AsyncMock()
+        service._clear_checkpoint = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_one_message_per_user(self, service):
+        today = date.today()
+        results = {code: _complete_result(code, today) for code in ["TPHCM", "DOTH", "CAMA"]}
+        service.lottery_service.get_latest_result = AsyncMock(side_effect=lambda code: results[code])
+        service.subscription_service.get_subscribers_by_provinces = AsyncMock(return_value=[
+            SimpleNamespace(user_id=1, province_code="TPHCM"),
+            SimpleNamespace(user_id=1, province_code="DOTH"),
+            SimpleNamespace(user_id=1, province_code="CAMA"),
+            SimpleNamespace(user_id=2, province_code="CAMA"),
+        ])
+
+        summary = await service.check_and_send_region_digest("MN", ["TPHCM", "DOTH", "CAMA"], today)
+
+        assert summary["users"] == 2
+        assert summary["messages"] == 2
+        assert service.bot.send_message.await_count == 2
+        assert summary["provinces"]["CAMA"]["success"] == 2
+        assert service._mark_as_sent.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_waits_for_siblings(self, service):
+        today = date.today()
+        results = {"TPHCM": _complete_result("TPHCM", today), "DOTH": None}
+        service.lottery_service.get_latest_result = AsyncMock(side_effect=lambda code: results[code])
+        service.subscription_service.get_subscribers_by_provinces = AsyncMock(return_value=[])
+
+        summary = await service.check_and_send_region_digest("MN", ["TPHCM", "DOTH"], today)
+
+        assert summary is None
+        service.bot.send_message.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_sends_partial_after_deadline(self, service):
+        today = date.today()
+        results = {"TPHCM": _complete_result("TPHCM", today), "DOTH": None}
+        service.lottery_service.get_latest_result = AsyncMock(side_effect=lambda code: results[code])
+        service.subscription_service.get_subscribers_by_provinces = AsyncMock(return_value=[
+            SimpleNamespace(user_id=1, province_code="TPHCM"),
+        ])
+        # Mốc chờ đọc từ DB (lần check trước / worker khác đã ghi)
+        first_ready = datetime.utcnow() - timedelta(hours=1)
+        service._load_checkpoint = AsyncMock(side_effect=lambda key: (
+            {"state": {"first_ready": first_ready.isoformat()}} if key.startswith("digest_wait:") else None
+        ))
+
+        summary = await service.check_and_send_region_digest("MN", ["TPHCM", "DOTH"], today)
+
+        assert summary is not None
+        assert list(summary["provinces"]) == ["TPHCM"]
+        service.bot.send_message.assert_awaited_once()
+        service._save_checkpoint.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_first_ready_persisted(self, service):
+        today = date.today()
+        results = {"TPHCM": _complete_result("TPHCM", today), "DOTH": None}
+        service.lottery_service.get_latest_result = AsyncMock(side_effect=lambda code: results[code])
+
+        assert await service.check_and_send_region_digest("MN", ["TPHCM", "DOTH"], today) is None
+
+        key, _, _, _, state = service._save_checkpoint.await_args.args
+        assert key == f"digest_wait:MN:{today}"
+        assert datetime.fromisoformat(state["first_ready"]) <= datetime.utcnow()
+
+    @pytest.mark.asyncio
+    async def test_sends_partial_at_last_check(self, service):
+        """Tỉnh đầu tiên đủ giải muộn: lần check cuối vẫn gửi, không bỏ cả ngày"""
+        today = date.today()
+        results = {"TPHCM": _complete_result("TPHCM", today), "DOTH": None}
+        service.lottery_service.get_latest_result = AsyncMock(side_effect=lambda code: results[code])
+        service.subscription_service.get_subscribers_by_provinces = AsyncMock(return_value=[
+            SimpleNamespace(user_id=1, province_code="TPHCM"),
+        ])
+
+        summary = await service.check_and_send_region_digest(
+            "MN", ["TPHCM", "DOTH"], today, deadline=datetime.utcnow() - timedelta(seconds=1)
+        )
+
+        assert list(summary["provinces"]) == ["TPHCM"]
+        service.bot.send_message.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_all_already_sent(self, service):
+        service._already_sent = AsyncMock(return_value=True)
+        summary = await service.check_and_send_region_digest("MN", ["TPHCM"], date.today())
+        assert summary is None
+
+
+class TestChannelFanout:
+    """Test publish modes qua broadcast channel"""
+
+    @pytest.fixture
+    def service(self):
+        bot = SimpleNamespace(
+            send_message=AsyncMock(return_value=SimpleNamespace(message_id=42)),
+            copy_message=AsyncMock(),
+            forward_message=AsyncMock(),
+        )
+        service = NotificationService(bot=bot)
+        service.channel_id = "@xsbamien"
+        service.lottery_service.get_latest_result = AsyncMock(
+            return_value=_complete_result("MB", date.today())
+        )
+        service.subscription_service.get_subscribers_by_province = AsyncMock(return_value=[
+            SimpleNamespace(user_id=1), SimpleNamespace(user_id=2),
+        ])
+        service._load_checkpoint = AsyncMock(return_value=None)
+        service._save_checkpoint = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_direct_mode(self, service):
+        service.publish_modes = {}
+        summary = await service.send_result_notification("MB")
+        assert summary["mode"] == "direct"
+        assert service.bot.send_message.await_count == 2
+        service.bot.copy_message.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_copy_mode_publishes_once(self, service):
+        service.publish_modes = {"MB": "copy"}
+        summary = await service.send_result_notification("MB")
+
+        service.bot.send_message.assert_awaited_once()
+        assert service.bot.send_message.await_args.kwargs["chat_id"] == "@xsbamien"
+        assert service.bot.copy_message.await_count == 2
+        assert service.bot.copy_message.await_args.kwargs["message_id"] == 42
+        assert summary["success"] == 2
+        assert summary["channel_message_id"] == 42
+
+    @pytest.mark.asyncio
+    async def test_wildcard_forward_mode(self, service):
+        service.publish_modes = {"*": "forward"}
+        summary = await service.send_result_notification("MB")
+        assert summary["mode"] == "forward"
+        assert service.bot.forward_message.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_follow_mode_only_posts_channel(self, service):
+        service.publish_modes = {"MB": "follow"}
+        summary = await service.send_result_notification("MB")
+        service.bot.send_message.assert_awaited_once()
+        service.bot.copy_message.assert_not_awaited()
+        assert summary["success"] == 0
+        assert summary["channel_only"] == 2
+
+    @pytest.mark.asyncio
+    async def test_follow_mode_marked_as_sent(self, service):
+        service.publish_modes = {"TPHCM": "follow"}
+        service._already_sent = AsyncMock(return_value=False)
+        service._mark_as_sent = AsyncMock()
+        service._clear_checkpoint = AsyncMock()
+
+        summary = await service.check_and_send_if_new_result("TPHCM", date.today())
+
+        assert summary["channel_only"] == 2
+        service._mark_as_sent.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_direct_without_channel(self, service):
+        service.channel_id = ""
+        service.publish_modes = {"MB": "copy"}
+        summary = await service.send_result_notification("MB")
+        assert summary["mode"] == "direct"
+        assert service.bot.send_message.await_count == 2
@@ -0,0 +1,145 @@
+"""Unit tests for Postgres year partitioning of lô history tables"""
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+import app.database.config as db_config
+from app.data.synthetic import generate_results
+from app.database import get_engine
+from app.database.partitioning import ensure_partitions, partitioned_tables
+from app.models.lottery_result import Lo2SoHistory, Lo3SoHistory
+from app.models.partitioning import (
+    partition_name,
+    partition_statements,
+    partition_years,
+    year_partition_ddl,
+)
+from app.services.db import LotteryDBService
+from app.services.scheduler_jobs import SchedulerJobs
+from app.services.statistics_service import StatisticsService
+from app.utils.lottery_helpers import count_draw_periods, draw_window_start
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """Database SQLite tạm"""
+    await sqlite_database()
+
+
+class TestPartitionDDL:
+    """DDL sinh ra cho Postgres"""
+
+    def test_partition_bounds(self):
+        ddl = year_partition_ddl("lo_2_so_history", 2026)
+
+        assert partition_name("lo_2_so_history", 2026) == "lo_2_so_history_y2026"
+        assert "PARTITION OF lo_2_so_history" in ddl
+        assert "FROM ('2026-01-01') TO ('2027-01-01')" in ddl
+
+    def test_statements_include_default_and_brin(self):
+        statements = partition_statements("lo_3_so_history", [2025, 2026], schema="bench")
+
+        assert len(statements) == 4
+        assert "bench.lo_3_so_history_default PARTITION OF bench.lo_3_so_history DEFAULT" in statements[2]
+        assert "USING brin (draw_date)" in statements[3]
+
+    def test_partition_years_include_next_year(self):
+        assert partition_years(2024, today=date(2026, 3, 1)) == [2024, 2025, 2026, 2027]
+
+    def test_postgres_table_is_partitioned(self):
+        for table in (Lo2SoHistory.__table__, Lo3SoHistory.__table__):
+            ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+
+            assert "PARTITION BY RANGE (draw_date)" in ddl
+            assert "PRIMARY KEY (id, draw_date)" in ddl
+
+    def test_sqlite_table_unchanged(self):
+        ddl = str(CreateTable(Lo2SoHistory.__table__).compile(dialect=sqlite.dialect()))
+
+        assert "PARTITION" not in ddl
+        assert "PRIMARY KEY (id)" in ddl
+
+    def test_partitioned_tables(self):
+        assert sorted(partitioned_tables()) == ["lo_2_so_history", "lo_3_so_history"]
+
+
+class TestDrawWindowStart:
+    """Cận dưới draw_date cho truy vấn cửa sổ N kỳ"""
+
+    @pytest.mark.parametrize("province_code", ["MB", "TPHCM", "ANGI"])
+    def test_window_covers_draws(self, province_code):
+        end = date(2026, 10, 19)
+        start = draw_window_start(province_code, 200, end)
+
+        assert count_draw_periods(province_code, start, end) >= 200
+
+    def test_weekly_province_window_longer(self):
+        end = date(2026, 10, 19)
+        assert draw_window_start("ANGI", 200, end) < draw_window_start("MB", 200, end)
+
+
+class TestSQLiteUnchanged:
+    """SQLite: không partition, ensure_partitions là no-op"""
+
+    @pytest.mark.asyncio
+    async def test_no_partitions_on_sqlite(self, database):
+        assert await ensure_partitions() == []
+
+        async with get_engine().connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+
+        assert "lo_2_so_history" in tables
+        assert not any(name.startswith("lo_2_so_history_y") for name in tables)
+
+    @pytest.mark.asyncio
+    async def test_streaks_use_bounded_window(self, database):
+        service = LotteryDBService()
+        today = date.today()
+        # 10 ngày gần đây + 1 kỳ rất cũ (ngoài cửa sổ 5 kỳ)
+        for result in generate_results(10, end_date=today, regions=["MB"]):
+            await service.save_result(result)
+        await service.save_result(next(generate_results(1, end_date=today - timedelta(days=900), regions=["MB"])))
+
+        stats = StatisticsService(use_database=True)
+        async with db_config.get_read_session_factory()() as session:
+            recent = await stats._recent_draw_dates(session, Lo2SoHistory, "MB", 5)
+            sparse = await stats._recent_draw_dates(session, Lo2SoHistory, "MB", 20)
+
+        assert recent == [today - timedelta(days=offset) for offset in range(4, -1, -1)]
+        # Không đủ kỳ trong cửa sổ → truy vấn lại không cận dưới, lấy cả kỳ cũ
+        assert len(sparse) == 11
+        assert sparse[0] == today - timedelta(days=900)
+
+
+class TestPartitionJob:
+    """Scheduler job tạo partition năm mới"""
+
+    def test_job_registered_for_postgres(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "postgresql+asyncpg://u:p@localhost/db")
+        with patch("app.services.scheduler_jobs.USE_DATABASE", True):
+            scheduler = SchedulerJobs(bot=AsyncMock())
+            scheduler.setup_jobs()
+
+        assert scheduler.scheduler.get_job("ensure_history_partitions") is not None
+
+    def test_job_not_registered_for_sqlite(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///./x.db")
+        with patch("app.services.scheduler_jobs.USE_DATABASE", True):
+            scheduler = SchedulerJobs(bot=AsyncMock())
+            scheduler.setup_jobs()
+
+        assert scheduler.scheduler.get_job("ensure_history_partitions") is None
+
+    @pytest.mark.asyncio
+    async def test_job_calls_ensure(self):
+        scheduler = SchedulerJobs(bot=AsyncMock())
+        with patch("app.services.scheduler_jobs.ensure_partitions", new=AsyncMock()) as ensure:
+            await scheduler.ensure_history_partitions()
+
+        ensure.assert_awaited_once_with(years_ahead=1)
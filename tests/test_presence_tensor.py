@@ -0,0 +1,132 @@
+"""Unit tests for PresenceTensor / PresenceService (gan toàn quốc)"""
+
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+import app.services.analytics.presence as presence
+from app.data.synthetic import generate_results
+from app.services.analytics import PresenceService, PresenceTensor
+from app.services.db import LotteryDBService, StatisticsDBService
+from app.services.statistics_service import StatisticsService
+from app.utils.timezone import get_vietnam_today
+
+D = date(2026, 10, 19)
+
+
+def rows_for(province_code, draws):
+    """draws: [số về ở kỳ cũ nhất, ..., kỳ mới nhất] - mỗi kỳ cách nhau 7 ngày"""
+    rows = []
+    for index, numbers in enumerate(reversed(draws)):
+        draw_date = D - timedelta(days=7 * index)
+        rows.extend((province_code, draw_date, number) for number in numbers)
+    return rows
+
+
+@pytest.fixture
+def tensor():
+    rows = (
+        rows_for("TPHCM", [["05", "07"], ["07"], ["11"], ["11"]])
+        + rows_for("DOTH", [["05"], ["07"], ["07"], ["11"]])
+        + rows_for("DANA", [["05", "11"], ["99"], ["99"], ["99"]])
+    )
+    return PresenceTensor.from_rows(rows, draws=200)
+
+
+class TestPresenceTensor:
+    """Phép toán trên bitset"""
+
+    def test_masks(self, tensor):
+        # bit 0 = kỳ mới nhất
+        assert tensor.masks["TPHCM"][11] == 0b0011
+        assert tensor.masks["TPHCM"][7] == 0b1100
+        assert tensor.draw_dates["TPHCM"][0] == D
+
+    def test_gan(self, tensor):
+        gan = tensor.gan()
+
+        assert gan["TPHCM"][11] == 0
+        assert gan["TPHCM"][7] == 2
+        assert gan["TPHCM"][5] == 3
+        assert gan["TPHCM"][42] is None  # chưa về trong cửa sổ
+
+    def test_gan_everywhere(self, tensor):
+        result = tensor.gan_everywhere(min_gan=3, min_provinces=2)
+
+        assert [item["number"] for item in result] == ["05"]
+        assert result[0]["province_count"] == 3
+        assert result[0]["max_gan"] == 3
+        assert {code for code, _ in result[0]["provinces"]} == {"TPHCM", "DOTH", "DANA"}
+
+    def test_gan_everywhere_scope(self, tensor):
+        assert tensor.gan_everywhere(min_gan=3, min_provinces=2, provinces=["DANA", "MB"]) == []
+
+    def test_hottest(self, tensor):
+        hot = tensor.hottest(draws=2)
+
+        assert hot[0] == {"number": "11", "count": 3, "province_count": 2}
+        assert {"number": "99", "count": 2, "province_count": 1} in hot
+        assert "05" not in {item["number"] for item in hot}
+
+    def test_window_keeps_latest_draws(self):
+        tensor = PresenceTensor.from_rows(rows_for("TPHCM", [["01"], ["02"], ["03"]]), draws=2)
+
+        assert tensor.draw_dates["TPHCM"] == [D, D - timedelta(days=7)]
+        assert tensor.masks["TPHCM"][1] == 0
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database):
+    """30 ngày MN/MT synthetic trong SQLite tạm"""
+    await sqlite_database(30, ["MN", "MT"])
+
+
+class TestPresenceService:
+    """Nạp tensor từ lo_2_so_history"""
+
+    @pytest.mark.asyncio
+    async def test_matches_get_lo_gan(self, loaded):
+        all_gan = await PresenceService().get_all_gan()
+
+        assert len(all_gan) == 35
+        for province_code in ("TPHCM", "DANA"):
+            for item in await StatisticsDBService().get_lo_gan(province_code, draws=200, limit=100):
+                assert all_gan[province_code][int(item["number"])] == item["periods_since_last"]
+
+    @pytest.mark.asyncio
+    async def test_region_scope(self, loaded):
+        gan = await PresenceService().get_all_gan(region="MT")
+
+        assert len(gan) == 14
+
+    @pytest.mark.asyncio
+    async def test_reloads_after_new_result(self, loaded, monkeypatch):
+        service = PresenceService()
+        first = await service.get_tensor()
+
+        # Trong REFRESH_CHECK_SECONDS: dùng lại tensor, không query
+        assert await service.get_tensor() is first
+
+        monkeypatch.setattr(presence, "REFRESH_CHECK_SECONDS", 0)
+        assert await service.get_tensor() is first  # chưa có dữ liệu mới
+
+        # Lưu lại kết quả hôm nay với giải 8 khác
+        result = next(generate_results(1, end_date=get_vietnam_today(), regions=["MN"]))
+        number = next(n for n in range(100) if first.masks[result["province_code"]][n] & 1 == 0)
+        result["prizes"]["G8"] = [f"{number:02d}"]
+        await LotteryDBService().save_result(result)
+
+        reloaded = await service.get_tensor()
+        assert reloaded is not first
+        assert reloaded.masks[result["province_code"]][number] & 1
+
+    @pytest.mark.asyncio
+    async def test_statistics_service(self, loaded):
+        stats = StatisticsService(use_database=True)
+
+        gan = await stats.get_national_gan(min_gan=3, min_provinces=2, limit=5)
+        hot = await stats.get_national_hot(draws=5, limit=5)
+
+        assert len(gan) <= 5 and len(hot) == 5
+        assert all(item["province_count"] >= 2 for item in gan)
+        assert hot == sorted(hot, key=lambda item: (item["count"], item["province_count"]), reverse=True)
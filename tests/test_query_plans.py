@@ -0,0 +1,120 @@
+"""Query plan regression tests cho các hot queries (app/services/db/hot_queries.py)
+
+SQLite: luôn chạy, trên dataset synthetic 365 ngày.
+Postgres: đặt TEST_POSTGRES_URL=postgresql+asyncpg://... (database dùng riêng
+cho test - bảng sẽ bị drop và tạo lại).
+"""
+
+import os
+
+import pytest
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models import Base
+from app.services.db.hot_queries import HOT_QUERIES
+from app.services.db.query_plans import QueryPlan, check_plan, explain, load_synthetic_dataset
+
+END_DATE = date(2026, 10, 19)
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory):
+    """SQLite đã nạp dataset + ANALYZE (như init_db với production profile)"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        load_synthetic_dataset(conn, days=365, end_date=END_DATE, analyze=True)
+    yield engine
+    engine.dispose()
+
+
+class TestRegistry:
+    """Các statement nóng đều được đăng ký"""
+
+    def test_hot_queries_registered(self):
+        assert set(HOT_QUERIES) >= {
+            "lo2so_frequency",
+            "lo_gan_window",
+            "de_series",
+            "number_history",
+            "latest_result",
+            "latest_results",
+            "province_history",
+            "history_by_provinces",
+            "subscriptions_by_users",
+            "subscribers_by_province",
+        }
+
+    def test_declared_indexes_exist(self):
+        declared = {index.name for table in Base.metadata.tables.values() for index in table.indexes}
+        for query in HOT_QUERIES.values():
+            assert set(query.indexes) <= declared, query.name
+
+
+class TestCheckPlan:
+    """check_plan phát hiện full scan / sai index / row estimate"""
+
+    def test_ok(self):
+        query = HOT_QUERIES["latest_result"]
+        plan = QueryPlan("postgresql", [], {"idx_province_date"}, set(), 1)
+        assert check_plan(query, plan) == []
+
+    def test_violations(self):
+        query = HOT_QUERIES["number_history"]
+        plan = QueryPlan("postgresql", [], set(), {"lo_2_so_history"}, 5000)
+        assert len(check_plan(query, plan)) == 3
+
+
+class TestSQLitePlans:
+    """EXPLAIN QUERY PLAN trên SQLite"""
+
+    @pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+    def test_uses_index(self, sqlite_engine, name):
+        query = HOT_QUERIES[name]
+        with sqlite_engine.connect() as conn:
+            plan = explain(conn, query.build(**query.example(END_DATE)))
+
+        assert check_plan(query, plan) == [], plan.lines
+
+    def test_detects_missing_index(self, tmp_path):
+        """Bỏ index của lottery_results → latest_result phải bị báo lỗi"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'no_index.db'}")
+        Base.metadata.create_all(engine)
+        query = HOT_QUERIES["latest_result"]
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX idx_province_date")
+            conn.exec_driver_sql("DROP INDEX ix_lottery_results_province_code")
+            load_synthetic_dataset(conn, days=30, end_date=END_DATE, subscribers=0, analyze=True)
+            plan = explain(conn, query.build(**query.example(END_DATE)))
+        engine.dispose()
+
+        assert check_plan(query, plan) != []
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+class TestPostgresPlans:
+    """EXPLAIN (FORMAT JSON) trên Postgres (partitioned lô history)"""
+
+    @pytest.mark.asyncio
+    async def test_uses_index(self):
+        engine = create_async_engine(POSTGRES_URL)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(load_synthetic_dataset, 365, END_DATE, 5000, True)
+
+            problems = []
+            async with engine.connect() as conn:
+                for query in HOT_QUERIES.values():
+                    plan = await conn.run_sync(explain, query.build(**query.example(END_DATE)))
+                    problems.extend(check_plan(query, plan))
+        finally:
+            await engine.dispose()
+
+        assert problems == []
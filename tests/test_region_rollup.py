@@ -0,0 +1,158 @@
+"""Unit tests for region-level lô rollups (region_lo_rollup)"""
+
+import pytest
+import pytest_asyncio
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import delete, select
+
+from app.database import DatabaseSession
+from app.models.region_rollup import RegionLoRollup
+from app.services.db import LotteryDBService, RegionRollupService, StatisticsDBService
+from app.services.db.lottery_db_service import extract_lo_numbers
+from app.services.db.region_rollup_service import decode_counts, encode_counts, region_provinces
+from app.services.statistics_service import StatisticsService
+from app.utils.timezone import get_vietnam_today
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """Database SQLite tạm"""
+    await sqlite_database()
+
+
+@pytest_asyncio.fixture
+async def mn_results(sqlite_database):
+    """30 ngày kết quả Miền Nam đã ingest"""
+    return await sqlite_database(30, ["MN"])
+
+
+def expected_counts(results):
+    return Counter(number for r in results for number, _ in extract_lo_numbers(r["prizes"], 2))
+
+
+class TestCodec:
+    """Vector 100 bytes"""
+
+    def test_roundtrip(self):
+        vector = decode_counts(encode_counts({"00": 1, "42": 7, "99": 3}))
+
+        assert len(vector) == 100
+        assert (vector[0], vector[42], vector[99]) == (1, 7, 3)
+        assert sum(vector) == 11
+
+    def test_region_provinces(self):
+        assert region_provinces("MB") == ["MB"]
+        assert "TPHCM" in region_provinces("MN")
+        assert "TPHCM" not in region_provinces("MT")
+
+
+class TestIngest:
+    """save_result cập nhật rollup"""
+
+    @pytest.mark.asyncio
+    async def test_rollup_matches_history(self, mn_results):
+        day = mn_results[-1]["date"]
+        same_day = [r for r in mn_results if r["date"] == day]
+
+        async with DatabaseSession(read_only=True) as session:
+            row = (await session.execute(
+                select(RegionLoRollup).where(RegionLoRollup.region == "MN").order_by(RegionLoRollup.draw_date.desc())
+            )).scalars().first()
+
+        assert row.draw_date.isoformat() == day
+        assert row.province_count == len(same_day)
+        counts = decode_counts(row.counts)
+        assert {f"{n:02d}": c for n, c in enumerate(counts) if c} == dict(expected_counts(same_day))
+
+    @pytest.mark.asyncio
+    async def test_resave_is_idempotent(self, mn_results):
+        service = RegionRollupService()
+        before = await service.get_region_frequency("MN", days=40)
+
+        await LotteryDBService().save_result(mn_results[-1])
+
+        assert await service.get_region_frequency("MN", days=40) == before
+
+
+class TestWindowQueries:
+    """Tần suất / đầu-đuôi / gan theo miền"""
+
+    @pytest.mark.asyncio
+    async def test_frequency_equals_sum_of_provinces(self, mn_results):
+        frequency = await RegionRollupService().get_region_frequency("MN", days=40)
+
+        assert frequency == dict(expected_counts(mn_results))
+
+        # Cộng tần suất từng tỉnh cho cùng kết quả
+        per_province = Counter()
+        for province_code in {r["province_code"] for r in mn_results}:
+            per_province.update(await StatisticsDBService().get_lo2so_frequency(province_code, days=40))
+        assert frequency == dict(per_province)
+
+    @pytest.mark.asyncio
+    async def test_days_window(self, mn_results):
+        today = get_vietnam_today()
+        recent = [r for r in mn_results if r["date"] >= (today - timedelta(days=7)).isoformat()]
+
+        assert await RegionRollupService().get_region_frequency("MN", days=7) == dict(expected_counts(recent))
+
+    @pytest.mark.asyncio
+    async def test_head_tail(self, mn_results):
+        head_tail = await RegionRollupService().get_region_head_tail("MN", days=40)
+        counts = expected_counts(mn_results)
+
+        assert sum(head_tail["head"]) == sum(head_tail["tail"]) == sum(counts.values())
+        assert head_tail["head"][4] == sum(c for n, c in counts.items() if n[0] == "4")
+        assert head_tail["tail"][7] == sum(c for n, c in counts.items() if n[1] == "7")
+
+    @pytest.mark.asyncio
+    async def test_region_gan(self, mn_results):
+        gan = await RegionRollupService().get_region_lo_gan("MN", draws=30, limit=15)
+
+        assert gan == sorted(gan, key=lambda item: item["gan_value"], reverse=True)
+        for item in gan:
+            assert item["gan_value"] >= 10
+            assert item["is_daily"] is True
+            assert item["number"] in expected_counts(mn_results)
+
+    @pytest.mark.asyncio
+    async def test_empty_region(self, database):
+        service = RegionRollupService()
+
+        assert await service.get_region_frequency("MT") == {}
+        assert await service.get_region_lo_gan("MT") == []
+
+
+class TestBackfill:
+    """Dựng lại rollup từ lo_2_so_history"""
+
+    @pytest.mark.asyncio
+    async def test_backfill_rebuilds_rows(self, mn_results):
+        service = RegionRollupService()
+        before = await service.get_region_frequency("MN", days=40)
+
+        async with DatabaseSession() as session:
+            await session.execute(delete(RegionLoRollup))
+
+        assert await service.get_region_frequency("MN", days=40) == {}
+        assert await service.backfill() == 30
+        assert await service.get_region_frequency("MN", days=40) == before
+
+
+class TestStatisticsService:
+    """StatisticsService dùng rollup khi có database"""
+
+    @pytest.mark.asyncio
+    async def test_uses_rollup(self, mn_results):
+        stats = StatisticsService(use_database=True)
+
+        assert await stats.get_region_frequency("MN", days=40) == dict(expected_counts(mn_results))
+
+    @pytest.mark.asyncio
+    async def test_without_database(self):
+        stats = StatisticsService(use_database=False)
+
+        assert await stats.get_region_frequency("MN", days=30)  # mock data
+        assert await stats.get_region_lo_gan("MN") == []
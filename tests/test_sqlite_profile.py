@@ -0,0 +1,133 @@
+"""Unit tests for SQLite production profile (WAL, reader pool, write queue)"""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func, text
+
+from app.database import DatabaseSession, run_write, get_write_queue
+from app.database.config import use_sqlite_profile
+from app.models.lottery_result import UserSubscription
+from app.services.subscription_service import SubscriptionService
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database, monkeypatch):
+    """SQLite file với production profile"""
+    monkeypatch.setenv("SQLITE_PROFILE", "production")
+    await sqlite_database(name="prod.db")
+
+
+def _subscription(user_id: int, province_code: str = "MB") -> UserSubscription:
+    return UserSubscription(user_id=user_id, province_code=province_code, is_active=True)
+
+
+class TestProfileSelection:
+    """Test use_sqlite_profile"""
+
+    def test_file_database(self, monkeypatch):
+        monkeypatch.delenv("SQLITE_PROFILE", raising=False)
+        assert use_sqlite_profile("sqlite+aiosqlite:///./xoso.db") is True
+
+    def test_memory_and_postgres_excluded(self, monkeypatch):
+        monkeypatch.delenv("SQLITE_PROFILE", raising=False)
+        assert use_sqlite_profile("sqlite+aiosqlite:///:memory:") is False
+        assert use_sqlite_profile("postgresql+asyncpg://u:p@localhost/db") is False
+
+    def test_profile_disabled(self, monkeypatch):
+        monkeypatch.setenv("SQLITE_PROFILE", "default")
+        assert use_sqlite_profile("sqlite+aiosqlite:///./xoso.db") is False
+
+
+class TestPragmas:
+    """Pragmas được áp dụng cho cả writer và reader connections"""
+
+    @pytest.mark.asyncio
+    async def test_wal_mode(self, database):
+        async with DatabaseSession() as session:
+            assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await session.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+
+    @pytest.mark.asyncio
+    async def test_read_session_is_query_only(self, database):
+        async with DatabaseSession(read_only=True) as session:
+            assert (await session.execute(text("PRAGMA query_only"))).scalar() == 1
+
+        with pytest.raises(Exception):
+            async with DatabaseSession(read_only=True) as session:
+                session.add(_subscription(1))
+                await session.flush()
+
+
+class TestWriteQueue:
+    """Test run_write / WriteQueue"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_are_batched(self, database):
+        async def add(user_id):
+            async def op(session):
+                session.add(_subscription(user_id))
+                await session.flush()
+                return user_id
+            return await run_write(op)
+
+        results = await asyncio.gather(*(add(i) for i in range(50)))
+
+        assert sorted(results) == list(range(50))
+        queue = get_write_queue()
+        assert queue.ops == 50
+        assert queue.batches < 50
+
+        async with DatabaseSession(read_only=True) as session:
+            count = (await session.execute(select(func.count(UserSubscription.id)))).scalar()
+        assert count == 50
+
+    @pytest.mark.asyncio
+    async def test_failed_op_isolated_by_savepoint(self, database):
+        async def good(session):
+            session.add(_subscription(1))
+            await session.flush()
+            return "ok"
+
+        async def bad(session):
+            raise ValueError("boom")
+
+        results = await asyncio.gather(run_write(good), run_write(bad), return_exceptions=True)
+
+        assert results[0] == "ok"
+        assert isinstance(results[1], ValueError)
+
+        async with DatabaseSession(read_only=True) as session:
+            count = (await session.execute(select(func.count(UserSubscription.id)))).scalar()
+        assert count == 1
+
+    @pytest.mark.asyncio
+    async def test_subscription_service_roundtrip(self, database):
+        service = SubscriptionService()
+
+        assert await service.subscribe(42, "MB") is True
+        assert await service.subscribe(42, "TPHCM") is True
+        assert [s.province_code for s in await service.get_user_subscriptions(42)] == ["MB", "TPHCM"]
+
+        assert await service.unsubscribe(42, "MB") is True
+        assert await service.unsubscribe(42, "DANA") is False
+        assert [s.province_code for s in await service.get_user_subscriptions(42)] == ["TPHCM"]
+
+
+class TestDefaultProfile:
+    """SQLITE_PROFILE=default: run_write chạy trực tiếp, không qua queue"""
+
+    @pytest.mark.asyncio
+    async def test_run_write_without_queue(self, sqlite_database, monkeypatch):
+        monkeypatch.setenv("SQLITE_PROFILE", "default")
+        await sqlite_database(name="plain.db")
+
+        async def op(session):
+            session.add(_subscription(7))
+            return "done"
+
+        assert await run_write(op) == "done"
+
+        async with DatabaseSession(read_only=True) as session:
+            count = (await session.execute(select(func.count(UserSubscription.id)))).scalar()
+        assert count == 1
@@ -0,0 +1,197 @@
+"""Unit tests for span tracing (app/services/tracing.py)"""
+
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.tracing as tracing
+from app.services.analytics.executor import AnalyticsExecutor
+from app.services.tracing import TraceFormatter, Tracer, current_trace_id, trace_methods, traced_update
+from app.ui.formatters import format_result_mb_full, format_trace_list, format_trace_waterfall
+
+
+@trace_methods("fake")
+class FakeService:
+    async def fetch(self, fail: bool = False):
+        await asyncio.sleep(0)
+        self.lookup()
+        if fail:
+            raise RuntimeError("boom")
+        return "ok"
+
+    async def fan_out(self):
+        return await asyncio.gather(self.fetch(), self.fetch())
+
+    def lookup(self):
+        return current_trace_id()
+
+    def _private(self):
+        return "untouched"
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer(sample_rate=1.0, buffer_size=10, file_path="")
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def callback_update(data: str, user_id: int = 7):
+    return SimpleNamespace(
+        callback_query=SimpleNamespace(data=data),
+        effective_user=SimpleNamespace(id=user_id),
+        effective_message=None,
+    )
+
+
+class TestTracer:
+    """Lấy mẫu, span lồng nhau, lỗi"""
+
+    @pytest.mark.asyncio
+    async def test_nested_spans(self, tracer):
+        with tracer.trace("result_MB", user_id=1):
+            assert await FakeService().fetch() == "ok"
+
+        record = tracer.recent()[0]
+        names = [(span["name"], span["depth"]) for span in record["spans"]]
+
+        assert names == [("result_MB", 0), ("fake.fetch", 1), ("fake.lookup", 2)]
+        assert record["attrs"] == {"user_id": 1}
+        spans = record["spans"]
+        assert spans[2]["parent_id"] == spans[1]["span_id"]
+        assert spans[1]["duration_ms"] <= record["duration_ms"]
+
+    @pytest.mark.asyncio
+    async def test_gathered_tasks_share_trace(self, tracer):
+        with tracer.trace("fan"):
+            await FakeService().fan_out()
+
+        spans = tracer.recent()[0]["spans"]
+        fan_out = next(span for span in spans if span["name"] == "fake.fan_out")
+
+        assert sum(1 for span in spans if span["parent_id"] == fan_out["span_id"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_error_recorded(self, tracer):
+        with pytest.raises(RuntimeError):
+            with tracer.trace("fail"):
+                await FakeService().fetch(fail=True)
+
+        spans = tracer.recent()[0]["spans"]
+
+        assert spans[0]["error"] == "RuntimeError"
+        assert spans[1]["error"] == "RuntimeError"
+        assert spans[2]["error"] is None
+
+    @pytest.mark.asyncio
+    async def test_not_sampled(self, tracer):
+        tracer.sample_rate = 0
+        with tracer.trace("skip") as root:
+            assert root is None
+            assert await FakeService().fetch() == "ok"
+            assert current_trace_id() is None
+
+        assert tracer.recent() == []
+        assert (tracer.started, tracer.sampled) == (1, 0)
+
+    def test_private_methods_not_wrapped(self):
+        assert FakeService._private.__qualname__ == "FakeService._private"
+        assert FakeService.fetch.__wrapped__.__name__ == "fetch"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_traces_isolated(self, tracer):
+        @traced_update
+        async def handler(update, context):
+            await asyncio.sleep(0.01)
+            return current_trace_id()
+
+        first, second = await asyncio.gather(
+            handler(callback_update("result_MB"), None),
+            handler(callback_update("stats_gan_MB"), None),
+        )
+
+        assert first and second and first != second
+        assert {record["name"] for record in tracer.recent()} == {"result_MB", "stats_gan_MB"}
+        assert all(len(record["spans"]) == 1 for record in tracer.recent())
+
+    @pytest.mark.asyncio
+    async def test_executor_and_formatter_spans(self, tracer):
+        executor = AnalyticsExecutor(kind="thread", workers=1, queue_size=2)
+        try:
+            with tracer.trace("stats"):
+                await executor.run(sorted, [2, 1])
+                format_result_mb_full({"date": "2026-01-01", "prizes": {"DB": ["12345"]}})
+        finally:
+            executor.shutdown()
+
+        names = [span["name"] for span in tracer.recent()[0]["spans"]]
+
+        assert "analytics.sorted" in names
+        assert "format.format_result_mb_full" in names
+
+
+class TestExport:
+    """Ring buffer + file JSONL"""
+
+    def test_ring_buffer(self, tracer):
+        for index in range(12):
+            with tracer.trace(f"t{index}"):
+                pass
+
+        assert [record["name"] for record in tracer.recent(3)] == ["t11", "t10", "t9"]
+        assert len(tracer.buffer) == 10
+
+        trace_id = tracer.recent()[0]["trace_id"]
+        assert tracer.find(trace_id[:6])["name"] == "t11"
+        assert tracer.find("zzzz") is None
+
+    def test_file_exporter(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(sample_rate=1.0, file_path=str(path))
+
+        with tracer.trace("result_MB"):
+            with tracer.span("cache.get", key="lottery:result:MB"):
+                pass
+        tracer.close()
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        record = json.loads(lines[0])
+
+        assert len(lines) == 1
+        assert record["spans"][1]["attrs"] == {"key": "lottery:result:MB"}
+
+    def test_file_written_off_caller_thread(self, tmp_path, monkeypatch):
+        threads = []
+        original = TraceFormatter.format
+
+        def recording(self, record):
+            threads.append(threading.current_thread())
+            return original(self, record)
+
+        monkeypatch.setattr(TraceFormatter, "format", recording)
+        tracer = Tracer(sample_rate=1.0, file_path=str(tmp_path / "traces.jsonl"))
+
+        with tracer.trace("result_MB"):
+            pass
+        tracer.close()
+
+        assert threads and threading.current_thread() not in threads
+
+
+class TestFormat:
+    def test_waterfall_and_list(self, tracer):
+        with tracer.trace("result_MB"):
+            with tracer.span("lottery.get_latest_result"):
+                with tracer.span("mu88.fetch_results"):
+                    pass
+
+        record = tracer.recent()[0]
+        waterfall = format_trace_waterfall(record)
+        listing = format_trace_list(tracer.recent(), {"sample_rate": 1.0, "started": 1, "sampled": 1})
+
+        assert "    mu88.fetch_results" in waterfall
+        assert record["trace_id"][:8] in listing
+        assert "100%" in listing
@@ -0,0 +1,152 @@
+"""Unit tests for TransitionMatrix / TransitionService (bạc nhớ)"""
+
+import random
+
+import pytest
+import pytest_asyncio
+from collections import Counter
+from datetime import date, timedelta
+
+import app.services.analytics.draw_matrix as draw_matrix
+from app.services.analytics import TransitionMatrix, TransitionService
+from app.services.db import LotteryDBService
+from app.services.db.lottery_db_service import extract_lo_numbers
+from app.services.statistics_service import StatisticsService
+
+D = date(2026, 1, 1)
+
+
+def random_draws(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        (D + timedelta(days=index), [f"{rng.randrange(100):02d}" for _ in range(18)])
+        for index in range(count)
+    ]
+
+
+def naive_next(draws, sources):
+    """Đếm trực tiếp cặp (kỳ t, kỳ t+1)"""
+    counter, occurrences = Counter(), 0
+    for (_, today), (_, tomorrow) in zip(draws, draws[1:]):
+        for source in set(sources) & set(today):
+            occurrences += 1
+            counter.update(set(tomorrow))
+    return counter, occurrences
+
+
+def build(draws, snapshot_every=10):
+    matrix = TransitionMatrix(snapshot_every)
+    for draw_date, numbers in draws:
+        matrix.add_draw(draw_date, numbers)
+    return matrix
+
+
+class TestTransitionMatrix:
+    """previous ⊗ present + prefix snapshots"""
+
+    def test_single_number(self):
+        draws = random_draws(40)
+        source = draws[3][1][0]
+        expected, occurrences = naive_next(draws, [source])
+
+        result = build(draws).next_after([source], limit=100)
+
+        assert result["occurrences"] == occurrences
+        assert {item["number"]: item["count"] for item in result["next"]} == dict(expected)
+        assert all(item["rate"] == item["count"] / occurrences for item in result["next"])
+
+    def test_draw_set(self):
+        draws = random_draws(40)
+        sources = draws[-1][1]
+        expected, occurrences = naive_next(draws, sources)
+
+        result = build(draws).next_after(sources, limit=100)
+
+        assert result["occurrences"] == occurrences
+        assert {item["number"]: item["count"] for item in result["next"]} == dict(expected)
+
+    @pytest.mark.parametrize("window", [1, 10, 23, 38])
+    def test_window_is_last_transitions(self, window):
+        draws = random_draws(40)
+        sources = [number for _, numbers in draws[-5:] for number in numbers]
+        # K kỳ gần nhất = K lần chuyển gần nhất (cần K + 1 kỳ)
+        expected, occurrences = naive_next(draws[-(window + 1):], sources)
+
+        result = build(draws).next_after(sources, draws=window, limit=100)
+
+        assert result["occurrences"] == occurrences
+        assert {item["number"]: item["count"] for item in result["next"]} == dict(expected)
+
+    def test_first_draw_has_no_transition(self):
+        matrix = build(random_draws(1))
+
+        assert sum(matrix.counts) == 0
+
+    def test_truncate_and_reload(self):
+        draws = random_draws(40)
+        matrix = build(draws)
+
+        matrix.truncate(draws[25][0])
+        assert matrix.counts == build(draws[:25]).counts
+
+        for draw_date, numbers in draws[25:]:
+            matrix.add_draw(draw_date, numbers)
+        assert matrix.counts == build(draws).counts
+
+    def test_window_cache_cleared_on_add(self):
+        draws = random_draws(40)
+        matrix = build(draws[:-1])
+        before = matrix.next_after(["05"], draws=10)
+
+        matrix.add_draw(*draws[-1])
+
+        assert matrix.next_after(["05"], draws=10) == build(draws).next_after(["05"], draws=10)
+        assert before == build(draws[:-1]).next_after(["05"], draws=10)
+
+
+@pytest_asyncio.fixture
+async def loaded(sqlite_database, monkeypatch):
+    """40 ngày MB synthetic trong SQLite tạm"""
+    results = await sqlite_database(40, ["MB"])
+    monkeypatch.setattr(draw_matrix, "REFRESH_CHECK_SECONDS", 0)
+    return results
+
+
+def result_draws(results):
+    return [(r["date"], [number for number, _ in extract_lo_numbers(r["prizes"], 2)]) for r in results]
+
+
+class TestTransitionService:
+    """Bạc nhớ từ database"""
+
+    @pytest.mark.asyncio
+    async def test_next_after_latest(self, loaded):
+        draws = result_draws(loaded)
+        expected, occurrences = naive_next(draws, draws[-1][1])
+
+        result = await TransitionService().get_next_after_latest("MB", draws=None, limit=100)
+
+        assert result["date"].isoformat() == loaded[-1]["date"]
+        assert result["numbers"] == sorted(set(draws[-1][1]))
+        assert result["occurrences"] == occurrences
+        assert {item["number"]: item["count"] for item in result["next"]} == dict(expected)
+
+    @pytest.mark.asyncio
+    async def test_resaved_latest_draw(self, loaded):
+        service = TransitionService()
+        await service.get_matrix("MB")
+
+        loaded[-1]["prizes"]["G7"] = ["42", "42", "42", "42"]
+        await LotteryDBService().save_result(loaded[-1])
+
+        expected, _ = naive_next(result_draws(loaded), ["05"])
+        result = await service.get_next_after("MB", "05", draws=None, limit=100)
+        assert {item["number"]: item["count"] for item in result["next"]} == dict(expected)
+
+    @pytest.mark.asyncio
+    async def test_statistics_service(self, loaded):
+        stats = StatisticsService(use_database=True)
+
+        assert len((await stats.get_bac_nho("MB", draws=20, limit=5))["next"]) == 5
+        assert await stats.get_bac_nho("ANGI") == {}
+        assert (await StatisticsService(use_database=False).get_bac_nho_number("MB", "05"))["next"] == []
@@ -0,0 +1,179 @@
+"""Unit tests for unit-of-work DB scopes (app/database/unit_of_work.py)"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func
+
+from app.database import DatabaseSession, unit_of_work, current_unit_of_work
+from app.database.unit_of_work import UnitOfWorkStats
+from app.models.lottery_result import LotteryResult, NotificationCheckpoint
+from app.services.db.statistics_db_service import StatisticsDBService
+from app.services.drain import DrainCoordinator, TrackingUpdateProcessor
+from app.ui.formatters import format_db_scopes
+
+
+@pytest_asyncio.fixture
+async def database(sqlite_database):
+    """SQLite production profile (read pool riêng) với 10 ngày MB"""
+    await sqlite_database(10, ["MB"])
+
+
+async def count_results() -> int:
+    async with DatabaseSession(read_only=True) as session:
+        return (await session.execute(select(func.count(LotteryResult.id)))).scalar()
+
+
+async def count_checkpoints() -> int:
+    async with DatabaseSession(read_only=True, scoped=False) as session:
+        return (await session.execute(select(func.count()).select_from(NotificationCheckpoint))).scalar()
+
+
+def checkpoint(key: str) -> NotificationCheckpoint:
+    return NotificationCheckpoint(key=key, last_user_id=1, success_count=0, failed_count=0, state={})
+
+
+class TestReadOnlyScope:
+    """Scope read-only: service lồng nhau dùng chung 1 connection"""
+
+    @pytest.mark.asyncio
+    async def test_nested_calls_share_one_checkout(self, database):
+        service = StatisticsDBService()
+
+        async with unit_of_work() as scope:
+            summary = await service.get_statistics_summary("MB", 30)
+
+        assert summary["total_draws"] == 10
+        assert summary["total_occurrences"] > 0
+        assert scope.checkouts == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_released_between_calls(self, database):
+        async with unit_of_work() as scope:
+            assert await count_results() == 10
+            assert not scope.session.in_transaction()
+            assert await count_results() == 10
+
+        assert scope.checkouts == 2
+        assert scope.closed
+
+    @pytest.mark.asyncio
+    async def test_nested_scope_reused(self, database):
+        async with unit_of_work() as outer:
+            async with unit_of_work() as inner:
+                assert inner is outer
+
+        assert current_unit_of_work() is None
+
+    @pytest.mark.asyncio
+    async def test_writes_use_own_session(self, database):
+        async with unit_of_work() as scope:
+            async with DatabaseSession() as session:
+                session.add(checkpoint("a"))
+
+            assert await count_checkpoints() == 1
+
+        assert scope.checkouts == 2
+
+    @pytest.mark.asyncio
+    async def test_child_tasks_open_own_sessions(self, database):
+        async with unit_of_work() as scope:
+            counts = await asyncio.gather(count_results(), count_results())
+
+        assert counts == [10, 10]
+        assert scope.checkouts == 2
+
+    @pytest.mark.asyncio
+    async def test_error_in_nested_call_keeps_outer_session(self, database):
+        async with unit_of_work():
+            async with DatabaseSession(read_only=True) as session:
+                rows = (await session.execute(select(LotteryResult).limit(2))).scalars().all()
+                with pytest.raises(RuntimeError):
+                    async with DatabaseSession(read_only=True):
+                        raise RuntimeError("boom")
+                assert (await session.execute(select(func.count(LotteryResult.id)))).scalar() == 10
+
+        assert all(row.province_code == "MB" for row in rows)
+
+
+class TestReadWriteScope:
+    """Scope read-write: 1 transaction, mỗi DatabaseSession lồng trong là 1 SAVEPOINT"""
+
+    @pytest.mark.asyncio
+    async def test_commit_at_scope_end(self, database):
+        async with unit_of_work(read_only=False) as scope:
+            async with DatabaseSession() as session:
+                session.add(checkpoint("a"))
+            async with DatabaseSession() as session:
+                session.add(checkpoint("b"))
+            assert scope.checkouts == 1
+            assert await count_checkpoints() == 0
+
+        assert await count_checkpoints() == 2
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self, database):
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(read_only=False):
+                async with DatabaseSession() as session:
+                    session.add(checkpoint("a"))
+                raise RuntimeError("boom")
+
+        assert await count_checkpoints() == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_nested_call_rolls_back_savepoint_only(self, database):
+        async with unit_of_work(read_only=False):
+            async with DatabaseSession() as session:
+                session.add(checkpoint("a"))
+            try:
+                async with DatabaseSession() as session:
+                    session.add(checkpoint("b"))
+                    await session.flush()
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+
+        async with DatabaseSession(read_only=True) as session:
+            keys = (await session.execute(select(NotificationCheckpoint.key))).scalars().all()
+        assert keys == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_unscoped_session_commits_immediately(self, database):
+        async with unit_of_work(read_only=False):
+            async with DatabaseSession(scoped=False) as session:
+                session.add(checkpoint("a"))
+            assert await count_checkpoints() == 1
+
+
+class TestStats:
+    """Báo cáo connection mỗi update"""
+
+    @pytest.mark.asyncio
+    async def test_update_processor_opens_scope(self, database):
+        processor = TrackingUpdateProcessor(2, drain=DrainCoordinator(timeout=1))
+        scopes = []
+
+        async def handle():
+            scopes.append(current_unit_of_work())
+            await count_results()
+
+        await processor.process_update(object(), handle())
+
+        assert scopes[0] is not None and scopes[0].kind == "update"
+        assert scopes[0].checkouts == 1
+
+    @pytest.mark.asyncio
+    async def test_snapshot_and_format(self):
+        stats = UnitOfWorkStats()
+        for checkouts in (1, 1, 2, 9):
+            stats.record(SimpleNamespace(kind="update", checkouts=checkouts))
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["kinds"]["update"] == {"scopes": 4, "avg": 3.25, "max": 9}
+        assert dict(snapshot["histogram"]) == {"0": 0, "1": 2, "2": 1, "3": 0, "4+": 1}
+        assert "update" in format_db_scopes(snapshot)
+        assert "Chưa có dữ liệu" in format_db_scopes(UnitOfWorkStats().snapshot())